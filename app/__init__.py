@@ -40,7 +40,10 @@ logger = logging.getLogger(__name__)
 
 def init_db():
     """Initialize the database by creating all tables."""
+    from app.migrations import run_migrations
+
     Base.metadata.create_all(engine)
+    run_migrations(engine)
     logger.info('Database tables ensured')
 
 from app import routes
@@ -0,0 +1,146 @@
+"""
+Schema Migrations - Brings existing SQLite databases up to the current models
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import logging
+from sqlalchemy import inspect, text
+
+from app.models import (
+    PokemonType, PokemonAbility, PokemonStat, TypeName, AbilityName, StatName, STAT_COLUMNS
+)
+from app.models.pokemon import Base
+
+
+logger = logging.getLogger(__name__)
+
+
+STAT_COLUMN_NAMES = list(STAT_COLUMNS.values()) + ['total']
+
+
+def _columns(connection, table_name):
+    return {column['name'] for column in inspect(connection).get_columns(table_name)}
+
+
+def add_stat_columns(connection):
+    """Add the wide stat columns to pokemon and backfill them from pokemon_stats."""
+    existing = _columns(connection, 'pokemon')
+    missing = [column for column in STAT_COLUMN_NAMES if column not in existing]
+    if not missing:
+        return
+
+    for column in missing:
+        connection.execute(text(f'ALTER TABLE pokemon ADD COLUMN {column} INTEGER'))
+
+    assignments = [
+        f"{column} = (SELECT base_stat FROM pokemon_stats "
+        f"WHERE pokemon_stats.pokemon_id = pokemon.id AND pokemon_stats.stat_name = '{stat_name}')"
+        for stat_name, column in STAT_COLUMNS.items()
+    ]
+    assignments.append(
+        "total = (SELECT SUM(base_stat) FROM pokemon_stats WHERE pokemon_stats.pokemon_id = pokemon.id)"
+    )
+    result = connection.execute(text(f"UPDATE pokemon SET {', '.join(assignments)}"))
+    logger.info('Backfilled stat columns for %s Pokemon', result.rowcount)
+
+
+def add_sprite_hash_column(connection):
+    """Add pokemon.sprite_hash, the local sprite cache key; it stays NULL until sprites are downloaded."""
+    if 'sprite_hash' not in _columns(connection, 'pokemon'):
+        connection.execute(text('ALTER TABLE pokemon ADD COLUMN sprite_hash VARCHAR(64)'))
+
+
+def _encode_lookup_column(connection, model, lookup_model, name_column, id_column):
+    """Rebuild a child table so its repeated name strings become ids into a lookup table."""
+    table_name = model.__tablename__
+    if table_name not in inspect(connection).get_table_names():
+        return
+    if name_column not in _columns(connection, table_name):
+        return
+
+    lookup_table = lookup_model.__tablename__
+    lookup_model.__table__.create(connection, checkfirst=True)
+    connection.execute(text(
+        f'INSERT OR IGNORE INTO {lookup_table} (name) SELECT DISTINCT {name_column} FROM {table_name}'
+    ))
+
+    # SQLite can't change a column in place: rename, recreate from the model, copy across, drop
+    legacy = f'{table_name}_legacy'
+    for index in inspect(connection).get_indexes(table_name):
+        connection.execute(text(f'DROP INDEX IF EXISTS {index["name"]}'))
+    connection.execute(text(f'ALTER TABLE {table_name} RENAME TO {legacy}'))
+    model.__table__.create(connection)
+
+    columns = [column.name for column in model.__table__.columns]
+    select_list = [f'{lookup_table}.id' if column == id_column else f'{legacy}.{column}' for column in columns]
+    connection.execute(text(
+        f'INSERT INTO {table_name} ({", ".join(columns)}) '
+        f'SELECT {", ".join(select_list)} FROM {legacy} '
+        f'JOIN {lookup_table} ON {lookup_table}.name = {legacy}.{name_column}'
+    ))
+    connection.execute(text(f'DROP TABLE {legacy}'))
+    logger.info('Moved %s.%s into lookup table %s', table_name, name_column, lookup_table)
+
+
+def encode_lookup_names(connection):
+    """Replace type/ability/stat name strings with small integer keys into lookup tables."""
+    _encode_lookup_column(connection, PokemonType, TypeName, 'type_name', 'type_id')
+    _encode_lookup_column(connection, PokemonAbility, AbilityName, 'ability_name', 'ability_id')
+    _encode_lookup_column(connection, PokemonStat, StatName, 'stat_name', 'stat_id')
+
+
+def seed_aggregates(connection):
+    """Populate the aggregate tables the first time they appear next to existing data."""
+    from app.services.aggregates import StatsAggregator
+
+    if 'metric_aggregates' not in inspect(connection).get_table_names():
+        return
+    if connection.execute(text('SELECT COUNT(*) FROM metric_aggregates')).scalar():
+        return
+    if not connection.execute(text('SELECT COUNT(*) FROM pokemon')).scalar():
+        return
+    StatsAggregator.rebuild(connection)
+
+
+def seed_change_feed(connection):
+    """Give Pokemon stored before the change feed existed their first version."""
+    from app.services.change_feed import ChangeFeed
+
+    if 'pokemon_changes' not in inspect(connection).get_table_names():
+        return
+    if connection.execute(text('SELECT COUNT(*) FROM pokemon_changes')).scalar():
+        return
+    if not connection.execute(text('SELECT COUNT(*) FROM pokemon')).scalar():
+        return
+    ChangeFeed.rebuild(connection)
+    logger.info('Seeded the change feed from existing Pokemon')
+
+
+def ensure_indexes(connection):
+    """Create any index declared on the models that an older database doesn't have yet."""
+    existing_tables = set(inspect(connection).get_table_names())
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+
+# applied in order; each step must be safe to run against an already migrated database
+MIGRATIONS = [
+    add_stat_columns,
+    add_sprite_hash_column,
+    encode_lookup_names,
+    seed_aggregates,
+    seed_change_feed,
+    # keep last so indexes only reference columns earlier steps have added
+    ensure_indexes,
+]
+
+
+def run_migrations(engine):
+    """Apply every migration step inside a single transaction."""
+    with engine.begin() as connection:
+        for migration in MIGRATIONS:
+            migration(connection)
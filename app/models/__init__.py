@@ -1,3 +1,20 @@
-from .pokemon import Pokemon, PokemonType, PokemonAbility, PokemonStat
+from .pokemon import (
+    Pokemon, PokemonType, PokemonAbility, PokemonStat,
+    TypeName, AbilityName, StatName, STAT_COLUMNS, LOCAL_SPRITE_PREFIX
+)
+from .aggregates import TypeCount, AbilityCount, MetricAggregate
+from .type_chart import TypeEffectiveness
+from .archive import RawPayload, ArchivedResource
+from .names import KnownName
+from .changes import PokemonChange
+from .species import EvolutionChain, PokemonSpecies, SpeciesVariety, EvolutionEdge, EvolutionClosure
+from .moves import MoveName, LearnMethodName, VersionGroupName, PokemonMove
 
-__all__ = ['Pokemon', 'PokemonType', 'PokemonAbility', 'PokemonStat']
+__all__ = [
+    'Pokemon', 'PokemonType', 'PokemonAbility', 'PokemonStat',
+    'TypeName', 'AbilityName', 'StatName', 'STAT_COLUMNS', 'LOCAL_SPRITE_PREFIX',
+    'TypeCount', 'AbilityCount', 'MetricAggregate', 'TypeEffectiveness',
+    'RawPayload', 'ArchivedResource', 'KnownName', 'PokemonChange',
+    'EvolutionChain', 'PokemonSpecies', 'SpeciesVariety', 'EvolutionEdge', 'EvolutionClosure',
+    'MoveName', 'LearnMethodName', 'VersionGroupName', 'PokemonMove'
+]
@@ -0,0 +1,33 @@
+"""
+Aggregate Models - Running counts and sums kept in step with the Pokemon tables
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+from sqlalchemy import Column, Integer, String, Float, ForeignKey
+
+from .pokemon import Base
+
+
+class TypeCount(Base):
+    __tablename__ = 'type_counts'
+    
+    type_id = Column(Integer, ForeignKey('type_names.id'), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class AbilityCount(Base):
+    __tablename__ = 'ability_counts'
+    
+    ability_id = Column(Integer, ForeignKey('ability_names.id'), primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class MetricAggregate(Base):
+    """Count, sum and sum of squares of one numeric Pokemon column - enough for mean and stddev."""
+    __tablename__ = 'metric_aggregates'
+    
+    metric = Column(String, primary_key=True)
+    value_count = Column(Integer, nullable=False, default=0)
+    value_sum = Column(Float, nullable=False, default=0)
+    value_sum_sq = Column(Float, nullable=False, default=0)
@@ -0,0 +1,28 @@
+"""
+Archive Models - Compressed raw PokeAPI payloads, kept for offline re-processing
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+from sqlalchemy import Column, Integer, String, LargeBinary, ForeignKey
+
+from .pokemon import Base
+
+
+class RawPayload(Base):
+    """One distinct response body, stored once however many resources point at it."""
+    __tablename__ = 'raw_payloads'
+    
+    content_hash = Column(String(64), primary_key=True)  # sha256 of the uncompressed bytes
+    codec = Column(String, nullable=False)
+    raw_size = Column(Integer, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+
+
+class ArchivedResource(Base):
+    """The latest archived payload of a PokeAPI resource, e.g. ('pokemon', 'pikachu')."""
+    __tablename__ = 'archived_resources'
+    
+    kind = Column(String, primary_key=True)
+    name = Column(String, primary_key=True)
+    content_hash = Column(String(64), ForeignKey('raw_payloads.content_hash'), nullable=False, index=True)
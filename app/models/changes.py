@@ -0,0 +1,22 @@
+"""
+Change Feed Models - The latest version of every Pokemon ever written, deleted ones included
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+from sqlalchemy import Column, Integer, String, Boolean
+
+from .pokemon import Base
+
+
+class PokemonChange(Base):
+    """Last write to one Pokemon id; a newer write replaces the row with a higher version.
+
+    Rows outlive the Pokemon they describe (deleted=True), so sync clients see deletions.
+    """
+    __tablename__ = 'pokemon_changes'
+    
+    pokemon_id = Column(Integer, primary_key=True)
+    version = Column(Integer, nullable=False, unique=True, index=True)
+    name = Column(String, nullable=False)
+    deleted = Column(Boolean, nullable=False, default=False)
@@ -0,0 +1,52 @@
+"""
+Move Models - Moves and the learnsets tying them to Pokemon
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+
+from .pokemon import Base
+
+
+class MoveName(Base):
+    __tablename__ = 'move_names'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+
+class LearnMethodName(Base):
+    """How a move is learned: 'level-up', 'machine', 'egg', 'tutor', ..."""
+    __tablename__ = 'learn_method_names'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+
+class VersionGroupName(Base):
+    """A PokeAPI version group such as 'red-blue' or 'scarlet-violet'."""
+    __tablename__ = 'version_group_names'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+
+
+class PokemonMove(Base):
+    """One learnset entry: Pokemon learns move in version group by method (at level, for level-up).
+
+    Hundreds of rows per Pokemon, so the table is WITHOUT ROWID and clustered on its key:
+    a Pokemon's moves for one version group are stored together, already in level order.
+    """
+    __tablename__ = 'pokemon_moves'
+    __table_args__ = (
+        # "who learns move X", answered from the index alone
+        Index('ix_pokemon_moves_move_version_group_pokemon', 'move_id', 'version_group_id', 'pokemon_id'),
+        {'sqlite_with_rowid': False},
+    )
+    
+    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), primary_key=True)
+    version_group_id = Column(Integer, ForeignKey('version_group_names.id'), primary_key=True)
+    level = Column(Integer, primary_key=True)
+    move_id = Column(Integer, ForeignKey('move_names.id'), primary_key=True)
+    method_id = Column(Integer, ForeignKey('learn_method_names.id'), primary_key=True)
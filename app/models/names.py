@@ -0,0 +1,16 @@
+"""
+Name List Models - Every Pokemon name PokeAPI serves, for lookups of Pokemon not stored yet
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+from sqlalchemy import Column, String
+
+from .pokemon import Base
+
+
+class KnownName(Base):
+    """One entry of PokeAPI's /pokemon list, as PokeAPI spells it (e.g. 'mr-mime')."""
+    __tablename__ = 'pokeapi_names'
+    
+    name = Column(String, primary_key=True)
@@ -4,22 +4,47 @@ Author: Vilmar Junior
 Project: Challenge Assignment
 """
 
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table, Index
+from sqlalchemy.ext.associationproxy import association_proxy
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
 
+# maps the formatted stat names coming out of DataProcessor to the wide columns on Pokemon
+STAT_COLUMNS = {
+    'HP': 'hp',
+    'ATTACK': 'attack',
+    'DEFENSE': 'defense',
+    'SPECIAL ATTACK': 'sp_atk',
+    'SPECIAL DEFENSE': 'sp_def',
+    'SPEED': 'speed',
+}
+
+# where the API serves a cached sprite, by the sha256 of its bytes
+LOCAL_SPRITE_PREFIX = '/sprites/'
+
 
 class Pokemon(Base):
     __tablename__ = 'pokemon'
     
     id = Column(Integer, primary_key=True)
     name = Column(String, unique=True, nullable=False, index=True)
-    pokedex_number = Column(Integer, nullable=False)
+    pokedex_number = Column(Integer, nullable=False, index=True)
     height = Column(Integer)
     weight = Column(Integer)
     base_experience = Column(Integer)
     sprite_url = Column(String)
+    # sha256 of the downloaded image in the local sprite cache, NULL until it's fetched
+    sprite_hash = Column(String(64))
+    
+    # denormalized copies of pokemon_stats so threshold filters and sorts hit one index
+    hp = Column(Integer, index=True)
+    attack = Column(Integer, index=True)
+    defense = Column(Integer, index=True)
+    sp_atk = Column(Integer, index=True)
+    sp_def = Column(Integer, index=True)
+    speed = Column(Integer, index=True)
+    total = Column(Integer, index=True)
     
     types = relationship("PokemonType", back_populates="pokemon", cascade="all, delete-orphan")
     abilities = relationship("PokemonAbility", back_populates="pokemon", cascade="all, delete-orphan")
@@ -28,7 +53,20 @@ class Pokemon(Base):
     def __repr__(self):
         return f"<Pokemon(name='{self.name}', pokedex_number={self.pokedex_number})>"
     
-    def to_dict(self):
+    def sync_stat_columns(self, base_stats):
+        """Copy base stats (stat name -> value, as stored in pokemon_stats) onto the wide stat columns."""
+        values = {column: None for column in STAT_COLUMNS.values()}
+        for stat_name, base_stat in base_stats.items():
+            column = STAT_COLUMNS.get(stat_name)
+            if column:
+                values[column] = base_stat
+        
+        for column, value in values.items():
+            setattr(self, column, value)
+        self.total = sum(base_stats.values()) if base_stats else None
+    
+    def to_dict(self, local_sprites=False):
+        """With local_sprites, sprite_url points at the cached copy when there is one."""
         return {
             'id': self.id,
             'name': self.name,
@@ -36,22 +74,60 @@ class Pokemon(Base):
             'height': self.height,
             'weight': self.weight,
             'base_experience': self.base_experience,
-            'sprite_url': self.sprite_url,
+            'sprite_url': LOCAL_SPRITE_PREFIX + self.sprite_hash if local_sprites and self.sprite_hash
+                          else self.sprite_url,
             'types': [t.to_dict() for t in self.types],
             'abilities': [a.to_dict() for a in self.abilities],
             'stats': [s.to_dict() for s in self.stats]
         }
 
 
+class TypeName(Base):
+    """Lookup table so pokemon_types stores a small integer instead of repeating the type name."""
+    __tablename__ = 'type_names'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    
+    def __repr__(self):
+        return f"<TypeName(id={self.id}, name='{self.name}')>"
+
+
+class AbilityName(Base):
+    __tablename__ = 'ability_names'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    
+    def __repr__(self):
+        return f"<AbilityName(id={self.id}, name='{self.name}')>"
+
+
+class StatName(Base):
+    __tablename__ = 'stat_names'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
+    
+    def __repr__(self):
+        return f"<StatName(id={self.id}, name='{self.name}')>"
+
+
 class PokemonType(Base):
     __tablename__ = 'pokemon_types'
+    __table_args__ = (
+        # covering index for "Pokemon of type X" semi-joins
+        Index('ix_pokemon_types_type_id_pokemon_id', 'type_id', 'pokemon_id'),
+    )
     
     id = Column(Integer, primary_key=True)
-    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), nullable=False)
-    type_name = Column(String, nullable=False)
+    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), nullable=False, index=True)
+    type_id = Column(Integer, ForeignKey('type_names.id'), nullable=False)
     slot = Column(Integer)
     
     pokemon = relationship("Pokemon", back_populates="types")
+    type = relationship("TypeName", lazy="selectin")
+    type_name = association_proxy("type", "name")
     
     def __repr__(self):
         return f"<PokemonType(type='{self.type_name}')>"
@@ -65,14 +141,19 @@ class PokemonType(Base):
 
 class PokemonAbility(Base):
     __tablename__ = 'pokemon_abilities'
+    __table_args__ = (
+        Index('ix_pokemon_abilities_ability_hidden_pokemon_id', 'ability_id', 'is_hidden', 'pokemon_id'),
+    )
     
     id = Column(Integer, primary_key=True)
-    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), nullable=False)
-    ability_name = Column(String, nullable=False)
+    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), nullable=False, index=True)
+    ability_id = Column(Integer, ForeignKey('ability_names.id'), nullable=False)
     is_hidden = Column(Integer, default=0)
     slot = Column(Integer)
     
     pokemon = relationship("Pokemon", back_populates="abilities")
+    ability = relationship("AbilityName", lazy="selectin")
+    ability_name = association_proxy("ability", "name")
     
     def __repr__(self):
         return f"<PokemonAbility(ability='{self.ability_name}', hidden={bool(self.is_hidden)})>"
@@ -89,12 +170,14 @@ class PokemonStat(Base):
     __tablename__ = 'pokemon_stats'
     
     id = Column(Integer, primary_key=True)
-    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), nullable=False)
-    stat_name = Column(String, nullable=False)
+    pokemon_id = Column(Integer, ForeignKey('pokemon.id'), nullable=False, index=True)
+    stat_id = Column(Integer, ForeignKey('stat_names.id'), nullable=False)
     base_stat = Column(Integer, nullable=False)
     effort = Column(Integer, default=0)
     
     pokemon = relationship("Pokemon", back_populates="stats")
+    stat = relationship("StatName", lazy="selectin")
+    stat_name = association_proxy("stat", "name")
     
     def __repr__(self):
         return f"<PokemonStat(stat='{self.stat_name}', value={self.base_stat})>"
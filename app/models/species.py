@@ -0,0 +1,92 @@
+"""
+Species Models - Species details, evolution chains and their precomputed ancestry
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Index
+
+from .pokemon import Base
+
+
+class EvolutionChain(Base):
+    __tablename__ = 'evolution_chains'
+    
+    id = Column(Integer, primary_key=True)  # PokeAPI's chain id
+    root_species_id = Column(Integer, nullable=False)
+
+
+class PokemonSpecies(Base):
+    """A PokeAPI species. Chain members that were never fetched on their own only have id, name and chain."""
+    __tablename__ = 'pokemon_species'
+    
+    id = Column(Integer, primary_key=True)  # PokeAPI's species id
+    name = Column(String, nullable=False, unique=True)
+    evolution_chain_id = Column(Integer, ForeignKey('evolution_chains.id'), index=True)
+    evolves_from_species_id = Column(Integer)
+    generation = Column(Integer)
+    genus = Column(String)
+    flavor_text = Column(String)
+    habitat = Column(String)
+    growth_rate = Column(String)
+    capture_rate = Column(Integer)
+    base_happiness = Column(Integer)
+    is_baby = Column(Boolean)
+    is_legendary = Column(Boolean)
+    is_mythical = Column(Boolean)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'evolution_chain_id': self.evolution_chain_id,
+            'evolves_from_species_id': self.evolves_from_species_id,
+            'generation': self.generation,
+            'genus': self.genus,
+            'flavor_text': self.flavor_text,
+            'habitat': self.habitat,
+            'growth_rate': self.growth_rate,
+            'capture_rate': self.capture_rate,
+            'base_happiness': self.base_happiness,
+            'is_baby': self.is_baby,
+            'is_legendary': self.is_legendary,
+            'is_mythical': self.is_mythical
+        }
+
+
+class SpeciesVariety(Base):
+    """Which species a Pokemon (as stored, e.g. 'Mr-mime-galar') belongs to."""
+    __tablename__ = 'species_varieties'
+    
+    pokemon_name = Column(String, primary_key=True)
+    species_id = Column(Integer, ForeignKey('pokemon_species.id'), nullable=False, index=True)
+    is_default = Column(Boolean, nullable=False, default=False)
+
+
+class EvolutionEdge(Base):
+    """One evolution step and what triggers it."""
+    __tablename__ = 'evolution_edges'
+    
+    from_species_id = Column(Integer, primary_key=True)
+    to_species_id = Column(Integer, primary_key=True)
+    chain_id = Column(Integer, ForeignKey('evolution_chains.id'), nullable=False, index=True)
+    trigger = Column(String)
+    min_level = Column(Integer)
+    item = Column(String)
+
+
+class EvolutionClosure(Base):
+    """Every (ancestor, descendant) pair of a chain, self pairs at depth 0 included.
+
+    Ancestors of X: rows with descendant_id = X; descendants: rows with ancestor_id = X.
+    """
+    __tablename__ = 'evolution_closure'
+    __table_args__ = (
+        # the primary key serves ancestor lookups; this one serves descendant lookups
+        Index('ix_evolution_closure_descendant_ancestor', 'descendant_id', 'ancestor_id', 'depth'),
+    )
+    
+    ancestor_id = Column(Integer, primary_key=True)
+    descendant_id = Column(Integer, primary_key=True)
+    depth = Column(Integer, nullable=False)
+    chain_id = Column(Integer, ForeignKey('evolution_chains.id'), nullable=False, index=True)
@@ -0,0 +1,18 @@
+"""
+Type Chart Models - Damage multipliers between attacking and defending types
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+from sqlalchemy import Column, Integer, Float, ForeignKey
+
+from .pokemon import Base
+
+
+class TypeEffectiveness(Base):
+    """One cell of the type chart; pairs without a row deal normal (1x) damage."""
+    __tablename__ = 'type_effectiveness'
+    
+    attacking_type_id = Column(Integer, ForeignKey('type_names.id'), primary_key=True)
+    defending_type_id = Column(Integer, ForeignKey('type_names.id'), primary_key=True)
+    multiplier = Column(Float, nullable=False)
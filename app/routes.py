@@ -4,14 +4,38 @@ Author: Vilmar Junior
 Project: Challenge Assignment
 """
 
-from flask import jsonify, request
+import logging
+
+import numpy as np
+from flask import jsonify, request, send_file
+from sqlalchemy.exc import IntegrityError
 from app import app, Session, init_db
-from app.models import Pokemon, PokemonType, PokemonAbility, PokemonStat
-from app.services import PokeAPIService, DataProcessor
+from app.models import Pokemon, TypeName
+from app.services import (
+    PokeAPIService, UpstreamError, DataProcessor, PokemonRepository, PokemonQuery, QueryError,
+    StatsAggregator, stat_matrix_store, similarity_store, type_chart_store
+)
+from app.services.stat_matrix import STAT_ORDER, parse_score
+from app.services.archive import archive_from_env
+from app.services.change_feed import MAX_PAGE_SIZE, ChangeFeed
+from app.services.damage import DamageCalculator
+from app.services.learnsets import LearnsetQuery, move_display_name
+from app.services.species import SpeciesRepository
+from app.services.sprites import MAX_AGE, download_sprites, local_sprites_enabled, sprite_store_from_env
+from app.services.name_index import NODE_CAPACITY, name_index_store
+from app.services.prefetch import Prefetcher, prefetch_enabled
+from app.services.read_model import read_model_enabled, read_model_store
+from app.services.team_optimizer import TeamOptimizer
+from app.services.type_chart import pokemon_type_ids
+
+
+logger = logging.getLogger(__name__)
 
 
-pokeapi_service = PokeAPIService()
+pokeapi_service = PokeAPIService(archive=archive_from_env(Session), moves=True)
 data_processor = DataProcessor()
+sprite_store = sprite_store_from_env()
+prefetcher = Prefetcher(Session, pokeapi_service)
 
 
 @app.route('/')
@@ -22,32 +46,126 @@ def index():
         'version': '1.0',
         'endpoints': {
             '/api/pokemon/<name>': 'GET - Fetch and store Pokemon',
-            '/api/pokemon': 'GET - List all Pokemon',
-            '/api/pokemon/<name>/info': 'GET - Get Pokemon details'
+            '/api/pokemon': 'GET - List stored Pokemon (filters: type, ability, hidden_ability, min_/max_<stat>, sort, limit, offset)',
+            '/api/pokemon/<name>/info': 'GET - Get Pokemon details',
+            '/api/pokemon/autocomplete': 'GET - Name completions for a prefix, typo-tolerant (q, limit, stored)',
+            '/api/pokemon/changes': 'GET - Pokemon written or deleted after a version, for incremental sync (since, limit)',
+            '/api/pokemon/<name>/similar': 'GET - Closest base-stat profiles (k, metric=euclidean|cosine, type)',
+            '/api/pokemon/<name>/family': 'GET - Species details and the whole evolution family',
+            '/api/pokemon/<name>/moves': 'GET - Learnset by level (version_group, method)',
+            '/api/moves/<move>/learners': 'GET - Stored Pokemon that learn a move (version_group, method)',
+            '/sprites/<hash>': 'GET - A locally cached sprite image (ETag and Range supported)',
+            '/api/prefetch/metrics': 'GET - Background prefetch counters and hit rate',
+            '/api/stats': 'GET - Type/ability counts and stat averages',
+            '/api/analytics/top': 'GET - Top k by stat or weighted formula (by, k, type)',
+            '/api/analytics/percentiles': 'GET - Stat percentiles (q, type)',
+            '/api/analytics/threshold': 'GET - Pokemon meeting every min_/max_<stat> at once',
+            '/api/analytics/zscores/<name>': 'GET - Stat z-scores of one Pokemon',
+            '/api/matchups': 'GET - Type effectiveness between stored Pokemon (pokemon, defenders)',
+            '/api/team/optimize': 'GET - Best type-coverage team (size, required, banned_types, min_total, time_budget_ms)',
+            '/api/damage': 'GET - Damage ranges, attackers x defenders (power, move_type, category, level)'
         }
     })
 
 
+def _stored_name(session, name):
+    """The stored spelling of a Pokemon name however it was typed ('MR. MIME' -> 'Mr-mime')."""
+    entry = name_index_store.get(session).lookup(name)
+    return entry.name if entry is not None and entry.stored else name.capitalize()
+
+
+def _not_found(session, name, message, stored_only=True):
+    """A 404 with did-you-mean suggestions when a name looks like a typo."""
+    body = {'error': message}
+    suggestions = name_index_store.get(session).suggest(name, stored_only=stored_only)
+    if suggestions:
+        body['did_you_mean'] = [entry.name for entry in suggestions]
+    return jsonify(body), 404
+
+
+@app.route('/api/pokemon/autocomplete', methods=['GET'])
+def autocomplete_pokemon():
+    """Names starting with q (case and punctuation ignored); close matches when none do."""
+    session = Session()
+    
+    try:
+        q = request.args.get('q', '')
+        limit = max(1, min(request.args.get('limit', 10, type=int), NODE_CAPACITY))
+        stored_only = request.args.get('stored', '').lower() in ('1', 'true', 'yes')
+        
+        index = name_index_store.get(session)
+        suggestions = index.complete(q, limit, stored_only)
+        fuzzy = not suggestions
+        if fuzzy:
+            suggestions = index.suggest(q, limit, stored_only)
+        
+        return jsonify({
+            'query': q,
+            'fuzzy': fuzzy,
+            'suggestions': [entry.to_dict() for entry in suggestions]
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+@app.route('/api/pokemon/changes', methods=['GET'])
+def pokemon_changes():
+    """Pokemon inserted, updated or deleted after version `since`, oldest first, `limit` at a time."""
+    session = Session()
+    
+    try:
+        since = request.args.get('since', 0, type=int)
+        limit = max(1, min(request.args.get('limit', 100, type=int), MAX_PAGE_SIZE))
+        if since < 0:
+            return jsonify({
+                'error': 'since must be a non-negative version'
+            }), 400
+        
+        return jsonify(ChangeFeed.page(session, since, limit)), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
 @app.route('/api/pokemon/<string:name>', methods=['GET'])
 def get_and_store_pokemon(name):
     """Fetch Pokemon from PokeAPI and save to database."""
     session = Session()
     
     try:
-        # check if we already have it
-        existing_pokemon = session.query(Pokemon).filter_by(name=name.capitalize()).first()
+        # check if we already have it, however the name was typed
+        index = name_index_store.get(session)
+        entry = index.lookup(name)
+        stored_name = entry.name if entry is not None and entry.stored else name.capitalize()
+        existing_pokemon = session.query(Pokemon).filter_by(name=stored_name).first()
         if existing_pokemon:
+            prefetcher.record_hit(existing_pokemon.id)
             return jsonify({
-                'message': f'{name.capitalize()} already in database',
-                'data': existing_pokemon.to_dict()
+                'message': f'{existing_pokemon.name} already in database',
+                'data': existing_pokemon.to_dict(local_sprites=local_sprites_enabled())
             }), 200
         
-        raw_data = pokeapi_service.get_pokemon(name)
+        # with PokeAPI's name list at hand, a name it doesn't serve isn't worth a request;
+        # the list has no numbers, so a pokedex id still goes upstream
+        if entry is None and index.has_known_names and not name.isdigit():
+            return _not_found(session, name, f'Pokemon {name} not found', stored_only=False)
+        
+        with prefetcher.foreground():
+            raw_data = pokeapi_service.get_pokemon(entry.api_name if entry is not None else name)
         
         if not raw_data:
-            return jsonify({
-                'error': f'Pokemon {name} not found'
-            }), 404
+            return _not_found(session, name, f'Pokemon {name} not found', stored_only=False)
         
         sanitized_data = data_processor.sanitize_pokemon_data(raw_data)
         
@@ -56,35 +174,41 @@ def get_and_store_pokemon(name):
                 'error': 'Failed to process data'
             }), 500
         
-        # create the main pokemon record
-        pokemon = Pokemon(
-            name=sanitized_data['name'],
-            pokedex_number=sanitized_data['pokedex_number'],
-            height=sanitized_data['height'],
-            weight=sanitized_data['weight'],
-            base_experience=sanitized_data['base_experience'],
-            sprite_url=sanitized_data['sprite_url']
-        )
-        
-        for type_data in sanitized_data['types']:
-            pokemon_type = PokemonType(**type_data)
-            pokemon.types.append(pokemon_type)
-        
-        for ability_data in sanitized_data['abilities']:
-            pokemon_ability = PokemonAbility(**ability_data)
-            pokemon.abilities.append(pokemon_ability)
-        
-        for stat_data in sanitized_data['stats']:
-            pokemon_stat = PokemonStat(**stat_data)
-            pokemon.stats.append(pokemon_stat)
-        
-        session.add(pokemon)
+        # create the main pokemon record with its types, abilities, stats and learnset
+        try:
+            pokemon = PokemonRepository.add_pokemon(session, sanitized_data, raw_data)
+        except IntegrityError:
+            # stored while we were fetching, by another request or the prefetcher
+            session.rollback()
+            existing_pokemon = session.query(Pokemon).filter_by(name=sanitized_data['name']).first()
+            if existing_pokemon is None:
+                raise
+            return jsonify({
+                'message': f'{existing_pokemon.name} already in database',
+                'data': existing_pokemon.to_dict(local_sprites=local_sprites_enabled())
+            }), 200
         session.commit()
         
-        return jsonify({
+        # the family and pokedex neighbours are likely next; fetch them while nobody waits
+        if prefetch_enabled():
+            prefetcher.after_miss(pokemon.name, pokemon.pokedex_number)
+        
+        response = jsonify({
             'message': f'{pokemon.name} saved successfully',
-            'data': pokemon.to_dict()
-        }), 201
+            'data': pokemon.to_dict(local_sprites=local_sprites_enabled())
+        })
+        if local_sprites_enabled() and sprite_store is not None:
+            # once the response is out: a slow or failing sprite host never holds up the stored Pokemon
+            pokemon_id = pokemon.id
+            response.call_on_close(lambda: _cache_sprites([pokemon_id]))
+        return response, 201
+        
+    except UpstreamError as e:
+        # PokeAPI is down or rate limiting us: the Pokemon may well exist, so not a 404
+        session.rollback()
+        return jsonify({
+            'error': f'PokeAPI unavailable: {str(e)}'
+        }), 503 if e.status_code in (429, 503) else 502
         
     except Exception as e:
         session.rollback()
@@ -96,19 +220,51 @@ def get_and_store_pokemon(name):
         session.close()
 
 
+def _cache_sprites(pokemon_ids):
+    """Download sprites in a session of their own; a failure costs only the local copy, so it's logged."""
+    session = Session()
+    try:
+        download_sprites(session, sprite_store, pokeapi_service.get_sprite, pokemon_ids, workers=1)
+        session.commit()
+    except Exception:
+        session.rollback()
+        logger.exception('Caching the sprites of Pokemon %s failed', pokemon_ids)
+    finally:
+        session.close()
+
+
 @app.route('/api/pokemon', methods=['GET'])
 def list_pokemon():
-    """List all Pokemon stored in the database."""
+    """List Pokemon stored in the database, with optional filters, sorting and paging.
+    
+    Query parameters: type, ability, hidden_ability (repeatable or comma separated),
+    min_/max_ + hp|attack|defense|sp_atk|sp_def|speed|total|pokedex,
+    sort (comma separated keys, prefix with '-' for descending), limit and offset.
+    """
     session = Session()
     
     try:
-        all_pokemon = session.query(Pokemon).all()
+        query = PokemonQuery.from_args(request.args)
+        if read_model_enabled():
+            pokemon, total = read_model_store.get(session).page(query, local_sprites_enabled())
+        else:
+            page = query.fetch(session)
+            total = len(page) if query.limit is None and not query.offset else query.count(session)
+            pokemon = [p.to_dict(local_sprites=local_sprites_enabled()) for p in page]
         
         return jsonify({
-            'count': len(all_pokemon),
-            'pokemon': [p.to_dict() for p in all_pokemon]
+            'count': len(pokemon),
+            'total': total,
+            'limit': query.limit,
+            'offset': query.offset,
+            'pokemon': pokemon
         }), 200
         
+    except QueryError as e:
+        return jsonify({
+            'error': str(e)
+        }), 400
+        
     except Exception as e:
         return jsonify({
             'error': f'An error occurred: {str(e)}'
@@ -124,14 +280,534 @@ def get_pokemon_info(name):
     session = Session()
     
     try:
-        pokemon = session.query(Pokemon).filter_by(name=name.capitalize()).first()
+        stored_name = _stored_name(session, name)
+        if read_model_enabled():
+            pokemon = read_model_store.get(session).get(stored_name, local_sprites_enabled())
+        else:
+            pokemon = session.query(Pokemon).filter_by(name=stored_name).first()
+            pokemon = pokemon.to_dict(local_sprites=local_sprites_enabled()) if pokemon else None
         
         if not pokemon:
+            return _not_found(session, name, f'Pokemon {name} not found in database')
+        
+        return jsonify(pokemon), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+@app.route('/api/pokemon/<string:name>/similar', methods=['GET'])
+def get_similar_pokemon(name):
+    """Stored Pokemon with the closest base-stat profile, from the in-memory vector index."""
+    session = Session()
+    
+    try:
+        stored_name = _stored_name(session, name)
+        pokemon_id = session.query(Pokemon.id).filter_by(name=stored_name).scalar()
+        if pokemon_id is None:
+            return _not_found(session, name, f'Pokemon {name} not found in database')
+        
+        k = min(request.args.get('k', 10, type=int), 100)
+        metric = request.args.get('metric', 'euclidean')
+        type_id = None
+        if request.args.get('type'):
+            type_id = session.query(TypeName.id).filter_by(name=request.args['type'].capitalize()).scalar() or -1
+        
+        index = similarity_store.get(session)
+        if pokemon_id not in index:
+            # stored by another process since the index was built
+            index = similarity_store.refresh(session)
+        neighbours = index.similar_to(pokemon_id, k, metric, type_id)
+        names = _pokemon_names(session, [neighbour_id for neighbour_id, _ in neighbours])
+        
+        return jsonify({
+            'name': stored_name,
+            'metric': metric,
+            'similar': [
+                {'id': neighbour_id, 'name': names.get(neighbour_id), 'distance': distance}
+                for neighbour_id, distance in neighbours
+            ]
+        }), 200
+        
+    except KeyError:
+        return _not_found(session, name, f'Pokemon {name} not found in database')
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+@app.route('/api/pokemon/<string:name>/family', methods=['GET'])
+def get_pokemon_family(name):
+    """Species details and every member of the evolution chain, with ancestors and descendants."""
+    session = Session()
+    
+    try:
+        stored_name = _stored_name(session, name)
+        species = SpeciesRepository.species_for(session, stored_name)
+        if species is None:
+            if not SpeciesRepository.has_species(session):
+                return jsonify({
+                    'error': 'Species not loaded, run python scout.py --fetch-species'
+                }), 503
+            return _not_found(session, name, f'No species stored for {name}')
+        
+        return jsonify({'pokemon': stored_name, **SpeciesRepository.family(session, species)}), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+@app.route('/api/pokemon/<string:name>/moves', methods=['GET'])
+def get_pokemon_moves(name):
+    """A stored Pokemon's learnset ordered by level, optionally for one version group and learn method."""
+    session = Session()
+    
+    try:
+        stored_name = _stored_name(session, name)
+        pokemon_id = session.query(Pokemon.id).filter_by(name=stored_name).scalar()
+        if pokemon_id is None:
+            return _not_found(session, name, f'Pokemon {name} not found in database')
+        
+        moves = LearnsetQuery.moves_of(session, pokemon_id, request.args.get('version_group'),
+                                       request.args.get('method'))
+        
+        return jsonify({
+            'pokemon': stored_name,
+            'count': len(moves),
+            'moves': moves
+        }), 200
+        
+    except QueryError as e:
+        return jsonify({
+            'error': str(e)
+        }), 400
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+@app.route('/api/moves/<string:move>/learners', methods=['GET'])
+def get_move_learners(move):
+    """Every stored Pokemon that learns a move, optionally in one version group and by one learn method."""
+    session = Session()
+    
+    try:
+        pokemon = LearnsetQuery.learners(session, move, request.args.get('version_group'),
+                                         request.args.get('method'))
+        if pokemon is None:
             return jsonify({
-                'error': f'Pokemon {name} not found in database'
+                'error': f'No stored Pokemon learns {move}'
             }), 404
         
-        return jsonify(pokemon.to_dict()), 200
+        return jsonify({
+            'move': move_display_name(move),
+            'count': len(pokemon),
+            'pokemon': pokemon
+        }), 200
+        
+    except QueryError as e:
+        return jsonify({
+            'error': str(e)
+        }), 400
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+@app.route('/sprites/<string:sprite_hash>', methods=['GET'])
+def get_sprite(sprite_hash):
+    """A cached sprite by content hash; the bytes never change, so clients may keep it for a year."""
+    if sprite_store is None or not sprite_store.has(sprite_hash):
+        return jsonify({
+            'error': 'Sprite not cached'
+        }), 404
+    
+    # conditional=True answers If-None-Match with 304 and Range requests with 206
+    response = send_file(sprite_store.path(sprite_hash), mimetype=sprite_store.content_type(sprite_hash),
+                         conditional=True, etag=sprite_hash, max_age=MAX_AGE)
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    # an SVG opened directly would run as a page on the API's origin: no scripts, no loads, and
+    # SVGs download rather than render
+    response.headers['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'; sandbox"
+    response.headers['X-Content-Type-Options'] = 'nosniff'
+    if response.mimetype == 'image/svg+xml':
+        response.headers['Content-Disposition'] = f'attachment; filename="{sprite_hash}.svg"'
+    return response
+
+
+@app.route('/api/prefetch/metrics', methods=['GET'])
+def get_prefetch_metrics():
+    """How many misses the prefetcher followed up, what it stored and how many later requests it saved."""
+    return jsonify({'enabled': prefetch_enabled(), **prefetcher.metrics()}), 200
+
+
+@app.route('/api/stats', methods=['GET'])
+def get_stats():
+    """Database statistics, served from the incrementally maintained aggregate tables."""
+    session = Session()
+    
+    try:
+        return jsonify(StatsAggregator.summary(session)), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+def _pokemon_names(session, ids):
+    if not ids:
+        return {}
+    return dict(session.query(Pokemon.id, Pokemon.name).filter(Pokemon.id.in_(ids)).all())
+
+
+def _type_mask(session, matrix):
+    """Mask for the optional ?type= filter; None when no type was asked for."""
+    type_name = request.args.get('type')
+    if not type_name:
+        return None
+    type_id = session.query(TypeName.id).filter_by(name=type_name.capitalize()).scalar()
+    return matrix.type_mask(type_id if type_id is not None else -1)
+
+
+@app.route('/api/analytics/top', methods=['GET'])
+def analytics_top():
+    """Top k Pokemon by a stat, 'total' or a weighted formula (by=attack:1.5,speed:1)."""
+    session = Session()
+    
+    try:
+        matrix = stat_matrix_store.get(session)
+        by = parse_score(request.args.get('by', 'total'))
+        k = min(request.args.get('k', 10, type=int), 1000)
+        results = matrix.top_k(by, k, _type_mask(session, matrix))
+        names = _pokemon_names(session, [r['id'] for r in results])
+        
+        return jsonify({
+            'by': by,
+            'results': [dict(r, name=names.get(r['id'])) for r in results]
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+@app.route('/api/analytics/percentiles', methods=['GET'])
+def analytics_percentiles():
+    """Percentiles of every base stat (q=25,50,75 by default)."""
+    session = Session()
+    
+    try:
+        q = [float(value) for value in request.args.get('q', '25,50,75').split(',')]
+        if any(not 0 <= value <= 100 for value in q):
+            raise ValueError('percentiles must be between 0 and 100')
+        matrix = stat_matrix_store.get(session)
+        
+        return jsonify({
+            'q': q,
+            'percentiles': matrix.percentiles(q, _type_mask(session, matrix))
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+@app.route('/api/analytics/threshold', methods=['GET'])
+def analytics_threshold():
+    """Pokemon meeting every min_<stat>/max_<stat> bound, evaluated as one vectorized mask."""
+    session = Session()
+    
+    try:
+        minimums = {stat: request.args.get(f'min_{stat}', type=int) for stat in STAT_ORDER
+                    if request.args.get(f'min_{stat}') is not None}
+        maximums = {stat: request.args.get(f'max_{stat}', type=int) for stat in STAT_ORDER
+                    if request.args.get(f'max_{stat}') is not None}
+        if None in minimums.values() or None in maximums.values():
+            raise ValueError('stat bounds must be integers')
+        matrix = stat_matrix_store.get(session)
+        mask = matrix.threshold_mask(minimums, maximums)
+        type_mask = _type_mask(session, matrix)
+        if type_mask is not None:
+            mask &= type_mask
+        ids = [int(pokemon_id) for pokemon_id in matrix.ids[mask]]
+        names = _pokemon_names(session, ids)
+        
+        return jsonify({
+            'count': len(ids),
+            'pokemon': [{'id': pokemon_id, 'name': names.get(pokemon_id)} for pokemon_id in ids]
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+@app.route('/api/analytics/zscores/<string:name>', methods=['GET'])
+def analytics_zscores(name):
+    """How far each of a Pokemon's base stats sits from the dex mean, in standard deviations."""
+    session = Session()
+    
+    try:
+        stored_name = _stored_name(session, name)
+        pokemon_id = session.query(Pokemon.id).filter_by(name=stored_name).scalar()
+        if pokemon_id is None:
+            return _not_found(session, name, f'Pokemon {name} not found in database')
+        
+        matrix = stat_matrix_store.get(session)
+        if matrix.row(pokemon_id) is None:
+            # stored since the matrix was built, by a write it hasn't noticed yet
+            matrix = stat_matrix_store.refresh(session)
+        zscores = matrix.zscores(pokemon_id)
+        return jsonify({
+            'name': stored_name,
+            'zscores': dict(zip(STAT_ORDER, zscores.tolist()))
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+def _name_list(key):
+    """Names from a repeatable and/or comma-separated query parameter."""
+    return [part.strip().capitalize() for value in request.args.getlist(key)
+            for part in value.split(',') if part.strip()]
+
+
+@app.route('/api/matchups', methods=['GET'])
+def get_matchups():
+    """Attacker-vs-defender type effectiveness for a set of stored Pokemon, in one batched call.
+
+    ?pokemon= lists the attackers; ?defenders= defaults to the same set.
+    """
+    session = Session()
+    
+    try:
+        attackers = _name_list('pokemon')
+        defenders = _name_list('defenders') or attackers
+        if not attackers:
+            return jsonify({'error': 'pokemon is required'}), 400
+        if len(set(attackers) | set(defenders)) > 200:
+            return jsonify({'error': 'at most 200 Pokemon per call'}), 400
+        
+        chart = type_chart_store.get(session)
+        if not len(chart):
+            return jsonify({
+                'error': 'Type chart not loaded, run python scout.py --fetch-types'
+            }), 503
+        
+        ids = dict(session.query(Pokemon.name, Pokemon.id).filter(
+            Pokemon.name.in_(set(attackers) | set(defenders))
+        ).all())
+        missing = sorted({name for name in attackers + defenders if name not in ids})
+        if missing:
+            return jsonify({
+                'error': f'Pokemon not found in database: {", ".join(missing)}'
+            }), 404
+        
+        attacker_types = pokemon_type_ids(session, [ids[name] for name in attackers])
+        defender_types = pokemon_type_ids(session, [ids[name] for name in defenders])
+        by_type, best = chart.matchups(attacker_types, defender_types)
+        profiles = chart.defensive_profiles(defender_types)
+        
+        return jsonify({
+            'attackers': attackers,
+            'defenders': defenders,
+            'effectiveness': best.tolist(),
+            'by_type': {
+                attacker: {
+                    chart.names[column]: by_type[i, slot].tolist()
+                    for slot, column in enumerate(chart.columns(attacker_types[i])) if column < len(chart)
+                }
+                for i, attacker in enumerate(attackers)
+            },
+            'defense': {defender: chart.profile_dict(profiles[i]) for i, defender in enumerate(defenders)}
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+@app.route('/api/team/optimize', methods=['GET'])
+def optimize_team():
+    """Team of stored Pokemon with the widest offensive/defensive type coverage, via branch-and-bound."""
+    session = Session()
+    
+    try:
+        chart = type_chart_store.get(session)
+        if not len(chart):
+            return jsonify({
+                'error': 'Type chart not loaded, run python scout.py --fetch-types'
+            }), 503
+        
+        size = request.args.get('size', 6, type=int)
+        min_total = request.args.get('min_total', type=int)
+        time_budget = min(request.args.get('time_budget_ms', 1000, type=int), 10000) / 1000
+        
+        required = _name_list('required')
+        required_ids = dict(session.query(Pokemon.name, Pokemon.id).filter(Pokemon.name.in_(required)).all())
+        missing = [name for name in required if name not in required_ids]
+        if missing:
+            return jsonify({
+                'error': f'Pokemon not found in database: {", ".join(missing)}'
+            }), 404
+        banned_type_ids = [type_id for (type_id,) in session.query(TypeName.id).filter(
+            TypeName.name.in_(_name_list('banned_types'))
+        ).all()]
+        
+        optimizer = TeamOptimizer(stat_matrix_store.get(session), chart)
+        result = optimizer.optimize(size, [required_ids[name] for name in required], banned_type_ids,
+                                    min_total, time_budget)
+        names = _pokemon_names(session, result['ids'])
+        result['team'] = [{'id': pokemon_id, 'name': names.get(pokemon_id)} for pokemon_id in result.pop('ids')]
+        return jsonify(result), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+        
+    except Exception as e:
+        return jsonify({
+            'error': f'An error occurred: {str(e)}'
+        }), 500
+        
+    finally:
+        session.close()
+
+
+@app.route('/api/damage', methods=['GET'])
+def get_damage():
+    """Min/max damage for every attacker against every defender, computed as one batch.
+
+    With ?move_type= every attacker uses that move; without it each uses its best STAB move.
+    """
+    session = Session()
+    
+    try:
+        attackers = _name_list('attacker')
+        defenders = _name_list('defender') or attackers
+        if not attackers:
+            return jsonify({'error': 'attacker is required'}), 400
+        if len(set(attackers) | set(defenders)) > 200:
+            return jsonify({'error': 'at most 200 Pokemon per call'}), 400
+        
+        chart = type_chart_store.get(session)
+        if not len(chart):
+            return jsonify({
+                'error': 'Type chart not loaded, run python scout.py --fetch-types'
+            }), 503
+        
+        power = request.args.get('power', 80, type=int)
+        level = request.args.get('level', 50, type=int)
+        category = request.args.get('category', 'physical')
+        if not 0 < power <= 250:
+            raise ValueError('power must be between 1 and 250')
+        if category not in ('physical', 'special'):
+            raise ValueError("category must be 'physical' or 'special'")
+        
+        matrix = stat_matrix_store.get(session)
+        ids = dict(session.query(Pokemon.name, Pokemon.id).filter(
+            Pokemon.name.in_(set(attackers) | set(defenders))
+        ).all())
+        missing = sorted({name for name in attackers + defenders if name not in ids})
+        if missing:
+            return jsonify({
+                'error': f'Pokemon not found in database: {", ".join(missing)}'
+            }), 404
+        if any(matrix.row(pokemon_id) is None for pokemon_id in ids.values()):
+            # stored since the matrix was built, by a write it hasn't noticed yet
+            matrix = stat_matrix_store.refresh(session)
+        missing = sorted({name for name in attackers + defenders if matrix.row(ids[name]) is None})
+        if missing:
+            return jsonify({
+                'error': f'No stats stored for: {", ".join(missing)}'
+            }), 404
+        attacker_rows = np.array([matrix.row(ids[name]) for name in attackers])
+        defender_rows = np.array([matrix.row(ids[name]) for name in defenders])
+        
+        calculator = DamageCalculator(matrix, chart, level)
+        move_type = request.args.get('move_type')
+        if move_type:
+            if move_type.capitalize() not in chart.names:
+                raise ValueError(f"unknown move_type '{move_type}', expected one of: {', '.join(chart.names)}")
+            move_type_id = chart.type_ids[chart.names.index(move_type.capitalize())]
+            low, high = calculator.damage(attacker_rows[:, None], defender_rows[None, :], np.array(power),
+                                          np.array(move_type_id), np.array(category == 'physical'))
+        else:
+            low, high = calculator.best_stab_damage(attacker_rows, defender_rows, power)
+        
+        return jsonify({
+            'attackers': attackers,
+            'defenders': defenders,
+            'defender_hp': calculator.hp(defender_rows).tolist(),
+            'min': low.tolist(),
+            'max': high.tolist()
+        }), 200
+        
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
         
     except Exception as e:
         return jsonify({
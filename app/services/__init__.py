@@ -1,4 +1,14 @@
-from .pokeapi import PokeAPIService
+from .pokeapi import PokeAPIService, UpstreamError
 from .data_processor import DataProcessor
+from .persistence import PokemonRepository
+from .pokemon_query import PokemonQuery, QueryError
+from .aggregates import StatsAggregator
+from .stat_matrix import StatMatrix, stat_matrix_store
+from .similarity import StatVectorIndex, similarity_store
+from .type_chart import TypeChart, TypeChartRepository, type_chart_store
 
-__all__ = ['PokeAPIService', 'DataProcessor']
+__all__ = [
+    'PokeAPIService', 'UpstreamError', 'DataProcessor', 'PokemonRepository', 'PokemonQuery', 'QueryError',
+    'StatsAggregator', 'StatMatrix', 'stat_matrix_store', 'StatVectorIndex', 'similarity_store',
+    'TypeChart', 'TypeChartRepository', 'type_chart_store'
+]
@@ -0,0 +1,227 @@
+"""
+Aggregates - Maintains the type/ability counts and metric sums used by /api/stats
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import logging
+import math
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import event, func, inspect, select, delete
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session as OrmSession, object_session
+
+from app.models import (
+    Pokemon, PokemonType, PokemonAbility, TypeName, AbilityName, STAT_COLUMNS,
+    TypeCount, AbilityCount, MetricAggregate
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+METRICS = ['height', 'weight', 'base_experience'] + list(STAT_COLUMNS.values()) + ['total']
+# the number of Pokemon lives in this row's value_count; its sums stay at zero
+POKEMON_COUNT_METRIC = 'pokemon'
+
+
+class AggregateDeltas:
+    """Changes collected while a flush runs, written out in one batch at the end of it."""
+
+    def __init__(self):
+        self.metrics = defaultdict(lambda: [0, 0.0, 0.0])
+        self.types = Counter()
+        self.abilities = Counter()
+
+    def add_pokemon(self, values: Dict[str, Any], sign: int):
+        self.metrics[POKEMON_COUNT_METRIC][0] += sign
+        for metric in METRICS:
+            value = values.get(metric)
+            if value is not None:
+                entry = self.metrics[metric]
+                entry[0] += sign
+                entry[1] += sign * value
+                entry[2] += sign * value * value
+
+    def is_empty(self) -> bool:
+        return not (self.metrics or self.types or self.abilities)
+
+    def apply(self, connection):
+        if self.metrics:
+            stmt = insert(MetricAggregate.__table__)
+            connection.execute(stmt.on_conflict_do_update(
+                index_elements=['metric'],
+                set_={
+                    'value_count': MetricAggregate.value_count + stmt.excluded.value_count,
+                    'value_sum': MetricAggregate.value_sum + stmt.excluded.value_sum,
+                    'value_sum_sq': MetricAggregate.value_sum_sq + stmt.excluded.value_sum_sq,
+                }
+            ), [
+                {'metric': metric, 'value_count': count, 'value_sum': total, 'value_sum_sq': total_sq}
+                for metric, (count, total, total_sq) in self.metrics.items()
+            ])
+
+        for model, key, counts in ((TypeCount, 'type_id', self.types), (AbilityCount, 'ability_id', self.abilities)):
+            rows = [{key: row_id, 'count': count} for row_id, count in counts.items() if count]
+            if rows:
+                stmt = insert(model.__table__)
+                connection.execute(stmt.on_conflict_do_update(
+                    index_elements=[key],
+                    set_={'count': model.count + stmt.excluded.count}
+                ), rows)
+
+
+def _deltas(target) -> AggregateDeltas:
+    session = object_session(target)
+    return session.info.setdefault('aggregate_deltas', AggregateDeltas())
+
+
+def _pokemon_values(target) -> Dict[str, Any]:
+    return {metric: getattr(target, metric) for metric in METRICS}
+
+
+def _on_pokemon_insert(mapper, connection, target):
+    _deltas(target).add_pokemon(_pokemon_values(target), 1)
+
+
+def _on_pokemon_delete(mapper, connection, target):
+    _deltas(target).add_pokemon(_pokemon_values(target), -1)
+
+
+def _on_pokemon_update(mapper, connection, target):
+    state = inspect(target)
+    deltas = _deltas(target)
+    for metric in METRICS:
+        history = state.attrs[metric].history
+        if not history.has_changes():
+            continue
+        entry = deltas.metrics[metric]
+        for old in history.deleted:
+            if old is not None:
+                entry[0] -= 1
+                entry[1] -= old
+                entry[2] -= old * old
+        for new in history.added:
+            if new is not None:
+                entry[0] += 1
+                entry[1] += new
+                entry[2] += new * new
+
+
+def _child_listeners(model, key: str, counter: str):
+    def on_insert(mapper, connection, target):
+        getattr(_deltas(target), counter)[getattr(target, key)] += 1
+
+    def on_delete(mapper, connection, target):
+        getattr(_deltas(target), counter)[getattr(target, key)] -= 1
+
+    def on_update(mapper, connection, target):
+        history = inspect(target).attrs[key].history
+        counts = getattr(_deltas(target), counter)
+        for old in history.deleted:
+            counts[old] -= 1
+        for new in history.added:
+            counts[new] += 1
+
+    event.listen(model, 'after_insert', on_insert)
+    # before_delete: the row (and its lazily loaded columns) still exists
+    event.listen(model, 'before_delete', on_delete)
+    event.listen(model, 'before_update', on_update)
+
+
+def _reset_deltas(session, flush_context, instances):
+    session.info['aggregate_deltas'] = AggregateDeltas()
+
+
+def _apply_deltas(session, flush_context):
+    deltas = session.info.pop('aggregate_deltas', None)
+    if deltas is not None and not deltas.is_empty():
+        deltas.apply(session.connection())
+
+
+event.listen(Pokemon, 'after_insert', _on_pokemon_insert)
+event.listen(Pokemon, 'before_delete', _on_pokemon_delete)
+event.listen(Pokemon, 'before_update', _on_pokemon_update)
+_child_listeners(PokemonType, 'type_id', 'types')
+_child_listeners(PokemonAbility, 'ability_id', 'abilities')
+event.listen(OrmSession, 'before_flush', _reset_deltas)
+event.listen(OrmSession, 'after_flush', _apply_deltas)
+
+
+class StatsAggregator:
+    """Reads and repairs the aggregate tables."""
+
+    @staticmethod
+    def record_bulk_insert(connection, pokemon_rows: Iterable[Dict[str, Any]],
+                           type_ids: Iterable[int], ability_ids: Iterable[int]):
+        """Account for rows written with Core executemany, which bypasses the ORM events."""
+        deltas = AggregateDeltas()
+        for values in pokemon_rows:
+            deltas.add_pokemon(values, 1)
+        deltas.types.update(type_ids)
+        deltas.abilities.update(ability_ids)
+        if not deltas.is_empty():
+            deltas.apply(connection)
+
+    @staticmethod
+    def rebuild(connection):
+        """Recompute every aggregate from the base tables (drift repair)."""
+        for model in (MetricAggregate, TypeCount, AbilityCount):
+            connection.execute(delete(model))
+
+        connection.execute(insert(TypeCount).from_select(
+            ['type_id', 'count'],
+            select(PokemonType.type_id, func.count()).group_by(PokemonType.type_id)
+        ))
+        connection.execute(insert(AbilityCount).from_select(
+            ['ability_id', 'count'],
+            select(PokemonAbility.ability_id, func.count()).group_by(PokemonAbility.ability_id)
+        ))
+
+        columns = [func.count()]
+        for metric in METRICS:
+            column = getattr(Pokemon, metric)
+            columns += [func.count(column), func.coalesce(func.sum(column), 0),
+                        func.coalesce(func.sum(column * column), 0)]
+        row = connection.execute(select(*columns)).one()
+        rows = [{'metric': POKEMON_COUNT_METRIC, 'value_count': row[0], 'value_sum': 0, 'value_sum_sq': 0}]
+        for i, metric in enumerate(METRICS):
+            count, total, total_sq = row[1 + 3 * i:4 + 3 * i]
+            rows.append({'metric': metric, 'value_count': count, 'value_sum': total, 'value_sum_sq': total_sq})
+        connection.execute(insert(MetricAggregate), rows)
+        logger.info('Rebuilt aggregates for %s Pokemon', row[0])
+
+    @staticmethod
+    def summary(session) -> Dict[str, Any]:
+        """Everything /api/stats reports, read straight from the aggregate tables."""
+        metrics = {}
+        total = 0
+        for row in session.query(MetricAggregate).all():
+            if row.metric == POKEMON_COUNT_METRIC:
+                total = row.value_count
+                continue
+            metrics[row.metric] = StatsAggregator._describe(row.value_count, row.value_sum, row.value_sum_sq)
+
+        types = session.query(TypeName.name, TypeCount.count).join(
+            TypeName, TypeName.id == TypeCount.type_id
+        ).filter(TypeCount.count > 0).order_by(TypeCount.count.desc(), TypeName.name).all()
+        abilities = session.query(AbilityName.name, AbilityCount.count).join(
+            AbilityName, AbilityName.id == AbilityCount.ability_id
+        ).filter(AbilityCount.count > 0).order_by(AbilityCount.count.desc(), AbilityName.name).all()
+
+        return {
+            'total': total,
+            'types': {name: count for name, count in types},
+            'abilities': {name: count for name, count in abilities},
+            'metrics': {metric: metrics.get(metric, StatsAggregator._describe(0, 0, 0)) for metric in METRICS}
+        }
+
+    @staticmethod
+    def _describe(count: int, total: float, total_sq: float) -> Dict[str, Optional[float]]:
+        if not count:
+            return {'count': 0, 'mean': None, 'stddev': None}
+        mean = total / count
+        variance = max(total_sq / count - mean * mean, 0.0)
+        return {'count': count, 'mean': mean, 'stddev': math.sqrt(variance)}
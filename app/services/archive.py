@@ -0,0 +1,207 @@
+"""
+Archive - Compressed, deduplicated store of raw PokeAPI payloads and offline re-processing
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import hashlib
+import json
+import logging
+import os
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.sqlite import insert
+
+from app.models import ArchivedResource, Pokemon, PokemonAbility, PokemonMove, PokemonStat, PokemonType, RawPayload
+from app.services.aggregates import StatsAggregator
+from app.services.data_processor import DataProcessor
+from app.services.persistence import PokemonRepository
+from app.services.pokemon_record import PokemonBatch
+from app.services.selective_json import POKEMON_FIELDS_WITH_MOVES, parse_pokemon
+
+try:
+    import zstandard
+except ImportError:  # optional: zlib is always there
+    zstandard = None
+
+
+logger = logging.getLogger(__name__)
+
+
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 10
+
+
+def compress(data: bytes) -> Tuple[str, bytes]:
+    """(codec, blob): zstd when the zstandard package is installed, zlib otherwise."""
+    if zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return 'zlib', zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress(codec: str, blob: bytes) -> bytes:
+    if codec == 'zlib':
+        return zlib.decompress(blob)
+    if codec == 'zstd':
+        if zstandard is None:
+            raise RuntimeError('This archive holds zstd payloads; install zstandard to read them')
+        return zstandard.ZstdDecompressor().decompress(blob)
+    if codec == 'none':
+        return blob
+    raise ValueError(f"Unknown archive codec '{codec}'")
+
+
+class PayloadArchive:
+    """Content-addressed archive of response bodies in raw_payloads/archived_resources.
+
+    Identical bodies are stored once (keyed by their sha256) and every resource points at
+    its latest body. Writes use their own short session, so archiving never depends on
+    (or breaks) whatever the caller does with the parsed data.
+    """
+
+    def __init__(self, session_factory: Callable):
+        self.session_factory = session_factory
+
+    def store(self, kind: str, name: str, data: bytes) -> Optional[str]:
+        """Archive one body; returns its hash, or None if it could not be written."""
+        session = self.session_factory()
+        try:
+            content_hash = self.store_in(session, kind, name, data)
+            session.commit()
+            return content_hash
+        except Exception as e:
+            session.rollback()
+            logger.warning("Could not archive %s '%s': %s", kind, name, e)
+            return None
+        finally:
+            session.close()
+
+    @staticmethod
+    def store_in(session, kind: str, name: str, data: bytes) -> str:
+        content_hash = hashlib.sha256(data).hexdigest()
+        known = session.execute(
+            select(RawPayload.content_hash).where(RawPayload.content_hash == content_hash)
+        ).scalar()
+        if known is None:
+            codec, blob = compress(data)
+            session.execute(insert(RawPayload).values(
+                content_hash=content_hash, codec=codec, raw_size=len(data), data=blob
+            ).on_conflict_do_nothing(index_elements=['content_hash']))
+        stmt = insert(ArchivedResource).values(kind=kind, name=name, content_hash=content_hash)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['kind', 'name'], set_={'content_hash': stmt.excluded.content_hash}
+        ))
+        return content_hash
+
+    @staticmethod
+    def load(session, kind: str, name: str) -> Optional[bytes]:
+        row = session.execute(
+            select(RawPayload.codec, RawPayload.data)
+            .join(ArchivedResource, ArchivedResource.content_hash == RawPayload.content_hash)
+            .where(ArchivedResource.kind == kind, ArchivedResource.name == name)
+        ).first()
+        return decompress(*row) if row else None
+
+    @staticmethod
+    def compressed(session, kind: str, chunk_size: int = 200) -> Iterator[List[Tuple[str, bytes]]]:
+        """Every archived resource of `kind` as (codec, blob) lists of `chunk_size`, streamed."""
+        result = session.execute(
+            select(RawPayload.codec, RawPayload.data)
+            .join(ArchivedResource, ArchivedResource.content_hash == RawPayload.content_hash)
+            .where(ArchivedResource.kind == kind)
+            .order_by(ArchivedResource.name)
+            .execution_options(yield_per=chunk_size)
+        )
+        for partition in result.partitions():
+            yield [tuple(row) for row in partition]
+
+    @staticmethod
+    def summary(session) -> Dict[str, int]:
+        """Resources archived, distinct bodies behind them, and their raw vs compressed bytes."""
+        payloads, raw_bytes, stored_bytes = session.execute(select(
+            func.count(), func.coalesce(func.sum(RawPayload.raw_size), 0),
+            func.coalesce(func.sum(func.length(RawPayload.data)), 0)
+        )).one()
+        resources = session.execute(select(func.count()).select_from(ArchivedResource)).scalar()
+        return {
+            'resources': resources, 'payloads': payloads, 'raw_bytes': raw_bytes, 'stored_bytes': stored_bytes
+        }
+
+
+def archive_from_env(session_factory: Callable) -> Optional[PayloadArchive]:
+    """A PayloadArchive when ARCHIVE_RAW_PAYLOADS is set to a true value, else None."""
+    if os.environ.get('ARCHIVE_RAW_PAYLOADS', '').lower() in ('1', 'true', 'yes', 'on'):
+        return PayloadArchive(session_factory)
+    return None
+
+
+def _sanitize_blobs(blobs: List[Tuple[str, bytes]]) -> PokemonBatch:
+    """Worker: decompress, parse and sanitize one chunk of archived /pokemon bodies."""
+    payloads = []
+    for codec, blob in blobs:
+        data = decompress(codec, blob)
+        try:
+            payloads.append(parse_pokemon(data, POKEMON_FIELDS_WITH_MOVES))
+        except ValueError:
+            try:
+                payloads.append(json.loads(data))
+            except ValueError:
+                payloads.append(None)
+    return DataProcessor.sanitize_many(payloads)
+
+
+def _in_order(chunks, workers: int) -> Iterator[PokemonBatch]:
+    """Sanitize chunks across `workers` processes, yielding in input order with a bounded backlog."""
+    if workers <= 1:
+        for chunk in chunks:
+            yield _sanitize_blobs(chunk)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(executor.submit(_sanitize_blobs, chunk))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def reprocess(session, workers: Optional[int] = None, chunk_size: int = 200) -> Dict[str, int]:
+    """Re-run sanitization over every archived /pokemon body, with no network access.
+
+    Pokemon already stored are replaced in place (keeping their ids, and their cached
+    sprite while the sprite URL is unchanged), new ones are added, and the aggregates are
+    rebuilt at the end. Nothing is committed; the caller does that.
+    """
+    workers = workers or os.cpu_count() or 1
+    stored = skipped = 0
+    for batch in _in_order(PayloadArchive.compressed(session, 'pokemon', chunk_size), workers):
+        skipped += len(batch.skipped)
+        if not len(batch):
+            continue
+        existing = {row.name: (row.id, row.sprite_url, row.sprite_hash) for row in session.execute(
+            select(Pokemon.name, Pokemon.id, Pokemon.sprite_url, Pokemon.sprite_hash)
+            .where(Pokemon.name.in_(batch.names))
+        )}
+        if existing:
+            replaced = [pokemon_id for pokemon_id, _, _ in existing.values()]
+            for model in (PokemonType, PokemonAbility, PokemonStat, PokemonMove):
+                session.execute(delete(model.__table__).where(model.__table__.c.pokemon_id.in_(replaced)))
+            session.execute(delete(Pokemon.__table__).where(Pokemon.__table__.c.id.in_(replaced)))
+        kept = [existing.get(name, (None, None, None)) for name in batch.names]
+        # a cached sprite stays valid while the payload still points at the same image
+        PokemonRepository.bulk_insert(
+            session, batch, ids=[pokemon_id for pokemon_id, _, _ in kept],
+            sprite_hashes=[sprite_hash if sprite_url == url else None
+                           for (_, sprite_url, sprite_hash), url in zip(kept, batch.sprite_urls)]
+        )
+        stored += len(batch)
+
+    # the deletes above bypass the aggregate bookkeeping, so recount once at the end
+    StatsAggregator.rebuild(session.connection())
+    logger.info('Reprocessed %s archived Pokemon (%s skipped) with %s workers', stored, skipped, workers)
+    return {'stored': stored, 'skipped': skipped, 'workers': workers}
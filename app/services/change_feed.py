@@ -0,0 +1,124 @@
+"""
+Change Feed - Versions every Pokemon write so clients can sync incrementally
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session as OrmSession, selectinload
+
+from app.models import Pokemon, PokemonType, PokemonAbility, PokemonStat, PokemonChange
+
+
+logger = logging.getLogger(__name__)
+
+
+MAX_PAGE_SIZE = 1000
+
+
+class ChangeFeed:
+    """pokemon_changes holds one row per Pokemon id with the version of its last write.
+
+    Versions come from one counter shared by every write, so `version > since`
+    on the unique version index is exactly what a client hasn't seen yet.
+    """
+
+    @staticmethod
+    def latest_version(connection) -> int:
+        return connection.execute(select(func.max(PokemonChange.version))).scalar() or 0
+
+    @staticmethod
+    def record(connection, changed: Dict[int, str], deleted: Optional[Dict[int, str]] = None):
+        """Give each written (id -> name) and deleted (id -> last name) Pokemon the next version."""
+        deleted = deleted or {}
+        if not changed and not deleted:
+            return
+        version = ChangeFeed.latest_version(connection)
+        rows = []
+        for is_deleted, names in ((False, changed), (True, deleted)):
+            for pokemon_id in sorted(names):
+                version += 1
+                rows.append({'pokemon_id': pokemon_id, 'version': version,
+                             'name': names[pokemon_id], 'deleted': is_deleted})
+        stmt = insert(PokemonChange.__table__)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=['pokemon_id'],
+            set_={'version': stmt.excluded.version, 'name': stmt.excluded.name, 'deleted': stmt.excluded.deleted}
+        ), rows)
+
+    @staticmethod
+    def rebuild(connection):
+        """Version every stored Pokemon from scratch, in id order (databases older than the feed)."""
+        connection.execute(PokemonChange.__table__.delete())
+        connection.execute(insert(PokemonChange.__table__).from_select(
+            ['pokemon_id', 'version', 'name', 'deleted'],
+            select(Pokemon.id, func.row_number().over(order_by=Pokemon.id), Pokemon.name, False)
+        ))
+
+    @staticmethod
+    def page(session, since: int = 0, limit: int = 100) -> Dict[str, Any]:
+        """Pokemon written after `since`, oldest change first, with tombstones for deleted ones.
+
+        Only the latest write per Pokemon is kept, so a client that resumes from `next_since`
+        until `has_more` is false ends up with the current data in O(changes).
+        """
+        rows = session.execute(
+            select(PokemonChange).where(PokemonChange.version > since)
+            .order_by(PokemonChange.version).limit(limit + 1)
+        ).scalars().all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        live_ids = [row.pokemon_id for row in rows if not row.deleted]
+        pokemon = {}
+        if live_ids:
+            pokemon = {p.id: p for p in session.query(Pokemon).filter(Pokemon.id.in_(live_ids)).options(
+                selectinload(Pokemon.types),
+                selectinload(Pokemon.abilities),
+                selectinload(Pokemon.stats)
+            )}
+
+        changes = []
+        for row in rows:
+            current = pokemon.get(row.pokemon_id)
+            changes.append({
+                'version': row.version,
+                'id': row.pokemon_id,
+                'name': row.name,
+                'deleted': row.deleted,
+                'data': current.to_dict() if current is not None else None
+            })
+        return {
+            'since': since,
+            'next_since': rows[-1].version if rows else since,
+            'latest_version': ChangeFeed.latest_version(session),
+            'has_more': has_more,
+            'changes': changes
+        }
+
+
+def _record_flushed_changes(session, flush_context):
+    # after_flush: ids are assigned but new/dirty/deleted still describe what was flushed
+    deleted = {obj.id: obj.name for obj in session.deleted if isinstance(obj, Pokemon)}
+    changed = {}
+    parents = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Pokemon):
+            # dirty also holds objects whose attributes were set to the values they already had
+            if obj.id not in deleted and session.is_modified(obj):
+                changed[obj.id] = obj.name
+        elif isinstance(obj, (PokemonType, PokemonAbility, PokemonStat)):
+            if obj.pokemon_id is not None and obj.pokemon_id not in deleted:
+                parents.add(obj.pokemon_id)
+    parents.difference_update(changed)
+    connection = session.connection()
+    if parents:
+        changed.update(connection.execute(select(Pokemon.id, Pokemon.name).where(Pokemon.id.in_(parents))).all())
+    ChangeFeed.record(connection, changed, deleted)
+
+
+event.listen(OrmSession, 'after_flush', _record_flushed_changes)
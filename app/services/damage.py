@@ -0,0 +1,150 @@
+"""
+Damage - Batched damage-range calculations over stored base stats and types
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+from typing import Iterator, Optional, Tuple
+
+import numpy as np
+
+from app.services.stat_matrix import STAT_ORDER, StatMatrix
+from app.services.type_chart import TypeChart
+
+
+HP, ATTACK, DEFENSE, SP_ATK, SP_DEF = (STAT_ORDER.index(stat) for stat in ('hp', 'attack', 'defense', 'sp_atk', 'sp_def'))
+# damage rolls run from 85% to 100% of the base damage
+MIN_ROLL = 85
+
+
+class DamageCalculator:
+    """Gen V+ damage formula evaluated on whole arrays of attacker/defender/move tuples.
+
+    Stats are derived from base stats at `level` with fixed IVs/EVs and a neutral nature,
+    and the damage is rounded down after the random roll, STAB and type effectiveness in turn.
+    """
+
+    def __init__(self, matrix: StatMatrix, chart: TypeChart, level: int = 50, iv: int = 31, ev: int = 0):
+        if not 1 <= level <= 100:
+            raise ValueError('level must be between 1 and 100')
+        self.matrix = matrix
+        self.chart = chart
+        self.level = level
+        # int32 is plenty (the largest intermediate is about 42 * 250 * 700) and halves memory traffic
+        self.stats = self.battle_stats(matrix.stats, level, iv, ev).astype(np.int32)
+        self._combos, self._combo_of = np.unique(matrix.type_ids, axis=0, return_inverse=True)
+        self._combo_of = self._combo_of.reshape(-1)
+        self._best_stab_quarters = self._stab_table()
+
+    @staticmethod
+    def battle_stats(base_stats: np.ndarray, level: int, iv: int = 31, ev: int = 0) -> np.ndarray:
+        """(N, 6) base stats -> (N, 6) stats at `level`."""
+        scaled = (2 * base_stats.astype(np.int64) + iv + ev // 4) * level // 100
+        stats = scaled + 5
+        stats[:, HP] = scaled[:, HP] + level + 10
+        return stats
+
+    @staticmethod
+    def _quarters(effectiveness: np.ndarray) -> np.ndarray:
+        # type multipliers are products of 0, 1/2 and 2, so whole numbers of quarters
+        return np.rint(np.asarray(effectiveness) * 4).astype(np.int32)
+
+    def _stab_table(self) -> np.ndarray:
+        """(C, C) best STAB multiplier, in quarters, between every pair of type combinations present.
+
+        A dex has a few hundred combinations at most, so this small table replaces a
+        per-pair chart lookup with one gather.
+        """
+        if not len(self._combos):
+            return np.zeros((0, 0), dtype=np.int32)
+        profiles = self.chart.defensive_profiles(self._combos).T
+        profiles = np.vstack([profiles, np.ones((1, len(self._combos)))])
+        move_columns = self.chart.columns(self._combos)
+        best = profiles[move_columns[:, 0]]
+        for slot in range(1, move_columns.shape[1]):
+            has_type = (self._combos[:, slot] > 0)[:, None]
+            best = np.where(has_type, np.maximum(best, profiles[move_columns[:, slot]]), best)
+        # a typeless attacker's first slot maps to the chart's neutral row: one plain hit
+        return self._quarters(best)
+
+    def damage(self, attacker_rows: np.ndarray, defender_rows: np.ndarray, power: np.ndarray,
+               move_type_ids: np.ndarray, physical: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(min, max) damage for every tuple; all arguments broadcast against each other.
+
+        Rows index the StatMatrix; `physical` picks Attack/Defense over Sp. Atk/Sp. Def.
+        """
+        attacker_rows, defender_rows, power, move_type_ids, physical = np.broadcast_arrays(
+            attacker_rows, defender_rows, power, move_type_ids, physical
+        )
+        attack = np.where(physical, self.stats[attacker_rows, ATTACK], self.stats[attacker_rows, SP_ATK])
+        defense = np.where(physical, self.stats[defender_rows, DEFENSE], self.stats[defender_rows, SP_DEF])
+        stab = (self.matrix.type_ids[attacker_rows] == move_type_ids[..., None]).any(axis=-1) & (move_type_ids > 0)
+        quarters = self._quarters(self.chart.effectiveness(move_type_ids, self.matrix.type_ids[defender_rows]))
+        base = self._base_damage(power.astype(np.int32) * attack, defense)
+        return self._ranges(base, stab, quarters)
+
+    def _base_damage(self, power_x_attack: np.ndarray, defense: np.ndarray) -> np.ndarray:
+        # floor(floor(k * P * A / D) / 50) == floor(k * P * A / (50 * D)) for positive integers
+        return (2 * self.level // 5 + 2) * power_x_attack // (50 * np.maximum(defense, 1)) + 2
+
+    @staticmethod
+    def _ranges(base: np.ndarray, stab: np.ndarray, quarters: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Integer maths throughout: the roll is a percentage, STAB 3/2 and the type multiplier quarters."""
+        hits = quarters > 0
+        stab_numerator = np.where(stab, 3, 2).astype(np.int32)
+        ranges = []
+        for roll in (MIN_ROLL, 100):
+            damage = base * roll
+            damage //= 100
+            damage *= stab_numerator
+            damage >>= 1  # everything is non-negative, so shifts are exact floor divisions
+            damage *= quarters
+            damage >>= 2
+            # any hit that isn't an immunity does at least 1
+            ranges.append(np.maximum(damage, hits, out=damage))
+        return ranges[0], ranges[1]
+
+    def best_stab_damage(self, attacker_rows: np.ndarray, defender_rows: np.ndarray,
+                         power: int = 80) -> Tuple[np.ndarray, np.ndarray]:
+        """(A, D) ranges for each attacker's strongest STAB move of `power` against each defender.
+
+        The attacker uses whichever of Attack or Sp. Atk is higher, with a move of each of its
+        types; both share base damage and STAB, so the better move is simply the one with the
+        higher multiplier, looked up per type combination.
+        """
+        attacker_rows = np.asarray(attacker_rows)
+        defender_rows = np.asarray(defender_rows)
+        low = np.empty((len(attacker_rows), len(defender_rows)), dtype=np.int32)
+        high = np.empty_like(low)
+        attacker_stats = self.stats[attacker_rows]
+        physical = attacker_stats[:, ATTACK] >= attacker_stats[:, SP_ATK]
+        # (C, D) once, so each attacker then just copies its combination's row
+        quarters_by_combo = self._best_stab_quarters[:, self._combo_of[defender_rows]]
+
+        # physical and special attackers face different defensive stats; doing them as two
+        # groups keeps every operation a plain (B, 1) x (1, D) broadcast
+        for group, attack_stat, defense_stat in ((physical, ATTACK, DEFENSE), (~physical, SP_ATK, SP_DEF)):
+            if not group.any():
+                continue
+            rows = attacker_rows[group]
+            base = self._base_damage(np.int32(power) * self.stats[rows, attack_stat][:, None],
+                                     self.stats[defender_rows, defense_stat][None, :])
+            quarters = quarters_by_combo[self._combo_of[rows]]
+            stab = (self.matrix.type_ids[rows, 0] > 0)[:, None]
+            low[group], high[group] = self._ranges(base, stab, quarters)
+        return low, high
+
+    def pairwise(self, power: int = 80, block_size: int = 1024,
+                 rows: Optional[np.ndarray] = None) -> Iterator[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Every Pokemon (or `rows`) against every other, in attacker blocks to bound memory.
+
+        Yields (attacker_rows, min, max) with (B, N) damage blocks.
+        """
+        rows = np.arange(len(self.matrix)) if rows is None else np.asarray(rows)
+        for start in range(0, len(rows), block_size):
+            block = rows[start:start + block_size]
+            low, high = self.best_stab_damage(block, rows, power)
+            yield block, low, high
+
+    def hp(self, rows: np.ndarray) -> np.ndarray:
+        return self.stats[np.asarray(rows), HP]
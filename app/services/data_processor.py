@@ -5,7 +5,14 @@ Project: Challenge Assignment
 """
 
 import logging
-from typing import Dict, Any, List, Optional
+import sys
+from array import array
+from functools import lru_cache
+from typing import Dict, Any, Iterable, List, Optional, Tuple
+
+from app.services.pokemon_record import (
+    MISSING_STAT, STAT_INDEX, STAT_NAMES, AbilitySlot, PokemonBatch, PokemonRecord, TypeSlot
+)
 
 
 logger = logging.getLogger(__name__)
@@ -39,6 +46,219 @@ class DataProcessor:
             logger.exception(f"Error processing Pokemon data: {e}")
             return None
     
+    @staticmethod
+    def sanitize_pokemon_record(raw_data: Dict[Any, Any]) -> Optional[PokemonRecord]:
+        """Same as sanitize_pokemon_data, but returns a compact PokemonRecord for big batches."""
+        if not raw_data:
+            return None
+        
+        try:
+            stats, efforts = [MISSING_STAT] * len(STAT_NAMES), [0] * len(STAT_NAMES)
+            for stat_info in raw_data.get('stats', []):
+                position = _stat_position(stat_info.get('stat', {}).get('name', ''))
+                if position is not None:
+                    stats[position] = stat_info.get('base_stat', 0)
+                    efforts[position] = stat_info.get('effort', 0)
+            
+            # positional: keyword arguments cost as much as the rest of the record put together
+            return PokemonRecord(
+                raw_data.get('name', '').capitalize(),
+                raw_data.get('id', 0),
+                raw_data.get('height', 0),
+                raw_data.get('weight', 0),
+                raw_data.get('base_experience', 0),
+                DataProcessor._extract_sprite(raw_data.get('sprites', {})),
+                tuple([
+                    _type_slot(type_info.get('type', {}).get('name', ''), type_info.get('slot', 0))
+                    for type_info in raw_data.get('types', [])
+                ]),
+                tuple([
+                    _ability_slot(ability_info.get('ability', {}).get('name', ''),
+                                  ability_info.get('is_hidden', False), ability_info.get('slot', 0))
+                    for ability_info in raw_data.get('abilities', [])
+                ]),
+                array('h', stats),
+                array('B', efforts)
+            )
+            
+        except Exception as e:
+            logger.exception(f"Error processing Pokemon data: {e}")
+            return None
+    
+    @staticmethod
+    def sanitize_many(raw_payloads: Iterable[Dict[Any, Any]]) -> PokemonBatch:
+        """Sanitize a batch of raw payloads in one pass into columns (see PokemonBatch).
+
+        Empty payloads are listed in `skipped`; a payload that can't be processed is
+        logged and skipped the same way, so one bad entry never sinks the batch.
+        """
+        batch = PokemonBatch()
+        width = len(STAT_NAMES)
+        for position, raw_data in enumerate(raw_payloads):
+            if not raw_data:
+                batch.skipped.append(position)
+                continue
+            
+            try:
+                stats, efforts = [MISSING_STAT] * width, [0] * width
+                for stat_info in raw_data.get('stats', []):
+                    stat_position = _stat_position(stat_info.get('stat', {}).get('name', ''))
+                    if stat_position is not None:
+                        stats[stat_position] = stat_info.get('base_stat', 0)
+                        efforts[stat_position] = stat_info.get('effort', 0)
+                types = [
+                    (_format_type_name(type_info.get('type', {}).get('name', '')), type_info.get('slot', 0))
+                    for type_info in raw_data.get('types', [])
+                ]
+                abilities = [
+                    (_format_ability_name(ability_info.get('ability', {}).get('name', '')),
+                     ability_info.get('is_hidden', False), ability_info.get('slot', 0))
+                    for ability_info in raw_data.get('abilities', [])
+                ]
+                learnset = _learnset(raw_data.get('moves') or [])
+                parent = (
+                    raw_data.get('name', '').capitalize(),
+                    raw_data.get('id', 0),
+                    raw_data.get('height', 0),
+                    raw_data.get('weight', 0),
+                    raw_data.get('base_experience', 0),
+                    DataProcessor._extract_sprite(raw_data.get('sprites', {}))
+                )
+            except Exception as e:
+                logger.exception(f"Error processing Pokemon data: {e}")
+                batch.skipped.append(position)
+                continue
+            
+            # everything above is validated before any column grows, so columns stay aligned
+            row = len(batch.names)
+            for column, value in zip((batch.names, batch.pokedex_numbers, batch.heights, batch.weights,
+                                      batch.base_experiences, batch.sprite_urls), parent):
+                column.append(value)
+            batch.stats.extend(stats)
+            batch.efforts.extend(efforts)
+            for type_name, slot in types:
+                batch.type_parent.append(row)
+                batch.type_names.append(type_name)
+                batch.type_slots.append(slot)
+            for ability_name, is_hidden, slot in abilities:
+                batch.ability_parent.append(row)
+                batch.ability_names.append(ability_name)
+                batch.ability_hidden.append(is_hidden)
+                batch.ability_slots.append(slot)
+            for move_name, method, version_group, level in learnset:
+                batch.move_parent.append(row)
+                batch.move_names.append(move_name)
+                batch.move_methods.append(method)
+                batch.move_version_groups.append(version_group)
+                batch.move_levels.append(level)
+        return batch
+    
+    @staticmethod
+    def sanitize_learnset(raw_data: Dict[Any, Any]) -> List[Tuple[str, str, str, int]]:
+        """(move, learn method, version group, level) for every entry of the payload's moves, duplicates dropped.
+
+        Payloads parsed by PokeAPIService(selective=True) without moves=True give an empty learnset.
+        """
+        if not raw_data:
+            return []
+        
+        try:
+            return _learnset(raw_data.get('moves') or [])
+        except (KeyError, TypeError) as e:
+            logger.exception(f"Error processing learnset data: {e}")
+            return []
+    
+    @staticmethod
+    def sanitize_type_data(raw_data: Dict[Any, Any]) -> Optional[Dict[str, Any]]:
+        """Keeps a type's name and the multiplier it deals to each other type."""
+        if not raw_data:
+            return None
+        
+        relations = raw_data.get('damage_relations', {})
+        damage_to = {}
+        for key, multiplier in (('double_damage_to', 2.0), ('half_damage_to', 0.5), ('no_damage_to', 0.0)):
+            for type_info in relations.get(key, []):
+                damage_to[type_info.get('name', '').capitalize()] = multiplier
+        
+        return {
+            'type_name': raw_data.get('name', '').capitalize(),
+            'damage_to': damage_to
+        }
+    
+    @staticmethod
+    def sanitize_species_data(raw_data: Dict[Any, Any]) -> Optional[Dict[str, Any]]:
+        """Keeps a species' descriptive fields, its varieties and the id of its evolution chain."""
+        if not raw_data:
+            return None
+        
+        try:
+            return {
+                'id': raw_data['id'],
+                'name': raw_data.get('name', '').capitalize(),
+                'evolution_chain_id': _url_id((raw_data.get('evolution_chain') or {}).get('url')),
+                'evolves_from_species_id': _url_id((raw_data.get('evolves_from_species') or {}).get('url')),
+                'generation': _url_id((raw_data.get('generation') or {}).get('url')),
+                'genus': _english(raw_data.get('genera', []), 'genus'),
+                'flavor_text': _english(raw_data.get('flavor_text_entries', []), 'flavor_text', latest=True),
+                'habitat': (raw_data.get('habitat') or {}).get('name'),
+                'growth_rate': (raw_data.get('growth_rate') or {}).get('name'),
+                'capture_rate': raw_data.get('capture_rate'),
+                'base_happiness': raw_data.get('base_happiness'),
+                'is_baby': bool(raw_data.get('is_baby')),
+                'is_legendary': bool(raw_data.get('is_legendary')),
+                'is_mythical': bool(raw_data.get('is_mythical')),
+                # Pokemon names as DataProcessor stores them, e.g. 'Mr-mime-galar'
+                'varieties': [
+                    {
+                        'pokemon_name': variety['pokemon']['name'].capitalize(),
+                        'is_default': bool(variety.get('is_default'))
+                    }
+                    for variety in raw_data.get('varieties', [])
+                ]
+            }
+            
+        except (KeyError, TypeError) as e:
+            logger.exception(f"Error processing species data: {e}")
+            return None
+    
+    @staticmethod
+    def species_id(raw_data: Dict[Any, Any]) -> Optional[int]:
+        """The species a /pokemon payload belongs to; alternate forms don't share its id."""
+        if not raw_data:
+            return None
+        return _url_id((raw_data.get('species') or {}).get('url'))
+    
+    @staticmethod
+    def sanitize_evolution_chain(raw_data: Dict[Any, Any]) -> Optional[Dict[str, Any]]:
+        """Flattens an evolution chain tree into its species and (from, to) evolution edges."""
+        if not raw_data or not raw_data.get('chain'):
+            return None
+        
+        species, edges = [], []
+        pending = [(raw_data['chain'], None)]
+        while pending:
+            link, parent_id = pending.pop()
+            species_id = _url_id(link['species']['url'])
+            species.append({'id': species_id, 'name': link['species']['name'].capitalize()})
+            if parent_id is not None:
+                # a species can evolve several ways (e.g. level or item); the first one is kept
+                details = (link.get('evolution_details') or [{}])[0]
+                edges.append({
+                    'from_species_id': parent_id,
+                    'to_species_id': species_id,
+                    'trigger': (details.get('trigger') or {}).get('name'),
+                    'min_level': details.get('min_level'),
+                    'item': (details.get('item') or {}).get('name')
+                })
+            pending.extend((child, species_id) for child in reversed(link.get('evolves_to', [])))
+        
+        return {
+            'id': raw_data['id'],
+            'root_species_id': species[0]['id'],
+            'species': species,
+            'edges': edges
+        }
+    
     @staticmethod
     def _extract_sprite(sprites: Dict[Any, Any]) -> str:
         """Get the best quality sprite available."""
@@ -57,7 +277,7 @@ class DataProcessor:
         types = []
         for type_info in types_data:
             types.append({
-                'type_name': type_info.get('type', {}).get('name', '').capitalize(),
+                'type_name': _format_type_name(type_info.get('type', {}).get('name', '')),
                 'slot': type_info.get('slot', 0)
             })
         return types
@@ -68,11 +288,9 @@ class DataProcessor:
         abilities = []
         for ability_info in abilities_data:
             ability_name = ability_info.get('ability', {}).get('name', '')
-            # make it look nicer - "lightning-rod" becomes "Lightning Rod"
-            ability_name_formatted = ability_name.replace('-', ' ').title()
             
             abilities.append({
-                'ability_name': ability_name_formatted,
+                'ability_name': _format_ability_name(ability_name),
                 'is_hidden': ability_info.get('is_hidden', False),
                 'slot': ability_info.get('slot', 0)
             })
@@ -84,11 +302,84 @@ class DataProcessor:
         stats = []
         for stat_info in stats_data:
             stat_name = stat_info.get('stat', {}).get('name', '')
-            stat_name_formatted = stat_name.replace('-', ' ').upper()
             
             stats.append({
-                'stat_name': stat_name_formatted,
+                'stat_name': _format_stat_name(stat_name),
                 'base_stat': stat_info.get('base_stat', 0),
                 'effort': stat_info.get('effort', 0)
             })
         return stats
+
+
+def _url_id(url: Optional[str]) -> Optional[int]:
+    """The trailing id of a PokeAPI resource URL ('.../evolution-chain/10/' -> 10)."""
+    if not url:
+        return None
+    return int(url.rstrip('/').rsplit('/', 1)[-1])
+
+
+def _english(entries: List[Dict[Any, Any]], key: str, latest: bool = False) -> Optional[str]:
+    """The first (or last) English entry of a localized list, with PokeAPI's hard line breaks removed."""
+    texts = [entry.get(key, '') for entry in entries if (entry.get('language') or {}).get('name') == 'en']
+    if not texts:
+        return None
+    return ' '.join((texts[-1] if latest else texts[0]).split())
+
+
+def _learnset(moves_data: List[Dict[Any, Any]]) -> List[Tuple[str, str, str, int]]:
+    entries = {}
+    for move_info in moves_data:
+        move_name = _format_move_name(move_info['move']['name'])
+        for details in move_info.get('version_group_details', []):
+            entries[(move_name, _slug(details['move_learn_method']['name']),
+                     _slug(details['version_group']['name']), details.get('level_learned_at') or 0)] = None
+    return list(entries)
+
+
+# PokeAPI's vocabularies are small (a few hundred types, abilities, stats and moves), so each
+# name is formatted once and every Pokemon after that shares the same interned string
+@lru_cache(maxsize=4096)
+def _format_type_name(raw_name: str) -> str:
+    return sys.intern(raw_name.capitalize())
+
+
+@lru_cache(maxsize=4096)
+def _format_ability_name(raw_name: str) -> str:
+    # make it look nicer - "lightning-rod" becomes "Lightning Rod"
+    return sys.intern(raw_name.replace('-', ' ').title())
+
+
+@lru_cache(maxsize=4096)
+def _format_stat_name(raw_name: str) -> str:
+    return sys.intern(raw_name.replace('-', ' ').upper())
+
+
+@lru_cache(maxsize=4096)
+def _format_move_name(raw_name: str) -> str:
+    # same shape as abilities - "thunder-shock" becomes "Thunder Shock"
+    return sys.intern(raw_name.replace('-', ' ').title())
+
+
+@lru_cache(maxsize=1024)
+def _slug(raw_name: str) -> str:
+    # learn methods and version groups stay PokeAPI identifiers ('level-up', 'red-blue')
+    return sys.intern(raw_name)
+
+
+@lru_cache(maxsize=4096)
+def _type_slot(raw_name: str, slot: int) -> TypeSlot:
+    return TypeSlot(_format_type_name(raw_name), slot)
+
+
+@lru_cache(maxsize=4096)
+def _ability_slot(raw_name: str, is_hidden: bool, slot: int) -> AbilitySlot:
+    return AbilitySlot(_format_ability_name(raw_name), is_hidden, slot)
+
+
+@lru_cache(maxsize=64)
+def _stat_position(raw_name: str) -> Optional[int]:
+    # cached, so each unknown name is reported once rather than for every payload carrying it
+    position = STAT_INDEX.get(_format_stat_name(raw_name))
+    if position is None:
+        logger.warning("Dropping unknown stat '%s'; stat columns are %s", raw_name, ', '.join(STAT_NAMES))
+    return position
@@ -0,0 +1,65 @@
+"""
+Data Version - Notices commits made to a SQLite database by other processes
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import threading
+import time
+from typing import Optional
+
+
+# seconds between PRAGMA data_version checks for commits made by other processes
+POLL_INTERVAL = 1.0
+
+
+class DataVersionWatcher:
+    """PRAGMA data_version, read on a connection of our own that never writes.
+
+    SQLite bumps it there whenever any other connection commits, so an in-memory copy
+    of the data built at one version is stale once it moves. Commits from this process
+    are reported through on_pokemon_commit instead; this covers other workers, scout.py
+    and the importer. Checks run at most every `poll_interval` seconds.
+    """
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._connection = None
+        self._engine = None
+        self._checked_at = 0.0
+
+    def version(self, session) -> Optional[int]:
+        """The current data_version; None where it can't be watched (not SQLite, or in memory)."""
+        engine = session.get_bind()
+        if engine.dialect.name != 'sqlite' or engine.url.database in (None, '', ':memory:'):
+            return None
+        with self._lock:
+            if self._engine is not engine:
+                self._close()
+                self._connection, self._engine = engine.raw_connection(), engine
+            cursor = self._connection.cursor()
+            try:
+                return cursor.execute('PRAGMA data_version').fetchone()[0]
+            finally:
+                cursor.close()
+
+    def changed(self, session, version: Optional[int], force: bool = False) -> bool:
+        """True when data built at `version` has been changed by another connection since."""
+        if version is None:
+            return False
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.poll_interval:
+            return False
+        self._checked_at = now
+        return self.version(session) != version
+
+    def close(self):
+        """Drop the watcher connection (the next check opens a new one)."""
+        with self._lock:
+            self._close()
+
+    def _close(self):
+        if self._connection is not None:
+            self._connection.close()
+        self._connection = self._engine = None
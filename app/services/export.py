@@ -0,0 +1,181 @@
+"""
+Export - Streams stored Pokemon to JSON, NDJSON or per-table CSV, optionally gzipped
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import csv
+import gzip
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import func, select
+
+from app.models import (
+    Pokemon, PokemonType, PokemonAbility, PokemonStat, TypeName, AbilityName, StatName
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+FORMATS = ('json', 'ndjson', 'csv')
+# rows fetched per round trip; memory stays bounded by this, not by the table size
+CHUNK_SIZE = 1000
+
+POKEMON_COLUMNS = [column.name for column in Pokemon.__table__.columns]
+# child table -> (model, lookup model, lookup id column, output name key, extra columns)
+CHILD_TABLES = {
+    'types': (PokemonType, TypeName, 'type_id', 'type', ('slot',)),
+    'abilities': (PokemonAbility, AbilityName, 'ability_id', 'ability', ('is_hidden', 'slot')),
+    'stats': (PokemonStat, StatName, 'stat_id', 'stat', ('base_stat', 'effort')),
+}
+
+
+def _child_rows(session, table: str, chunk_size: int):
+    """(pokemon_id, name, extra...) for every row of a child table, ordered like the relationships load."""
+    model, lookup, id_column, _, extra = CHILD_TABLES[table]
+    return session.execute(
+        select(model.pokemon_id, lookup.name, *[getattr(model, column) for column in extra])
+        .join(lookup, lookup.id == getattr(model, id_column))
+        .order_by(model.pokemon_id, model.id)
+        .execution_options(yield_per=chunk_size)
+    )
+
+
+def _grouped(rows) -> Iterator[Tuple[int, List[Any]]]:
+    """Consecutive rows sharing a pokemon_id, as (pokemon_id, rows)."""
+    current, group = None, []
+    for row in rows:
+        if row[0] != current:
+            if group:
+                yield current, group
+            current, group = row[0], []
+        group.append(row)
+    if group:
+        yield current, group
+
+
+def iter_pokemon_dicts(session, chunk_size: int = CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Every stored Pokemon in Pokemon.to_dict form, by id, without loading the table.
+
+    The Pokemon and each child table are read through their own ordered cursor and
+    merged on pokemon_id, so it's four streaming queries in total rather than one per row.
+    """
+    pokemon_rows = session.execute(
+        select(Pokemon.id, Pokemon.name, Pokemon.pokedex_number, Pokemon.height, Pokemon.weight,
+               Pokemon.base_experience, Pokemon.sprite_url)
+        .order_by(Pokemon.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    children = {table: _grouped(_child_rows(session, table, chunk_size)) for table in CHILD_TABLES}
+    pending = {table: next(groups, None) for table, groups in children.items()}
+
+    for pokemon_id, name, pokedex_number, height, weight, base_experience, sprite_url in pokemon_rows:
+        record = {
+            'id': pokemon_id,
+            'name': name,
+            'pokedex_number': pokedex_number,
+            'height': height,
+            'weight': weight,
+            'base_experience': base_experience,
+            'sprite_url': sprite_url,
+        }
+        for table, groups in children.items():
+            # skip children of ids that no longer exist, then take this Pokemon's group if it's next
+            while pending[table] is not None and pending[table][0] < pokemon_id:
+                pending[table] = next(groups, None)
+            rows = []
+            if pending[table] is not None and pending[table][0] == pokemon_id:
+                rows = pending[table][1]
+                pending[table] = next(groups, None)
+            record[table] = [_child_dict(table, row) for row in rows]
+        yield record
+
+
+def _child_dict(table: str, row) -> Dict[str, Any]:
+    _, _, _, key, extra = CHILD_TABLES[table]
+    child = {key: row[1]}
+    for column, value in zip(extra, row[2:]):
+        child[column] = bool(value) if column == 'is_hidden' else value
+    return child
+
+
+def _open(path: str, compress: bool, newline: Optional[str] = None):
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline=newline, compresslevel=6)
+    return open(path, 'w', encoding='utf-8', newline=newline)
+
+
+def split_path(path: str, fmt: Optional[str] = None, compress: Optional[bool] = None) -> Tuple[str, str, bool]:
+    """(path without .gz, format, gzip?) with the format and compression read from the extension when not given."""
+    gz = path.endswith('.gz')
+    base = path[:-3] if gz else path
+    if fmt is None:
+        extension = base.rsplit('.', 1)[-1].lower() if '.' in base else ''
+        fmt = extension if extension in FORMATS else 'json'
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}', expected one of {', '.join(FORMATS)}")
+    return base, fmt, gz if compress is None else compress
+
+
+def export_pokemon(session, path: str, fmt: Optional[str] = None, compress: Optional[bool] = None,
+                   chunk_size: int = CHUNK_SIZE) -> Dict[str, Any]:
+    """Write every stored Pokemon to `path`; returns {'count': rows, 'files': [paths written]}.
+
+    json keeps the old {"count", "pokemon": [...]} document, ndjson writes one Pokemon per
+    line, and csv writes one flat file per table next to `path` (name.pokemon.csv,
+    name.types.csv, ...). A .gz suffix or compress=True gzips the output.
+    """
+    base, fmt, compress = split_path(path, fmt, compress)
+    suffix = '.gz' if compress else ''
+    if fmt == 'csv':
+        return _export_csv(session, base, suffix, compress, chunk_size)
+
+    target = base + suffix
+    count = 0
+    with _open(target, compress) as out:
+        if fmt == 'json':
+            total = session.execute(select(func.count()).select_from(Pokemon)).scalar()
+            out.write(f'{{"count": {total}, "pokemon": [')
+        for record in iter_pokemon_dicts(session, chunk_size):
+            line = json.dumps(record, ensure_ascii=False, separators=(',', ':'))
+            if fmt == 'json':
+                out.write(('\n  ' if not count else ',\n  ') + line)
+            else:
+                out.write(line + '\n')
+            count += 1
+        if fmt == 'json':
+            out.write('\n]}\n')
+    logger.info('Exported %s Pokemon to %s', count, target)
+    return {'count': count, 'files': [target]}
+
+
+def _export_csv(session, base: str, suffix: str, compress: bool, chunk_size: int) -> Dict[str, Any]:
+    stem = base[:-4] if base.lower().endswith('.csv') else base
+    files = []
+
+    target = f'{stem}.pokemon.csv{suffix}'
+    count = 0
+    with _open(target, compress, newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(POKEMON_COLUMNS)
+        rows = session.execute(
+            select(*Pokemon.__table__.columns).order_by(Pokemon.id).execution_options(yield_per=chunk_size)
+        )
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    files.append(target)
+
+    for table, (_, _, _, key, extra) in CHILD_TABLES.items():
+        target = f'{stem}.{table}.csv{suffix}'
+        with _open(target, compress, newline='') as out:
+            writer = csv.writer(out)
+            writer.writerow(['pokemon_id', key, *extra])
+            writer.writerows(_child_rows(session, table, chunk_size))
+        files.append(target)
+
+    logger.info('Exported %s Pokemon to %s', count, ', '.join(files))
+    return {'count': count, 'files': files}
@@ -0,0 +1,221 @@
+"""
+Importer - Seeds the database from JSON/NDJSON export files, streamed and bulk-inserted
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import gzip
+import json
+import logging
+import pickle
+import tempfile
+import time
+from typing import Any, Dict, Iterator, Optional
+
+from sqlalchemy import select
+
+from app.models import Pokemon, PokemonType, PokemonAbility, PokemonStat, PokemonMove
+from app.services.export import split_path
+from app.services.persistence import PokemonRepository
+from app.services.pokemon_record import MISSING_STAT, STAT_INDEX, STAT_NAMES, PokemonBatch
+
+
+logger = logging.getLogger(__name__)
+
+
+BATCH_SIZE = 2000
+# bytes read from the file per refill when walking a JSON document
+READ_SIZE = 1 << 16
+# tables whose secondary indexes are dropped during a load and rebuilt once at the end
+INDEXED_MODELS = (Pokemon, PokemonType, PokemonAbility, PokemonStat, PokemonMove)
+
+
+def _open(path: str, compress: bool):
+    return gzip.open(path, 'rt', encoding='utf-8') if compress else open(path, 'r', encoding='utf-8')
+
+
+def iter_exported(path: str, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Pokemon dicts (Pokemon.to_dict form) from an export file, one at a time.
+
+    ndjson is read line by line; json (the {"count", "pokemon": [...]} document, indented
+    or not) is walked element by element with raw_decode over a sliding buffer, so
+    neither ever holds more than one Pokemon plus a read buffer.
+    """
+    _, fmt, compress = split_path(path, fmt)
+    if fmt == 'csv':
+        raise ValueError('CSV exports are split per table and cannot be imported; use json or ndjson')
+    with _open(path, compress) as f:
+        if fmt == 'ndjson':
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _iter_json_array(f, 'pokemon')
+
+
+def _iter_json_array(f, key: str) -> Iterator[Dict[str, Any]]:
+    decoder = json.JSONDecoder()
+    buffer, position = '', 0
+
+    def fill() -> bool:
+        nonlocal buffer, position
+        chunk = f.read(READ_SIZE)
+        buffer, position = buffer[position:] + chunk, 0
+        return bool(chunk)
+
+    # find the array: the top-level object's `key`, whatever comes before it
+    marker = f'"{key}"'
+    while True:
+        found = buffer.find(marker, position)
+        if found >= 0:
+            opening = buffer.find('[', found + len(marker))
+            if opening >= 0:
+                position = opening + 1
+                break
+        position = max(0, len(buffer) - len(marker) - 16)
+        if not fill():
+            raise ValueError(f'No "{key}" array in export file')
+
+    while True:
+        while True:
+            # skip separators; refill when the buffer runs dry
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position < len(buffer):
+                break
+            if not fill():
+                raise ValueError('Export file ends inside the Pokemon array')
+        if buffer[position] == ']':
+            return
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            # most likely the element continues past the buffer; read more and retry
+            if not fill():
+                raise
+            continue
+        position = end
+        yield item
+
+
+def _append(batch: PokemonBatch, pokemon: Dict[str, Any]):
+    """Add one exported Pokemon to the batch's columns."""
+    row = len(batch.names)
+    batch.names.append(pokemon['name'])
+    batch.pokedex_numbers.append(pokemon['pokedex_number'])
+    batch.heights.append(pokemon.get('height'))
+    batch.weights.append(pokemon.get('weight'))
+    batch.base_experiences.append(pokemon.get('base_experience'))
+    batch.sprite_urls.append(pokemon.get('sprite_url'))
+
+    stats, efforts = [MISSING_STAT] * len(STAT_NAMES), [0] * len(STAT_NAMES)
+    for stat in pokemon.get('stats', []):
+        position = STAT_INDEX.get(stat['stat'])
+        if position is not None:
+            stats[position] = stat['base_stat']
+            efforts[position] = stat.get('effort') or 0
+    batch.stats.extend(stats)
+    batch.efforts.extend(efforts)
+
+    for pokemon_type in pokemon.get('types', []):
+        batch.type_parent.append(row)
+        batch.type_names.append(pokemon_type['type'])
+        batch.type_slots.append(pokemon_type.get('slot'))
+    for ability in pokemon.get('abilities', []):
+        batch.ability_parent.append(row)
+        batch.ability_names.append(ability['ability'])
+        batch.ability_hidden.append(bool(ability.get('is_hidden')))
+        batch.ability_slots.append(ability.get('slot'))
+
+
+def _begin(connection):
+    """Open the transaction now, so the index drops below are rolled back with everything else.
+
+    pysqlite only starts a transaction on the first INSERT/UPDATE/DELETE and runs DDL
+    before that in autocommit mode.
+    """
+    if connection.dialect.name == 'sqlite' and not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN')
+
+
+def import_pokemon(session, path: str, fmt: Optional[str] = None, batch_size: int = BATCH_SIZE,
+                   keep_ids: bool = True, defer_indexes: bool = True) -> Dict[str, Any]:
+    """Load an export file through PokemonRepository.bulk_insert, in the session's transaction.
+
+    Pokemon whose name is already stored (or repeated in the file) are skipped. With
+    `keep_ids` the exported ids are reused when free; the rest are numbered after the
+    load. `defer_indexes` drops the secondary indexes for the load and rebuilds each in
+    one pass at the end, which is much cheaper than updating them row by row. Nothing is committed; the caller does that, so a
+    failure anywhere leaves the database untouched.
+    """
+    started = time.perf_counter()
+    connection = session.connection()
+    _begin(connection)
+    taken_names = set(session.execute(select(Pokemon.name)).scalars())
+    taken_ids = set(session.execute(select(Pokemon.id)).scalars()) if keep_ids else set()
+
+    indexes = [] if not defer_indexes else [
+        index for model in INDEXED_MODELS for index in model.__table__.indexes
+    ]
+    for index in indexes:
+        index.drop(connection, checkfirst=True)
+
+    imported = skipped = 0
+
+    def insert(batch: PokemonBatch, ids: Optional[list]):
+        nonlocal imported
+        PokemonRepository.bulk_insert(session, batch, ids=ids)
+        imported += len(batch)
+
+    batch, ids = PokemonBatch(), []
+    # Pokemon whose exported id is taken (or that have none) get a new one, but only after
+    # the whole file: an id SQLite assigns now could be the one a later row asks for. Until
+    # then they wait in a temporary file, since they can be most of the import; pickled,
+    # which reads back several times faster than JSON
+    with tempfile.TemporaryFile() as displaced:
+        for pokemon in iter_exported(path, fmt):
+            if pokemon.get('name') in taken_names:
+                skipped += 1
+                continue
+            taken_names.add(pokemon['name'])
+            pokemon_id = pokemon.get('id') if keep_ids else None
+            if keep_ids:
+                if pokemon_id is None or pokemon_id in taken_ids:
+                    pickle.dump(pokemon, displaced, pickle.HIGHEST_PROTOCOL)
+                    continue
+                taken_ids.add(pokemon_id)
+            _append(batch, pokemon)
+            ids.append(pokemon_id)
+            if len(batch) >= batch_size:
+                insert(batch, ids)
+                batch, ids = PokemonBatch(), []
+        if len(batch):
+            insert(batch, ids)
+
+        displaced.seek(0)
+        batch = PokemonBatch()
+        while True:
+            try:
+                _append(batch, pickle.load(displaced))
+            except EOFError:
+                break
+            if len(batch) >= batch_size:
+                insert(batch, None)
+                batch = PokemonBatch()
+        if len(batch):
+            insert(batch, None)
+
+    index_started = time.perf_counter()
+    for index in indexes:
+        index.create(connection, checkfirst=True)
+    elapsed = time.perf_counter() - started
+    result = {
+        'imported': imported,
+        'skipped': skipped,
+        'seconds': elapsed,
+        'index_seconds': time.perf_counter() - index_started,
+        'rows_per_second': imported / elapsed if elapsed else 0.0,
+    }
+    logger.info('Imported %s Pokemon from %s (%s skipped) at %.0f rows/s', imported, path, skipped,
+                result['rows_per_second'])
+    return result
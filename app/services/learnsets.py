@@ -0,0 +1,71 @@
+"""
+Learnsets - "Who learns move X" and "moves of Pokemon Y by level" over pokemon_moves
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select
+
+from app.models import Pokemon, MoveName, LearnMethodName, VersionGroupName, PokemonMove
+from app.services.pokemon_query import QueryError
+
+
+def _lookup_id(session, model, name: str) -> Optional[int]:
+    return session.execute(select(model.id).where(model.name == name)).scalar()
+
+
+def move_display_name(name: str) -> str:
+    """'thunder-shock', 'THUNDER SHOCK' and 'Thunder Shock' all give the stored 'Thunder Shock'."""
+    # same formatting DataProcessor applies to move names
+    return name.strip().lower().replace('-', ' ').title()
+
+
+def _filters(session, version_group: Optional[str], method: Optional[str]) -> List:
+    conditions = []
+    for column, model, value, label in ((PokemonMove.version_group_id, VersionGroupName, version_group, 'version group'),
+                                        (PokemonMove.method_id, LearnMethodName, method, 'learn method')):
+        if value:
+            row_id = _lookup_id(session, model, value.strip().lower())
+            if row_id is None:
+                raise QueryError(f"Unknown {label} '{value}'")
+            conditions.append(column == row_id)
+    return conditions
+
+
+class LearnsetQuery:
+    """Both lookups run off an index: the clustered primary key (pokemon, version group, level, ...)
+    for a Pokemon's moves, and (move, version group, pokemon) for a move's learners."""
+
+    @staticmethod
+    def moves_of(session, pokemon_id: int, version_group: Optional[str] = None,
+                 method: Optional[str] = None) -> List[Dict[str, Any]]:
+        """A Pokemon's learnset ordered by level, then move name."""
+        rows = session.execute(
+            select(MoveName.name, LearnMethodName.name, VersionGroupName.name, PokemonMove.level)
+            .join(MoveName, MoveName.id == PokemonMove.move_id)
+            .join(LearnMethodName, LearnMethodName.id == PokemonMove.method_id)
+            .join(VersionGroupName, VersionGroupName.id == PokemonMove.version_group_id)
+            .where(PokemonMove.pokemon_id == pokemon_id, *_filters(session, version_group, method))
+            .order_by(PokemonMove.level, MoveName.name, VersionGroupName.id)
+        )
+        return [{'move': move, 'method': learn_method, 'version_group': group, 'level': level}
+                for move, learn_method, group, level in rows]
+
+    @staticmethod
+    def learners(session, move: str, version_group: Optional[str] = None,
+                 method: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
+        """Every stored Pokemon that learns a move, in pokedex order; None for a move no Pokemon has."""
+        move_id = _lookup_id(session, MoveName, move_display_name(move))
+        if move_id is None:
+            return None
+        learner_ids = (select(PokemonMove.pokemon_id)
+                       .where(PokemonMove.move_id == move_id, *_filters(session, version_group, method))
+                       .distinct())
+        rows = session.execute(
+            select(Pokemon.id, Pokemon.name, Pokemon.pokedex_number)
+            .where(Pokemon.id.in_(learner_ids))
+            .order_by(Pokemon.pokedex_number, Pokemon.name)
+        )
+        return [{'id': pokemon_id, 'name': name, 'pokedex_number': number} for pokemon_id, name, number in rows]
@@ -0,0 +1,272 @@
+"""
+Name Index - Normalized Pokemon name lookup, prefix autocomplete and did-you-mean suggestions
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import logging
+import threading
+import unicodedata
+from bisect import insort
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import Session as OrmSession
+
+from app.models import KnownName, Pokemon
+from app.models.pokemon import Base
+from app.services.data_version import POLL_INTERVAL, DataVersionWatcher
+from app.services.persistence import on_pokemon_commit
+
+
+logger = logging.getLogger(__name__)
+
+
+# completions kept per trie node, so a prefix lookup never walks the subtree below it
+NODE_CAPACITY = 20
+# trigram candidates re-ranked by edit distance for each did-you-mean
+SUGGESTION_CANDIDATES = 24
+
+
+def normalize_name(name: str) -> str:
+    """Case-, accent- and punctuation-insensitive key: 'Mr. Mime', 'mr-mime' and 'MR MIME' all give 'mrmime'."""
+    decomposed = unicodedata.normalize('NFKD', name)
+    return ''.join(char for char in decomposed.casefold() if char.isalnum())
+
+
+class NameEntry(NamedTuple):
+    name: str        # as stored (or as DataProcessor would store it)
+    api_name: str    # as PokeAPI spells it, for fetching
+    stored: bool
+
+    def to_dict(self):
+        return {'name': self.name, 'stored': self.stored}
+
+
+class _TrieNode:
+    __slots__ = ('children', 'best')
+
+    def __init__(self):
+        self.children: Dict[str, '_TrieNode'] = {}
+        # (rank, entry) of the best completions below this node, at most NODE_CAPACITY
+        self.best: List[Tuple[tuple, NameEntry]] = []
+
+
+def _rank(key: str, entry: NameEntry) -> tuple:
+    # stored Pokemon first, then shorter names (the base form before its variants), then alphabetical
+    return not entry.stored, len(key), key
+
+
+def _trigrams(key: str) -> List[str]:
+    padded = f'  {key} '
+    return [padded[i:i + 3] for i in range(len(padded) - 2)]
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (adjacent swaps count once), or limit + 1 once it's exceeded.
+
+    Hyyro's bit-parallel form: bit i of the vertical delta vectors describes row i of the
+    DP matrix, so each character of `b` advances a whole column in a few integer operations.
+    """
+    return _aligned_distance(_match_masks(a), len(a), b, limit)
+
+
+def _match_masks(a: str) -> Dict[str, int]:
+    """Bit i set in masks[char] where a[i] == char; built once per query, reused for every candidate."""
+    masks: Dict[str, int] = {}
+    for i, char in enumerate(a):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+
+def _aligned_distance(matches: Dict[str, int], length: int, b: str, limit: int) -> int:
+    if abs(length - len(b)) > limit:
+        return limit + 1
+    if not length:
+        return min(len(b), limit + 1)
+    full = (1 << length) - 1
+    last = 1 << (length - 1)
+    positive, negative, diagonal, previous_match = full, 0, 0, 0
+    distance = length
+    for char in b:
+        match = matches.get(char, 0)
+        swapped = (((~diagonal) & match) << 1) & previous_match
+        diagonal = ((((match & positive) + positive) ^ positive) | match | negative | swapped) & full
+        horizontal_positive = negative | (~(diagonal | positive) & full)
+        horizontal_negative = diagonal & positive
+        if horizontal_positive & last:
+            distance += 1
+        elif horizontal_negative & last:
+            distance -= 1
+        horizontal_positive = ((horizontal_positive << 1) | 1) & full
+        horizontal_negative = (horizontal_negative << 1) & full
+        positive = horizontal_negative | (~(diagonal | horizontal_positive) & full)
+        negative = horizontal_positive & diagonal
+        previous_match = match
+    return min(distance, limit + 1)
+
+
+class NameIndex:
+    """Every stored and PokeAPI-known name under its normalized key.
+
+    A prefix trie answers autocomplete from the best completions cached on each node,
+    and a trigram inverted index narrows did-you-mean candidates down to a handful
+    before any edit distance is computed.
+    """
+
+    def __init__(self, stored: Iterable[str] = (), known: Iterable[str] = ()):
+        self.entries: Dict[str, NameEntry] = {}
+        for name in known:
+            self.entries.setdefault(normalize_name(name), NameEntry(name.capitalize(), name, False))
+        for name in stored:
+            # a stored Pokemon wins over the list entry with the same key
+            self.entries[normalize_name(name)] = NameEntry(name, name.lower(), True)
+        self.entries.pop('', None)
+        self.has_known_names = any(not entry.stored for entry in self.entries.values())
+
+        self._root = _TrieNode()
+        self._keys = list(self.entries)
+        # postings of key positions, split by key length so a suggestion only counts candidates within edit range
+        postings: Dict[Tuple[str, int], List[int]] = {}
+        for position, (key, entry) in enumerate(self.entries.items()):
+            self._insert(key, entry)
+            for trigram in set(_trigrams(key)):
+                postings.setdefault((trigram, len(key)), []).append(position)
+        self._postings = {posting: np.array(positions, dtype=np.int32) for posting, positions in postings.items()}
+        self._lengths = np.array([len(key) for key in self._keys], dtype=np.int32)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _insert(self, key: str, entry: NameEntry):
+        item = (_rank(key, entry), entry)
+        node = self._root
+        for char in key:
+            node = node.children.setdefault(char, _TrieNode())
+            if len(node.best) < NODE_CAPACITY or item < node.best[-1]:
+                insort(node.best, item)
+                del node.best[NODE_CAPACITY:]
+
+    def lookup(self, name: str) -> Optional[NameEntry]:
+        """The entry whose normalized name is exactly this one's, if any."""
+        return self.entries.get(normalize_name(name))
+
+    def complete(self, prefix: str, limit: int = 10, stored_only: bool = False) -> List[NameEntry]:
+        node = self._root
+        for char in normalize_name(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        if node is self._root:
+            return []
+        entries = [entry for _, entry in node.best if entry.stored or not stored_only]
+        return entries[:limit]
+
+    def suggest(self, name: str, limit: int = 5, stored_only: bool = False) -> List[NameEntry]:
+        """Closest names to a misspelling, nearest first; nothing if none is plausibly meant."""
+        key = normalize_name(name)
+        if not key:
+            return []
+        # roughly one typo per four characters, never more than three
+        limit_distance = min(3, max(1, len(key) // 4))
+        trigrams = set(_trigrams(key))
+        lengths = range(len(key) - limit_distance, len(key) + limit_distance + 1)
+        postings = [self._postings[(trigram, length)] for trigram in trigrams for length in lengths
+                    if (trigram, length) in self._postings]
+        if not postings:
+            return []
+        # trigrams shared with each key, counted in one pass over the matching postings
+        shared = np.bincount(np.concatenate(postings))
+        # an edit touches at most three trigrams (four for a swap), so anything sharing fewer is out of range
+        needed = max(1, len(trigrams) - 4 * limit_distance)
+        candidates = np.flatnonzero(shared >= needed)
+        if len(candidates) > SUGGESTION_CANDIDATES:
+            # most shared trigrams first; among equals, the lengths closest to the query's
+            closeness = 8 * shared[candidates] - np.abs(self._lengths[candidates] - len(key))
+            candidates = candidates[np.argpartition(-closeness, SUGGESTION_CANDIDATES - 1)[:SUGGESTION_CANDIDATES]]
+        matches = _match_masks(key)
+        scored = []
+        for position in candidates.tolist():
+            candidate, count = self._keys[position], int(shared[position])
+            entry = self.entries[candidate]
+            if stored_only and not entry.stored:
+                continue
+            distance = _aligned_distance(matches, len(key), candidate, limit_distance)
+            if distance <= limit_distance:
+                scored.append((distance, -count, _rank(candidate, entry), entry))
+        scored.sort()
+        return [entry for *_, entry in scored[:limit]]
+
+
+class NameListRepository:
+    """Keeps pokeapi_names in step with PokeAPI's /pokemon list."""
+
+    @staticmethod
+    def store_names(session, names: Iterable[str]) -> int:
+        rows = [{'name': name} for name in sorted(set(names))]
+        session.execute(delete(KnownName))
+        if rows:
+            session.execute(insert(KnownName), rows)
+        session.info['name_list_changed'] = True
+        return len(rows)
+
+    @staticmethod
+    def fetch_all(session, pokeapi) -> Optional[int]:
+        """Fetch and store the full name list; returns how many names, or None if it could not be fetched."""
+        names = pokeapi.get_pokemon_names()
+        if names is None:
+            return None
+        return NameListRepository.store_names(session, names)
+
+
+class NameIndexStore:
+    """Caches the NameIndex until a Pokemon or the name list is written again.
+
+    Writes from other processes (scout.py --fetch-names, other workers) are noticed
+    through a DataVersionWatcher.
+    """
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL):
+        self._index: Optional[NameIndex] = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._watcher = DataVersionWatcher(poll_interval)
+
+    def invalidate(self, *args, **kwargs):
+        self._index = None
+
+    def get(self, session) -> NameIndex:
+        index = self._index
+        if index is not None and not self._watcher.changed(session, self._version):
+            return index
+        with self._lock:
+            if self._index is None or self._watcher.changed(session, self._version, force=True):
+                self._version = self._watcher.version(session)
+                stored = session.execute(select(Pokemon.name)).scalars().all()
+                known = session.execute(select(KnownName.name)).scalars().all()
+                self._index = NameIndex(stored, known)
+                logger.info('Built name index: %s stored, %s known names', len(stored), len(known))
+            return self._index
+
+    def close(self):
+        self._watcher.close()
+
+
+name_index_store = NameIndexStore()
+
+
+def _on_commit(session):
+    if session.info.pop('name_list_changed', False):
+        name_index_store.invalidate()
+
+
+def _on_rollback(session):
+    session.info.pop('name_list_changed', None)
+
+
+on_pokemon_commit(name_index_store.invalidate)
+event.listen(OrmSession, 'after_commit', _on_commit)
+event.listen(OrmSession, 'after_rollback', _on_rollback)
+event.listen(Base.metadata, 'after_create', name_index_store.invalidate)
+event.listen(Base.metadata, 'after_drop', name_index_store.invalidate)
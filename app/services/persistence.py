@@ -0,0 +1,387 @@
+"""
+Persistence - Turns sanitized Pokemon data into database rows
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import logging
+import threading
+import weakref
+from typing import Callable, Dict, Any, Iterable, List, Optional, Set, Union
+
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.dialects.sqlite import insert as upsert
+from sqlalchemy.orm import Session as OrmSession
+
+from app.models import (
+    Pokemon, PokemonType, PokemonAbility, PokemonStat,
+    TypeName, AbilityName, StatName, STAT_COLUMNS,
+    MoveName, LearnMethodName, VersionGroupName, PokemonMove
+)
+from app.models.pokemon import Base
+from app.services.aggregates import StatsAggregator
+from app.services.change_feed import ChangeFeed
+from app.services.data_processor import DataProcessor
+from app.services.pokemon_record import MISSING_STAT, STAT_NAMES, PokemonBatch, PokemonRecord
+
+
+logger = logging.getLogger(__name__)
+
+
+LOOKUP_MODELS = {
+    'type': TypeName,
+    'ability': AbilityName,
+    'stat': StatName,
+    'move': MoveName,
+    'learn_method': LearnMethodName,
+    'version_group': VersionGroupName,
+}
+
+
+class LookupCache:
+    """Name <-> id cache for the type/ability/stat/move lookup tables, one per engine.
+
+    Keyed by the engine object rather than its URL, since every in-memory SQLite engine
+    has the same URL but its own tables. Ids inserted by a session stay private to it
+    (in session.info) until it commits, so a rolled back insert never leaves a dangling
+    id in the shared cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # engine -> ({kind: {name: id}}, {kind: {id: name}}); dropped with the engine
+        self._by_engine = weakref.WeakKeyDictionary()
+
+    def clear(self, target=None, connection=None, **kwargs):
+        """Forget every engine's ids, or only those of the engine behind `connection`."""
+        with self._lock:
+            if connection is None:
+                self._by_engine.clear()
+            else:
+                self._by_engine.pop(connection.engine, None)
+
+    def _tables(self, session):
+        engine = session.get_bind().engine
+        tables = self._by_engine.get(engine)
+        if tables is None:
+            with self._lock:
+                tables = self._by_engine.setdefault(engine, (
+                    {kind: {} for kind in LOOKUP_MODELS}, {kind: {} for kind in LOOKUP_MODELS}
+                ))
+        return tables
+
+    def _remember(self, session, kind: str, name: str, row_id: int):
+        ids, names = self._tables(session)
+        with self._lock:
+            ids[kind][name] = row_id
+            names[kind][row_id] = name
+
+    def resolve(self, session, kind: str, name: str) -> int:
+        """Id for `name`, inserting it into the lookup table if it's new."""
+        row_id = self._tables(session)[0][kind].get(name)
+        if row_id is not None:
+            return row_id
+
+        pending = session.info.setdefault('pending_lookups', {})
+        if (kind, name) in pending:
+            return pending[(kind, name)]
+
+        model = LOOKUP_MODELS[kind]
+        row_id = session.execute(select(model.id).where(model.name == name)).scalar()
+        if row_id is not None:
+            self._remember(session, kind, name, row_id)
+            return row_id
+
+        result = session.execute(upsert(model).values(name=name).on_conflict_do_nothing(index_elements=['name']))
+        if not result.rowcount:
+            # another session (a request, the prefetcher) committed the same name since the select above
+            row_id = session.execute(select(model.id).where(model.name == name)).scalar()
+            self._remember(session, kind, name, row_id)
+            return row_id
+        row_id = result.inserted_primary_key[0]
+        pending[(kind, name)] = row_id
+        return row_id
+
+    def name(self, session, kind: str, row_id: int) -> Optional[str]:
+        """Reverse lookup, falling back to the database for ids this process hasn't seen."""
+        name = self._tables(session)[1][kind].get(row_id)
+        if name is None:
+            model = LOOKUP_MODELS[kind]
+            name = session.execute(select(model.name).where(model.id == row_id)).scalar()
+            if name is not None:
+                self._remember(session, kind, name, row_id)
+        return name
+
+    def commit_pending(self, session):
+        for (kind, name), row_id in session.info.pop('pending_lookups', {}).items():
+            self._remember(session, kind, name, row_id)
+
+    def discard_pending(self, session):
+        session.info.pop('pending_lookups', None)
+
+
+lookup_cache = LookupCache()
+
+event.listen(OrmSession, 'after_commit', lookup_cache.commit_pending)
+event.listen(OrmSession, 'after_rollback', lookup_cache.discard_pending)
+# recreated tables hand out ids from 1 again (the test suite does this constantly)
+event.listen(Base.metadata, 'after_create', lookup_cache.clear)
+event.listen(Base.metadata, 'after_drop', lookup_cache.clear)
+
+
+POKEMON_CHILD_MODELS = (PokemonType, PokemonAbility, PokemonStat)
+# learnsets run to hundreds of rows per Pokemon: written with plain DBAPI executemany, never as ORM objects
+LEARNSET_INSERT = (
+    'INSERT OR IGNORE INTO pokemon_moves (pokemon_id, version_group_id, level, move_id, method_id) '
+    'VALUES (?, ?, ?, ?, ?)'
+)
+_commit_listeners: List[Callable[[Optional[Set[int]]], None]] = []
+
+
+def on_pokemon_commit(callback: Callable[[Optional[Set[int]]], None]):
+    """Register a callback run after any commit that changed Pokemon data.
+
+    It receives the ids of the Pokemon touched, or None when they aren't known
+    (Core bulk writes) and listeners should rebuild from scratch.
+    """
+    _commit_listeners.append(callback)
+    return callback
+
+
+def mark_pokemon_changed(session, pokemon_ids: Optional[Iterable[int]] = None):
+    """Flag Pokemon as changed in the session's transaction; Core bulk writes call this themselves."""
+    if pokemon_ids is None:
+        session.info['pokemon_changed_ids'] = None
+        return
+    changed = session.info.setdefault('pokemon_changed_ids', set())
+    if changed is not None:
+        changed.update(pokemon_ids)
+
+
+def _track_pokemon_changes(session, flush_context):
+    # after_flush: ids are assigned but new/dirty/deleted still describe what was flushed
+    ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, Pokemon):
+            ids.add(obj.id)
+        elif isinstance(obj, POKEMON_CHILD_MODELS):
+            if obj.pokemon_id is None:
+                mark_pokemon_changed(session, None)
+                return
+            ids.add(obj.pokemon_id)
+    if ids:
+        mark_pokemon_changed(session, ids)
+
+
+def _notify_pokemon_commit(session):
+    if 'pokemon_changed_ids' not in session.info:
+        return
+    changed_ids = session.info.pop('pokemon_changed_ids')
+    for callback in _commit_listeners:
+        try:
+            callback(changed_ids)
+        except Exception:
+            logger.exception('Pokemon commit listener failed')
+
+
+def _forget_pokemon_changes(session):
+    session.info.pop('pokemon_changed_ids', None)
+
+
+def _delete_learnsets(session, flush_context):
+    # pokemon_moves isn't an ORM relationship (deleting would load every row first), so clear it here
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Pokemon)]
+    if deleted:
+        session.connection().execute(delete(PokemonMove.__table__).where(PokemonMove.pokemon_id.in_(deleted)))
+
+
+event.listen(OrmSession, 'after_flush', _track_pokemon_changes)
+event.listen(OrmSession, 'after_flush', _delete_learnsets)
+event.listen(OrmSession, 'after_commit', _notify_pokemon_commit)
+event.listen(OrmSession, 'after_rollback', _forget_pokemon_changes)
+
+
+class PokemonRepository:
+    """Single place where sanitized data becomes ORM objects, so every entry point stores the same shape."""
+
+    @staticmethod
+    def build_pokemon(session, sanitized_data: Union[Dict[str, Any], PokemonRecord]) -> Pokemon:
+        """Build a Pokemon with its types, abilities and stats attached (not yet added to the session).
+
+        Takes either a sanitized dict or a PokemonRecord. The session is only used to resolve
+        lookup ids for type/ability/stat names.
+        """
+        if isinstance(sanitized_data, PokemonRecord):
+            return PokemonRepository._build_from_record(session, sanitized_data)
+
+        pokemon = Pokemon(
+            name=sanitized_data['name'],
+            pokedex_number=sanitized_data['pokedex_number'],
+            height=sanitized_data['height'],
+            weight=sanitized_data['weight'],
+            base_experience=sanitized_data['base_experience'],
+            sprite_url=sanitized_data['sprite_url']
+        )
+
+        for type_data in sanitized_data['types']:
+            pokemon.types.append(PokemonType(
+                type_id=lookup_cache.resolve(session, 'type', type_data['type_name']),
+                slot=type_data['slot']
+            ))
+
+        for ability_data in sanitized_data['abilities']:
+            pokemon.abilities.append(PokemonAbility(
+                ability_id=lookup_cache.resolve(session, 'ability', ability_data['ability_name']),
+                is_hidden=ability_data['is_hidden'],
+                slot=ability_data['slot']
+            ))
+
+        for stat_data in sanitized_data['stats']:
+            pokemon.stats.append(PokemonStat(
+                stat_id=lookup_cache.resolve(session, 'stat', stat_data['stat_name']),
+                base_stat=stat_data['base_stat'],
+                effort=stat_data['effort']
+            ))
+
+        pokemon.sync_stat_columns({s['stat_name']: s['base_stat'] for s in sanitized_data['stats']})
+        return pokemon
+
+    @staticmethod
+    def add_pokemon(session, sanitized_data: Dict[str, Any], raw_data: Dict[Any, Any]) -> Pokemon:
+        """Build, add and flush one fetched Pokemon, then store its learnset from the raw payload.
+
+        The flush assigns the id the learnset rows point at; a name that's already stored
+        raises IntegrityError there. Nothing is committed.
+        """
+        pokemon = PokemonRepository.build_pokemon(session, sanitized_data)
+        session.add(pokemon)
+        session.flush()
+        PokemonRepository.store_learnset(session, pokemon.id, DataProcessor.sanitize_learnset(raw_data))
+        return pokemon
+
+    @staticmethod
+    def bulk_insert(session, batch: PokemonBatch, ids: Optional[List[Optional[int]]] = None,
+                    sprite_hashes: Optional[List[Optional[str]]] = None) -> List[int]:
+        """Insert a sanitized batch with one executemany per table; returns the new ids in batch order.
+
+        Goes through Core rather than the ORM, so it keeps the aggregates, change feed and commit
+        listeners up to date itself. Every name must be new: an existing one fails the whole statement.
+        `ids` pins the id of each row (None lets SQLite assign one), e.g. to replace rows in place;
+        `sprite_hashes` carries over sprites already cached for them, which no payload holds.
+        """
+        if not len(batch):
+            return []
+
+        type_ids = {name: lookup_cache.resolve(session, 'type', name) for name in set(batch.type_names)}
+        ability_ids = {name: lookup_cache.resolve(session, 'ability', name) for name in set(batch.ability_names)}
+        stat_ids = [lookup_cache.resolve(session, 'stat', name) for name in STAT_NAMES]
+        columns = [STAT_COLUMNS[name] for name in STAT_NAMES]
+        width = len(STAT_NAMES)
+
+        pokemon_rows = []
+        for row, parent in enumerate(zip(batch.names, batch.pokedex_numbers, batch.heights, batch.weights,
+                                         batch.base_experiences, batch.sprite_urls)):
+            values = dict(zip(('name', 'pokedex_number', 'height', 'weight', 'base_experience', 'sprite_url'),
+                              parent))
+            stat_row = batch.stats[row * width:(row + 1) * width]
+            present = [value for value in stat_row if value != MISSING_STAT]
+            for column, value in zip(columns, stat_row):
+                values[column] = None if value == MISSING_STAT else value
+            values['total'] = sum(present) if present else None
+            if ids is not None:
+                values['id'] = ids[row]
+            if sprite_hashes is not None:
+                values['sprite_hash'] = sprite_hashes[row]
+            pokemon_rows.append(values)
+
+        # plain table inserts: the ORM's bulk mode would rebuild every parameter dict
+        pokemon_table = Pokemon.__table__
+        ids = list(session.execute(
+            insert(pokemon_table).returning(pokemon_table.c.id, sort_by_parameter_order=True), pokemon_rows
+        ).scalars())
+
+        type_rows = [
+            {'pokemon_id': ids[row], 'type_id': type_ids[name], 'slot': slot}
+            for row, name, slot in zip(batch.type_parent, batch.type_names, batch.type_slots)
+        ]
+        ability_rows = [
+            {'pokemon_id': ids[row], 'ability_id': ability_ids[name], 'is_hidden': is_hidden, 'slot': slot}
+            for row, name, is_hidden, slot in zip(batch.ability_parent, batch.ability_names,
+                                                  batch.ability_hidden, batch.ability_slots)
+        ]
+        stat_rows = [
+            {'pokemon_id': ids[position // width], 'stat_id': stat_ids[position % width],
+             'base_stat': value, 'effort': batch.efforts[position]}
+            for position, value in enumerate(batch.stats) if value != MISSING_STAT
+        ]
+        for model, rows in ((PokemonType, type_rows), (PokemonAbility, ability_rows), (PokemonStat, stat_rows)):
+            if rows:
+                session.execute(insert(model.__table__), rows)
+        if batch.move_names:
+            move_ids = {name: lookup_cache.resolve(session, 'move', name) for name in set(batch.move_names)}
+            method_ids = {name: lookup_cache.resolve(session, 'learn_method', name) for name in set(batch.move_methods)}
+            group_ids = {name: lookup_cache.resolve(session, 'version_group', name)
+                         for name in set(batch.move_version_groups)}
+            session.connection().exec_driver_sql(LEARNSET_INSERT, [
+                (ids[row], group_ids[group], level, move_ids[move], method_ids[method])
+                for row, move, method, group, level in zip(batch.move_parent, batch.move_names, batch.move_methods,
+                                                           batch.move_version_groups, batch.move_levels)
+            ])
+
+        StatsAggregator.record_bulk_insert(
+            session.connection(), pokemon_rows,
+            (row['type_id'] for row in type_rows), (row['ability_id'] for row in ability_rows)
+        )
+        ChangeFeed.record(session.connection(), dict(zip(ids, batch.names)))
+        mark_pokemon_changed(session, None)
+        return ids
+
+    @staticmethod
+    def store_learnset(session, pokemon_id: int, learnset: Iterable[tuple]) -> int:
+        """Replace one Pokemon's learnset with (move, method, version group, level) entries; returns the row count."""
+        rows = [
+            (pokemon_id, lookup_cache.resolve(session, 'version_group', version_group), level,
+             lookup_cache.resolve(session, 'move', move), lookup_cache.resolve(session, 'learn_method', method))
+            for move, method, version_group, level in learnset
+        ]
+        connection = session.connection()
+        connection.execute(delete(PokemonMove.__table__).where(PokemonMove.pokemon_id == pokemon_id))
+        if rows:
+            connection.exec_driver_sql(LEARNSET_INSERT, rows)
+        return len(rows)
+
+    @staticmethod
+    def _build_from_record(session, record: PokemonRecord) -> Pokemon:
+        pokemon = Pokemon(
+            name=record.name,
+            pokedex_number=record.pokedex_number,
+            height=record.height,
+            weight=record.weight,
+            base_experience=record.base_experience,
+            sprite_url=record.sprite_url
+        )
+
+        for type_slot in record.types:
+            pokemon.types.append(PokemonType(
+                type_id=lookup_cache.resolve(session, 'type', type_slot.type_name),
+                slot=type_slot.slot
+            ))
+
+        for ability_slot in record.abilities:
+            pokemon.abilities.append(PokemonAbility(
+                ability_id=lookup_cache.resolve(session, 'ability', ability_slot.ability_name),
+                is_hidden=ability_slot.is_hidden,
+                slot=ability_slot.slot
+            ))
+
+        base_stats = record.base_stats()
+        efforts = dict(zip(STAT_NAMES, record.efforts))
+        for stat_name, base_stat in base_stats.items():
+            pokemon.stats.append(PokemonStat(
+                stat_id=lookup_cache.resolve(session, 'stat', stat_name),
+                base_stat=base_stat,
+                effort=efforts[stat_name]
+            ))
+
+        pokemon.sync_stat_columns(base_stats)
+        return pokemon
@@ -5,53 +5,177 @@ Project: Challenge Assignment
 """
 
 import logging
+import os
 import requests
-from typing import Optional, Dict, Any
+from requests.adapters import HTTPAdapter
+from typing import Optional, Dict, Any, List
+from urllib3.util.retry import Retry
+
+from app.services.selective_json import POKEMON_FIELDS_WITH_MOVES, parse_pokemon
 
 
 logger = logging.getLogger(__name__)
 
 
+# extra attempts after a 429 or 5xx; Retry-After is honoured, otherwise the wait doubles from 0.2s
+RETRIES = 2
+# longest Retry-After we sleep for; a longer one is cut down to this, so with the 10s timeout per
+# attempt a call gives up within (RETRIES + 1) * 10 + RETRIES * MAX_RETRY_AFTER seconds
+MAX_RETRY_AFTER = 5.0
+# kept-alive connections per host; concurrent fetches beyond this reconnect for every request
+POOL_SIZE = 32
+
+
+class UpstreamError(Exception):
+    """PokeAPI failed (429, 5xx or unreachable) on every attempt, so a resource may exist but wasn't served."""
+
+    def __init__(self, message: str, status_code: Optional[int] = None):
+        super().__init__(message)
+        # the last HTTP status PokeAPI sent; None when it never answered
+        self.status_code = status_code
+
+
+class BoundedRetry(Retry):
+    """Retry that honours Retry-After only up to MAX_RETRY_AFTER seconds."""
+
+    def get_retry_after(self, response) -> Optional[float]:
+        retry_after = super().get_retry_after(response)
+        if retry_after is None:
+            return None
+        return min(retry_after, MAX_RETRY_AFTER)
+
+
 class PokeAPIService:
     BASE_URL = "https://pokeapi.co/api/v2"
 
-    def __init__(self):
+    def __init__(self, archive=None, moves: bool = False, base_url: Optional[str] = None, retries: int = RETRIES,
+                 selective: bool = False):
+        # optional PayloadArchive; every successful response body is kept there
+        self.archive = archive
+        # parse each Pokemon's moves too, for callers that store learnsets
+        self.moves = moves
+        # parse only the fields DataProcessor reads; opt-in for bulk ingest, where skipping the
+        # moves saves memory (per request it is no faster than response.json())
+        self.selective = selective
+        # POKEAPI_BASE_URL points every service at another server, e.g. the local stand-in
+        self.base_url = (base_url or os.environ.get('POKEAPI_BASE_URL') or self.BASE_URL).rstrip('/')
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Pokemon-Scout-App/1.0'
         })
+        retry = BoundedRetry(total=retries, status_forcelist=(429, 500, 502, 503, 504), allowed_methods=('GET',),
+                             backoff_factor=0.2, respect_retry_after_header=True, raise_on_status=False)
+        adapter = HTTPAdapter(max_retries=retry, pool_maxsize=POOL_SIZE)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get_pokemon(self, pokemon_name: str, selective: Optional[bool] = None) -> Optional[Dict[Any, Any]]:
+        """Fetch Pokemon data from PokeAPI.
+
+        The whole payload is parsed unless `selective` (default: the service's setting) is
+        set; then only the fields DataProcessor reads are (game_indices and most sprites are
+        skipped, and moves too unless the service was created with moves=True).
 
-    def get_pokemon(self, pokemon_name: str) -> Optional[Dict[Any, Any]]:
-        """Fetch Pokemon data from PokeAPI."""
+        Returns None when PokeAPI has no such Pokemon; raises UpstreamError when it kept
+        failing, so callers can tell an outage from a name that doesn't exist.
+        """
         try:
             pokemon_name = pokemon_name.lower().strip()
-            url = f"{self.BASE_URL}/pokemon/{pokemon_name}"
+            url = f"{self.base_url}/pokemon/{pokemon_name}"
 
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
 
-            return response.json()
+            if not (self.selective if selective is None else selective):
+                data = response.json()
+            else:
+                try:
+                    data = parse_pokemon(response.content, POKEMON_FIELDS_WITH_MOVES if self.moves else None)
+                except ValueError as e:
+                    logger.warning("Selective parse failed for '%s', parsing the full payload: %s", pokemon_name, e)
+                    data = response.json()
+            self._archive('pokemon', data.get('name') or pokemon_name, response.content)
+            return data
 
         except requests.exceptions.HTTPError as e:
-            if e.response is not None and e.response.status_code == 404:
+            status_code = e.response.status_code if e.response is not None else None
+            if status_code == 404:
                 logger.info("Pokemon '%s' not found in PokeAPI", pokemon_name)
-            else:
-                logger.exception("HTTP error occurred: %s", e)
+                return None
+            logger.warning("PokeAPI answered %s for '%s'", status_code, pokemon_name)
+            raise UpstreamError(f"PokeAPI answered {status_code} for '{pokemon_name}'", status_code) from e
+
+        except requests.exceptions.RequestException as e:
+            logger.warning("Error fetching data for '%s': %s", pokemon_name, e)
+            raise UpstreamError(f"PokeAPI unreachable for '{pokemon_name}': {e}") from e
+
+    def get_pokemon_species(self, species_id) -> Optional[Dict[Any, Any]]:
+        """Fetch Pokemon species data - flavor text, genus, varieties and its evolution chain link."""
+        try:
+            url = f"{self.base_url}/pokemon-species/{species_id}"
+            response = self.session.get(url, timeout=10)
+            response.raise_for_status()
+
+            self._archive('pokemon-species', str(species_id), response.content)
+            return response.json()
+
+        except requests.exceptions.RequestException as e:
+            logger.exception("Error fetching species data for Pokemon ID %s: %s", species_id, e)
             return None
 
+    def get_evolution_chain(self, chain_id: int) -> Optional[Dict[Any, Any]]:
+        """Fetch an evolution chain: the tree of species evolving into each other, with triggers."""
+        try:
+            url = f"{self.base_url}/evolution-chain/{chain_id}"
+            response = self.session.get(url, timeout=10)
+            response.raise_for_status()
+
+            self._archive('evolution-chain', str(chain_id), response.content)
+            return response.json()
+
         except requests.exceptions.RequestException as e:
-            logger.exception("Error fetching data for '%s': %s", pokemon_name, e)
+            logger.exception("Error fetching evolution chain %s: %s", chain_id, e)
             return None
 
-    def get_pokemon_species(self, pokemon_id: int) -> Optional[Dict[Any, Any]]:
-        """Fetch Pokemon species data - useful for additional info like descriptions."""
+    def get_pokemon_names(self) -> Optional[List[str]]:
+        """Every name PokeAPI serves under /pokemon, forms included, in one request."""
         try:
-            url = f"{self.BASE_URL}/pokemon-species/{pokemon_id}"
+            url = f"{self.base_url}/pokemon"
+            response = self.session.get(url, params={'limit': 100000}, timeout=30)
+            response.raise_for_status()
+
+            return [entry['name'] for entry in response.json().get('results', []) if entry.get('name')]
+
+        except (requests.exceptions.RequestException, ValueError) as e:
+            logger.exception("Error fetching the Pokemon name list: %s", e)
+            return None
+
+    def get_type(self, type_name: str) -> Optional[Dict[Any, Any]]:
+        """Fetch a type, including its damage relations."""
+        try:
+            url = f"{self.base_url}/type/{type_name.lower().strip()}"
             response = self.session.get(url, timeout=10)
             response.raise_for_status()
 
+            self._archive('type', type_name.lower().strip(), response.content)
             return response.json()
 
         except requests.exceptions.RequestException as e:
-            logger.exception("Error fetching species data for Pokemon ID %s: %s", pokemon_id, e)
+            logger.exception("Error fetching type data for '%s': %s", type_name, e)
             return None
+
+    def get_sprite(self, url: str) -> Optional[bytes]:
+        """Download a sprite image (sprite_url points at GitHub-hosted artwork, not the API)."""
+        try:
+            response = self.session.get(url, timeout=10)
+            response.raise_for_status()
+
+            return response.content
+
+        except requests.exceptions.RequestException as e:
+            logger.exception("Error fetching sprite %s: %s", url, e)
+            return None
+
+    def _archive(self, kind: str, name: str, body: bytes):
+        if self.archive is not None:
+            self.archive.store(kind, name, body)
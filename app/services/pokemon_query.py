@@ -0,0 +1,160 @@
+"""
+Pokemon Query - Compiles list filters and sorts from query parameters into SQL
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+
+from app.models import Pokemon, PokemonType, PokemonAbility, TypeName, AbilityName, STAT_COLUMNS
+
+
+class QueryError(ValueError):
+    """Raised when a query parameter can't be understood; routes turn it into a 400."""
+
+
+# every range filter maps min_<key>/max_<key> onto one indexed column
+RANGE_COLUMNS = {column: getattr(Pokemon, column) for column in list(STAT_COLUMNS.values()) + ['total']}
+RANGE_COLUMNS['pokedex'] = Pokemon.pokedex_number
+
+SORT_COLUMNS = dict(RANGE_COLUMNS)
+SORT_COLUMNS.update({
+    'id': Pokemon.id,
+    'name': Pokemon.name,
+    'pokedex_number': Pokemon.pokedex_number,
+    'height': Pokemon.height,
+    'weight': Pokemon.weight,
+    'base_experience': Pokemon.base_experience,
+})
+
+
+class PokemonQuery:
+    """Filters, sort keys and page window for GET /api/pokemon."""
+    
+    MAX_LIMIT = 1000
+    
+    def __init__(self, types: Optional[List[str]] = None, abilities: Optional[List[str]] = None,
+                 hidden_abilities: Optional[List[str]] = None,
+                 ranges: Optional[Dict[str, Tuple[Optional[int], Optional[int]]]] = None,
+                 sort: Optional[List[Tuple[str, bool]]] = None,
+                 limit: Optional[int] = None, offset: int = 0):
+        self.types = types or []
+        self.abilities = abilities or []
+        self.hidden_abilities = hidden_abilities or []
+        self.ranges = ranges or {}
+        self.sort = sort or []
+        self.limit = limit
+        self.offset = offset
+    
+    @classmethod
+    def from_args(cls, args: Mapping[str, Any]) -> 'PokemonQuery':
+        """Parse request args (a werkzeug MultiDict or a plain dict)."""
+        def values(key):
+            raw = args.getlist(key) if hasattr(args, 'getlist') else [args[key]] if key in args else []
+            return [part.strip() for value in raw for part in str(value).split(',') if part.strip()]
+        
+        ranges = {}
+        for key in RANGE_COLUMNS:
+            low = cls._int_arg(args, f'min_{key}')
+            high = cls._int_arg(args, f'max_{key}')
+            if low is not None or high is not None:
+                ranges[key] = (low, high)
+        
+        sort = []
+        for key in values('sort'):
+            descending = key.startswith('-')
+            key = key.lstrip('-+')
+            if key not in SORT_COLUMNS:
+                raise QueryError(f"Unknown sort key '{key}'")
+            sort.append((key, descending))
+        
+        limit = cls._int_arg(args, 'limit')
+        if limit is not None and not 0 < limit <= cls.MAX_LIMIT:
+            raise QueryError(f'limit must be between 1 and {cls.MAX_LIMIT}')
+        offset = cls._int_arg(args, 'offset') or 0
+        if offset < 0:
+            raise QueryError('offset must not be negative')
+        
+        return cls(
+            types=[value.capitalize() for value in values('type')],
+            abilities=[cls._ability_name(value) for value in values('ability')],
+            hidden_abilities=[cls._ability_name(value) for value in values('hidden_ability')],
+            ranges=ranges,
+            sort=sort,
+            limit=limit,
+            offset=offset
+        )
+    
+    @staticmethod
+    def _int_arg(args, key) -> Optional[int]:
+        value = args.get(key)
+        if value in (None, ''):
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise QueryError(f"'{key}' must be an integer")
+    
+    @staticmethod
+    def _ability_name(value: str) -> str:
+        # same formatting DataProcessor applies - "lightning-rod" becomes "Lightning Rod"
+        return value.replace('-', ' ').title()
+    
+    @staticmethod
+    def _lookup_id(model, name: str):
+        # resolved once by SQLite, then the child table is probed on its (id, pokemon_id) index
+        return select(model.id).where(model.name == name).scalar_subquery()
+    
+    def conditions(self) -> list:
+        """WHERE clauses; type/ability filters are semi-joins on the covering child indexes."""
+        clauses = []
+        for type_name in self.types:
+            clauses.append(Pokemon.id.in_(
+                select(PokemonType.pokemon_id).where(PokemonType.type_id == self._lookup_id(TypeName, type_name))
+            ))
+        for ability_name in self.abilities:
+            clauses.append(Pokemon.id.in_(
+                select(PokemonAbility.pokemon_id).where(
+                    PokemonAbility.ability_id == self._lookup_id(AbilityName, ability_name)
+                )
+            ))
+        for ability_name in self.hidden_abilities:
+            clauses.append(Pokemon.id.in_(
+                select(PokemonAbility.pokemon_id).where(
+                    PokemonAbility.ability_id == self._lookup_id(AbilityName, ability_name),
+                    PokemonAbility.is_hidden == 1
+                )
+            ))
+        for key, (low, high) in self.ranges.items():
+            column = RANGE_COLUMNS[key]
+            if low is not None:
+                clauses.append(column >= low)
+            if high is not None:
+                clauses.append(column <= high)
+        return clauses
+    
+    def order_by(self) -> list:
+        keys = [SORT_COLUMNS[key].desc() if descending else SORT_COLUMNS[key].asc()
+                for key, descending in self.sort]
+        # id last keeps pages stable when sort keys tie
+        keys.append(Pokemon.id.asc())
+        return keys
+    
+    def count(self, session) -> int:
+        return session.query(Pokemon.id).filter(*self.conditions()).count()
+    
+    def fetch(self, session) -> List[Pokemon]:
+        """Load one page of Pokemon with their child rows batched in by primary key."""
+        query = session.query(Pokemon).filter(*self.conditions()).order_by(*self.order_by()).options(
+            selectinload(Pokemon.types),
+            selectinload(Pokemon.abilities),
+            selectinload(Pokemon.stats)
+        )
+        if self.offset:
+            query = query.offset(self.offset)
+        if self.limit is not None:
+            query = query.limit(self.limit)
+        return query.all()
@@ -0,0 +1,189 @@
+"""
+Pokemon Record - Compact slotted form of DataProcessor output for large batches
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from app.models import STAT_COLUMNS
+
+
+# position of each stat in PokemonRecord.stats / efforts
+STAT_NAMES = tuple(STAT_COLUMNS)
+STAT_INDEX = {name: i for i, name in enumerate(STAT_NAMES)}
+# base stats are signed so a stat the payload didn't carry can be told apart from a real 0
+MISSING_STAT = -1
+
+
+class TypeSlot(NamedTuple):
+    type_name: str
+    slot: int
+
+
+class AbilitySlot(NamedTuple):
+    ability_name: str
+    is_hidden: bool
+    slot: int
+
+
+@dataclass
+class PokemonRecord:
+    """The same data as a sanitized dict, without a dict per type, ability and stat.
+
+    Stats and efforts are fixed-size arrays in STAT_NAMES order and type/ability names
+    are interned, so a batch of thousands shares one copy of each name.
+    """
+
+    # spelled out rather than dataclass(slots=True), which needs Python 3.10
+    __slots__ = ('name', 'pokedex_number', 'height', 'weight', 'base_experience', 'sprite_url',
+                 'types', 'abilities', 'stats', 'efforts')
+
+    name: str
+    pokedex_number: int
+    height: int
+    weight: int
+    base_experience: int
+    sprite_url: str
+    types: Tuple[TypeSlot, ...]
+    abilities: Tuple[AbilitySlot, ...]
+    stats: array
+    efforts: array
+
+    @staticmethod
+    def empty_stats() -> Tuple[array, array]:
+        return array('h', [MISSING_STAT] * len(STAT_NAMES)), array('B', bytes(len(STAT_NAMES)))
+
+    @classmethod
+    def from_sanitized(cls, sanitized_data: Dict[str, Any]) -> 'PokemonRecord':
+        stats, efforts = cls.empty_stats()
+        for stat_data in sanitized_data['stats']:
+            position = STAT_INDEX.get(stat_data['stat_name'])
+            if position is not None:
+                stats[position] = stat_data['base_stat']
+                efforts[position] = stat_data['effort']
+        return cls(
+            name=sanitized_data['name'],
+            pokedex_number=sanitized_data['pokedex_number'],
+            height=sanitized_data['height'],
+            weight=sanitized_data['weight'],
+            base_experience=sanitized_data['base_experience'],
+            sprite_url=sanitized_data['sprite_url'],
+            types=tuple(TypeSlot(sys.intern(t['type_name']), t['slot']) for t in sanitized_data['types']),
+            abilities=tuple(
+                AbilitySlot(sys.intern(a['ability_name']), a['is_hidden'], a['slot'])
+                for a in sanitized_data['abilities']
+            ),
+            stats=stats,
+            efforts=efforts,
+        )
+
+    def base_stats(self) -> Dict[str, int]:
+        """Stat name -> base stat for the stats present, as Pokemon.sync_stat_columns takes them."""
+        return {name: value for name, value in zip(STAT_NAMES, self.stats) if value != MISSING_STAT}
+
+    def as_sanitized(self) -> Dict[str, Any]:
+        """The dict DataProcessor.sanitize_pokemon_data would have returned."""
+        return {
+            'name': self.name,
+            'pokedex_number': self.pokedex_number,
+            'height': self.height,
+            'weight': self.weight,
+            'base_experience': self.base_experience,
+            'sprite_url': self.sprite_url,
+            'types': [{'type_name': t.type_name, 'slot': t.slot} for t in self.types],
+            'abilities': [
+                {'ability_name': a.ability_name, 'is_hidden': a.is_hidden, 'slot': a.slot}
+                for a in self.abilities
+            ],
+            'stats': [
+                {'stat_name': name, 'base_stat': value, 'effort': effort}
+                for name, value, effort in zip(STAT_NAMES, self.stats, self.efforts)
+                if value != MISSING_STAT
+            ],
+        }
+
+    def to_dict(self, pokemon_id: Optional[int] = None) -> Dict[str, Any]:
+        """Same shape as Pokemon.to_dict, for serving a record that was never stored."""
+        return {
+            'id': pokemon_id,
+            'name': self.name,
+            'pokedex_number': self.pokedex_number,
+            'height': self.height,
+            'weight': self.weight,
+            'base_experience': self.base_experience,
+            'sprite_url': self.sprite_url,
+            'types': [{'type': t.type_name, 'slot': t.slot} for t in self.types],
+            'abilities': [
+                {'ability': a.ability_name, 'is_hidden': bool(a.is_hidden), 'slot': a.slot}
+                for a in self.abilities
+            ],
+            'stats': [
+                {'stat': name, 'base_stat': value, 'effort': effort}
+                for name, value, effort in zip(STAT_NAMES, self.stats, self.efforts)
+                if value != MISSING_STAT
+            ],
+        }
+
+
+@dataclass
+class PokemonBatch:
+    """Many sanitized Pokemon as parallel columns, one set per table, ready for executemany.
+
+    Parent columns hold one entry per Pokemon. stats/efforts are flat arrays of
+    len(STAT_NAMES) entries per Pokemon, in STAT_NAMES order. The type, ability and
+    move (learnset) columns hold one entry per child row, pointing back at their Pokemon
+    by batch position through *_parent. The move columns stay empty for payloads parsed
+    without their moves. `skipped` lists the input positions that were empty.
+    """
+
+    names: List[str] = field(default_factory=list)
+    pokedex_numbers: List[int] = field(default_factory=list)
+    heights: List[int] = field(default_factory=list)
+    weights: List[int] = field(default_factory=list)
+    base_experiences: List[int] = field(default_factory=list)
+    sprite_urls: List[str] = field(default_factory=list)
+    stats: array = field(default_factory=lambda: array('h'))
+    efforts: array = field(default_factory=lambda: array('B'))
+    type_parent: array = field(default_factory=lambda: array('I'))
+    type_names: List[str] = field(default_factory=list)
+    type_slots: List[int] = field(default_factory=list)
+    ability_parent: array = field(default_factory=lambda: array('I'))
+    ability_names: List[str] = field(default_factory=list)
+    ability_hidden: List[bool] = field(default_factory=list)
+    ability_slots: List[int] = field(default_factory=list)
+    move_parent: array = field(default_factory=lambda: array('I'))
+    move_names: List[str] = field(default_factory=list)
+    move_methods: List[str] = field(default_factory=list)
+    move_version_groups: List[str] = field(default_factory=list)
+    move_levels: array = field(default_factory=lambda: array('H'))
+    skipped: List[int] = field(default_factory=list)
+
+    def __len__(self):
+        return len(self.names)
+
+    def stat_row(self, position: int) -> array:
+        width = len(STAT_NAMES)
+        return self.stats[position * width:(position + 1) * width]
+
+    def record(self, position: int) -> PokemonRecord:
+        width = len(STAT_NAMES)
+        return PokemonRecord(
+            self.names[position], self.pokedex_numbers[position], self.heights[position],
+            self.weights[position], self.base_experiences[position], self.sprite_urls[position],
+            tuple(TypeSlot(self.type_names[i], self.type_slots[i])
+                  for i in _children(self.type_parent, position)),
+            tuple(AbilitySlot(self.ability_names[i], self.ability_hidden[i], self.ability_slots[i])
+                  for i in _children(self.ability_parent, position)),
+            self.stat_row(position),
+            self.efforts[position * width:(position + 1) * width],
+        )
+
+
+def _children(parents: array, position: int) -> range:
+    # child rows are appended Pokemon by Pokemon, so each one's rows are a contiguous run
+    return range(bisect_left(parents, position), bisect_right(parents, position))
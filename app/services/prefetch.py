@@ -0,0 +1,249 @@
+"""
+Prefetch - Fetches a missed Pokemon's evolution family and pokedex neighbours in the background
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import itertools
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.models import EvolutionClosure, Pokemon
+from app.services.data_processor import DataProcessor
+from app.services.persistence import PokemonRepository
+from app.services.pokeapi import UpstreamError
+from app.services.species import FORM_ID_START, SpeciesRepository
+
+
+logger = logging.getLogger(__name__)
+
+
+# pokedex numbers on each side of a miss that are worth having ready
+NEIGHBOURS = 2
+# most Pokemon fetched in the background per miss, evolution family first
+BUDGET = 6
+# waiting fetches beyond this are dropped rather than piling up behind a burst of misses
+QUEUE_SIZE = 256
+# fewest seconds between two background requests to PokeAPI, however much is queued
+MIN_INTERVAL = 0.1
+
+_EXPAND, _FETCH = 0, 1
+
+
+def prefetch_enabled() -> bool:
+    """True when PREFETCH is set to a true value."""
+    return os.environ.get('PREFETCH', '').lower() in ('1', 'true', 'yes', 'on')
+
+
+class Prefetcher:
+    """One background thread that stores the Pokemon a client is likely to ask for next.
+
+    After a miss, the missed Pokemon's evolution chain (from stored species, or fetched
+    and stored on the way) and its pokedex neighbours are queued, nearest first, up to
+    `budget` of them, skipping any already stored or queued. The thread only talks to
+    PokeAPI while no foreground fetch is in flight, so it never competes with a request
+    someone is waiting on, and at most once every `min_interval` seconds, so a run of
+    misses doesn't turn into a burst against PokeAPI. Later requests answered from a
+    prefetched row count as hits.
+    """
+
+    def __init__(self, session_factory: Callable, pokeapi, neighbours: int = NEIGHBOURS,
+                 budget: int = BUDGET, queue_size: int = QUEUE_SIZE, min_interval: float = MIN_INTERVAL):
+        self.session_factory = session_factory
+        self.pokeapi = pokeapi
+        self.neighbours = neighbours
+        self.budget = budget
+        self.min_interval = min_interval
+        self._last_request = float('-inf')
+        self._queue = queue.PriorityQueue(maxsize=queue_size)
+        self._order = itertools.count()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._foreground = 0
+        self._idle = threading.Condition(self._lock)
+        self._pending: Set[int] = set()
+        # ids stored by the prefetcher that no request has asked for yet
+        self._unclaimed: Set[int] = set()
+        self._counts = dict.fromkeys(
+            ('misses', 'queued', 'prefetched', 'hits', 'already_stored', 'over_budget', 'dropped', 'failed'), 0
+        )
+
+    @contextmanager
+    def foreground(self):
+        """Wrap a request's own PokeAPI call; background fetches wait until none is running."""
+        with self._lock:
+            self._foreground += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._foreground -= 1
+                self._idle.notify_all()
+
+    def after_miss(self, name: str, pokedex_number: int):
+        """Queue the related Pokemon of one that was just fetched for a request."""
+        with self._lock:
+            self._counts['misses'] += 1
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='prefetcher', daemon=True)
+                self._thread.start()
+        self._put(_EXPAND, (name, pokedex_number))
+
+    def record_hit(self, pokemon_id: int):
+        """A request found this Pokemon stored; counts once if the prefetcher stored it."""
+        with self._lock:
+            if pokemon_id in self._unclaimed:
+                self._unclaimed.discard(pokemon_id)
+                self._counts['hits'] += 1
+
+    def drain(self):
+        """Block until everything queued so far has been handled."""
+        self._queue.join()
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = dict(self._counts)
+        counts['waiting'] = self._queue.qsize()
+        # hit_rate: share of prefetched Pokemon a request went on to use;
+        # saved_ratio: share of would-be misses answered without waiting on PokeAPI
+        counts['hit_rate'] = counts['hits'] / counts['prefetched'] if counts['prefetched'] else 0.0
+        requested = counts['hits'] + counts['misses']
+        counts['saved_ratio'] = counts['hits'] / requested if requested else 0.0
+        return counts
+
+    def _put(self, priority: int, item) -> bool:
+        try:
+            self._queue.put_nowait((priority, next(self._order), item))
+            return True
+        except queue.Full:
+            with self._lock:
+                self._counts['dropped'] += 1
+            return False
+
+    def _run(self):
+        while True:
+            priority, _, item = self._queue.get()
+            try:
+                if priority == _EXPAND:
+                    self._expand(*item)
+                else:
+                    self._fetch(item)
+            except Exception:
+                logger.exception('Prefetch of %s failed', item)
+            finally:
+                self._queue.task_done()
+
+    def _wait_for_turn(self):
+        """Block until `min_interval` has passed since the last background request and no foreground one runs."""
+        delay = self._last_request + self.min_interval - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        with self._lock:
+            while self._foreground:
+                self._idle.wait()
+        self._last_request = time.monotonic()
+
+    def _expand(self, name: str, pokedex_number: int):
+        session = self.session_factory()
+        try:
+            candidates = self._chain_members(session, name, pokedex_number)
+            if pokedex_number < FORM_ID_START:
+                for distance in range(1, self.neighbours + 1):
+                    candidates += [number for number in (pokedex_number - distance, pokedex_number + distance)
+                                   if 0 < number < FORM_ID_START]
+            candidates = [number for number in dict.fromkeys(candidates) if number != pokedex_number]
+            stored = set(session.execute(
+                select(Pokemon.pokedex_number).where(Pokemon.pokedex_number.in_(candidates))
+            ).scalars())
+        finally:
+            session.close()
+
+        wanted = []
+        with self._lock:
+            for number in candidates:
+                if number in stored or number in self._pending:
+                    self._counts['already_stored'] += 1
+                elif len(wanted) < self.budget:
+                    wanted.append(number)
+                    self._pending.add(number)
+                else:
+                    self._counts['over_budget'] += 1
+        # nearer relatives go first, ahead of farther ones still queued from earlier misses
+        for rank, number in enumerate(wanted):
+            if self._put(_FETCH + rank, number):
+                with self._lock:
+                    self._counts['queued'] += 1
+            else:
+                with self._lock:
+                    self._pending.discard(number)
+
+    def _chain_members(self, session, name: str, pokedex_number: int) -> List[int]:
+        """Species ids of the evolution chain, from the closure table or fetched (and stored) from PokeAPI."""
+        species = SpeciesRepository.species_for(session, name)
+        if species is None or species.evolution_chain_id is None:
+            if pokedex_number >= FORM_ID_START:
+                return []
+            self._wait_for_turn()
+            species_data = DataProcessor.sanitize_species_data(self.pokeapi.get_pokemon_species(pokedex_number))
+            chain = None
+            if species_data and species_data['evolution_chain_id'] is not None:
+                self._wait_for_turn()
+                chain = DataProcessor.sanitize_evolution_chain(
+                    self.pokeapi.get_evolution_chain(species_data['evolution_chain_id'])
+                )
+            if chain is None:
+                return []
+            SpeciesRepository.store_chain(session, chain)
+            SpeciesRepository.store_species(session, species_data)
+            session.commit()
+            return [member['id'] for member in chain['species']]
+        return list(session.execute(
+            select(EvolutionClosure.descendant_id).where(EvolutionClosure.chain_id == species.evolution_chain_id)
+            .distinct().order_by(EvolutionClosure.descendant_id)
+        ).scalars())
+
+    def _fetch(self, pokedex_number: int):
+        session = self.session_factory()
+        try:
+            if session.execute(select(Pokemon.id).where(Pokemon.pokedex_number == pokedex_number)).first():
+                # a request got there first
+                with self._lock:
+                    self._counts['already_stored'] += 1
+                return
+            self._wait_for_turn()
+            raw_data = self.pokeapi.get_pokemon(str(pokedex_number))
+            sanitized_data = DataProcessor.sanitize_pokemon_data(raw_data)
+            if not sanitized_data:
+                with self._lock:
+                    self._counts['failed'] += 1
+                return
+
+            pokemon_id = PokemonRepository.add_pokemon(session, sanitized_data, raw_data).id
+            session.commit()
+            with self._lock:
+                self._counts['prefetched'] += 1
+                self._unclaimed.add(pokemon_id)
+
+        except IntegrityError:
+            session.rollback()
+            with self._lock:
+                self._counts['already_stored'] += 1
+
+        except UpstreamError as e:
+            session.rollback()
+            logger.warning('Prefetch of #%s skipped: %s', pokedex_number, e)
+            with self._lock:
+                self._counts['failed'] += 1
+
+        finally:
+            session.close()
+            with self._lock:
+                self._pending.discard(pokedex_number)
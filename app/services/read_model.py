@@ -0,0 +1,206 @@
+"""
+Read Model - Immutable in-memory index of every Pokemon, swapped atomically after writes
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import logging
+import os
+import sys
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import event, select
+
+from app.models import LOCAL_SPRITE_PREFIX, STAT_COLUMNS, Pokemon
+from app.models.pokemon import Base
+from app.services.data_version import POLL_INTERVAL, DataVersionWatcher
+from app.services.export import iter_pokemon_dicts
+from app.services.persistence import on_pokemon_commit
+from app.services.pokemon_query import PokemonQuery
+from app.services.pokemon_record import (
+    MISSING_STAT, STAT_INDEX, STAT_NAMES, AbilitySlot, PokemonRecord, TypeSlot
+)
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReadModel:
+    """Every stored Pokemon as compact records plus the indexes the read routes need.
+
+    Built once and never modified: a new version replaces it wholesale, so a request
+    that holds a reference keeps a consistent view however long it runs. Range filters
+    and sorts run over NumPy columns with the same NULL rules SQLite applies.
+    """
+
+    def __init__(self, ids: List[int], records: List[PokemonRecord], version: Optional[int] = None,
+                 sprite_hashes: Optional[Dict[int, str]] = None):
+        self.version = version
+        self.ids = np.array(ids, dtype=np.int64)
+        self.records = tuple(records)
+        # id -> hash of the locally cached sprite, for Pokemon that have one
+        self.sprite_hashes = sprite_hashes or {}
+        self.by_name = {record.name: row for row, record in enumerate(records)}
+
+        by_number, by_type, by_ability, by_hidden = {}, {}, {}, {}
+        for row, record in enumerate(records):
+            by_number.setdefault(record.pokedex_number, []).append(row)
+            for type_slot in record.types:
+                by_type.setdefault(type_slot.type_name, []).append(row)
+            for ability in record.abilities:
+                by_ability.setdefault(ability.ability_name, []).append(row)
+                if ability.is_hidden:
+                    by_hidden.setdefault(ability.ability_name, []).append(row)
+        self.by_number = {number: tuple(rows) for number, rows in by_number.items()}
+        self.by_type = {name: np.array(rows, dtype=np.int64) for name, rows in by_type.items()}
+        self.by_ability = {name: np.unique(rows) for name, rows in by_ability.items()}
+        self.by_hidden_ability = {name: np.unique(rows) for name, rows in by_hidden.items()}
+
+        stats = np.array([record.stats for record in records], dtype=np.float64).reshape(-1, len(STAT_NAMES))
+        stats[stats == MISSING_STAT] = np.nan
+        present = ~np.isnan(stats)
+        columns = {
+            'id': self.ids.astype(np.float64),
+            'pokedex_number': np.array([r.pokedex_number for r in records], dtype=np.float64),
+            'height': self._nullable([r.height for r in records]),
+            'weight': self._nullable([r.weight for r in records]),
+            'base_experience': self._nullable([r.base_experience for r in records]),
+            # like the total column: the sum of the stats present, NULL without any
+            'total': np.where(present.any(axis=1), np.nansum(stats, axis=1), np.nan),
+        }
+        for stat_name, column in STAT_COLUMNS.items():
+            columns[column] = stats[:, STAT_INDEX[stat_name]]
+        columns['pokedex'] = columns['pokedex_number']
+        self.columns = columns
+        self.name_rank = np.empty(len(records), dtype=np.int64)
+        self.name_rank[sorted(range(len(records)), key=lambda row: records[row].name)] = np.arange(len(records))
+
+    @staticmethod
+    def _nullable(values: List[Optional[int]]) -> np.ndarray:
+        return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+    @classmethod
+    def from_session(cls, session, version: Optional[int] = None) -> 'ReadModel':
+        ids, records = [], []
+        for pokemon in iter_pokemon_dicts(session):
+            ids.append(pokemon['id'])
+            records.append(_record_from_dict(pokemon))
+        sprite_hashes = dict(session.execute(
+            select(Pokemon.id, Pokemon.sprite_hash).where(Pokemon.sprite_hash.is_not(None))
+        ).all())
+        return cls(ids, records, version, sprite_hashes)
+
+    def __len__(self):
+        return len(self.records)
+
+    def to_dict(self, row: int, local_sprites: bool = False) -> Dict[str, Any]:
+        pokemon_id = int(self.ids[row])
+        pokemon = self.records[row].to_dict(pokemon_id)
+        if local_sprites and pokemon_id in self.sprite_hashes:
+            pokemon['sprite_url'] = LOCAL_SPRITE_PREFIX + self.sprite_hashes[pokemon_id]
+        return pokemon
+
+    def get(self, name: str, local_sprites: bool = False) -> Optional[Dict[str, Any]]:
+        row = self.by_name.get(name)
+        return None if row is None else self.to_dict(row, local_sprites)
+
+    def rows(self, query: PokemonQuery) -> np.ndarray:
+        """Rows matching every filter of `query`, in its sort order (id breaks ties)."""
+        mask = np.ones(len(self), dtype=bool)
+        for names, index in ((query.types, self.by_type), (query.abilities, self.by_ability),
+                             (query.hidden_abilities, self.by_hidden_ability)):
+            for name in names:
+                matches = np.zeros(len(self), dtype=bool)
+                matches[index.get(name, [])] = True
+                mask &= matches
+        for key, (low, high) in query.ranges.items():
+            column = self.columns[key]
+            # NaN fails both comparisons, as NULL does in SQL
+            if low is not None:
+                mask &= column >= low
+            if high is not None:
+                mask &= column <= high
+        rows = np.flatnonzero(mask)
+
+        # lexsort's last key is the primary one; SQLite puts NULLs first ascending, last descending
+        keys = [self.ids[rows]]
+        for key, descending in reversed(query.sort):
+            if key == 'name':
+                values = self.name_rank[rows]
+                keys.append(-values if descending else values)
+            else:
+                values = self.columns[key][rows]
+                keys.append(np.nan_to_num(-values if descending else values, nan=np.inf if descending else -np.inf))
+        return rows[np.lexsort(keys)]
+
+    def page(self, query: PokemonQuery, local_sprites: bool = False) -> Tuple[List[Dict[str, Any]], int]:
+        """(one page of Pokemon in to_dict form, total matching) for GET /api/pokemon."""
+        rows = self.rows(query)
+        end = None if query.limit is None else query.offset + query.limit
+        return [self.to_dict(int(row), local_sprites) for row in rows[query.offset:end]], len(rows)
+
+
+def _record_from_dict(pokemon: Dict[str, Any]) -> PokemonRecord:
+    stats, efforts = PokemonRecord.empty_stats()
+    for stat in pokemon['stats']:
+        position = STAT_INDEX.get(stat['stat'])
+        if position is not None:
+            stats[position] = stat['base_stat']
+            efforts[position] = stat['effort'] or 0
+    return PokemonRecord(
+        pokemon['name'], pokemon['pokedex_number'], pokemon['height'], pokemon['weight'],
+        pokemon['base_experience'], pokemon['sprite_url'],
+        tuple(TypeSlot(sys.intern(t['type']), t['slot']) for t in pokemon['types']),
+        tuple(AbilitySlot(sys.intern(a['ability']), a['is_hidden'], a['slot']) for a in pokemon['abilities']),
+        stats, efforts,
+    )
+
+
+def read_model_enabled() -> bool:
+    """True when READ_MODEL is set to a true value."""
+    return os.environ.get('READ_MODEL', '').lower() in ('1', 'true', 'yes', 'on')
+
+
+class ReadModelStore:
+    """Hands out the current ReadModel and replaces it when the data changes.
+
+    Commits in this process mark it stale through on_pokemon_commit. Commits from other
+    processes (other workers on the same SQLite file) are noticed through a
+    DataVersionWatcher, so other workers' writes show up within its poll interval.
+    """
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL):
+        self._model: Optional[ReadModel] = None
+        self._stale = True
+        self._lock = threading.Lock()
+        self._watcher = DataVersionWatcher(poll_interval)
+
+    def invalidate(self, *args, **kwargs):
+        self._stale = True
+
+    def get(self, session) -> ReadModel:
+        model = self._model
+        if model is not None and not self._stale and not self._watcher.changed(session, model.version):
+            return model
+        with self._lock:
+            model = self._model
+            if model is None or self._stale or self._watcher.changed(session, model.version, force=True):
+                self._stale = False
+                version = self._watcher.version(session)
+                # one reference assignment: readers see the old model or the new one, never a mix
+                self._model = ReadModel.from_session(session, version)
+                logger.info('Loaded read model of %s Pokemon (data_version %s)', len(self._model), version)
+            return self._model
+
+    def close(self):
+        """Drop the watcher connection (a later get opens a new one)."""
+        self._watcher.close()
+
+
+read_model_store = ReadModelStore()
+
+on_pokemon_commit(read_model_store.invalidate)
+event.listen(Base.metadata, 'after_create', read_model_store.invalidate)
+event.listen(Base.metadata, 'after_drop', read_model_store.invalidate)
@@ -0,0 +1,188 @@
+"""
+Selective JSON - Pulls a few fields out of a large JSON document without parsing the rest
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import json
+import logging
+from typing import Any, Dict, Optional, Tuple, Union
+
+import numpy as np
+
+
+logger = logging.getLogger(__name__)
+
+
+QUOTE, BACKSLASH = ord('"'), ord('\\')
+OPEN_OBJECT, COLON, COMMA = ord('{'), ord(':'), ord(',')
+
+# PokeAPI /pokemon fields DataProcessor reads; sprites keeps only the two images it picks from
+POKEMON_FIELDS = {
+    'name': None,
+    'id': None,
+    'height': None,
+    'weight': None,
+    'base_experience': None,
+    'types': None,
+    'abilities': None,
+    'stats': None,
+    'sprites': {
+        'front_default': None,
+        'other': {'official-artwork': {'front_default': None}},
+    },
+}
+
+# the same plus the learnsets, the bulk of every payload, for ingestion that stores moves
+POKEMON_FIELDS_WITH_MOVES = dict(POKEMON_FIELDS, moves=None)
+
+
+class JsonIndex:
+    """Structural index of one JSON document, built with a few vectorized passes.
+
+    A few byte comparisons over the raw buffer keep only the candidate structural characters;
+    quote parity drops the ones inside strings and a cumulative sum gives every remaining
+    token its nesting depth. Value spans are then found from the tokens alone, and only
+    the spans asked for are ever handed to json.loads.
+    """
+
+    # bytes scanned per vectorized pass, so temporaries stay small next to the payload
+    SCAN_CHUNK = 1 << 16
+
+    def __init__(self, data: bytes):
+        self.data = data
+        buf = np.frombuffer(data, dtype=np.uint8)
+        positions = np.zeros(0, dtype=np.int32)
+        for offset in range(0, len(buf), self.SCAN_CHUNK):
+            found = self._candidates(buf[offset:offset + self.SCAN_CHUNK])
+            found += offset
+            positions = np.concatenate([positions, found]) if len(positions) else found
+        chars = buf[positions]
+
+        is_quote = chars == QUOTE
+        # a quote is escaped when an odd run of backslashes precedes it; rare enough to count one by one
+        quote_positions = positions[is_quote]
+        suspects = quote_positions[buf[np.maximum(quote_positions - 1, 0)] == BACKSLASH]
+        for position in suspects.tolist():
+            run = 0
+            while position - run > 0 and buf[position - run - 1] == BACKSLASH:
+                run += 1
+            if run % 2:
+                is_quote[np.searchsorted(positions, position)] = False
+        if np.count_nonzero(is_quote) % 2:
+            raise ValueError('Unterminated string in JSON document')
+
+        # an odd number of quotes so far means inside a string (uint8 wraps, parity survives);
+        # keep the quotes themselves and everything outside strings
+        inside = (np.cumsum(is_quote, dtype=np.uint8) & 1).view(bool)
+        keep = is_quote | ~inside
+        del is_quote, inside
+        # rebinding drops the unfiltered arrays straight away, keeping the peak near the final index
+        positions = positions[keep]
+        chars = chars[keep]
+        del keep
+
+        folded = chars | 0x20
+        closes = folded == ord('}')
+        step = (folded == ord('{')).view(np.int8)
+        step -= closes.view(np.int8)
+        # an opener's depth includes itself; a closer sits at the same depth as its opener
+        depth = np.cumsum(step, dtype=np.int32)
+        depth += closes
+        self.positions, self.chars, self.closes, self.depth = positions, chars, closes, depth
+
+    @staticmethod
+    def _candidates(chunk: np.ndarray) -> np.ndarray:
+        """Positions of the only bytes that can matter structurally: { } [ ] : , and \"."""
+        # '[' and ']' are '{' and '}' without bit 0x20, so one fold covers both pairs
+        folded = chunk | 0x20
+        mask = folded == ord('{')
+        mask |= folded == ord('}')
+        mask |= chunk == COLON
+        mask |= chunk == COMMA
+        mask |= chunk == QUOTE
+        return np.flatnonzero(mask).astype(np.int32)
+
+    def _skip_space(self, position: int) -> int:
+        while position < len(self.data) and self.data[position] in b' \t\r\n':
+            position += 1
+        if position == len(self.data):
+            raise ValueError('Unexpected end of JSON document')
+        return position
+
+    def members(self, start: int = None) -> Dict[str, Tuple[int, int]]:
+        """Keys of the object opening at byte `start` (default: the root) -> (start, end) byte span of each value."""
+        start = self._skip_space(0) if start is None else start
+        if self.data[start] != OPEN_OBJECT:
+            raise ValueError(f'Expected an object at byte {start}')
+        first = int(np.searchsorted(self.positions, start))
+        level = self.depth[first]
+        last = self._closer_of(first)
+
+        inside = slice(first + 1, last)
+        at_level = np.flatnonzero(self.depth[inside] == level) + first + 1
+        chars = self.chars[at_level]
+        colons = at_level[chars == COLON]
+        commas = self.positions[at_level[chars == COMMA]]
+        end = int(self.positions[last])
+
+        # a value runs from its colon to the next comma at this level, or to the closing brace
+        colon_positions = self.positions[colons]
+        value_ends = np.append(commas, end)[np.searchsorted(commas, colon_positions)]
+        # the two tokens before a colon are always its key's quotes
+        key_starts = self.positions[colons - 2].tolist()
+        key_ends = self.positions[colons - 1].tolist()
+
+        members = {}
+        for key_start, key_end, position, value_end in zip(key_starts, key_ends, colon_positions.tolist(),
+                                                           value_ends.tolist()):
+            key = self.data[key_start:key_end + 1]
+            key = json.loads(key) if BACKSLASH in key else key[1:-1].decode('utf-8')
+            members[key] = (position + 1, value_end)
+        return members
+
+    def _closer_of(self, first: int) -> int:
+        level = self.depth[first]
+        closers = np.flatnonzero(self.closes[first + 1:] & (self.depth[first + 1:] == level))
+        if not len(closers):
+            raise ValueError('Unterminated object in JSON document')
+        return first + 1 + int(closers[0])
+
+    def value(self, span: Tuple[int, int]) -> Any:
+        return json.loads(self.data[span[0]:span[1]])
+
+    def value_start(self, span: Tuple[int, int]) -> int:
+        return self._skip_space(span[0])
+
+
+def extract(data: Union[bytes, str], fields: Dict[str, Any], index: Optional[JsonIndex] = None) -> Dict[str, Any]:
+    """The subset of a JSON object described by `fields` (key -> None for the whole value,
+    or a nested `fields` dict), parsing nothing else. Missing keys are simply absent."""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    index = index or JsonIndex(data)
+    return _extract(index, None, fields)
+
+
+def _extract(index: JsonIndex, start: Optional[int], fields: Dict[str, Any]) -> Dict[str, Any]:
+    members = index.members(start)
+    result = {}
+    for key, nested in fields.items():
+        span = members.get(key)
+        if span is None:
+            continue
+        if nested is None:
+            result[key] = index.value(span)
+            continue
+        value_start = index.value_start(span)
+        if index.data[value_start] == ord('{'):
+            result[key] = _extract(index, value_start, nested)
+        else:
+            # not an object (e.g. null): keep whatever it is
+            result[key] = index.value(span)
+    return result
+
+
+def parse_pokemon(data: Union[bytes, str], fields: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """The parts of a /pokemon payload DataProcessor uses, skipping moves, game_indices and the rest."""
+    return extract(data, POKEMON_FIELDS if fields is None else fields)
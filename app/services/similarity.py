@@ -0,0 +1,263 @@
+"""
+Similarity - Nearest-neighbour search over base-stat vectors
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy import event, select
+
+from app.models import Pokemon, PokemonType
+from app.models.pokemon import Base
+from app.services.data_version import POLL_INTERVAL, DataVersionWatcher
+from app.services.persistence import on_pokemon_commit
+from app.services.stat_matrix import STAT_ORDER, MAX_TYPES, StatMatrix, stat_matrix_store
+
+
+logger = logging.getLogger(__name__)
+
+
+METRICS = ('euclidean', 'cosine')
+
+
+class StatVectorIndex:
+    """Brute-force but fully vectorized k-NN index over the six base stats.
+
+    Euclidean distance runs on stats scaled by their standard deviation (so a point of HP
+    counts as much as a point of Speed relative to its spread) via |x|^2 + |q|^2 - 2x.q;
+    cosine compares the shape of the stat spread using pre-normalized unit vectors.
+    Rows can be upserted/removed in place, so ingest never forces a full rebuild; that
+    reallocates and moves rows, so reads and writes alike hold the index's lock.
+    """
+
+    # rescale every row once the dex has grown or shrunk this much since the last scale
+    RESCALE_DRIFT = 0.2
+
+    def __init__(self, ids: Iterable[int], stats: np.ndarray, type_ids: np.ndarray):
+        ids = np.asarray(ids, dtype=np.int64)
+        self._lock = threading.RLock()
+        self._size = len(ids)
+        capacity = max(16, self._size)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._stats = np.zeros((capacity, len(STAT_ORDER)), dtype=np.float64)
+        self._type_ids = np.zeros((capacity, MAX_TYPES), dtype=np.int32)
+        self._ids[:self._size] = ids
+        self._stats[:self._size] = stats
+        self._type_ids[:self._size] = type_ids
+        self._row_by_id = {int(pokemon_id): row for row, pokemon_id in enumerate(ids.tolist())}
+        self._rescale()
+
+    @classmethod
+    def from_matrix(cls, matrix: StatMatrix) -> 'StatVectorIndex':
+        return cls(matrix.ids, matrix.stats, matrix.type_ids)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, pokemon_id):
+        with self._lock:
+            return pokemon_id in self._row_by_id
+
+    def _rescale(self):
+        live = self._stats[:self._size]
+        scale = live.std(axis=0) if self._size else np.ones(len(STAT_ORDER))
+        scale[scale == 0] = 1.0
+        self._scale = scale
+        self._scaled_at = self._size
+        self._scaled = np.zeros_like(self._stats)
+        self._sq_norms = np.zeros(len(self._stats))
+        self._unit = np.zeros_like(self._stats)
+        self._derive(slice(0, self._size))
+
+    def _derive(self, rows):
+        scaled = self._stats[rows] / self._scale
+        self._scaled[rows] = scaled
+        self._sq_norms[rows] = (scaled * scaled).sum(axis=-1)
+        norms = np.linalg.norm(self._stats[rows], axis=-1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self._unit[rows] = self._stats[rows] / norms
+
+    def _grow(self):
+        capacity = len(self._ids) * 2
+        for name in ('_ids', '_stats', '_type_ids', '_scaled', '_sq_norms', '_unit'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def upsert(self, pokemon_id: int, stats: Iterable[float], type_ids: Iterable[int] = ()):
+        with self._lock:
+            self._upsert(pokemon_id, stats, type_ids)
+
+    def _upsert(self, pokemon_id: int, stats: Iterable[float], type_ids: Iterable[int]):
+        row = self._row_by_id.get(pokemon_id)
+        if row is None:
+            if self._size == len(self._ids):
+                self._grow()
+            row = self._size
+            self._size += 1
+            self._row_by_id[pokemon_id] = row
+        type_ids = list(type_ids)[:MAX_TYPES]
+        self._ids[row] = pokemon_id
+        self._stats[row] = list(stats)
+        self._type_ids[row] = type_ids + [0] * (MAX_TYPES - len(type_ids))
+        self._derive(slice(row, row + 1))
+        self._maybe_rescale()
+
+    def remove(self, pokemon_id: int):
+        with self._lock:
+            self._remove(pokemon_id)
+
+    def _remove(self, pokemon_id: int):
+        row = self._row_by_id.pop(pokemon_id, None)
+        if row is None:
+            return
+        last = self._size - 1
+        if row != last:
+            # move the last row into the hole so live rows stay contiguous
+            for name in ('_ids', '_stats', '_type_ids', '_scaled', '_sq_norms', '_unit'):
+                array = getattr(self, name)
+                array[row] = array[last]
+            self._row_by_id[int(self._ids[row])] = row
+        self._size = last
+        self._maybe_rescale()
+
+    def _maybe_rescale(self):
+        if abs(self._size - self._scaled_at) > self.RESCALE_DRIFT * max(self._scaled_at, 1):
+            self._rescale()
+
+    def distances(self, queries: np.ndarray, metric: str = 'euclidean') -> np.ndarray:
+        """(B, 6) raw stat vectors -> (B, N) distances to every indexed Pokemon, in one matrix product."""
+        with self._lock:
+            return self._distances(queries, metric)
+
+    def _distances(self, queries: np.ndarray, metric: str) -> np.ndarray:
+        queries = np.atleast_2d(np.asarray(queries, dtype=np.float64))
+        if metric == 'euclidean':
+            scaled = queries / self._scale
+            q_norms = (scaled * scaled).sum(axis=1)
+            squared = self._sq_norms[:self._size] + q_norms[:, None] - 2.0 * scaled @ self._scaled[:self._size].T
+            return np.sqrt(np.maximum(squared, 0.0))
+        if metric == 'cosine':
+            norms = np.linalg.norm(queries, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            return 1.0 - (queries / norms) @ self._unit[:self._size].T
+        raise ValueError(f"Unknown metric '{metric}', expected one of {', '.join(METRICS)}")
+
+    def nearest(self, queries: np.ndarray, k: int = 10, metric: str = 'euclidean',
+                type_id: Optional[int] = None,
+                exclude_ids: Optional[Iterable[int]] = None) -> List[List[Tuple[int, float]]]:
+        """k nearest indexed Pokemon for each query vector, closest first."""
+        with self._lock:
+            return self._nearest(queries, k, metric, type_id, exclude_ids)
+
+    def _nearest(self, queries: np.ndarray, k: int, metric: str, type_id: Optional[int],
+                 exclude_ids: Optional[Iterable[int]]) -> List[List[Tuple[int, float]]]:
+        distances = self._distances(queries, metric)
+        if type_id is not None:
+            distances[:, ~(self._type_ids[:self._size] == type_id).any(axis=1)] = np.inf
+        for i, pokemon_id in enumerate(exclude_ids or []):
+            row = self._row_by_id.get(pokemon_id)
+            if row is not None:
+                distances[i, row] = np.inf
+
+        k = min(k, self._size)
+        if k <= 0:
+            return [[] for _ in range(len(distances))]
+        best = np.argpartition(distances, k - 1, axis=1)[:, :k]
+        results = []
+        for query_row, candidates in zip(distances, best):
+            candidates = candidates[np.argsort(query_row[candidates], kind='stable')]
+            results.append([(int(self._ids[row]), float(query_row[row]))
+                            for row in candidates if np.isfinite(query_row[row])])
+        return results
+
+    def similar_to(self, pokemon_id: int, k: int = 10, metric: str = 'euclidean',
+                   type_id: Optional[int] = None) -> List[Tuple[int, float]]:
+        with self._lock:
+            row = self._row_by_id.get(pokemon_id)
+            if row is None:
+                raise KeyError(pokemon_id)
+            return self._nearest(self._stats[row].copy(), k, metric, type_id, [pokemon_id])[0]
+
+
+class SimilarityIndexStore:
+    """Keeps one StatVectorIndex per process, applying committed changes row by row.
+
+    Changes committed by other processes aren't reported row by row; a DataVersionWatcher
+    notices them and the index is rebuilt from a fresh stat matrix.
+    """
+
+    def __init__(self, poll_interval: float = POLL_INTERVAL):
+        self._index: Optional[StatVectorIndex] = None
+        self._pending: Set[int] = set()
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._watcher = DataVersionWatcher(poll_interval)
+
+    def on_commit(self, changed_ids: Optional[Set[int]]):
+        with self._lock:
+            if changed_ids is None:
+                self._index = None
+            else:
+                self._pending.update(changed_ids)
+
+    def reset(self, *args, **kwargs):
+        with self._lock:
+            self._index = None
+            self._pending.clear()
+
+    def get(self, session) -> StatVectorIndex:
+        with self._lock:
+            changed_elsewhere = self._index is not None and self._watcher.changed(session, self._version)
+            if self._index is None or changed_elsewhere:
+                self._version = self._watcher.version(session)
+                matrix = stat_matrix_store.refresh(session) if changed_elsewhere else stat_matrix_store.get(session)
+                self._index = StatVectorIndex.from_matrix(matrix)
+                self._pending.clear()
+            elif self._pending:
+                self._apply(session, self._pending)
+                self._pending = set()
+            return self._index
+
+    def refresh(self, session) -> StatVectorIndex:
+        """Rebuild from a fresh stat matrix, e.g. for an id the index doesn't have yet."""
+        with self._lock:
+            self._version = self._watcher.version(session)
+            self._index = StatVectorIndex.from_matrix(stat_matrix_store.refresh(session))
+            self._pending.clear()
+            return self._index
+
+    def close(self):
+        self._watcher.close()
+
+    def _apply(self, session, pokemon_ids: Set[int]):
+        columns = [getattr(Pokemon, stat) for stat in STAT_ORDER]
+        rows = {row[0]: row[1:] for row in session.execute(
+            select(Pokemon.id, *columns).where(Pokemon.id.in_(pokemon_ids))
+        )}
+        types: Dict[int, List[int]] = {}
+        for pokemon_id, type_id in session.execute(
+            select(PokemonType.pokemon_id, PokemonType.type_id)
+            .where(PokemonType.pokemon_id.in_(pokemon_ids)).order_by(PokemonType.slot)
+        ):
+            types.setdefault(pokemon_id, []).append(type_id)
+
+        for pokemon_id in pokemon_ids:
+            if pokemon_id in rows:
+                stats = [value or 0 for value in rows[pokemon_id]]
+                self._index.upsert(pokemon_id, stats, types.get(pokemon_id, []))
+            else:
+                self._index.remove(pokemon_id)
+        logger.debug('Applied %s changed Pokemon to the similarity index', len(pokemon_ids))
+
+
+similarity_store = SimilarityIndexStore()
+
+on_pokemon_commit(similarity_store.on_commit)
+event.listen(Base.metadata, 'after_create', similarity_store.reset)
+event.listen(Base.metadata, 'after_drop', similarity_store.reset)
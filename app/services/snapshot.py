@@ -0,0 +1,294 @@
+"""
+Dex Snapshot - Versioned binary copy of the stored dex, memory-mapped for read-only browsing
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import logging
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.export import iter_pokemon_dicts
+from app.services.pokemon_record import STAT_INDEX, STAT_NAMES
+
+
+logger = logging.getLogger(__name__)
+
+
+MAGIC = b'PKDXSNAP'
+SNAPSHOT_VERSION = 1
+# sections in file order; the header holds an (offset, byte length) pair for each
+SECTIONS = ('records', 'types', 'abilities', 'string_offsets', 'strings', 'name_index', 'number_keys',
+            'number_rows')
+HEADER = struct.Struct('<8sHHI' + 'QQ' * len(SECTIONS))
+ALIGNMENT = 8
+
+# stand-ins for NULL in the fixed-width columns
+NO_VALUE = -(2 ** 31)
+NO_STRING = 2 ** 32 - 1
+MISSING_STAT = -1
+
+# fixed-width, unpadded little-endian rows; strings are ids into the string pool
+RECORD_DTYPE = np.dtype([
+    ('id', '<u4'),
+    ('pokedex_number', '<u4'),
+    ('height', '<i4'),
+    ('weight', '<i4'),
+    ('base_experience', '<i4'),
+    ('name', '<u4'),
+    ('sprite_url', '<u4'),
+    ('stats', '<i2', (len(STAT_NAMES),)),
+    ('efforts', 'u1', (len(STAT_NAMES),)),
+    ('types_start', '<u4'),
+    ('types_count', 'u1'),
+    ('abilities_start', '<u4'),
+    ('abilities_count', 'u1'),
+])
+TYPE_DTYPE = np.dtype([('name', '<u4'), ('slot', 'u1')])
+ABILITY_DTYPE = np.dtype([('name', '<u4'), ('is_hidden', 'u1'), ('slot', 'u1')])
+SECTION_DTYPES = {
+    'records': RECORD_DTYPE,
+    'types': TYPE_DTYPE,
+    'abilities': ABILITY_DTYPE,
+    'string_offsets': np.dtype('<u4'),
+    'strings': np.dtype('u1'),
+    'name_index': np.dtype('<u4'),
+    'number_keys': np.dtype('<u4'),
+    'number_rows': np.dtype('<u4'),
+}
+
+
+def _nullable(value: Optional[int]) -> int:
+    return NO_VALUE if value is None else value
+
+
+def _value(value: int) -> Optional[int]:
+    return None if value == NO_VALUE else value
+
+
+class _StringPool:
+    """Each distinct string stored once, as utf-8 bytes addressed by an id."""
+
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.offsets = [0]
+        self.chunks: List[bytes] = []
+
+    def add(self, text: Optional[str]) -> int:
+        if text is None:
+            return NO_STRING
+        string_id = self.ids.get(text)
+        if string_id is None:
+            data = text.encode('utf-8')
+            string_id = self.ids[text] = len(self.chunks)
+            self.chunks.append(data)
+            self.offsets.append(self.offsets[-1] + len(data))
+        return string_id
+
+
+def write_snapshot(session, path: str) -> Dict[str, int]:
+    """Dump every stored Pokemon into a snapshot file at `path`; returns its row and byte counts.
+
+    The file is written next to `path` and renamed over it, so readers never see half of one.
+    """
+    strings = _StringPool()
+    rows, types, abilities, names = [], [], [], []
+    for pokemon in iter_pokemon_dicts(session):
+        stats, efforts = [MISSING_STAT] * len(STAT_NAMES), [0] * len(STAT_NAMES)
+        for stat in pokemon['stats']:
+            position = STAT_INDEX.get(stat['stat'])
+            if position is not None:
+                stats[position] = stat['base_stat']
+                efforts[position] = stat['effort'] or 0
+        rows.append((
+            pokemon['id'], pokemon['pokedex_number'], _nullable(pokemon['height']),
+            _nullable(pokemon['weight']), _nullable(pokemon['base_experience']),
+            strings.add(pokemon['name']), strings.add(pokemon['sprite_url']), stats, efforts,
+            len(types), len(pokemon['types']), len(abilities), len(pokemon['abilities']),
+        ))
+        types.extend((strings.add(t['type']), t['slot'] or 0) for t in pokemon['types'])
+        abilities.extend((strings.add(a['ability']), a['is_hidden'], a['slot'] or 0)
+                         for a in pokemon['abilities'])
+        names.append(pokemon['name'].lower())
+
+    records = np.array(rows, dtype=RECORD_DTYPE)
+    numbers = records['pokedex_number']
+    # ties on the number keep id order, so forms of one species list the same way as in the database
+    number_rows = np.lexsort((records['id'], numbers)).astype('<u4')
+    sections = {
+        'records': records,
+        'types': np.array(types, dtype=TYPE_DTYPE),
+        'abilities': np.array(abilities, dtype=ABILITY_DTYPE),
+        'string_offsets': np.array(strings.offsets, dtype='<u4'),
+        'strings': np.frombuffer(b''.join(strings.chunks), dtype='u1'),
+        'name_index': np.array(sorted(range(len(names)), key=names.__getitem__), dtype='<u4'),
+        'number_keys': numbers[number_rows].astype('<u4'),
+        'number_rows': number_rows,
+    }
+
+    layout, offset = [], _aligned(HEADER.size)
+    for name in SECTIONS:
+        layout += [offset, sections[name].nbytes]
+        offset = _aligned(offset + sections[name].nbytes)
+
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, SNAPSHOT_VERSION, 0, len(records), *layout))
+        for name, section_offset in zip(SECTIONS, layout[::2]):
+            f.write(b'\0' * (section_offset - f.tell()))
+            f.write(sections[name].tobytes())
+    os.replace(tmp_path, path)
+    size = os.path.getsize(path)
+    logger.info('Wrote dex snapshot of %s Pokemon (%s bytes) to %s', len(records), size, path)
+    return {'count': len(records), 'bytes': size}
+
+
+def _aligned(offset: int) -> int:
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+class DexSnapshot:
+    """Read-only view of a snapshot file through a memory map.
+
+    Every section is a NumPy array over the mapped pages, so opening costs a header parse
+    and lookups only touch the pages they read: a binary search over the name or number
+    index, one fixed-width record and its strings. Use as a context manager, or call close().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._sections = self._map_sections()
+        except ValueError:
+            self._map.close()
+            raise
+        self.records = self._sections['records']
+        self._types = self._sections['types']
+        self._abilities = self._sections['abilities']
+        self._string_offsets = self._sections['string_offsets']
+        self._name_index = self._sections['name_index']
+        self._number_keys = self._sections['number_keys']
+        self._number_rows = self._sections['number_rows']
+
+    def _map_sections(self) -> Dict[str, np.ndarray]:
+        if len(self._map) < HEADER.size:
+            raise ValueError(f'{self.path} is not a dex snapshot')
+        magic, version, _, count, *layout = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError(f'{self.path} is not a dex snapshot')
+        if version != SNAPSHOT_VERSION:
+            raise ValueError(f'{self.path} is snapshot version {version}; this reader needs {SNAPSHOT_VERSION}')
+        spans = dict(zip(SECTIONS, zip(layout[::2], layout[1::2])))
+        # check everything before mapping any array: a failed open must be able to close the map
+        for name, (offset, length) in spans.items():
+            if offset + length > len(self._map) or length % SECTION_DTYPES[name].itemsize:
+                raise ValueError(f'{self.path} is truncated or corrupt ({name} section)')
+        if spans['records'][1] != count * RECORD_DTYPE.itemsize:
+            raise ValueError(f'{self.path} is truncated or corrupt (records section)')
+        self._strings_start = spans['strings'][0]
+        return {
+            name: np.frombuffer(self._map, dtype=SECTION_DTYPES[name], count=length // SECTION_DTYPES[name].itemsize,
+                                offset=offset)
+            for name, (offset, length) in spans.items()
+        }
+
+    def close(self):
+        # the arrays export the map's buffer; it can only be closed once they are gone
+        self.records = self._types = self._abilities = self._string_offsets = None
+        self._name_index = self._number_keys = self._number_rows = self._sections = None
+        self._map.close()
+
+    def __enter__(self) -> 'DexSnapshot':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return len(self.records)
+
+    def string(self, string_id: int) -> Optional[str]:
+        if string_id == NO_STRING:
+            return None
+        start, end = self._string_offsets[string_id:string_id + 2].tolist()
+        # sliced straight from the map: a str is made, but no intermediate array
+        return self._map[self._strings_start + start:self._strings_start + end].decode('utf-8')
+
+    def row_of(self, name: str) -> Optional[int]:
+        """Record row of a Pokemon by name (case-insensitive), or None."""
+        key = name.lower()
+        names = _NameKeys(self)
+        position = bisect_left(names, key)
+        if position < len(names) and names[position] == key:
+            return int(self._name_index[position])
+        return None
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        """A Pokemon in Pokemon.to_dict form, or None."""
+        row = self.row_of(name)
+        return None if row is None else self.record(row)
+
+    def by_number(self, pokedex_number: int) -> List[Dict[str, Any]]:
+        """Every Pokemon with this pokedex number (forms share one), in id order."""
+        start, end = np.searchsorted(self._number_keys, [pokedex_number, pokedex_number + 1])
+        return [self.record(int(row)) for row in self._number_rows[start:end]]
+
+    def record(self, row: int) -> Dict[str, Any]:
+        record = self.records[row]
+        types_start, abilities_start = int(record['types_start']), int(record['abilities_start'])
+        types = self._types[types_start:types_start + int(record['types_count'])]
+        abilities = self._abilities[abilities_start:abilities_start + int(record['abilities_count'])]
+        return {
+            'id': int(record['id']),
+            'name': self.string(int(record['name'])),
+            'pokedex_number': int(record['pokedex_number']),
+            'height': _value(int(record['height'])),
+            'weight': _value(int(record['weight'])),
+            'base_experience': _value(int(record['base_experience'])),
+            'sprite_url': self.string(int(record['sprite_url'])),
+            'types': [{'type': self.string(name), 'slot': slot} for name, slot in types.tolist()],
+            'abilities': [
+                {'ability': self.string(name), 'is_hidden': bool(hidden), 'slot': slot}
+                for name, hidden, slot in abilities.tolist()
+            ],
+            'stats': [
+                {'stat': stat, 'base_stat': value, 'effort': effort}
+                for stat, value, effort in zip(STAT_NAMES, record['stats'].tolist(), record['efforts'].tolist())
+                if value != MISSING_STAT
+            ],
+        }
+
+    def iter_by_number(self) -> Iterator[Dict[str, Any]]:
+        """Every Pokemon in pokedex order."""
+        for row in self._number_rows.tolist():
+            yield self.record(row)
+
+    def listing(self) -> Iterator[Tuple[int, str, List[str]]]:
+        """(pokedex_number, name, type names) in pokedex order, without building full records."""
+        records, types = self.records, self._types
+        for row in self._number_rows.tolist():
+            record = records[row]
+            start = int(record['types_start'])
+            type_ids = types['name'][start:start + int(record['types_count'])].tolist()
+            yield int(record['pokedex_number']), self.string(int(record['name'])), [self.string(t) for t in type_ids]
+
+
+class _NameKeys:
+    """Lowercased names in name-index order, decoded only where bisect looks."""
+
+    def __init__(self, snapshot: DexSnapshot):
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return len(self.snapshot._name_index)
+
+    def __getitem__(self, position: int) -> str:
+        snapshot = self.snapshot
+        return snapshot.string(int(snapshot.records['name'][snapshot._name_index[position]])).lower()
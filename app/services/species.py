@@ -0,0 +1,281 @@
+"""
+Species - Species details and evolution families, fetched concurrently and stored with their closure
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import logging
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects.sqlite import insert as upsert
+
+from app.models import (
+    Pokemon, EvolutionChain, PokemonSpecies, SpeciesVariety, EvolutionEdge, EvolutionClosure
+)
+from app.services.data_processor import DataProcessor
+
+
+logger = logging.getLogger(__name__)
+
+
+# species and chain requests in flight at once; they are I/O bound, so threads are enough
+DEFAULT_WORKERS = 8
+# PokeAPI numbers alternate forms from 10001 up; below that a Pokemon's id is its species id
+FORM_ID_START = 10001
+
+SPECIES_FIELDS = [
+    'name', 'evolution_chain_id', 'evolves_from_species_id', 'generation', 'genus', 'flavor_text', 'habitat',
+    'growth_rate', 'capture_rate', 'base_happiness', 'is_baby', 'is_legendary', 'is_mythical',
+]
+
+
+def closure_rows(chain: Dict[str, Any]) -> List[Dict[str, int]]:
+    """Every (ancestor, descendant, depth) pair of a sanitized chain, each species with itself at depth 0."""
+    parent = {edge['to_species_id']: edge['from_species_id'] for edge in chain['edges']}
+    rows = []
+    for member in chain['species']:
+        ancestor, depth = member['id'], 0
+        while ancestor is not None:
+            rows.append({'ancestor_id': ancestor, 'descendant_id': member['id'], 'depth': depth,
+                         'chain_id': chain['id']})
+            ancestor, depth = parent.get(ancestor), depth + 1
+    return rows
+
+
+class SpeciesRepository:
+    """Writes species and evolution chains, and answers whole-family questions from the closure table."""
+
+    @staticmethod
+    def store_chain(session, chain: Dict[str, Any]):
+        """Replace a chain's edges and closure; its members get at least a name-only species row."""
+        chain_id = chain['id']
+        stmt = upsert(EvolutionChain.__table__)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['id'], set_={'root_species_id': stmt.excluded.root_species_id}
+        ), {'id': chain_id, 'root_species_id': chain['root_species_id']})
+
+        parent = {edge['to_species_id']: edge['from_species_id'] for edge in chain['edges']}
+        stmt = upsert(PokemonSpecies.__table__)
+        session.execute(stmt.on_conflict_do_update(
+            index_elements=['id'],
+            set_={'evolution_chain_id': stmt.excluded.evolution_chain_id,
+                  'evolves_from_species_id': stmt.excluded.evolves_from_species_id}
+        ), [
+            {'id': member['id'], 'name': member['name'], 'evolution_chain_id': chain_id,
+             'evolves_from_species_id': parent.get(member['id'])}
+            for member in chain['species']
+        ])
+
+        for model in (EvolutionEdge, EvolutionClosure):
+            session.execute(delete(model).where(model.chain_id == chain_id))
+        if chain['edges']:
+            session.execute(insert(EvolutionEdge), [dict(edge, chain_id=chain_id) for edge in chain['edges']])
+        session.execute(insert(EvolutionClosure), closure_rows(chain))
+
+    @staticmethod
+    def store_species(session, species: Dict[str, Any]):
+        """Insert or fully update one sanitized species and the Pokemon varieties that belong to it."""
+        values = {'id': species['id'], **{field: species[field] for field in SPECIES_FIELDS}}
+        stmt = upsert(PokemonSpecies.__table__)
+        updates = {field: getattr(stmt.excluded, field) for field in SPECIES_FIELDS}
+        # the chain already knows where the species sits; a species payload without the link keeps it
+        for field in ('evolution_chain_id', 'evolves_from_species_id'):
+            updates[field] = func.coalesce(getattr(stmt.excluded, field), getattr(PokemonSpecies, field))
+        session.execute(stmt.on_conflict_do_update(index_elements=['id'], set_=updates), values)
+
+        session.execute(delete(SpeciesVariety).where(SpeciesVariety.species_id == species['id']))
+        if species['varieties']:
+            stmt = upsert(SpeciesVariety.__table__)
+            session.execute(stmt.on_conflict_do_update(
+                index_elements=['pokemon_name'],
+                set_={'species_id': stmt.excluded.species_id, 'is_default': stmt.excluded.is_default}
+            ), [dict(variety, species_id=species['id']) for variety in species['varieties']])
+
+    @staticmethod
+    def stored_species_ids(session) -> List[int]:
+        """Species ids of the stored Pokemon; alternate forms are reached through their base species."""
+        return session.execute(
+            select(Pokemon.pokedex_number).where(Pokemon.pokedex_number < FORM_ID_START)
+            .distinct().order_by(Pokemon.pokedex_number)
+        ).scalars().all()
+
+    @staticmethod
+    def unresolved_form_ids(session) -> List[int]:
+        """Pokedex numbers of stored alternate forms that no stored species lists as a variety."""
+        return session.execute(
+            select(Pokemon.pokedex_number)
+            .outerjoin(SpeciesVariety, SpeciesVariety.pokemon_name == Pokemon.name)
+            .where(Pokemon.pokedex_number >= FORM_ID_START, SpeciesVariety.species_id.is_(None))
+            .distinct().order_by(Pokemon.pokedex_number)
+        ).scalars().all()
+
+    @staticmethod
+    def fetch_all(session, pokeapi, species_ids: Optional[Iterable[int]] = None,
+                  workers: int = DEFAULT_WORKERS, refresh: bool = False) -> Dict[str, Any]:
+        """Fetch species (default: those of every stored Pokemon) and their evolution chains, then store them.
+
+        Each species request is followed by its chain request as soon as it comes back, so the
+        two levels overlap instead of running one after the other. A chain is requested once
+        however many of its members are fetched. Ids from FORM_ID_START up are alternate
+        forms: their /pokemon payload is fetched for the species id first. Without `refresh`,
+        species already stored in full and chains already stored are skipped. A request or
+        payload that fails is listed in `failed` and the rest are still stored. Nothing is
+        committed.
+        """
+        if species_ids is None:
+            species_ids = (SpeciesRepository.stored_species_ids(session)
+                           + SpeciesRepository.unresolved_form_ids(session))
+        species_ids = list(dict.fromkeys(species_ids))
+        form_ids = [number for number in species_ids if number >= FORM_ID_START]
+        species_ids = [number for number in species_ids if number < FORM_ID_START]
+        form_names = dict(session.execute(
+            select(Pokemon.pokedex_number, Pokemon.name).where(Pokemon.pokedex_number.in_(form_ids))
+        ).all()) if form_ids else {}
+        requested_species, requested_chains = set(species_ids), set()
+        if not refresh:
+            complete = set(session.execute(
+                select(PokemonSpecies.id).where(PokemonSpecies.generation.is_not(None))
+            ).scalars())
+            species_ids = [species_id for species_id in species_ids if species_id not in complete]
+            requested_species.update(complete)
+            requested_chains.update(session.execute(select(EvolutionChain.id)).scalars())
+
+        def fetch_form(pokedex_number):
+            return DataProcessor.species_id(pokeapi.get_pokemon(str(pokedex_number), selective=False))
+
+        def fetch_species(species_id):
+            return DataProcessor.sanitize_species_data(pokeapi.get_pokemon_species(species_id))
+
+        def fetch_chain(chain_id):
+            return DataProcessor.sanitize_evolution_chain(pokeapi.get_evolution_chain(chain_id))
+
+        fetched_species, fetched_chains, failed = [], [], []
+        # results are only collected here and the rows written once the network work is over;
+        # with ARCHIVE_RAW_PAYLOADS the workers still write, each payload through the archive's
+        # own session, so those writes do take the SQLite write lock while requests are running
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            pending = {executor.submit(fetch_species, species_id): ('species', species_id)
+                       for species_id in species_ids}
+            while pending or form_ids:
+                if not pending:
+                    # forms last: most turn out to be varieties of a species fetched above
+                    covered = {variety['pokemon_name'] for species in fetched_species
+                               for variety in species['varieties']}
+                    pending = {executor.submit(fetch_form, pokedex_number): ('form', pokedex_number)
+                               for pokedex_number in form_ids if form_names.get(pokedex_number) not in covered}
+                    form_ids = []
+                    continue
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    kind, key = pending.pop(future)
+                    try:
+                        data = future.result()
+                    except Exception as e:
+                        # one bad payload or outage costs its own entry, not the whole fetch
+                        logger.warning('Fetching %s %s failed: %s', kind, key, e)
+                        data = None
+                    if data is None:
+                        failed.append(f'{kind} {key}')
+                    elif kind == 'form':
+                        if data not in requested_species:
+                            requested_species.add(data)
+                            pending[executor.submit(fetch_species, data)] = ('species', data)
+                    elif kind == 'chain':
+                        fetched_chains.append(data)
+                    else:
+                        fetched_species.append(data)
+                        chain_id = data['evolution_chain_id']
+                        if chain_id is not None and chain_id not in requested_chains:
+                            requested_chains.add(chain_id)
+                            pending[executor.submit(fetch_chain, chain_id)] = ('chain', chain_id)
+
+        # chains first: they create the chain rows species point at
+        for chain in fetched_chains:
+            SpeciesRepository.store_chain(session, chain)
+        for species in fetched_species:
+            SpeciesRepository.store_species(session, species)
+        logger.info('Stored %s species and %s evolution chains (%s failed)',
+                    len(fetched_species), len(fetched_chains), len(failed))
+        return {'species': len(fetched_species), 'chains': len(fetched_chains), 'failed': sorted(failed)}
+
+    @staticmethod
+    def species_for(session, pokemon_name: str) -> Optional[PokemonSpecies]:
+        """The species of a stored-style Pokemon name ('Mr-mime-galar'), through its variety or its own name."""
+        species_id = session.execute(
+            select(SpeciesVariety.species_id).where(SpeciesVariety.pokemon_name == pokemon_name)
+        ).scalar()
+        if species_id is not None:
+            return session.get(PokemonSpecies, species_id)
+        return session.execute(select(PokemonSpecies).where(PokemonSpecies.name == pokemon_name)).scalar()
+
+    @staticmethod
+    def family(session, species: PokemonSpecies) -> Dict[str, Any]:
+        """The whole evolution family of a species, with its ancestors and descendants picked out."""
+        # the chain's root is the ancestor furthest up; every member is one of its descendants
+        root = (select(EvolutionClosure.ancestor_id)
+                .where(EvolutionClosure.descendant_id == species.id)
+                .order_by(EvolutionClosure.depth.desc()).limit(1).scalar_subquery())
+        members = session.execute(
+            select(EvolutionClosure.descendant_id, EvolutionClosure.depth, PokemonSpecies.name,
+                   PokemonSpecies.evolves_from_species_id)
+            .join(PokemonSpecies, PokemonSpecies.id == EvolutionClosure.descendant_id)
+            .where(EvolutionClosure.ancestor_id == root)
+            .order_by(EvolutionClosure.depth, EvolutionClosure.descendant_id)
+        ).all()
+        if not members:
+            # a species whose chain was never fetched is a family of one
+            members = [(species.id, 0, species.name, None)]
+
+        ids = [member[0] for member in members]
+        stored = {}
+        for species_id, name in session.execute(
+            select(SpeciesVariety.species_id, Pokemon.name)
+            .join(Pokemon, Pokemon.name == SpeciesVariety.pokemon_name)
+            .where(SpeciesVariety.species_id.in_(ids))
+            .order_by(Pokemon.pokedex_number, Pokemon.name)
+        ):
+            stored.setdefault(species_id, []).append(name)
+        edges = {(edge.from_species_id, edge.to_species_id): edge for edge in session.execute(
+            select(EvolutionEdge).where(EvolutionEdge.chain_id == species.evolution_chain_id)
+        ).scalars()} if species.evolution_chain_id is not None else {}
+
+        names = {species_id: name for species_id, _, name, _ in members}
+        parent = {species_id: parent_id for species_id, _, _, parent_id in members}
+        ancestors = []
+        current = parent.get(species.id)
+        while current is not None and current in names:
+            ancestors.append(names[current])
+            current = parent.get(current)
+
+        def descends(species_id):
+            while species_id is not None:
+                species_id = parent.get(species_id)
+                if species_id == species.id:
+                    return True
+            return False
+
+        family = []
+        for species_id, stage, name, parent_id in members:
+            edge = edges.get((parent_id, species_id))
+            family.append({
+                'id': species_id,
+                'name': name,
+                'stage': stage,
+                'evolves_from': names.get(parent_id),
+                'trigger': edge.trigger if edge else None,
+                'min_level': edge.min_level if edge else None,
+                'item': edge.item if edge else None,
+                'stored': stored.get(species_id, [])
+            })
+        return {
+            'species': species.to_dict(),
+            'ancestors': ancestors,
+            'descendants': [name for species_id, _, name, _ in members if descends(species_id)],
+            'family': family
+        }
+
+    @staticmethod
+    def has_species(session) -> bool:
+        return session.execute(select(PokemonSpecies.id).limit(1)).first() is not None
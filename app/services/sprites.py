@@ -0,0 +1,147 @@
+"""
+Sprites - Content-addressed local copies of the sprite images, downloaded concurrently
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import hashlib
+import logging
+import os
+import re
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from sqlalchemy import bindparam, select, update
+
+from app.models import Pokemon
+from app.services.persistence import mark_pokemon_changed
+
+
+logger = logging.getLogger(__name__)
+
+
+# image requests in flight at once; they are I/O bound, so threads are enough
+DEFAULT_WORKERS = 8
+# a file's name is the hash of its bytes, so its content never changes: cache it for a year
+MAX_AGE = 365 * 24 * 3600
+HASH_PATTERN = re.compile(r'[0-9a-f]{64}')
+
+# leading bytes of the formats PokeAPI serves sprites in
+MAGIC_TYPES = (
+    (b'\x89PNG', 'image/png'),
+    (b'GIF8', 'image/gif'),
+    (b'\xff\xd8', 'image/jpeg'),
+    (b'<svg', 'image/svg+xml'),
+    (b'<?xml', 'image/svg+xml'),
+)
+
+
+def local_sprites_enabled() -> bool:
+    """True when LOCAL_SPRITES is set to a true value."""
+    return os.environ.get('LOCAL_SPRITES', '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def default_sprite_dir() -> Optional[str]:
+    """SPRITE_DIR if set, else a sprites folder next to a SQLite database; in-memory databases get none."""
+    configured = os.environ.get('SPRITE_DIR')
+    if configured is not None:
+        return configured or None
+    url = os.environ.get('DATABASE_URL', 'sqlite:///pokemon_scout.db')
+    if url.startswith('sqlite:///') and ':memory:' not in url:
+        return os.path.join(os.path.dirname(os.path.abspath(url[len('sqlite:///'):])), 'sprites')
+    return None
+
+
+class SpriteStore:
+    """Image files named by the sha256 of their bytes, fanned out into 256 folders.
+
+    The same image reached through different URLs (or shared by several forms) is
+    stored once. Files are written to a temporary name and renamed into place, so a
+    reader never sees half a file and concurrent writers of one image are harmless.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, sprite_hash: str) -> Optional[str]:
+        """Where an image lives, or None for something that isn't a sha256 hex digest."""
+        if not HASH_PATTERN.fullmatch(sprite_hash):
+            return None
+        return os.path.join(self.root, sprite_hash[:2], sprite_hash)
+
+    def has(self, sprite_hash: str) -> bool:
+        path = self.path(sprite_hash)
+        return path is not None and os.path.exists(path)
+
+    def put(self, data: bytes) -> str:
+        """Store an image unless it's already there; returns its hash."""
+        sprite_hash = hashlib.sha256(data).hexdigest()
+        path = self.path(sprite_hash)
+        if os.path.exists(path):
+            return sprite_hash
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as handle:
+                handle.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return sprite_hash
+
+    def content_type(self, sprite_hash: str) -> str:
+        with open(self.path(sprite_hash), 'rb') as handle:
+            head = handle.read(16).lstrip()
+        for magic, content_type in MAGIC_TYPES:
+            if head.startswith(magic):
+                return content_type
+        if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+            return 'image/webp'
+        return 'application/octet-stream'
+
+
+def sprite_store_from_env() -> Optional[SpriteStore]:
+    root = default_sprite_dir()
+    return SpriteStore(root) if root else None
+
+
+def download_sprites(session, store: SpriteStore, fetch: Callable[[str], Optional[bytes]],
+                     pokemon_ids: Optional[Iterable[int]] = None, workers: int = DEFAULT_WORKERS,
+                     refresh: bool = False) -> Dict[str, Any]:
+    """Download sprites (default: every stored Pokemon without one) into the store and record their hashes.
+
+    `fetch` returns an image's bytes, or None when it can't be had (PokeAPIService.get_sprite).
+    Each distinct URL is requested once. Without `refresh`, Pokemon whose cached file is
+    still there are skipped. Nothing is committed.
+    """
+    query = select(Pokemon.id, Pokemon.sprite_url, Pokemon.sprite_hash).where(
+        Pokemon.sprite_url.is_not(None), Pokemon.sprite_url != ''
+    )
+    if pokemon_ids is not None:
+        query = query.where(Pokemon.id.in_(list(pokemon_ids)))
+    by_url: Dict[str, list] = {}
+    for pokemon_id, url, sprite_hash in session.execute(query):
+        if refresh or not sprite_hash or not store.has(sprite_hash):
+            by_url.setdefault(url, []).append(pokemon_id)
+
+    def download(url):
+        data = fetch(url)
+        return None if not data else store.put(data)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        hashes = dict(zip(by_url, executor.map(download, by_url)))
+
+    rows = [{'row_id': pokemon_id, 'hash': sprite_hash}
+            for url, sprite_hash in hashes.items() if sprite_hash for pokemon_id in by_url[url]]
+    if rows:
+        session.execute(
+            update(Pokemon.__table__).where(Pokemon.__table__.c.id == bindparam('row_id'))
+            .values(sprite_hash=bindparam('hash')),
+            rows
+        )
+        mark_pokemon_changed(session, {row['row_id'] for row in rows})
+    failed = sorted(url for url, sprite_hash in hashes.items() if not sprite_hash)
+    logger.info('Cached %s sprites for %s Pokemon (%s failed)', len(hashes) - len(failed), len(rows), len(failed))
+    return {'downloaded': len(hashes) - len(failed), 'pokemon': len(rows), 'failed': failed}
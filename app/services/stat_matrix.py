@@ -0,0 +1,271 @@
+"""
+Stat Matrix - Columnar NumPy copy of every Pokemon's base stats for vectorized analytics
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from sqlalchemy import event, select
+
+from app.models import Pokemon, PokemonType, STAT_COLUMNS, MetricAggregate, TypeCount
+from app.models.pokemon import Base
+from app.services.change_feed import ChangeFeed
+from app.services.data_version import POLL_INTERVAL, DataVersionWatcher
+from app.services.persistence import on_pokemon_commit
+
+
+logger = logging.getLogger(__name__)
+
+
+# column order of the (N, 6) stats array
+STAT_ORDER = list(STAT_COLUMNS.values())
+MAX_TYPES = 2
+
+RECORD_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('stats', np.int16, (len(STAT_ORDER),)),
+    ('type_ids', np.int32, (MAX_TYPES,)),
+])
+
+
+class StatMatrix:
+    """Aligned arrays for N Pokemon: ids (N,), stats (N, 6) and type_ids (N, 2, 0 = no type).
+
+    Backed by one structured array, so it can be a read-only memory map of the cache file.
+    """
+
+    def __init__(self, records: np.ndarray, fingerprint: str = ''):
+        self.records = records
+        self.fingerprint = fingerprint
+        self.ids = records['id']
+        self.stats = records['stats']
+        self.type_ids = records['type_ids']
+        self._row_by_id = {int(pokemon_id): row for row, pokemon_id in enumerate(self.ids)}
+
+    def __len__(self):
+        return len(self.records)
+
+    @classmethod
+    def from_session(cls, session, fingerprint: str = '') -> 'StatMatrix':
+        """Build from the wide stat columns and pokemon_types - two queries, no ORM objects."""
+        columns = [getattr(Pokemon, stat) for stat in STAT_ORDER]
+        rows = session.execute(select(Pokemon.id, *columns).order_by(Pokemon.id)).all()
+
+        records = np.zeros(len(rows), dtype=RECORD_DTYPE)
+        if rows:
+            values = np.array(rows, dtype=np.float64)
+            records['id'] = values[:, 0]
+            records['stats'] = np.nan_to_num(values[:, 1:])
+
+            row_by_id = {pokemon_id: row for row, pokemon_id in enumerate(records['id'].tolist())}
+            type_rows = session.execute(
+                select(PokemonType.pokemon_id, PokemonType.type_id, PokemonType.slot)
+                .order_by(PokemonType.pokemon_id, PokemonType.slot)
+            ).all()
+            filled = {}
+            for pokemon_id, type_id, _slot in type_rows:
+                row = row_by_id.get(pokemon_id)
+                position = filled.get(pokemon_id, 0)
+                if row is not None and position < MAX_TYPES:
+                    records['type_ids'][row, position] = type_id
+                    filled[pokemon_id] = position + 1
+        return cls(records, fingerprint)
+
+    def row(self, pokemon_id: int) -> Optional[int]:
+        return self._row_by_id.get(pokemon_id)
+
+    def type_mask(self, type_id: Optional[int]) -> np.ndarray:
+        if type_id is None:
+            return np.ones(len(self), dtype=bool)
+        return (self.type_ids == type_id).any(axis=1)
+
+    def scores(self, by: Union[str, Dict[str, float]]) -> np.ndarray:
+        """One score per Pokemon: a single stat, 'total', or a weighted sum {stat: weight}."""
+        if isinstance(by, str):
+            if by == 'total':
+                return self.stats.sum(axis=1, dtype=np.float64)
+            by = {by: 1.0}
+        weights = np.zeros(len(STAT_ORDER))
+        for stat, weight in by.items():
+            if stat not in STAT_ORDER:
+                raise ValueError(f"Unknown stat '{stat}'")
+            weights[STAT_ORDER.index(stat)] = weight
+        return self.stats @ weights
+
+    def top_k(self, by: Union[str, Dict[str, float]], k: int = 10,
+              mask: Optional[np.ndarray] = None) -> List[Dict[str, float]]:
+        """Best k by score; argpartition keeps it O(N) before sorting just the winners."""
+        scores = self.scores(by)
+        candidates = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        if not len(candidates) or k <= 0:
+            return []
+        k = min(k, len(candidates))
+        candidate_scores = scores[candidates]
+        best = np.argpartition(-candidate_scores, k - 1)[:k]
+        best = best[np.lexsort((self.ids[candidates[best]], -candidate_scores[best]))]
+        return [{'id': int(self.ids[candidates[i]]), 'score': float(candidate_scores[i])} for i in best]
+
+    def percentiles(self, q: Sequence[float], mask: Optional[np.ndarray] = None) -> Dict[str, List[float]]:
+        stats = self.stats if mask is None else self.stats[mask]
+        if not len(stats):
+            return {stat: [] for stat in STAT_ORDER}
+        values = np.percentile(stats, q, axis=0)
+        return {stat: values[:, i].tolist() for i, stat in enumerate(STAT_ORDER)}
+
+    def zscores(self, pokemon_id: Optional[int] = None) -> np.ndarray:
+        """Per-stat z-scores against the whole dex, for one Pokemon (6,) or everyone (N, 6)."""
+        stats = self.stats.astype(np.float64)
+        mean = stats.mean(axis=0)
+        std = stats.std(axis=0)
+        std[std == 0] = 1.0
+        if pokemon_id is None:
+            return (stats - mean) / std
+        row = self.row(pokemon_id)
+        if row is None:
+            raise KeyError(pokemon_id)
+        return (stats[row] - mean) / std
+
+    def threshold_mask(self, minimums: Optional[Dict[str, int]] = None,
+                       maximums: Optional[Dict[str, int]] = None) -> np.ndarray:
+        """Boolean mask of Pokemon meeting every min/max at once."""
+        mask = np.ones(len(self), dtype=bool)
+        for bounds, compare in ((minimums or {}, np.greater_equal), (maximums or {}, np.less_equal)):
+            for stat, value in bounds.items():
+                if stat not in STAT_ORDER:
+                    raise ValueError(f"Unknown stat '{stat}'")
+                mask &= compare(self.stats[:, STAT_ORDER.index(stat)], value)
+        return mask
+
+    def save(self, path: str):
+        # data first, then the metadata that vouches for it: a crash in between leaves an old
+        # fingerprint next to new data, which load() rejects, never a current one next to old data
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.save(f, self.records)
+        os.replace(tmp_path, path)
+        with open(f'{path}.json.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'fingerprint': self.fingerprint, 'rows': len(self)}, f)
+        os.replace(f'{path}.json.tmp', f'{path}.json')
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str) -> Optional['StatMatrix']:
+        """Memory-map the cache file if it was written for the same data; None otherwise."""
+        try:
+            with open(f'{path}.json', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('fingerprint') != fingerprint:
+                return None
+            return cls(np.load(path, mmap_mode='r'), fingerprint)
+        except (OSError, ValueError):
+            return None
+
+
+def parse_score(text: str) -> Union[str, Dict[str, float]]:
+    """'attack', 'total' or a weighted formula like 'attack:1.5,speed:1'."""
+    text = (text or 'total').strip()
+    if ':' not in text:
+        if text != 'total' and text not in STAT_ORDER:
+            raise ValueError(f"Unknown stat '{text}'")
+        return text
+    weights = {}
+    for part in text.split(','):
+        stat, _, weight = part.partition(':')
+        try:
+            weights[stat.strip()] = float(weight)
+        except ValueError:
+            raise ValueError(f"Bad weight in '{part}'")
+    return weights
+
+
+def data_fingerprint(session) -> str:
+    """Cheap O(1) signature of the stored stats, taken from the aggregate tables and the change feed.
+
+    The aggregates alone miss writes that keep every sum the same (two Pokemon trading stats);
+    the latest change-feed version moves on every write.
+    """
+    digest = hashlib.sha1()
+    digest.update(repr(ChangeFeed.latest_version(session)).encode())
+    for row in session.execute(select(MetricAggregate.metric, MetricAggregate.value_count,
+                                      MetricAggregate.value_sum, MetricAggregate.value_sum_sq)
+                               .order_by(MetricAggregate.metric)):
+        digest.update(repr(tuple(row)).encode())
+    for row in session.execute(select(TypeCount.type_id, TypeCount.count).order_by(TypeCount.type_id)):
+        digest.update(repr(tuple(row)).encode())
+    return digest.hexdigest()
+
+
+def default_cache_path() -> Optional[str]:
+    """STAT_MATRIX_CACHE if set, else a file next to a SQLite database; in-memory databases get none."""
+    configured = os.environ.get('STAT_MATRIX_CACHE')
+    if configured is not None:
+        return configured or None
+    url = os.environ.get('DATABASE_URL', 'sqlite:///pokemon_scout.db')
+    if url.startswith('sqlite:///') and ':memory:' not in url:
+        return url[len('sqlite:///'):] + '.stats.npy'
+    return None
+
+
+class StatMatrixStore:
+    """Hands out the current StatMatrix, rebuilding it lazily after writes.
+
+    Writes in this process invalidate it through on_pokemon_commit; writes from other
+    processes (scout.py, the importer, other workers) are noticed through a DataVersionWatcher.
+    """
+
+    def __init__(self, cache_path: Optional[str] = None, poll_interval: float = POLL_INTERVAL):
+        self.cache_path = cache_path
+        self._matrix: Optional[StatMatrix] = None
+        self._version: Optional[int] = None
+        self._lock = threading.Lock()
+        self._watcher = DataVersionWatcher(poll_interval)
+
+    def invalidate(self, *args, **kwargs):
+        self._matrix = None
+
+    def get(self, session) -> StatMatrix:
+        matrix = self._matrix
+        if matrix is not None and not self._watcher.changed(session, self._version):
+            return matrix
+        with self._lock:
+            if self._matrix is None or self._watcher.changed(session, self._version, force=True):
+                self._version = self._watcher.version(session)
+                self._matrix = self._load_or_build(session)
+            return self._matrix
+
+    def refresh(self, session) -> StatMatrix:
+        """Rebuild now, e.g. for an id the current matrix doesn't have yet."""
+        self.invalidate()
+        return self.get(session)
+
+    def close(self):
+        self._watcher.close()
+
+    def _load_or_build(self, session) -> StatMatrix:
+        fingerprint = data_fingerprint(session)
+        if self.cache_path:
+            matrix = StatMatrix.load(self.cache_path, fingerprint)
+            if matrix is not None:
+                logger.info('Memory-mapped stat matrix (%s rows) from %s', len(matrix), self.cache_path)
+                return matrix
+
+        matrix = StatMatrix.from_session(session, fingerprint)
+        if self.cache_path:
+            try:
+                matrix.save(self.cache_path)
+            except OSError:
+                logger.exception('Could not write stat matrix cache to %s', self.cache_path)
+        return matrix
+
+
+stat_matrix_store = StatMatrixStore(default_cache_path())
+
+on_pokemon_commit(stat_matrix_store.invalidate)
+event.listen(Base.metadata, 'after_create', stat_matrix_store.invalidate)
+event.listen(Base.metadata, 'after_drop', stat_matrix_store.invalidate)
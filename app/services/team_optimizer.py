@@ -0,0 +1,253 @@
+"""
+Team Optimizer - Branch-and-bound search for the best type coverage team
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import logging
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.stat_matrix import StatMatrix
+from app.services.type_chart import TypeChart
+
+
+logger = logging.getLogger(__name__)
+
+
+MAX_TEAM_SIZE = 6
+
+
+def popcount(mask: int) -> int:
+    """Number of set bits in a coverage mask (int.bit_count needs Python 3.10)."""
+    return bin(mask).count('1')
+
+
+class TeamOptimizer:
+    """Picks a team maximizing type coverage, then base-stat total as the tie-breaker.
+
+    Coverage counts each type once on offense (some member's own type hits it
+    super-effectively) and once on defense (some member resists or is immune to it),
+    so a perfect team scores 2 x T. Every Pokemon is reduced to two T-bit masks; a
+    team's coverage is the popcount of their ORs.
+    """
+
+    # check the clock once per this many search nodes
+    CLOCK_INTERVAL = 256
+
+    def __init__(self, matrix: StatMatrix, chart: TypeChart):
+        self.matrix = matrix
+        self.chart = chart
+        self.totals = matrix.stats.sum(axis=1, dtype=np.int64)
+        self.offense, self.defense = self._coverage_masks()
+
+    def _coverage_masks(self) -> Tuple[List[int], List[int]]:
+        size = len(self.chart)
+        bits = np.left_shift(np.int64(1), np.arange(size, dtype=np.int64))
+        if not len(self.matrix) or not size:
+            return [0] * len(self.matrix), [0] * len(self.matrix)
+
+        columns = self.chart.columns(self.matrix.type_ids)
+        # (N, 2, T): the chart row of each of the Pokemon's own types
+        super_effective = (self.chart._padded[columns][:, :, :size] >= 2).any(axis=1)
+        resisted = self.chart.defensive_profiles(self.matrix.type_ids) < 1
+        return (super_effective.astype(np.int64) @ bits).tolist(), (resisted.astype(np.int64) @ bits).tolist()
+
+    def optimize(self, size: int = MAX_TEAM_SIZE, required_ids: Iterable[int] = (),
+                 banned_type_ids: Iterable[int] = (), min_total: Optional[int] = None,
+                 time_budget: float = 1.0) -> Dict[str, Any]:
+        """Best team of `size` under the constraints, within `time_budget` seconds.
+
+        `optimal` in the result is True when the search finished, i.e. no better team exists.
+        """
+        if not 1 <= size <= MAX_TEAM_SIZE:
+            raise ValueError(f'team size must be between 1 and {MAX_TEAM_SIZE}')
+        rows = []
+        for pokemon_id in dict.fromkeys(required_ids):
+            row = self.matrix.row(pokemon_id)
+            if row is None:
+                raise ValueError(f'Pokemon {pokemon_id} is not stored')
+            rows.append(row)
+        if len(rows) > size:
+            raise ValueError('more required members than team slots')
+
+        allowed = np.ones(len(self.matrix), dtype=bool)
+        banned = list(banned_type_ids)
+        if banned:
+            allowed &= ~np.isin(self.matrix.type_ids, banned).any(axis=1)
+        if min_total is not None:
+            allowed &= self.totals >= min_total
+        allowed[rows] = False
+
+        candidates = self._candidates(np.flatnonzero(allowed), size)
+        search = _Search(self, rows, candidates, size, time.perf_counter() + time_budget)
+        team, optimal = search.run()
+        team = self._fill(team, allowed, size)
+
+        offense = defense = 0
+        for row in team:
+            offense |= self.offense[row]
+            defense |= self.defense[row]
+        return {
+            'ids': [int(self.matrix.ids[row]) for row in team],
+            'offense': self._type_names(offense),
+            'defense': self._type_names(defense),
+            'coverage': popcount(offense) + popcount(defense),
+            'max_coverage': 2 * len(self.chart),
+            'stat_total': int(self.totals[team].sum()) if team else 0,
+            'optimal': optimal,
+            'candidates': len(candidates),
+            'nodes': search.nodes,
+        }
+
+    def _candidates(self, rows: np.ndarray, size: int) -> List[int]:
+        """Candidates worth searching, strongest stat total first.
+
+        A Pokemon is dropped when at least `size` others cover every type it covers (on
+        offense and defense) with at least its stat total: any team using it has a free
+        slot-swap to one of them that is no worse. Pokemon sharing both masks keep just
+        their best, so the full dex collapses to a few dozen candidates.
+        """
+        best: Dict[Tuple[int, int], int] = {}
+        for row in rows.tolist():
+            key = (self.offense[row], self.defense[row])
+            current = best.get(key)
+            if current is None or self.totals[row] > self.totals[current]:
+                best[key] = row
+        rows = np.array(list(best.values()), dtype=np.int64)
+        if not len(rows):
+            return []
+
+        offense = np.array([self.offense[row] for row in rows], dtype=np.int64)
+        defense = np.array([self.defense[row] for row in rows], dtype=np.int64)
+        totals = self.totals[rows]
+        # dominated[a, b]: b covers everything a does with at least a's total
+        dominated = (
+            ((offense[:, None] & ~offense[None, :]) == 0)
+            & ((defense[:, None] & ~defense[None, :]) == 0)
+            & (totals[:, None] <= totals[None, :])
+        )
+        np.fill_diagonal(dominated, False)
+        rows = rows[dominated.sum(axis=1) < size]
+        return sorted(rows.tolist(), key=lambda row: (-self.totals[row], row))
+
+    def _fill(self, team: List[int], allowed: np.ndarray, size: int) -> List[int]:
+        """Top up with the highest totals when there are fewer distinct candidates than slots."""
+        if len(team) >= size:
+            return team
+        taken = set(team)
+        for row in np.flatnonzero(allowed)[np.argsort(-self.totals[allowed], kind='stable')].tolist():
+            if len(team) == size:
+                break
+            if row not in taken:
+                team.append(row)
+        return team
+
+    def _type_names(self, mask: int) -> List[str]:
+        return [name for i, name in enumerate(self.chart.names) if mask >> i & 1]
+
+
+class _Search:
+    """Depth-first branch-and-bound over candidates, seeded with a greedy team."""
+
+    def __init__(self, optimizer: TeamOptimizer, required: List[int], candidates: List[int],
+                 size: int, deadline: float):
+        self.offense = optimizer.offense
+        self.defense = optimizer.defense
+        self.totals = optimizer.totals.tolist()
+        self.required = required
+        self.candidates = candidates
+        self.size = size
+        self.deadline = deadline
+        self.nodes = 0
+        self.timed_out = False
+        self.best_team: List[int] = []
+        self.best_key = (-1, -1)
+
+        self.prefix_totals = [0]
+        for row in candidates:
+            self.prefix_totals.append(self.prefix_totals[-1] + self.totals[row])
+        self.suffix_offense = [0] * (len(candidates) + 1)
+        self.suffix_defense = [0] * (len(candidates) + 1)
+        for i in range(len(candidates) - 1, -1, -1):
+            self.suffix_offense[i] = self.suffix_offense[i + 1] | self.offense[candidates[i]]
+            self.suffix_defense[i] = self.suffix_defense[i + 1] | self.defense[candidates[i]]
+
+    def run(self) -> Tuple[List[int], bool]:
+        offense = defense = total = 0
+        for row in self.required:
+            offense |= self.offense[row]
+            defense |= self.defense[row]
+            total += self.totals[row]
+        self._greedy(offense, defense, total)
+        self._branch(0, [], offense, defense, total)
+        return self.required + self.best_team, not self.timed_out
+
+    def _consider(self, team: List[int], offense: int, defense: int, total: int):
+        key = (popcount(offense) + popcount(defense), total)
+        if key > self.best_key:
+            self.best_key = key
+            self.best_team = list(team)
+
+    def _greedy(self, offense: int, defense: int, total: int):
+        team = []
+        remaining = list(self.candidates)
+        while remaining and len(self.required) + len(team) < self.size:
+            row = max(remaining, key=lambda r: (
+                popcount(self.offense[r] & ~offense) + popcount(self.defense[r] & ~defense),
+                self.totals[r]
+            ))
+            remaining.remove(row)
+            team.append(row)
+            offense |= self.offense[row]
+            defense |= self.defense[row]
+            total += self.totals[row]
+        self._consider(team, offense, defense, total)
+
+    def _window_total(self, start: int, slots: int) -> int:
+        # candidates are sorted by total, so no `slots` of them from `start` on beat the next `slots`
+        end = min(start + slots, len(self.candidates))
+        return self.prefix_totals[end] - self.prefix_totals[start]
+
+    def _branch(self, start: int, team: List[int], offense: int, defense: int, total: int):
+        self.nodes += 1
+        if self.nodes % TeamOptimizer.CLOCK_INTERVAL == 0 and time.perf_counter() > self.deadline:
+            self.timed_out = True
+        if self.timed_out:
+            return
+
+        slots = self.size - len(self.required) - len(team)
+        if slots == 0 or start == len(self.candidates):
+            self._consider(team, offense, defense, total)
+            return
+
+        # coverage bound: the `slots` largest single gains, and at most everything still reachable
+        gains = sorted(
+            (popcount(self.offense[r] & ~offense) + popcount(self.defense[r] & ~defense)
+             for r in self.candidates[start:]), reverse=True
+        )
+        coverage_bound = popcount(offense) + popcount(defense) + min(
+            sum(gains[:slots]),
+            popcount(self.suffix_offense[start] & ~offense) + popcount(self.suffix_defense[start] & ~defense)
+        )
+        best_coverage, best_total = self.best_key
+        if coverage_bound < best_coverage:
+            return
+
+        for i in range(start, len(self.candidates)):
+            # later children only have smaller totals to pick from, so once a tie on coverage
+            # can't beat the best total none of them can
+            if coverage_bound == best_coverage and total + self._window_total(i, slots) <= best_total:
+                break
+            row = self.candidates[i]
+            team.append(row)
+            self._branch(i + 1, team, offense | self.offense[row], defense | self.defense[row],
+                         total + self.totals[row])
+            team.pop()
+            if self.timed_out:
+                return
+            best_coverage, best_total = self.best_key
+            if coverage_bound < best_coverage:
+                return
@@ -0,0 +1,200 @@
+"""
+Type Chart - Stored damage relations and vectorized matchup maths
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, event, insert, select
+from sqlalchemy.orm import Session as OrmSession
+
+from app.models import PokemonType, TypeName, TypeEffectiveness
+from app.models.pokemon import Base
+from app.services.data_processor import DataProcessor
+from app.services.persistence import lookup_cache
+from app.services.stat_matrix import MAX_TYPES
+
+
+logger = logging.getLogger(__name__)
+
+
+# the 18 battle types, in PokeAPI order (it also lists 'unknown', 'shadow' and 'stellar')
+STANDARD_TYPES = [
+    'Normal', 'Fighting', 'Flying', 'Poison', 'Ground', 'Rock', 'Bug', 'Ghost', 'Steel',
+    'Fire', 'Water', 'Grass', 'Electric', 'Psychic', 'Ice', 'Dragon', 'Dark', 'Fairy',
+]
+
+
+class TypeChartRepository:
+    """Writes sanitized damage relations into type_effectiveness."""
+
+    @staticmethod
+    def store_type(session, type_data: Dict[str, Any]):
+        """Replace every multiplier dealt by one attacking type."""
+        attacking_id = lookup_cache.resolve(session, 'type', type_data['type_name'])
+        session.execute(delete(TypeEffectiveness).where(TypeEffectiveness.attacking_type_id == attacking_id))
+        rows = [
+            {
+                'attacking_type_id': attacking_id,
+                'defending_type_id': lookup_cache.resolve(session, 'type', defending),
+                'multiplier': multiplier,
+            }
+            for defending, multiplier in type_data['damage_to'].items()
+        ]
+        if rows:
+            session.execute(insert(TypeEffectiveness), rows)
+        session.info['type_chart_changed'] = True
+
+    @staticmethod
+    def fetch_all(session, pokeapi, type_names: Iterable[str] = STANDARD_TYPES) -> List[str]:
+        """Fetch and store every type's relations; returns the names that could not be fetched."""
+        failed = []
+        for type_name in type_names:
+            type_data = DataProcessor.sanitize_type_data(pokeapi.get_type(type_name))
+            if type_data is None:
+                failed.append(type_name)
+                continue
+            TypeChartRepository.store_type(session, type_data)
+        return failed
+
+
+class TypeChart:
+    """T x T multiplier matrix (rows attack, columns defend) over the types in the chart.
+
+    Pokemon types are carried as type_names ids in (N, 2) arrays with 0 for "no second
+    type", like StatMatrix.type_ids; ids the chart doesn't know map to a neutral column.
+    """
+
+    def __init__(self, type_ids: Iterable[int], names: Iterable[str], matrix: np.ndarray):
+        self.type_ids = np.asarray(list(type_ids), dtype=np.int64)
+        self.names = list(names)
+        self.matrix = np.asarray(matrix, dtype=np.float64)
+        size = len(self.names)
+        # one extra all-ones row/column stands in for missing or unknown types
+        self._padded = np.ones((size + 1, size + 1))
+        self._padded[:size, :size] = self.matrix
+        self._column_by_id = np.full(int(self.type_ids.max(initial=0)) + 1, size, dtype=np.int64)
+        self._column_by_id[self.type_ids] = np.arange(size)
+
+    def __len__(self):
+        return len(self.names)
+
+    @classmethod
+    def from_session(cls, session) -> 'TypeChart':
+        rows = session.execute(select(
+            TypeEffectiveness.attacking_type_id, TypeEffectiveness.defending_type_id,
+            TypeEffectiveness.multiplier
+        )).all()
+        involved = {row[0] for row in rows} | {row[1] for row in rows}
+        names = dict(session.execute(
+            select(TypeName.id, TypeName.name).where(TypeName.id.in_(involved))
+        ).all()) if involved else {}
+
+        # standard types first in their usual order, anything else after
+        order = {name: i for i, name in enumerate(STANDARD_TYPES)}
+        type_ids = sorted(names, key=lambda type_id: (order.get(names[type_id], len(order)), names[type_id]))
+        position = {type_id: i for i, type_id in enumerate(type_ids)}
+        matrix = np.ones((len(type_ids), len(type_ids)))
+        for attacking, defending, multiplier in rows:
+            matrix[position[attacking], position[defending]] = multiplier
+        return cls(type_ids, [names[type_id] for type_id in type_ids], matrix)
+
+    def columns(self, type_ids: np.ndarray) -> np.ndarray:
+        """Map type_names ids to chart positions; unknown ids and 0 map to the neutral slot."""
+        type_ids = np.asarray(type_ids, dtype=np.int64)
+        known = (type_ids > 0) & (type_ids < len(self._column_by_id))
+        return np.where(known, self._column_by_id[np.where(known, type_ids, 0)], len(self))
+
+    def defensive_profiles(self, defender_type_ids: np.ndarray) -> np.ndarray:
+        """(N, 2) defender types -> (N, T) multiplier taken from each attacking type.
+
+        Dual types multiply: the attacker's row is gathered for both defending columns at once.
+        """
+        columns = self.columns(np.atleast_2d(defender_type_ids))
+        attack_rows = self._padded[:len(self)]
+        return attack_rows[:, columns].prod(axis=2).T
+
+    def effectiveness(self, move_type_ids: np.ndarray, defender_type_ids: np.ndarray) -> np.ndarray:
+        """Multiplier of moves of `move_type_ids` (shape S) against (S..., 2) defender types, broadcast."""
+        move_columns = self.columns(move_type_ids)
+        defender_columns = self.columns(defender_type_ids)
+        return (self._padded[move_columns, defender_columns[..., 0]]
+                * self._padded[move_columns, defender_columns[..., 1]])
+
+    def matchups(self, attacker_type_ids: np.ndarray,
+                 defender_type_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """(A, 2) attackers vs (D, 2) defenders.
+
+        Returns (by_type, best): by_type is (A, 2, D), the multiplier of each of the
+        attacker's own (STAB) types against each defender, NaN where the attacker has no
+        such type; best is (A, D), the better of the two.
+        """
+        profiles = self.defensive_profiles(defender_type_ids)
+        padded_profiles = np.hstack([profiles, np.full((len(profiles), 1), np.nan)])
+        attacker_columns = self.columns(np.atleast_2d(attacker_type_ids))
+        by_type = padded_profiles.T[attacker_columns]
+        best = np.fmax.reduce(by_type, axis=1)
+        return by_type, np.nan_to_num(best, nan=1.0)
+
+    def profile_dict(self, profile: np.ndarray) -> Dict[str, float]:
+        return {name: float(value) for name, value in zip(self.names, profile)}
+
+
+class TypeChartStore:
+    """Caches the TypeChart until type_effectiveness is written again."""
+
+    def __init__(self):
+        self._chart: Optional[TypeChart] = None
+        self._lock = threading.Lock()
+
+    def invalidate(self, *args, **kwargs):
+        self._chart = None
+
+    def get(self, session) -> TypeChart:
+        chart = self._chart
+        if chart is not None:
+            return chart
+        with self._lock:
+            if self._chart is None:
+                self._chart = TypeChart.from_session(session)
+                logger.info('Loaded %sx%s type chart', len(self._chart), len(self._chart))
+            return self._chart
+
+
+type_chart_store = TypeChartStore()
+
+
+def _on_commit(session):
+    if session.info.pop('type_chart_changed', False):
+        type_chart_store.invalidate()
+
+
+def _on_rollback(session):
+    session.info.pop('type_chart_changed', None)
+
+
+event.listen(OrmSession, 'after_commit', _on_commit)
+event.listen(OrmSession, 'after_rollback', _on_rollback)
+event.listen(Base.metadata, 'after_create', type_chart_store.invalidate)
+event.listen(Base.metadata, 'after_drop', type_chart_store.invalidate)
+
+
+def pokemon_type_ids(session, pokemon_ids: List[int]) -> np.ndarray:
+    """(N, 2) type_names ids for the given Pokemon, in order, 0-padded."""
+    result = np.zeros((len(pokemon_ids), MAX_TYPES), dtype=np.int64)
+    row_by_id = {pokemon_id: row for row, pokemon_id in enumerate(pokemon_ids)}
+    filled: Dict[int, int] = {}
+    for pokemon_id, type_id in session.execute(
+        select(PokemonType.pokemon_id, PokemonType.type_id)
+        .where(PokemonType.pokemon_id.in_(pokemon_ids))
+        .order_by(PokemonType.pokemon_id, PokemonType.slot)
+    ):
+        position = filled.get(pokemon_id, 0)
+        if position < MAX_TYPES:
+            result[row_by_id[pokemon_id], position] = type_id
+            filled[pokemon_id] = position + 1
+    return result
@@ -0,0 +1,50 @@
+"""
+Benchmark the raw payload archive: compression ratio and offline reprocess throughput by worker count
+
+Usage: python -m benchmarks.bench_archive [--rows 2000] [--workers 1,2,4]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2000)
+    parser.add_argument('--workers', default=f'1,{os.cpu_count() or 1}')
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ['APP_ENV'] = 'testing'
+
+    from app import Session, init_db
+    from app.services.archive import PayloadArchive, compress, reprocess
+    from benchmarks.synthetic import raw_pokemon_payload, sanitized_pokemon
+
+    init_db()
+    session = Session()
+    t0 = time.perf_counter()
+    for data in sanitized_pokemon(args.rows):
+        body = json.dumps(raw_pokemon_payload(data)).encode()
+        PayloadArchive.store_in(session, 'pokemon', data['name'].lower(), body)
+    session.commit()
+    summary = PayloadArchive.summary(session)
+    print(f"Archived {summary['resources']} payloads with {compress(b'')[0]} in {time.perf_counter() - t0:.1f}s: "
+          f"{summary['raw_bytes'] / 2**20:.1f} MiB raw -> {summary['stored_bytes'] / 2**20:.1f} MiB "
+          f"({summary['raw_bytes'] / max(summary['stored_bytes'], 1):.1f}x)\n")
+
+    print(f"{'workers':>7s} {'seconds':>8s} {'rows/s':>8s}")
+    for workers in (int(w) for w in args.workers.split(',')):
+        t0 = time.perf_counter()
+        result = reprocess(session, workers=workers)
+        session.commit()
+        elapsed = time.perf_counter() - t0
+        print(f"{workers:7d} {elapsed:8.2f} {result['stored'] / elapsed:8.0f}")
+    session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark sanitize_many + bulk_insert against per-payload sanitize and ORM inserts
+
+Usage: python -m benchmarks.bench_bulk_insert [--rows 10000] [--batch 2000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--batch', type=int, default=2000)
+    args = parser.parse_args()
+
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+    os.environ['APP_ENV'] = 'testing'
+
+    from app import Session, engine, init_db
+    from app.models.pokemon import Base
+    from app.services import DataProcessor, PokemonRepository
+    from benchmarks.synthetic import raw_pokemon_payload, sanitized_pokemon
+
+    payloads = [raw_pokemon_payload(data, moves=0) for data in sanitized_pokemon(args.rows)]
+    chunks = [payloads[start:start + args.batch] for start in range(0, len(payloads), args.batch)]
+
+    def per_payload(session, chunk):
+        sanitized = [DataProcessor.sanitize_pokemon_data(raw) for raw in chunk]
+        sanitize_done = time.perf_counter()
+        for data in sanitized:
+            session.add(PokemonRepository.build_pokemon(session, data))
+        return sanitize_done
+
+    def batched(session, chunk):
+        batch = DataProcessor.sanitize_many(chunk)
+        sanitize_done = time.perf_counter()
+        PokemonRepository.bulk_insert(session, batch)
+        return sanitize_done
+
+    print(f"{'path':>12s} {'sanitize s':>11s} {'insert s':>9s} {'rows/s':>9s}")
+    for name, load in (('per-payload', per_payload), ('sanitize_many', batched)):
+        Base.metadata.drop_all(engine)
+        init_db()
+        sanitize_s = insert_s = 0.0
+        session = Session()
+        for chunk in chunks:
+            t0 = time.perf_counter()
+            sanitize_done = load(session, chunk)
+            session.commit()
+            sanitize_s += sanitize_done - t0
+            insert_s += time.perf_counter() - sanitize_done
+        session.close()
+        print(f'{name:>12s} {sanitize_s:11.2f} {insert_s:9.2f} {args.rows / (sanitize_s + insert_s):9.0f}')
+
+
+if __name__ == '__main__':
+    main()
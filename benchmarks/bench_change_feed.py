@@ -0,0 +1,65 @@
+"""
+Benchmark syncing a client copy via /api/pokemon/changes vs re-reading the whole /api/pokemon list
+
+Usage: python -m benchmarks.bench_change_feed [--rows 20000] [--changes 50]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--changes', type=int, default=50)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['APP_ENV'] = 'testing'
+    os.environ.pop('READ_MODEL', None)
+
+    from app import Session, app, init_db
+    from app.models import Pokemon
+    from benchmarks.synthetic import load
+
+    init_db()
+    session = Session()
+    load(session, args.rows)
+    session.commit()
+
+    client = app.test_client()
+    synced = client.get('/api/pokemon/changes?limit=1').get_json()['latest_version']
+
+    # a handful of edits and deletions since the client's last sync
+    rng = random.Random(5)
+    ids = rng.sample([pokemon_id for pokemon_id, in session.query(Pokemon.id)], args.changes)
+    for pokemon_id in ids[:args.changes // 2]:
+        session.get(Pokemon, pokemon_id).height += 1
+    for pokemon_id in ids[args.changes // 2:]:
+        session.delete(session.get(Pokemon, pokemon_id))
+    session.commit()
+    session.close()
+
+    t0 = time.perf_counter()
+    full = client.get('/api/pokemon').get_json()
+    full_seconds = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    received, since, has_more = 0, synced, True
+    while has_more:
+        page = client.get(f'/api/pokemon/changes?since={since}&limit=1000').get_json()
+        received += len(page['changes'])
+        since, has_more = page['next_since'], page['has_more']
+    feed_seconds = time.perf_counter() - t0
+
+    print(f"{'sync':>20s} {'rows sent':>10s} {'ms':>10s}")
+    print(f"{'full list':>20s} {full['count']:10d} {full_seconds * 1000:10.1f}")
+    print(f"{'changes?since=':>20s} {received:10d} {feed_seconds * 1000:10.1f}")
+
+
+if __name__ == '__main__':
+    main()
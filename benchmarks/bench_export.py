@@ -0,0 +1,72 @@
+"""
+Benchmark streaming export (json/ndjson/csv, plain and gzip) on a synthetic database
+
+Usage: python -m benchmarks.bench_export [--rows 100000] [--legacy]
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+def legacy_export(session, path):
+    """The old view_db export: every Pokemon loaded, one dict, one json.dump."""
+    from app.models import Pokemon
+
+    all_pokemon = session.query(Pokemon).all()
+    data = {'count': len(all_pokemon), 'pokemon': [p.to_dict() for p in all_pokemon]}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+    return {'count': len(all_pokemon), 'files': [path]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--legacy', action='store_true', help='also time the old load-everything export')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['APP_ENV'] = 'testing'
+
+    from app import Session, init_db
+    from app.services.export import export_pokemon
+    from benchmarks.synthetic import load
+
+    init_db()
+    session = Session()
+    t0 = time.perf_counter()
+    load(session, args.rows)
+    session.commit()
+    print(f'Loaded {args.rows} synthetic Pokemon in {time.perf_counter() - t0:.1f}s\n')
+
+    targets = ['dex.json', 'dex.ndjson', 'dex.ndjson.gz', 'dex.csv', 'dex.csv.gz']
+    runs = [(name, lambda path: export_pokemon(session, path)) for name in targets]
+    if args.legacy:
+        runs.append(('legacy.json', lambda path: legacy_export(session, path)))
+
+    print(f"{'output':>14s} {'seconds':>8s} {'rows/s':>8s} {'peak MiB':>9s} {'size MiB':>9s}")
+    for name, export in runs:
+        path = os.path.join(workdir, name)
+        session.expunge_all()
+        t0 = time.perf_counter()
+        result = export(path)
+        elapsed = time.perf_counter() - t0
+
+        # tracing slows Python down a lot, so the peak comes from a second, traced run
+        session.expunge_all()
+        tracemalloc.start()
+        export(path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        size = sum(os.path.getsize(f) for f in result['files'])
+        print(f"{name:>14s} {elapsed:8.2f} {result['count'] / elapsed:8.0f} {peak / 2**20:9.1f} {size / 2**20:9.1f}")
+    session.close()
+
+
+if __name__ == '__main__':
+    main()
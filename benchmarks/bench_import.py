@@ -0,0 +1,107 @@
+"""
+Benchmark the offline import of a synthetic export file, with and without deferred indexes
+
+Usage: python -m benchmarks.bench_import [--rows 100000] [--format ndjson] [--memory]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+
+def exported_dict(pokemon_id, data):
+    """A sanitized_pokemon() dict in Pokemon.to_dict form, as the exporters write it."""
+    return {
+        'id': pokemon_id,
+        'name': data['name'],
+        'pokedex_number': data['pokedex_number'],
+        'height': data['height'],
+        'weight': data['weight'],
+        'base_experience': data['base_experience'],
+        'sprite_url': data['sprite_url'],
+        'types': [{'type': t['type_name'], 'slot': t['slot']} for t in data['types']],
+        'abilities': [{'ability': a['ability_name'], 'is_hidden': a['is_hidden'], 'slot': a['slot']}
+                      for a in data['abilities']],
+        'stats': [{'stat': s['stat_name'], 'base_stat': s['base_stat'], 'effort': s['effort']}
+                  for s in data['stats']],
+    }
+
+
+def write_export(path, rows, fmt):
+    from benchmarks.synthetic import sanitized_pokemon
+
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as out:
+        if fmt == 'json':
+            out.write(f'{{"count": {rows}, "pokemon": [')
+        for i, data in enumerate(sanitized_pokemon(rows), 1):
+            line = json.dumps(exported_dict(i, data), separators=(',', ':'))
+            if fmt == 'json':
+                out.write(('\n  ' if i == 1 else ',\n  ') + line)
+            else:
+                out.write(line + '\n')
+        if fmt == 'json':
+            out.write('\n]}\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--format', choices=('json', 'ndjson'), default='ndjson')
+    parser.add_argument('--gzip', action='store_true', help='gzip the export file')
+    parser.add_argument('--memory', action='store_true', help='also measure the peak with a traced import')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['APP_ENV'] = 'testing'
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app import init_db
+    from app.models.pokemon import Base
+    from app.migrations import run_migrations
+    from app.services.importer import import_pokemon
+
+    init_db()
+    path = os.path.join(workdir, f'dex.{args.format}' + ('.gz' if args.gzip else ''))
+    t0 = time.perf_counter()
+    write_export(path, args.rows, args.format)
+    print(f'Wrote {args.rows} Pokemon to {os.path.basename(path)} '
+          f'({os.path.getsize(path) / 2**20:.1f} MiB) in {time.perf_counter() - t0:.1f}s\n')
+
+    def fresh_session(name):
+        engine = create_engine(f"sqlite:///{os.path.join(workdir, name)}")
+        Base.metadata.create_all(engine)
+        run_migrations(engine)
+        return sessionmaker(bind=engine)()
+
+    print(f"{'indexes':>10s} {'seconds':>8s} {'rows/s':>8s} {'index s':>8s} {'peak MiB':>9s}")
+    for defer in (False, True):
+        label = 'deferred' if defer else 'live'
+        session = fresh_session(f'{label}.db')
+        result = import_pokemon(session, path, defer_indexes=defer)
+        session.commit()
+        session.close()
+
+        peak = ''
+        if args.memory:
+            # tracing slows Python down a lot, so the peak comes from a second, traced import
+            session = fresh_session(f'{label}-traced.db')
+            tracemalloc.start()
+            import_pokemon(session, path, defer_indexes=defer)
+            _, traced = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            session.commit()
+            session.close()
+            peak = f'{traced / 2**20:9.1f}'
+        print(f"{label:>10s} {result['seconds']:8.2f} {result['rows_per_second']:8.0f} "
+              f"{result['index_seconds']:8.2f} {peak:>9s}")
+
+
+if __name__ == '__main__':
+    main()
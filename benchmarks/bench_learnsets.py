@@ -0,0 +1,72 @@
+"""
+Benchmark loading full-size learnsets for the whole dex and querying them by move and by Pokemon
+
+Usage: python -m benchmarks.bench_learnsets [--rows 1302] [--queries 500]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1302)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['APP_ENV'] = 'testing'
+
+    from sqlalchemy import func, select
+    from app import Session, init_db
+    from app.models import MoveName, PokemonMove
+    from app.services import DataProcessor, PokemonRepository
+    from app.services.learnsets import LearnsetQuery
+    from benchmarks.synthetic import VERSION_GROUPS, raw_pokemon_payload, sanitized_pokemon
+
+    init_db()
+    session = Session()
+    payloads = [raw_pokemon_payload(data) for data in sanitized_pokemon(args.rows)]
+
+    sanitize_seconds = insert_seconds = 0.0
+    ids = []
+    for start in range(0, len(payloads), 5000):
+        t0 = time.perf_counter()
+        batch = DataProcessor.sanitize_many(payloads[start:start + 5000])
+        t1 = time.perf_counter()
+        ids.extend(PokemonRepository.bulk_insert(session, batch))
+        session.commit()
+        sanitize_seconds += t1 - t0
+        insert_seconds += time.perf_counter() - t1
+    rows = session.execute(select(func.count()).select_from(PokemonMove)).scalar()
+
+    print(f"{'load':>24s} {'seconds':>8s} {'rows/s':>10s}")
+    print(f"{'sanitize (with moves)':>24s} {sanitize_seconds:8.2f} {rows / sanitize_seconds:10.0f}")
+    print(f"{'bulk insert':>24s} {insert_seconds:8.2f} {rows / insert_seconds:10.0f}")
+    print(f"{len(ids)} Pokemon, {rows} learnset rows\n")
+
+    rng = random.Random(7)
+    moves = rng.choices(session.execute(select(MoveName.name)).scalars().all(), k=args.queries)
+    pokemon_ids = rng.choices(ids, k=args.queries)
+    groups = rng.choices(VERSION_GROUPS, k=args.queries)
+
+    print(f"{'query':>34s} {'ms':>8s} {'avg rows':>9s}")
+    for label, run in (
+        ('learners(move)', lambda i: LearnsetQuery.learners(session, moves[i])),
+        ('learners(move, version_group)', lambda i: LearnsetQuery.learners(session, moves[i], groups[i])),
+        ('moves_of(pokemon)', lambda i: LearnsetQuery.moves_of(session, pokemon_ids[i])),
+        ('moves_of(pokemon, version_group)', lambda i: LearnsetQuery.moves_of(session, pokemon_ids[i], groups[i])),
+    ):
+        t0 = time.perf_counter()
+        found = sum(len(run(i)) for i in range(args.queries))
+        elapsed = time.perf_counter() - t0
+        print(f"{label:>34s} {elapsed * 1000 / args.queries:8.2f} {found / args.queries:9.1f}")
+    session.close()
+
+
+if __name__ == '__main__':
+    main()
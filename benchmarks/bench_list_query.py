@@ -0,0 +1,81 @@
+"""
+Benchmark GET /api/pokemon filters on a synthetic database
+
+Usage: python -m benchmarks.bench_list_query [--rows 10000] [--repeat 20]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(), 'bench.db')
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['APP_ENV'] = 'testing'
+
+    from app import app, Session, init_db, engine
+    from app.models import Pokemon
+    from app.services import PokemonQuery
+    from benchmarks.synthetic import load
+
+    init_db()
+    started = time.perf_counter()
+    session = Session()
+    load(session, args.rows)
+    session.commit()
+    session.close()
+    print(f'Loaded {args.rows} synthetic Pokemon in {time.perf_counter() - started:.1f}s ({db_path})\n')
+
+    queries = [
+        'type=Fire&min_speed=100&sort=-attack&limit=50',
+        'min_speed=150&min_attack=150&sort=-total&limit=50',
+        'type=Fire&type=Flying&sort=name&limit=50',
+        'hidden_ability=Ability 7&limit=50',
+        'min_pokedex=5000&max_pokedex=5100&sort=pokedex',
+        'sort=-total&limit=20',
+    ]
+
+    client = app.test_client()
+    print(f"{'query':55s} {'rows':>5s} {'median ms':>10s}")
+    for qs in queries:
+        timings = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            resp = client.get(f'/api/pokemon?{qs}')
+            timings.append((time.perf_counter() - t0) * 1000)
+        print(f"{qs:55s} {resp.get_json()['count']:5d} {statistics.median(timings):10.2f}")
+
+    # the old way: load every row and filter in Python
+    timings = []
+    for _ in range(max(1, args.repeat // 5)):
+        t0 = time.perf_counter()
+        session = Session()
+        matches = [p for p in session.query(Pokemon).all()
+                   if any(t.type_name == 'Fire' for t in p.types)
+                   and any(s.stat_name == 'SPEED' and s.base_stat >= 100 for s in p.stats)]
+        session.close()
+        timings.append((time.perf_counter() - t0) * 1000)
+    print(f"\n{'python-side filter (type=Fire&min_speed=100)':55s} {len(matches):5d} {statistics.median(timings):10.2f}")
+
+    print('\nQuery plan for type=Fire&min_speed=100&sort=-attack:')
+    from werkzeug.datastructures import MultiDict
+    query = PokemonQuery.from_args(MultiDict([('type', 'Fire'), ('min_speed', '100'), ('sort', '-attack')]))
+    session = Session()
+    sql = session.query(Pokemon.id).filter(*query.conditions()).order_by(*query.order_by()).statement
+    compiled = sql.compile(engine, compile_kwargs={'literal_binds': True})
+    with engine.connect() as conn:
+        for row in conn.exec_driver_sql(f'EXPLAIN QUERY PLAN {compiled}'):
+            print('  ', row[-1])
+    session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+"""
+Benchmark DB size and aggregate query time before/after the lookup-table migration
+
+Usage: python -m benchmarks.bench_lookup_tables [--rows 20000] [--repeat 10]
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from app.migrations import add_stat_columns, run_migrations
+from app.models.pokemon import Base
+from benchmarks.synthetic import sanitized_pokemon
+
+
+LEGACY_SCHEMA = """
+CREATE TABLE pokemon (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL UNIQUE, pokedex_number INTEGER NOT NULL,
+                      height INTEGER, weight INTEGER, base_experience INTEGER, sprite_url VARCHAR);
+CREATE TABLE pokemon_types (id INTEGER PRIMARY KEY, pokemon_id INTEGER NOT NULL, type_name VARCHAR NOT NULL, slot INTEGER);
+CREATE TABLE pokemon_abilities (id INTEGER PRIMARY KEY, pokemon_id INTEGER NOT NULL, ability_name VARCHAR NOT NULL,
+                                is_hidden INTEGER, slot INTEGER);
+CREATE TABLE pokemon_stats (id INTEGER PRIMARY KEY, pokemon_id INTEGER NOT NULL, stat_name VARCHAR NOT NULL,
+                            base_stat INTEGER NOT NULL, effort INTEGER);
+CREATE INDEX ix_legacy_types ON pokemon_types (type_name, pokemon_id);
+CREATE INDEX ix_legacy_types_pokemon ON pokemon_types (pokemon_id);
+CREATE INDEX ix_legacy_abilities ON pokemon_abilities (ability_name, is_hidden, pokemon_id);
+CREATE INDEX ix_legacy_abilities_pokemon ON pokemon_abilities (pokemon_id);
+CREATE INDEX ix_legacy_stats ON pokemon_stats (pokemon_id);
+"""
+
+LEGACY_AGGREGATES = {
+    'type distribution': 'SELECT type_name, COUNT(*) FROM pokemon_types GROUP BY type_name',
+    'ability distribution': 'SELECT ability_name, COUNT(*) FROM pokemon_abilities GROUP BY ability_name',
+    'average per stat': 'SELECT stat_name, AVG(base_stat) FROM pokemon_stats GROUP BY stat_name',
+}
+
+ENCODED_AGGREGATES = {
+    'type distribution': 'SELECT n.name, c FROM (SELECT type_id, COUNT(*) c FROM pokemon_types GROUP BY type_id) '
+                         'JOIN type_names n ON n.id = type_id',
+    'ability distribution': 'SELECT n.name, c FROM (SELECT ability_id, COUNT(*) c FROM pokemon_abilities '
+                            'GROUP BY ability_id) JOIN ability_names n ON n.id = ability_id',
+    'average per stat': 'SELECT n.name, a FROM (SELECT stat_id, AVG(base_stat) a FROM pokemon_stats GROUP BY stat_id) '
+                        'JOIN stat_names n ON n.id = stat_id',
+}
+
+
+def load_legacy(path, rows):
+    conn = sqlite3.connect(path)
+    conn.executescript(LEGACY_SCHEMA)
+    types, abilities, stats = [], [], []
+    parents = []
+    for pokemon_id, data in enumerate(sanitized_pokemon(rows), 1):
+        parents.append((pokemon_id, data['name'], data['pokedex_number'], data['height'], data['weight'],
+                        data['base_experience'], data['sprite_url']))
+        types += [(pokemon_id, t['type_name'], t['slot']) for t in data['types']]
+        abilities += [(pokemon_id, a['ability_name'], int(a['is_hidden']), a['slot']) for a in data['abilities']]
+        stats += [(pokemon_id, s['stat_name'], s['base_stat'], s['effort']) for s in data['stats']]
+    conn.executemany('INSERT INTO pokemon VALUES (?, ?, ?, ?, ?, ?, ?)', parents)
+    conn.executemany('INSERT INTO pokemon_types (pokemon_id, type_name, slot) VALUES (?, ?, ?)', types)
+    conn.executemany('INSERT INTO pokemon_abilities (pokemon_id, ability_name, is_hidden, slot) '
+                     'VALUES (?, ?, ?, ?)', abilities)
+    conn.executemany('INSERT INTO pokemon_stats (pokemon_id, stat_name, base_stat, effort) VALUES (?, ?, ?, ?)', stats)
+    conn.commit()
+    conn.close()
+
+
+def measure(path, queries, repeat):
+    conn = sqlite3.connect(path)
+    conn.execute('VACUUM')
+    size = os.path.getsize(path)
+    timings = {}
+    for label, sql in queries.items():
+        samples = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            conn.execute(sql).fetchall()
+            samples.append((time.perf_counter() - t0) * 1000)
+        timings[label] = statistics.median(samples)
+    conn.close()
+    return size, timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'lookup_bench.db')
+    load_legacy(path, args.rows)
+    engine = create_engine(f'sqlite:///{path}')
+    # compare against the schema as it was right before this migration, stat columns included
+    with engine.begin() as conn:
+        add_stat_columns(conn)
+        for index in Base.metadata.tables['pokemon'].indexes:
+            index.create(conn, checkfirst=True)
+    engine.dispose()
+    before_size, before = measure(path, LEGACY_AGGREGATES, args.repeat)
+
+    engine = create_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    t0 = time.perf_counter()
+    run_migrations(engine)
+    migration_seconds = time.perf_counter() - t0
+    engine.dispose()
+    after_size, after = measure(path, ENCODED_AGGREGATES, args.repeat)
+
+    print(f'{args.rows} Pokemon, migration took {migration_seconds:.2f}s\n')
+    print(f"{'':26s} {'before':>10s} {'after':>10s}")
+    print(f"{'DB size (KiB)':26s} {before_size / 1024:10.0f} {after_size / 1024:10.0f}")
+    for label in before:
+        print(f'{label + " (ms)":26s} {before[label]:10.2f} {after[label]:10.2f}')
+
+
+if __name__ == '__main__':
+    main()
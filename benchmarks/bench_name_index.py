@@ -0,0 +1,75 @@
+"""
+Benchmark name lookup, autocomplete and did-you-mean on dex-sized and larger name lists
+
+Usage: python -m benchmarks.bench_name_index [--sizes 1302 20000 100000] [--queries 2000]
+"""
+
+import argparse
+import random
+import time
+
+from app.services.name_index import NameIndex
+
+
+SYLLABLES = ['pi', 'ka', 'chu', 'char', 'man', 'der', 'bul', 'ba', 'saur', 'squir', 'tle', 'ee', 'vee', 'mew',
+             'two', 'gar', 'dos', 'lu', 'gia', 'ho', 'oh', 'ra', 'ti', 'as', 'go', 'lem', 'ma', 'chop', 'gen', 'gar']
+FORMS = ['', '', '', '', '-alola', '-galar', '-mega', '-gmax']
+
+
+def pokemon_names(count, seed=3):
+    """PokeAPI-style names (lowercase, dash-separated forms) that share prefixes like real ones do."""
+    rng = random.Random(seed)
+    names = set()
+    while len(names) < count:
+        names.add(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))) + rng.choice(FORMS))
+    return sorted(names)
+
+
+def typo(rng, name):
+    """One random deletion, insertion, substitution or swap."""
+    i = rng.randrange(len(name))
+    kind = rng.randrange(4)
+    if kind == 0:
+        return name[:i] + name[i + 1:]
+    if kind == 1:
+        return name[:i] + rng.choice('aeiou') + name[i:]
+    if kind == 2:
+        return name[:i] + rng.choice('xyz') + name[i + 1:]
+    return name[:i] + name[i + 1:i + 2] + name[i] + name[i + 2:] if i + 1 < len(name) else name[:-1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1302, 20000, 100000])
+    parser.add_argument('--queries', type=int, default=2000)
+    args = parser.parse_args()
+
+    print(f"{'names':>8s} {'build s':>8s} {'lookup us':>10s} {'complete us':>12s} {'suggest us':>11s} {'typo hit':>9s}")
+    for size in args.sizes:
+        names = pokemon_names(size)
+        rng = random.Random(size)
+        stored = [name.capitalize() for name in rng.sample(names, size // 10)]
+
+        t0 = time.perf_counter()
+        index = NameIndex(stored, names)
+        build = time.perf_counter() - t0
+
+        sample = rng.choices(names, k=args.queries)
+        spelled = [name.upper().replace('-', ' ') for name in sample]
+        prefixes = [name[:rng.randint(1, 5)] for name in sample]
+        typos = [typo(rng, name) for name in sample]
+
+        timings = []
+        for run in (lambda: [index.lookup(q) for q in spelled],
+                    lambda: [index.complete(q) for q in prefixes],
+                    lambda: [index.suggest(q) for q in typos]):
+            t0 = time.perf_counter()
+            results = run()
+            timings.append((time.perf_counter() - t0) * 1e6 / args.queries)
+        hits = sum(any(entry.api_name == name for entry in found) for name, found in zip(sample, results))
+        print(f"{size:8d} {build:8.2f} {timings[0]:10.1f} {timings[1]:12.1f} {timings[2]:11.1f} "
+              f"{hits / args.queries:9.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark browsing sessions against a slow PokeAPI with and without the background prefetcher
+
+Usage: python -m benchmarks.bench_prefetch [--dex 900] [--sessions 20] [--steps 5] [--latency-ms 60] [--think-ms 150] [--min-interval-ms 100]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+
+API = 'https://pokeapi.co/api/v2'
+CHAIN_LENGTH = 3
+
+
+class SlowDex:
+    """Synthetic dex in evolution chains of three, sleeping like a round trip to PokeAPI."""
+
+    def __init__(self, dex, latency: float):
+        self.dex = dex
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _request(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+        time.sleep(self.latency)
+
+    def get_pokemon(self, name):
+        from benchmarks.synthetic import raw_pokemon_payload
+
+        self._request('pokemon')
+        number = int(name) if name.isdigit() else int(name.lower().replace('synthmon', ''))
+        return raw_pokemon_payload(self.dex[number], moves=0) if number in self.dex else None
+
+    def get_pokemon_species(self, species_id):
+        self._request('species')
+        chain_id = (species_id - 1) // CHAIN_LENGTH + 1
+        return {
+            'id': species_id,
+            'name': f'synthmon{species_id}',
+            'evolution_chain': {'url': f'{API}/evolution-chain/{chain_id}/'},
+            'varieties': [{'is_default': True, 'pokemon': {'name': f'synthmon{species_id}'}}],
+        }
+
+    def get_evolution_chain(self, chain_id):
+        self._request('chain')
+        link = None
+        for species_id in reversed(range((chain_id - 1) * CHAIN_LENGTH + 1, chain_id * CHAIN_LENGTH + 1)):
+            link = {
+                'species': {'name': f'synthmon{species_id}', 'url': f'{API}/pokemon-species/{species_id}/'},
+                'evolution_details': [{'trigger': {'name': 'level-up'}, 'min_level': 16}],
+                'evolves_to': [link] if link else [],
+            }
+        return {'id': chain_id, 'chain': link}
+
+
+def browsing_sessions(dex_size, sessions, steps, seed=11):
+    """Each session opens a Pokemon, then hops to a family member or a pokedex neighbour."""
+    rng = random.Random(seed)
+    for _ in range(sessions):
+        current = rng.randint(1, dex_size)
+        path = [current]
+        for _ in range(steps):
+            if rng.random() < 0.5:
+                chain_start = (current - 1) // CHAIN_LENGTH * CHAIN_LENGTH + 1
+                current = rng.choice([n for n in range(chain_start, chain_start + CHAIN_LENGTH) if n != current])
+            else:
+                current = min(dex_size, max(1, current + rng.choice([-2, -1, 1, 2])))
+            path.append(current)
+        yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--dex', type=int, default=900)
+    parser.add_argument('--sessions', type=int, default=20)
+    parser.add_argument('--steps', type=int, default=5)
+    parser.add_argument('--latency-ms', type=float, default=60)
+    parser.add_argument('--think-ms', type=float, default=150)
+    parser.add_argument('--min-interval-ms', type=float, help='Gap between background fetches (default: MIN_INTERVAL)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['APP_ENV'] = 'testing'
+    for name in ('READ_MODEL', 'LOCAL_SPRITES'):
+        os.environ.pop(name, None)
+
+    from app import Base, Session, app, engine, init_db
+    from app import routes as routes_module
+    from app.services.prefetch import MIN_INTERVAL, Prefetcher
+    from benchmarks.synthetic import sanitized_pokemon
+
+    dex = {data['pokedex_number']: data for data in sanitized_pokemon(args.dex)}
+    paths = list(browsing_sessions(args.dex, args.sessions, args.steps))
+    client = app.test_client()
+
+    min_interval = MIN_INTERVAL if args.min_interval_ms is None else args.min_interval_ms / 1000
+    print(f"{len(paths)} sessions x {args.steps + 1} requests, {args.latency_ms:.0f} ms per PokeAPI call, "
+          f"{args.think_ms:.0f} ms think time, {min_interval * 1000:.0f} ms between background fetches\n")
+    print(f"{'prefetch':>9s} {'mean ms':>8s} {'p95 ms':>8s} {'misses':>7s} {'hits':>5s} {'prefetched':>11s} "
+          f"{'hit rate':>9s} {'upstream':>9s}")
+    for enabled in (False, True):
+        Base.metadata.drop_all(engine)
+        init_db()
+        pokeapi = SlowDex(dex, args.latency_ms / 1000)
+        prefetcher = Prefetcher(Session, pokeapi, min_interval=min_interval)
+        routes_module.pokeapi_service.get_pokemon = pokeapi.get_pokemon
+        routes_module.prefetcher = prefetcher
+        os.environ['PREFETCH'] = '1' if enabled else '0'
+
+        latencies = []
+        for path in paths:
+            for number in path:
+                t0 = time.perf_counter()
+                resp = client.get(f'/api/pokemon/synthmon{number}')
+                latencies.append(time.perf_counter() - t0)
+                assert resp.status_code in (200, 201), resp.get_json()
+                time.sleep(args.think_ms / 1000)
+        prefetcher.drain()
+
+        metrics = client.get('/api/prefetch/metrics').get_json()
+        latencies.sort()
+        print(f"{'on' if enabled else 'off':>9s} {sum(latencies) * 1000 / len(latencies):8.1f} "
+              f"{latencies[int(len(latencies) * 0.95)] * 1000:8.1f} "
+              f"{sum(1 for t in latencies if t >= args.latency_ms / 1000):7d} {metrics['hits']:5d} "
+              f"{metrics['prefetched']:11d} {metrics['hit_rate']:9.1%} {sum(pokeapi.calls.values()):9d}")
+
+
+if __name__ == '__main__':
+    main()
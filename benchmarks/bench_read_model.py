@@ -0,0 +1,71 @@
+"""
+Benchmark GET /api/pokemon and /info served from the in-memory read model vs SQLite
+
+Usage: python -m benchmarks.bench_read_model [--rows 20000] [--requests 200]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+QUERIES = [
+    '/api/pokemon?limit=50',
+    '/api/pokemon?type=fire&sort=-speed&limit=50',
+    '/api/pokemon?min_attack=100&max_speed=60&sort=-total,name&limit=20&offset=40',
+    '/api/pokemon?ability=ability-7&sort=name&limit=50',
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--requests', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['APP_ENV'] = 'testing'
+    os.environ.pop('READ_MODEL', None)
+
+    from app import Session, app, init_db
+    from app.models import Pokemon
+    from app.services.read_model import read_model_store
+    from benchmarks.synthetic import load
+
+    init_db()
+    session = Session()
+    load(session, args.rows)
+    session.commit()
+    names = [name.lower() for name, in random.Random(1).choices(session.query(Pokemon.name).all(), k=args.requests)]
+
+    t0 = time.perf_counter()
+    model = read_model_store.get(session)
+    print(f'Read model of {len(model)} Pokemon built in {time.perf_counter() - t0:.2f}s\n')
+    session.close()
+
+    client = app.test_client()
+    print(f"{'request':>72s} {'sqlite ms':>10s} {'memory ms':>10s}")
+    for label, urls in [(query, [query] * args.requests) for query in QUERIES] + [
+            ('/api/pokemon/<name>/info', [f'/api/pokemon/{name}/info' for name in names])]:
+        timings = []
+        for enabled in (False, True):
+            if enabled:
+                os.environ['READ_MODEL'] = '1'
+            else:
+                os.environ.pop('READ_MODEL', None)
+            responses = []
+            t0 = time.perf_counter()
+            for url in urls:
+                responses.append(client.get(url).get_json())
+            timings.append((time.perf_counter() - t0) * 1000 / len(urls))
+            if enabled:
+                assert responses == expected, label
+            expected = responses
+        print(f"{label:>72s} {timings[0]:10.2f} {timings[1]:10.2f}")
+
+
+if __name__ == '__main__':
+    main()
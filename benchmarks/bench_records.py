@@ -0,0 +1,49 @@
+"""
+Benchmark PokemonRecord against the sanitized dict form: memory per Pokemon and sanitize throughput
+
+Usage: python -m benchmarks.bench_records [--count 10000] [--repeat 3]
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+from app.services.data_processor import DataProcessor
+from benchmarks.synthetic import raw_pokemon_payload, sanitized_pokemon
+
+
+def measure(sanitize, payloads, repeat):
+    """(best microseconds per Pokemon, bytes held per Pokemon by the sanitized batch)."""
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for payload in payloads:
+            sanitize(payload)
+        runs.append((time.perf_counter() - t0) * 1e6 / len(payloads))
+
+    gc.collect()
+    tracemalloc.start()
+    batch = [sanitize(payload) for payload in payloads]
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del batch
+    return min(runs), held / len(payloads)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    payloads = [raw_pokemon_payload(data, moves=0) for data in sanitized_pokemon(args.count)]
+    print(f"{'form':>8s} {'us/pokemon':>11s} {'bytes/pokemon':>14s}")
+    for name, sanitize in (('dict', DataProcessor.sanitize_pokemon_data),
+                           ('record', DataProcessor.sanitize_pokemon_record)):
+        per_pokemon_us, held = measure(sanitize, payloads, args.repeat)
+        print(f'{name:>8s} {per_pokemon_us:11.2f} {held:14.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark how listing, stats and type search scale from 10k to 1M synthetic Pokemon
+
+Usage: python -m benchmarks.bench_scaling [--rows 10000 100000 1000000] [--repeat 10] [--like sqlite:///pokemon.db]
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+
+QUERIES = [
+    ('list page', '/api/pokemon?limit=50'),
+    ('list deep page', '/api/pokemon?sort=pokedex&limit=50&offset=500000'),
+    ('list top total', '/api/pokemon?sort=-total&limit=20'),
+    ('stats summary', '/api/stats'),
+    ('type search', '/api/pokemon?type=Fire&limit=50'),
+    ('dual type search', '/api/pokemon?type=Fire&type=Flying&sort=-speed&limit=50'),
+    ('type + stat filter', '/api/pokemon?type=Water&min_speed=100&sort=-attack&limit=50'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--like', help='Database URL to fit the synthetic distributions to')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['APP_ENV'] = 'testing'
+    os.environ.pop('READ_MODEL', None)
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app import Base, Session, app, engine, init_db
+    from benchmarks.synthetic import Distribution, load
+
+    distribution = Distribution.default()
+    if args.like:
+        like_session = sessionmaker(bind=create_engine(args.like))()
+        distribution = Distribution.from_session(like_session)
+        like_session.close()
+
+    client = app.test_client()
+    results = {}
+    for rows in args.rows:
+        Base.metadata.drop_all(engine)
+        init_db()
+        session = Session()
+        loaded = load(session, rows, distribution=distribution)
+        session.commit()
+        session.close()
+        print(f"Loaded {rows} Pokemon in {loaded['seconds']:.1f}s ({loaded['rows_per_second']:.0f} rows/s)")
+
+        for label, url in QUERIES:
+            timings = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                resp = client.get(url)
+                timings.append((time.perf_counter() - t0) * 1000)
+                assert resp.status_code == 200, resp.get_json()
+            results[label, rows] = statistics.median(timings)
+
+    print(f"\nmedian ms per request\n{'query':20s}" + ''.join(f'{rows:>10d}' for rows in args.rows))
+    for label, _ in QUERIES:
+        print(f'{label:20s}' + ''.join(f'{results[label, rows]:10.2f}' for rows in args.rows))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""
+Benchmark the selective /pokemon parse against json.loads on full-size payloads
+
+Usage: python -m benchmarks.bench_selective_json [--count 50] [--moves 90] [--repeat 5]
+"""
+
+import argparse
+import json
+import statistics
+import time
+import tracemalloc
+
+from app.services.data_processor import DataProcessor
+from app.services.selective_json import parse_pokemon
+from benchmarks.synthetic import raw_pokemon_payload, sanitized_pokemon
+
+
+def measure(parse, payloads, repeat):
+    """(median ms per payload over the best of `repeat` runs, median peak KiB, median retained KiB)."""
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for payload in payloads:
+            parse(payload)
+        runs.append((time.perf_counter() - t0) * 1000 / len(payloads))
+
+    peaks, retained = [], []
+    for payload in payloads:
+        tracemalloc.start()
+        result = parse(payload)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del result
+        peaks.append(peak / 1024)
+        retained.append(current / 1024)
+    return min(runs), statistics.median(peaks), statistics.median(retained)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--count', type=int, default=50)
+    parser.add_argument('--moves', type=int, default=90)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    payloads = [json.dumps(raw_pokemon_payload(data, moves=args.moves)).encode()
+                for data in sanitized_pokemon(args.count)]
+    for payload in payloads:
+        assert (DataProcessor.sanitize_pokemon_data(parse_pokemon(payload))
+                == DataProcessor.sanitize_pokemon_data(json.loads(payload)))
+    size_kib = statistics.median(len(payload) for payload in payloads) / 1024
+
+    print(f'{args.count} payloads, median {size_kib:.0f} KiB')
+    print(f"{'path':>14s} {'ms/pokemon':>11s} {'peak KiB':>9s} {'retained KiB':>13s}")
+    for name, parse in (('json.loads', json.loads), ('parse_pokemon', parse_pokemon)):
+        per_pokemon_ms, peak_kib, retained_kib = measure(parse, payloads, args.repeat)
+        print(f'{name:>14s} {per_pokemon_ms:11.2f} {peak_kib:9.0f} {retained_kib:13.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark the stat-vector similarity index at 1k/10k/100k Pokemon
+
+Usage: python -m benchmarks.bench_similarity [--sizes 1000,10000,100000] [--queries 200]
+"""
+
+import argparse
+import math
+import statistics
+import time
+
+import numpy as np
+
+from app.services.similarity import StatVectorIndex
+
+
+def python_nearest(rows, query, k):
+    """Baseline: scale and compare every row in a Python loop."""
+    scale = [statistics.pstdev(column) or 1.0 for column in zip(*(stats for _, stats in rows))]
+    scored = []
+    for pokemon_id, stats in rows:
+        scored.append((math.sqrt(sum(((a - b) / s) ** 2 for a, b, s in zip(stats, query, scale))), pokemon_id))
+    scored.sort()
+    return scored[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='1000,10000,100000')
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('-k', type=int, default=10)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(42)
+    print(f"{'rows':>7s} {'build ms':>9s} {'1 query ms':>11s} {'batch/query ms':>15s} "
+          f"{'upsert us':>10s} {'python loop ms':>15s}")
+    for size in (int(s) for s in args.sizes.split(',')):
+        stats = rng.integers(5, 200, size=(size, 6))
+        type_ids = rng.integers(1, 19, size=(size, 2))
+
+        t0 = time.perf_counter()
+        index = StatVectorIndex(np.arange(1, size + 1), stats, type_ids)
+        build_ms = (time.perf_counter() - t0) * 1000
+
+        query_ids = rng.integers(1, size + 1, size=args.queries)
+        timings = []
+        for pokemon_id in query_ids[:50]:
+            t0 = time.perf_counter()
+            index.similar_to(int(pokemon_id), args.k)
+            timings.append((time.perf_counter() - t0) * 1000)
+        single_ms = statistics.median(timings)
+
+        t0 = time.perf_counter()
+        for start in range(0, args.queries, 64):
+            index.nearest(stats[query_ids[start:start + 64] - 1], args.k)
+        batch_ms = (time.perf_counter() - t0) * 1000 / args.queries
+
+        t0 = time.perf_counter()
+        for i in range(1000):
+            index.upsert(size + 1 + i, stats[i], type_ids[i])
+        upsert_us = (time.perf_counter() - t0) * 1e6 / 1000
+
+        rows = list(zip(range(1, size + 1), stats.tolist()))
+        t0 = time.perf_counter()
+        python_nearest(rows, stats[0].tolist(), args.k)
+        python_ms = (time.perf_counter() - t0) * 1000
+
+        print(f'{size:7d} {build_ms:9.1f} {single_ms:11.2f} {batch_ms:15.3f} {upsert_us:10.1f} {python_ms:15.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark dex snapshot lookups and listing against the ORM on a synthetic database
+
+Usage: python -m benchmarks.bench_snapshot [--rows 100000] [--lookups 2000]
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--lookups', type=int, default=2000)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['APP_ENV'] = 'testing'
+
+    from app import Session, init_db
+    from app.models import Pokemon
+    from app.services.snapshot import DexSnapshot, write_snapshot
+    from benchmarks.synthetic import load
+
+    init_db()
+    session = Session()
+    load(session, args.rows)
+    session.commit()
+
+    path = os.path.join(workdir, 'dex.snap')
+    t0 = time.perf_counter()
+    written = write_snapshot(session, path)
+    print(f"Snapshot of {written['count']} Pokemon: {written['bytes'] / 2**20:.1f} MiB, "
+          f"written in {time.perf_counter() - t0:.1f}s\n")
+    names = random.Random(1).choices(session.query(Pokemon.name).all(), k=args.lookups)
+    names = [name for name, in names]
+
+    def orm_list():
+        session.expunge_all()
+        return [(p.pokedex_number, p.name, [t.type_name for t in p.types])
+                for p in session.query(Pokemon).order_by(Pokemon.pokedex_number)]
+
+    def orm_lookups():
+        session.expunge_all()
+        return [session.query(Pokemon).filter_by(name=name).first().to_dict() for name in names]
+
+    def snapshot_open():
+        DexSnapshot(path).close()
+
+    def snapshot_list():
+        with DexSnapshot(path) as snapshot:
+            return list(snapshot.listing())
+
+    def snapshot_lookups():
+        with DexSnapshot(path) as snapshot:
+            return [snapshot.get(name) for name in names]
+
+    print(f"{'operation':>22s} {'seconds':>8s}")
+    for label, run in (('orm list', orm_list), ('snapshot open', snapshot_open),
+                       ('snapshot list', snapshot_list), (f'orm {args.lookups} lookups', orm_lookups),
+                       (f'snapshot {args.lookups} lookups', snapshot_lookups)):
+        t0 = time.perf_counter()
+        run()
+        print(f"{label:>22s} {time.perf_counter() - t0:8.3f}")
+    session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark species + evolution-chain ingestion: concurrent fan-out with chain dedup vs one request at a time
+
+Usage: python -m benchmarks.bench_species [--species 300] [--latency-ms 20] [--workers 1 8 32]
+"""
+
+import argparse
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import EvolutionClosure
+from app.models.pokemon import Base
+from app.services.species import SpeciesRepository
+
+
+API = 'https://pokeapi.co/api/v2'
+CHAIN_LENGTH = 3
+
+
+class SlowPokeAPI:
+    """Serves synthetic species in chains of three, sleeping like a round trip to PokeAPI."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _request(self, kind):
+        with self._lock:
+            self.calls[kind] += 1
+        time.sleep(self.latency)
+
+    def get_pokemon_species(self, species_id):
+        self._request('species')
+        chain_id = (species_id - 1) // CHAIN_LENGTH + 1
+        return {
+            'id': species_id,
+            'name': f'species-{species_id}',
+            'evolution_chain': {'url': f'{API}/evolution-chain/{chain_id}/'},
+            'generation': {'url': f'{API}/generation/1/'},
+            'flavor_text_entries': [{'flavor_text': 'A synthetic Pokemon.', 'language': {'name': 'en'}}],
+            'varieties': [{'is_default': True, 'pokemon': {'name': f'species-{species_id}'}}],
+        }
+
+    def get_evolution_chain(self, chain_id):
+        self._request('chain')
+        link = None
+        for species_id in reversed(range((chain_id - 1) * CHAIN_LENGTH + 1, chain_id * CHAIN_LENGTH + 1)):
+            link = {
+                'species': {'name': f'species-{species_id}', 'url': f'{API}/pokemon-species/{species_id}/'},
+                'evolution_details': [{'trigger': {'name': 'level-up'}, 'min_level': 16}],
+                'evolves_to': [link] if link else [],
+            }
+        return {'id': chain_id, 'chain': link}
+
+
+def one_at_a_time(session, pokeapi, species_ids):
+    """The obvious loop: species, then its chain, for every species in turn."""
+    from app.services import DataProcessor
+
+    for species_id in species_ids:
+        species = DataProcessor.sanitize_species_data(pokeapi.get_pokemon_species(species_id))
+        chain = DataProcessor.sanitize_evolution_chain(pokeapi.get_evolution_chain(species['evolution_chain_id']))
+        SpeciesRepository.store_chain(session, chain)
+        SpeciesRepository.store_species(session, species)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--species', type=int, default=300)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+    species_ids = list(range(1, args.species + 1))
+
+    print(f"{'strategy':>22s} {'requests':>9s} {'seconds':>8s} {'closure rows':>13s}")
+    runs = [('one at a time', None)] + [(f'fan-out, {workers} workers', workers) for workers in args.workers]
+    for label, workers in runs:
+        engine = create_engine('sqlite:///:memory:')
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        pokeapi = SlowPokeAPI(args.latency_ms / 1000)
+
+        t0 = time.perf_counter()
+        if workers is None:
+            one_at_a_time(session, pokeapi, species_ids)
+        else:
+            SpeciesRepository.fetch_all(session, pokeapi, species_ids, workers=workers)
+        session.commit()
+        seconds = time.perf_counter() - t0
+
+        closure = session.query(EvolutionClosure).count()
+        print(f"{label:>22s} {sum(pokeapi.calls.values()):9d} {seconds:8.2f} {closure:13d}")
+        session.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Benchmark the sprite cache: concurrent, deduplicated downloads and serving with ETag revalidation
+
+Usage: python -m benchmarks.bench_sprites [--rows 1302] [--latency-ms 20] [--workers 1 8 32]
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+
+class SlowSpriteHost:
+    """Serves a ~20 KB PNG per URL, sleeping like a round trip to GitHub's raw host."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, url):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        seed = hashlib.sha256(url.encode()).digest()
+        return b'\x89PNG\r\n\x1a\n' + seed * 640
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1302)
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 8, 32])
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    os.environ['APP_ENV'] = 'testing'
+    os.environ['LOCAL_SPRITES'] = '1'
+    os.environ.pop('READ_MODEL', None)
+
+    from sqlalchemy import update
+    from app import Session, app, init_db
+    from app import routes as routes_module
+    from app.models import Pokemon
+    from app.services import DataProcessor, PokemonRepository
+    from app.services.sprites import SpriteStore, download_sprites
+    from benchmarks.synthetic import raw_pokemon_payload, sanitized_pokemon
+
+    init_db()
+    session = Session()
+    PokemonRepository.bulk_insert(session, DataProcessor.sanitize_many(
+        raw_pokemon_payload(data, moves=0) for data in sanitized_pokemon(args.rows)
+    ))
+    session.commit()
+    urls = {url for url, in session.query(Pokemon.sprite_url)}
+
+    print(f"{args.rows} Pokemon, {len(urls)} distinct sprite URLs, {args.latency_ms:.0f} ms per request\n")
+    print(f"{'workers':>8s} {'requests':>9s} {'seconds':>8s} {'sprites/s':>10s}")
+    for workers in args.workers:
+        session.execute(update(Pokemon).values(sprite_hash=None))
+        session.commit()
+        root = os.path.join(workdir, f'sprites-{workers}')
+        host = SlowSpriteHost(args.latency_ms / 1000)
+        t0 = time.perf_counter()
+        result = download_sprites(session, SpriteStore(root), host, workers=workers)
+        session.commit()
+        elapsed = time.perf_counter() - t0
+        print(f"{workers:8d} {host.calls:9d} {elapsed:8.2f} {result['pokemon'] / elapsed:10.0f}")
+
+    routes_module.sprite_store = SpriteStore(root)
+    client = app.test_client()
+    sprite_urls = [p['sprite_url'] for p in client.get('/api/pokemon?limit=200').get_json()['pokemon']]
+    etags = {}
+
+    t0 = time.perf_counter()
+    for url in sprite_urls:
+        etags[url] = client.get(url).headers['ETag']
+    full = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    statuses = {client.get(url, headers={'If-None-Match': etags[url]}).status_code for url in sprite_urls}
+    revalidate = time.perf_counter() - t0
+
+    print(f"\n{'GET /sprites/<hash>':>24s} {'ms':>8s}")
+    print(f"{'200 with body':>24s} {full * 1000 / len(sprite_urls):8.3f}")
+    print(f"{'304 revalidation':>24s} {revalidate * 1000 / len(sprite_urls):8.3f}  {sorted(statuses)}")
+    session.close()
+    shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+"""
+PokeAPI Stand-in - Local HTTP server replaying recorded PokeAPI responses, with injected faults
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import argparse
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import urlsplit
+
+import requests
+
+
+logger = logging.getLogger(__name__)
+
+
+API_PREFIX = '/api/v2'
+UPSTREAM = 'https://pokeapi.co/api/v2'
+
+
+class FixtureStore:
+    """Response bodies on disk, one file per resource: /api/v2/pokemon/pikachu is pokemon/pikachu.json.
+
+    A bare list URL (/api/v2/pokemon?limit=100000) is pokemon.json. Bodies are kept byte
+    for byte, so a replay parses exactly like the recorded response did.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def path(self, key: str) -> Optional[str]:
+        parts = [part for part in key.strip('/').lower().split('/') if part]
+        if not parts or any(part in ('.', '..') or '\\' in part for part in parts):
+            return None
+        return os.path.join(self.root, *parts[:-1], parts[-1] + '.json')
+
+    def load(self, key: str) -> Optional[bytes]:
+        path = self.path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        with open(path, 'rb') as handle:
+            return handle.read()
+
+    def save(self, key: str, body: bytes):
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        with os.fdopen(fd, 'wb') as handle:
+            handle.write(body)
+        os.replace(temp_path, path)
+
+    def save_json(self, key: str, data: Any):
+        self.save(key, json.dumps(data).encode())
+
+
+class PokeAPIStandIn:
+    """A ThreadingHTTPServer that answers PokeAPI GETs from a FixtureStore.
+
+    Faults are drawn per request from a seeded generator: `rate_limit_rate` of requests
+    get a 429 with Retry-After, `error_rate` a 500, and every request waits `latency_ms`
+    plus up to `jitter_ms`. With `record`, a resource missing from the fixtures is fetched
+    from `upstream`, saved, and served; without it the answer is PokeAPI's 404.
+    """
+
+    def __init__(self, fixtures: str, record: bool = False, upstream: str = UPSTREAM, host: str = '127.0.0.1',
+                 port: int = 0, latency_ms: float = 0.0, jitter_ms: float = 0.0, error_rate: float = 0.0,
+                 rate_limit_rate: float = 0.0, retry_after: int = 0, seed: int = 0):
+        self.store = FixtureStore(fixtures)
+        self.record = record
+        self.upstream = upstream.rstrip('/')
+        self.latency = latency_ms / 1000
+        self.jitter = jitter_ms / 1000
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.counts = dict.fromkeys(('requests', 'served', 'recorded', 'not_found', 'errors', 'rate_limited'), 0)
+        self._server = ThreadingHTTPServer((host, port), _handler(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        """What to set POKEAPI_BASE_URL (or PokeAPIService(base_url=...)) to."""
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}{API_PREFIX}'
+
+    def start(self) -> 'PokeAPIStandIn':
+        # a short poll interval so stop() returns promptly; tests start and stop servers a lot
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05},
+                                        name='pokeapi-standin', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve(self):
+        """Serve on the calling thread until interrupted."""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def _count(self, key: str):
+        with self._lock:
+            self.counts[key] += 1
+
+    def respond(self, path: str):
+        """(status, headers, body) for one GET."""
+        self._count('requests')
+        with self._lock:
+            delay = self.latency + self._rng.random() * self.jitter
+            draw = self._rng.random()
+        if delay:
+            time.sleep(delay)
+        if draw < self.rate_limit_rate:
+            self._count('rate_limited')
+            return 429, {'Retry-After': str(self.retry_after)}, b'Too Many Requests'
+        if draw < self.rate_limit_rate + self.error_rate:
+            self._count('errors')
+            return 500, {}, b'Internal Server Error'
+
+        key = urlsplit(path).path
+        if not key.startswith(API_PREFIX):
+            self._count('not_found')
+            return 404, {}, b'Not Found'
+        key = key[len(API_PREFIX):]
+        body = self.store.load(key)
+        if body is None and self.record and self.store.path(key) is not None:
+            body = self._record(key)
+        if body is None:
+            self._count('not_found')
+            return 404, {}, b'Not Found'
+        self._count('served')
+        return 200, {'Content-Type': 'application/json; charset=utf-8'}, body
+
+    def _record(self, key: str) -> Optional[bytes]:
+        # the name list is the one resource PokeAPI pages; ask for all of it like get_pokemon_names does
+        params = {'limit': 100000} if '/' not in key.strip('/') else None
+        try:
+            response = requests.get(self.upstream + key, params=params, timeout=30)
+        except requests.exceptions.RequestException as e:
+            logger.warning('Recording %s failed: %s', key, e)
+            return None
+        if response.status_code != 200:
+            return None
+        self.store.save(key, response.content)
+        self._count('recorded')
+        return response.content
+
+
+def _handler(standin: PokeAPIStandIn):
+    class Handler(BaseHTTPRequestHandler):
+        # keep-alive, so a requests.Session reuses its connections as it would against PokeAPI
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            status, headers, body = standin.respond(self.path)
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            logger.debug('%s %s', self.address_string(), format % args)
+
+    return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve recorded PokeAPI responses locally')
+    parser.add_argument('--fixtures', required=True, help='Folder of recorded responses')
+    parser.add_argument('--record', action='store_true', help='Fetch and save resources missing from the fixtures')
+    parser.add_argument('--upstream', default=UPSTREAM)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Share of requests answered with a 500')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Share of requests answered with a 429')
+    parser.add_argument('--retry-after', type=int, default=0, help='Retry-After seconds sent with each 429')
+    args = parser.parse_args()
+
+    standin = PokeAPIStandIn(args.fixtures, args.record, args.upstream, args.host, args.port, args.latency_ms,
+                             args.jitter_ms, args.error_rate, args.rate_limit_rate, args.retry_after)
+    print(f"Serving {args.fixtures} at {standin.base_url}" + (" (recording)" if args.record else ""))
+    print(f"Point the app at it with POKEAPI_BASE_URL={standin.base_url}")
+    standin.serve()
+    print(f"Requests: {standin.counts}")
+
+
+if __name__ == '__main__':
+    main()
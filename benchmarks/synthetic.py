@@ -0,0 +1,441 @@
+"""
+Synthetic Pokemon - Realistic generated datasets (10k to 1M rows) for benchmarks
+Author: Vilmar Junior
+Project: Challenge Assignment
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+TYPES = ['Normal', 'Fire', 'Water', 'Electric', 'Grass', 'Ice', 'Fighting', 'Poison', 'Ground',
+         'Flying', 'Psychic', 'Bug', 'Rock', 'Ghost', 'Dragon', 'Dark', 'Steel', 'Fairy']
+ABILITIES = [f'Ability {i}' for i in range(300)]
+STAT_NAMES = ['HP', 'ATTACK', 'DEFENSE', 'SPECIAL ATTACK', 'SPECIAL DEFENSE', 'SPEED']
+
+# rough shape of the real dex (~1,000 default forms), used when there's no stored data to fit
+PRIMARY_TYPE_COUNTS = [118, 68, 135, 62, 103, 33, 45, 40, 37, 10, 70, 87, 55, 34, 34, 42, 33, 24]
+SECONDARY_TYPE_COUNTS = [6, 18, 14, 13, 19, 19, 36, 36, 37, 105, 45, 5, 17, 24, 33, 33, 26, 33]
+DUAL_TYPE_RATE = 0.52
+ABILITY_COUNT_WEIGHTS = [0.12, 0.33, 0.55]  # one, two or three abilities; the last of two or three is hidden
+STAT_MEAN = [70.0, 80.0, 75.0, 72.0, 72.0, 68.0]
+STAT_STD = [26.0, 32.0, 30.0, 32.0, 27.0, 29.0]
+STAT_CORRELATION = 0.35
+# log(height), log(weight), base_experience
+SIZE_MEAN = [2.4, 3.9, 150.0]
+SIZE_COV = [[0.45, 0.70, 20.0], [0.70, 1.60, 40.0], [20.0, 40.0, 6400.0]]
+# stored Pokemon needed before Distribution.from_session fits them rather than using the defaults
+MIN_SAMPLE = 30
+CHUNK_SIZE = 5000
+
+
+@dataclass
+class Distribution:
+    """What synthetic Pokemon are drawn from: type combinations and abilities by frequency,
+    base stats from a multivariate normal (so strong Pokemon are strong across the board),
+    and height/weight/base experience from a normal over (log height, log weight, base experience).
+    """
+
+    type_combos: List[Tuple[str, ...]]
+    type_weights: np.ndarray
+    abilities: List[str]
+    ability_weights: np.ndarray
+    ability_counts: np.ndarray
+    stat_mean: np.ndarray
+    stat_cov: np.ndarray
+    size_mean: np.ndarray
+    size_cov: np.ndarray
+    # set by from_session when the stored Pokemon were enough to fit
+    fitted: bool = False
+
+    @classmethod
+    def default(cls) -> 'Distribution':
+        combos, weights = [], []
+        primary = np.array(PRIMARY_TYPE_COUNTS) / sum(PRIMARY_TYPE_COUNTS)
+        secondary = np.array(SECONDARY_TYPE_COUNTS) / sum(SECONDARY_TYPE_COUNTS)
+        for i, first in enumerate(TYPES):
+            combos.append((first,))
+            weights.append(primary[i] * (1 - DUAL_TYPE_RATE))
+            for j, second in enumerate(TYPES):
+                if i != j:
+                    combos.append((first, second))
+                    weights.append(primary[i] * DUAL_TYPE_RATE * secondary[j] / (1 - secondary[i]))
+        std = np.array(STAT_STD)
+        correlation = np.full((len(STAT_NAMES), len(STAT_NAMES)), STAT_CORRELATION)
+        np.fill_diagonal(correlation, 1.0)
+        # a few abilities (Levitate, Intimidate...) are common and most are rare
+        ability_weights = 1 / np.arange(1, len(ABILITIES) + 1) ** 0.8
+        return cls(combos, _normalized(weights), list(ABILITIES), _normalized(ability_weights),
+                   np.array(ABILITY_COUNT_WEIGHTS), np.array(STAT_MEAN), correlation * np.outer(std, std),
+                   np.array(SIZE_MEAN), np.array(SIZE_COV))
+
+    @classmethod
+    def from_session(cls, session, min_sample: int = MIN_SAMPLE) -> 'Distribution':
+        """Fit the stored Pokemon; the defaults when fewer than `min_sample` have all six stats.
+
+        Types, abilities and sizes fall back to the defaults on their own when nothing stored
+        has them (e.g. a dex loaded without abilities), so no weight is ever NaN.
+        """
+        from app.models import AbilityName, Pokemon, PokemonAbility, PokemonType, STAT_COLUMNS, TypeName
+
+        stat_columns = [getattr(Pokemon, STAT_COLUMNS[name]) for name in STAT_NAMES]
+        rows = np.array(
+            session.query(*stat_columns, Pokemon.height, Pokemon.weight, Pokemon.base_experience)
+            .filter(*(column.isnot(None) for column in stat_columns)).all(),
+            dtype=float
+        ).reshape(-1, len(STAT_NAMES) + 3)
+        if len(rows) < min_sample:
+            return cls.default()
+
+        combos = {}
+        for pokemon_id, type_name in (session.query(PokemonType.pokemon_id, TypeName.name)
+                                      .join(TypeName, PokemonType.type_id == TypeName.id)
+                                      .order_by(PokemonType.pokemon_id, PokemonType.slot)):
+            combos.setdefault(pokemon_id, []).append(type_name)
+        combo_counts = Counter(tuple(types) for types in combos.values())
+
+        ability_counts, per_pokemon = Counter(), Counter()
+        for pokemon_id, ability_name in (session.query(PokemonAbility.pokemon_id, AbilityName.name)
+                                         .join(AbilityName, PokemonAbility.ability_id == AbilityName.id)):
+            ability_counts[ability_name] += 1
+            per_pokemon[pokemon_id] += 1
+        abilities_each = Counter(min(count, 3) for count in per_pokemon.values())
+
+        default = cls.default()
+        sizes = rows[:, len(STAT_NAMES):]
+        sizes = sizes[(sizes[:, 0] > 0) & (sizes[:, 1] > 0)]
+        sizes = np.column_stack([np.log(sizes[:, 0]), np.log(sizes[:, 1]), sizes[:, 2]])
+        stats = rows[:, :len(STAT_NAMES)]
+        fitted = cls(default.type_combos, default.type_weights, default.abilities, default.ability_weights,
+                     default.ability_counts, stats.mean(axis=0), np.cov(stats, rowvar=False),
+                     default.size_mean, default.size_cov, fitted=True)
+        if combo_counts:
+            fitted.type_combos, fitted.type_weights = list(combo_counts), _normalized(list(combo_counts.values()))
+        if ability_counts:
+            fitted.abilities, fitted.ability_weights = list(ability_counts), _normalized(list(ability_counts.values()))
+            fitted.ability_counts = _normalized([abilities_each[k] for k in (1, 2, 3)])
+        if len(sizes) >= min_sample:
+            fitted.size_mean, fitted.size_cov = sizes.mean(axis=0), np.cov(sizes, rowvar=False)
+        return fitted
+
+    def batch(self, start: int, count: int, rng: np.random.Generator):
+        """PokemonBatch of Synthmon{start}..Synthmon{start + count - 1}, drawn in one go per column."""
+        from app.services.pokemon_record import PokemonBatch
+
+        batch = PokemonBatch()
+        numbers = range(start, start + count)
+        batch.names = [f'Synthmon{n}' for n in numbers]
+        batch.pokedex_numbers = list(numbers)
+        batch.sprite_urls = [f'https://example.com/sprites/{n}.png' for n in numbers]
+
+        sizes = rng.multivariate_normal(self.size_mean, self.size_cov, size=count)
+        batch.heights = np.clip(np.rint(np.exp(sizes[:, 0])), 1, 200).astype(int).tolist()
+        batch.weights = np.clip(np.rint(np.exp(sizes[:, 1])), 1, 9999).astype(int).tolist()
+        batch.base_experiences = np.clip(np.rint(sizes[:, 2]), 30, 400).astype(int).tolist()
+
+        stats = np.clip(np.rint(rng.multivariate_normal(self.stat_mean, self.stat_cov, size=count)), 5, 255)
+        batch.stats.frombytes(stats.astype(np.int16).tobytes())
+        # effort goes to the best stat, as it mostly does in the games
+        efforts = np.zeros((count, len(STAT_NAMES)), dtype=np.uint8)
+        efforts[np.arange(count), stats.argmax(axis=1)] = rng.integers(1, 4, size=count)
+        batch.efforts.frombytes(efforts.tobytes())
+
+        for row, combo in enumerate(rng.choice(len(self.type_combos), size=count, p=self.type_weights)):
+            for slot, type_name in enumerate(self.type_combos[combo], 1):
+                batch.type_parent.append(row)
+                batch.type_names.append(type_name)
+                batch.type_slots.append(slot)
+
+        # weighted picks without repeats: the top k of log(weight) plus Gumbel noise
+        keys = np.log(self.ability_weights) + rng.gumbel(size=(count, len(self.abilities)))
+        picks = np.argsort(-keys, axis=1)[:, :3]
+        ability_sizes = np.minimum(rng.choice(np.arange(1, 4), size=count, p=self.ability_counts), picks.shape[1])
+        for row, (picked, size) in enumerate(zip(picks.tolist(), ability_sizes.tolist())):
+            for i in range(size):
+                hidden = size > 1 and i == size - 1
+                batch.ability_parent.append(row)
+                batch.ability_names.append(self.abilities[picked[i]])
+                batch.ability_hidden.append(hidden)
+                batch.ability_slots.append(3 if hidden else i + 1)
+        return batch
+
+
+def _normalized(weights) -> np.ndarray:
+    weights = np.asarray(weights, dtype=float)
+    return weights / weights.sum()
+
+
+def batches(count: int, distribution: Optional[Distribution] = None, seed: int = 42, start: int = 1,
+            chunk_size: int = CHUNK_SIZE) -> Iterator[Any]:
+    """PokemonBatches of up to `chunk_size`, `count` Pokemon in all, numbered from `start`."""
+    distribution = distribution or Distribution.default()
+    rng = np.random.default_rng(seed)
+    for offset in range(0, count, chunk_size):
+        yield distribution.batch(start + offset, min(chunk_size, count - offset), rng)
+
+
+def sanitized_pokemon(count: int, seed: int = 42, distribution: Optional[Distribution] = None,
+                      start: int = 1) -> Iterator[Dict[str, Any]]:
+    """Yield `count` DataProcessor-shaped dicts drawn from `distribution` (the defaults if None)."""
+    for batch in batches(count, distribution, seed, start):
+        for position in range(len(batch)):
+            yield batch.record(position).as_sanitized()
+
+
+def raw_payloads(count: int, seed: int = 42, distribution: Optional[Distribution] = None, start: int = 1,
+                 moves: int = 0) -> Iterator[Dict[str, Any]]:
+    """PokeAPI /pokemon payloads for the same Pokemon sanitized_pokemon() yields, for DataProcessor."""
+    for data in sanitized_pokemon(count, seed, distribution, start):
+        yield raw_pokemon_payload(data, moves)
+
+
+def load(session, count: int, seed: int = 42, distribution: Optional[Distribution] = None, start: int = 1,
+         chunk_size: int = CHUNK_SIZE, defer_indexes: bool = True) -> Dict[str, Any]:
+    """Bulk-load `count` synthetic Pokemon through PokemonRepository.bulk_insert, skipping payloads
+    and DataProcessor entirely. Like import_pokemon, secondary indexes are dropped for the load and
+    rebuilt once at the end, and nothing is committed.
+    """
+    from app.services import PokemonRepository
+    from app.services.importer import INDEXED_MODELS
+
+    started = time.perf_counter()
+    connection = session.connection()
+    indexes = [index for model in INDEXED_MODELS for index in model.__table__.indexes] if defer_indexes else []
+    for index in indexes:
+        index.drop(connection, checkfirst=True)
+    for batch in batches(count, distribution, seed, start, chunk_size):
+        PokemonRepository.bulk_insert(session, batch)
+    for index in indexes:
+        index.create(connection, checkfirst=True)
+    elapsed = time.perf_counter() - started
+    return {'loaded': count, 'seconds': elapsed, 'rows_per_second': count / elapsed if elapsed else 0.0}
+
+
+# attacking type -> (double damage to, half damage to, no damage to), as in PokeAPI's damage_relations
+TYPE_RELATIONS = {
+    'normal': ([], ['rock', 'steel'], ['ghost']),
+    'fighting': (['normal', 'ice', 'rock', 'dark', 'steel'], ['poison', 'flying', 'psychic', 'bug', 'fairy'], ['ghost']),
+    'flying': (['fighting', 'bug', 'grass'], ['rock', 'steel', 'electric'], []),
+    'poison': (['grass', 'fairy'], ['poison', 'ground', 'rock', 'ghost'], ['steel']),
+    'ground': (['poison', 'rock', 'steel', 'fire', 'electric'], ['bug', 'grass'], ['flying']),
+    'rock': (['flying', 'bug', 'fire', 'ice'], ['fighting', 'ground', 'steel'], []),
+    'bug': (['grass', 'psychic', 'dark'], ['fighting', 'flying', 'poison', 'ghost', 'steel', 'fire', 'fairy'], []),
+    'ghost': (['ghost', 'psychic'], ['dark'], ['normal']),
+    'steel': (['rock', 'ice', 'fairy'], ['steel', 'fire', 'water', 'electric'], []),
+    'fire': (['bug', 'steel', 'grass', 'ice'], ['rock', 'fire', 'water', 'dragon'], []),
+    'water': (['ground', 'rock', 'fire'], ['water', 'grass', 'dragon'], []),
+    'grass': (['ground', 'rock', 'water'], ['flying', 'poison', 'bug', 'steel', 'fire', 'grass', 'dragon'], []),
+    'electric': (['flying', 'water'], ['grass', 'electric', 'dragon'], ['ground']),
+    'psychic': (['fighting', 'poison'], ['steel', 'psychic'], ['dark']),
+    'ice': (['flying', 'ground', 'grass', 'dragon'], ['steel', 'fire', 'water', 'ice'], []),
+    'dragon': (['dragon'], ['steel'], ['fairy']),
+    'dark': (['ghost', 'psychic'], ['fighting', 'dark', 'fairy'], []),
+    'fairy': (['fighting', 'dragon', 'dark'], ['poison', 'steel', 'fire'], []),
+}
+
+
+def raw_type_payloads() -> Iterator[Dict[str, Any]]:
+    """The real type chart as PokeAPI /type/<name> payloads (damage relations only)."""
+    for name, (double, half, none) in TYPE_RELATIONS.items():
+        yield {
+            'name': name,
+            'damage_relations': {
+                'double_damage_to': [{'name': t} for t in double],
+                'half_damage_to': [{'name': t} for t in half],
+                'no_damage_to': [{'name': t} for t in none],
+            }
+        }
+
+
+def type_chart():
+    """TypeChart of the real chart with type ids 1-18 in STANDARD_TYPES order, no database needed."""
+    import numpy as np
+    from app.services import DataProcessor
+    from app.services.type_chart import STANDARD_TYPES, TypeChart
+
+    type_ids = {name: i for i, name in enumerate(STANDARD_TYPES, 1)}
+    matrix = np.ones((len(STANDARD_TYPES), len(STANDARD_TYPES)))
+    for raw in raw_type_payloads():
+        data = DataProcessor.sanitize_type_data(raw)
+        for defending, multiplier in data['damage_to'].items():
+            matrix[type_ids[data['type_name']] - 1, type_ids[defending] - 1] = multiplier
+    return TypeChart(type_ids.values(), STANDARD_TYPES, matrix)
+
+
+def stat_matrix(count: int, seed: int = 42):
+    """StatMatrix of `count` synthetic Pokemon, with type ids matching type_chart()."""
+    import numpy as np
+    from app.services.stat_matrix import RECORD_DTYPE, StatMatrix
+    from app.services.type_chart import STANDARD_TYPES
+
+    type_ids = {name: i for i, name in enumerate(STANDARD_TYPES, 1)}
+    records = np.zeros(count, dtype=RECORD_DTYPE)
+    for i, data in enumerate(sanitized_pokemon(count, seed)):
+        records[i]['id'] = i + 1
+        records[i]['stats'] = [s['base_stat'] for s in data['stats']]
+        for slot, type_data in enumerate(data['types']):
+            records[i]['type_ids'][slot] = type_ids[type_data['type_name']]
+    return StatMatrix(records)
+
+
+VERSION_GROUPS = ['red-blue', 'yellow', 'gold-silver', 'crystal', 'ruby-sapphire', 'emerald', 'firered-leafgreen',
+                  'diamond-pearl', 'platinum', 'heartgold-soulsilver', 'black-white', 'black-2-white-2', 'x-y',
+                  'omega-ruby-alpha-sapphire', 'sun-moon', 'ultra-sun-ultra-moon', 'sword-shield', 'scarlet-violet']
+GENERATIONS = {
+    'generation-i': ['red-blue', 'yellow'],
+    'generation-ii': ['crystal', 'gold', 'silver'],
+    'generation-iii': ['emerald', 'firered-leafgreen', 'ruby-sapphire'],
+    'generation-iv': ['diamond-pearl', 'heartgold-soulsilver', 'platinum'],
+    'generation-v': ['black-white'],
+    'generation-vi': ['omegaruby-alphasapphire', 'x-y'],
+    'generation-vii': ['icons', 'ultra-sun-ultra-moon'],
+    'generation-viii': ['icons'],
+}
+API = 'https://pokeapi.co/api/v2'
+
+
+def _ref(kind: str, name: str, i: int) -> Dict[str, str]:
+    return {'name': name, 'url': f'{API}/{kind}/{i}/'}
+
+
+def raw_pokemon_payload(data: Dict[str, Any], moves: int = 90, seed: int = 0) -> Dict[str, Any]:
+    """A full-size PokeAPI /pokemon payload for one sanitized_pokemon() dict.
+
+    Besides the fields DataProcessor reads it carries the bulk a real payload has: ~90
+    moves with per-version learn details, game indices, and the sprites.versions tree.
+    """
+    rng = random.Random(seed or data['pokedex_number'])
+    number = data['pokedex_number']
+    sprite = f'https://raw.githubusercontent.com/PokeAPI/sprites/master/sprites/pokemon/{number}.png'
+    sprite_set = {key: sprite.replace('/pokemon/', f'/pokemon/{key}/') for key in (
+        'back_default', 'back_female', 'back_shiny', 'back_shiny_female',
+        'front_default', 'front_female', 'front_shiny', 'front_shiny_female')}
+    return {
+        'abilities': [
+            {'ability': _ref('ability', a['ability_name'].lower().replace(' ', '-'), i + 1),
+             'is_hidden': a['is_hidden'], 'slot': a['slot']}
+            for i, a in enumerate(data['abilities'])
+        ],
+        'base_experience': data['base_experience'],
+        'cries': {'latest': f'https://raw.githubusercontent.com/PokeAPI/cries/main/cries/pokemon/latest/{number}.ogg',
+                  'legacy': f'https://raw.githubusercontent.com/PokeAPI/cries/main/cries/pokemon/legacy/{number}.ogg'},
+        'forms': [_ref('pokemon-form', data['name'].lower(), number)],
+        'game_indices': [
+            {'game_index': number, 'version': _ref('version', version, i + 1)}
+            for i, version in enumerate(VERSION_GROUPS)
+        ],
+        'height': data['height'],
+        'held_items': [],
+        'id': number,
+        'is_default': True,
+        'location_area_encounters': f'{API}/pokemon/{number}/encounters',
+        'moves': [
+            {
+                'move': _ref('move', f'move-{m}', m),
+                'version_group_details': [
+                    {'level_learned_at': rng.randint(0, 60),
+                     'move_learn_method': _ref('move-learn-method', rng.choice(['level-up', 'machine', 'egg', 'tutor']), 1),
+                     'order': None,
+                     'version_group': _ref('version-group', group, g + 1)}
+                    for g, group in enumerate(rng.sample(VERSION_GROUPS, rng.randint(3, 12)))
+                ]
+            }
+            for m in rng.sample(range(1, 920), moves)
+        ],
+        'name': data['name'].lower(),
+        'order': number,
+        'past_abilities': [],
+        'past_types': [],
+        'species': _ref('pokemon-species', data['name'].lower(), number),
+        'sprites': dict(
+            sprite_set,
+            other={
+                'dream_world': {'front_default': sprite.replace('.png', '.svg'), 'front_female': None},
+                'home': dict(sprite_set),
+                'official-artwork': {'front_default': sprite.replace('/pokemon/', '/pokemon/other/official-artwork/'),
+                                     'front_shiny': None},
+                'showdown': dict(sprite_set),
+            },
+            versions={
+                generation: {game: dict(sprite_set, animated=dict(sprite_set)) for game in games}
+                for generation, games in GENERATIONS.items()
+            }
+        ),
+        'stats': [
+            {'base_stat': s['base_stat'], 'effort': s['effort'],
+             'stat': _ref('stat', s['stat_name'].lower().replace(' ', '-'), i + 1)}
+            for i, s in enumerate(data['stats'])
+        ],
+        'types': [
+            {'slot': t['slot'], 'type': _ref('type', t['type_name'].lower(), i + 1)}
+            for i, t in enumerate(data['types'])
+        ],
+        'weight': data['weight'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic Pokemon into a database and/or a payload file')
+    parser.add_argument('--rows', type=int, default=10000, help='e.g. 10000, 100000 or 1000000')
+    parser.add_argument('--database', help='Database URL to bulk-load into (default: DATABASE_URL / the app default)')
+    parser.add_argument('--like', help='Database URL whose stored Pokemon the distributions are fitted to')
+    parser.add_argument('--payloads', help='Also write raw PokeAPI payloads here, one JSON object per line')
+    parser.add_argument('--moves', type=int, default=0, help='Moves per payload in --payloads')
+    parser.add_argument('--no-load', action='store_true', help='Only write --payloads')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.database:
+        os.environ['DATABASE_URL'] = args.database
+
+    from sqlalchemy import create_engine, func
+    from sqlalchemy.orm import sessionmaker
+
+    distribution = Distribution.default()
+    if args.like:
+        like_engine = create_engine(args.like)
+        like_session = sessionmaker(bind=like_engine)()
+        distribution = Distribution.from_session(like_session)
+        like_session.close()
+        like_engine.dispose()
+        if distribution.fitted:
+            print(f"Fitted {len(distribution.type_combos)} type combinations and "
+                  f"{len(distribution.abilities)} abilities from {args.like}")
+        else:
+            print(f"Fewer than {MIN_SAMPLE} Pokemon with all six stats in {args.like}; "
+                  f"using the default distributions")
+
+    start = 1
+    if not args.no_load:
+        from app import Session, init_db
+        from app.models import Pokemon
+
+        init_db()
+        session = Session()
+        # number after whatever is stored, so names and pokedex numbers never collide
+        start = (session.query(func.max(Pokemon.pokedex_number)).scalar() or 0) + 1
+        result = load(session, args.rows, args.seed, distribution, start)
+        session.commit()
+        session.close()
+        print(f"Loaded {result['loaded']} Pokemon (Synthmon{start}..) in {result['seconds']:.1f}s "
+              f"({result['rows_per_second']:.0f} rows/s)")
+
+    if args.payloads:
+        t0 = time.perf_counter()
+        with open(args.payloads, 'w', encoding='utf-8') as f:
+            for payload in raw_payloads(args.rows, args.seed, distribution, start, args.moves):
+                f.write(json.dumps(payload, separators=(',', ':')))
+                f.write('\n')
+        print(f"Wrote {args.rows} payloads to {args.payloads} in {time.perf_counter() - t0:.1f}s")
+
+
+if __name__ == '__main__':
+    main()
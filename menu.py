@@ -1,16 +1,17 @@
 import os
 import sys
 from app import init_db, Session
-from app.services import PokeAPIService, DataProcessor
-from app.models import Pokemon, PokemonType, PokemonAbility, PokemonStat
-import json
+from app.services import PokeAPIService, DataProcessor, PokemonRepository, PokemonQuery, StatsAggregator
+from app.services.archive import archive_from_env
+from app.services.export import export_pokemon
+from app.models import Pokemon
 
 
 class PokemonScoutMenu:
     """Interactive menu for Pokemon Scout application."""
     
     def __init__(self):
-        self.pokeapi = PokeAPIService()
+        self.pokeapi = PokeAPIService(archive=archive_from_env(Session), moves=True)
         self.processor = DataProcessor()
         self.running = True
     
@@ -36,7 +37,7 @@ class PokemonScoutMenu:
         print("5.  View Specific Pokemon Details")
         print("6.  Search Pokemon by Type")
         print("7.  Database Statistics")
-        print("8.  Export Pokemon to JSON")
+        print("8.  Export Pokemon (JSON, NDJSON, CSV)")
         print("9.  Initialize/Reset Database")
         print("10. Start Flask API Server")
         print("11. Help & Documentation")
@@ -82,25 +83,7 @@ class PokemonScoutMenu:
                 return
             
             # Store in database
-            pokemon = Pokemon(
-                name=sanitized_data['name'],
-                pokedex_number=sanitized_data['pokedex_number'],
-                height=sanitized_data['height'],
-                weight=sanitized_data['weight'],
-                base_experience=sanitized_data['base_experience'],
-                sprite_url=sanitized_data['sprite_url']
-            )
-            
-            for type_data in sanitized_data['types']:
-                pokemon.types.append(PokemonType(**type_data))
-            
-            for ability_data in sanitized_data['abilities']:
-                pokemon.abilities.append(PokemonAbility(**ability_data))
-            
-            for stat_data in sanitized_data['stats']:
-                pokemon.stats.append(PokemonStat(**stat_data))
-            
-            session.add(pokemon)
+            PokemonRepository.add_pokemon(session, sanitized_data, raw_data)
             session.commit()
             
             print(f"\n✓ {sanitized_data['name']} stored successfully!")
@@ -153,25 +136,7 @@ class PokemonScoutMenu:
                     print(f"❌ {name.capitalize()} - processing failed")
                     continue
                 
-                pokemon = Pokemon(
-                    name=sanitized_data['name'],
-                    pokedex_number=sanitized_data['pokedex_number'],
-                    height=sanitized_data['height'],
-                    weight=sanitized_data['weight'],
-                    base_experience=sanitized_data['base_experience'],
-                    sprite_url=sanitized_data['sprite_url']
-                )
-                
-                for type_data in sanitized_data['types']:
-                    pokemon.types.append(PokemonType(**type_data))
-                
-                for ability_data in sanitized_data['abilities']:
-                    pokemon.abilities.append(PokemonAbility(**ability_data))
-                
-                for stat_data in sanitized_data['stats']:
-                    pokemon.stats.append(PokemonStat(**stat_data))
-                
-                session.add(pokemon)
+                PokemonRepository.add_pokemon(session, sanitized_data, raw_data)
                 session.commit()
                 
                 print(f"✓ {sanitized_data['name']} - stored successfully")
@@ -224,25 +189,7 @@ class PokemonScoutMenu:
                     print(f"❌ {name.capitalize()} - processing failed")
                     continue
                 
-                pokemon = Pokemon(
-                    name=sanitized_data['name'],
-                    pokedex_number=sanitized_data['pokedex_number'],
-                    height=sanitized_data['height'],
-                    weight=sanitized_data['weight'],
-                    base_experience=sanitized_data['base_experience'],
-                    sprite_url=sanitized_data['sprite_url']
-                )
-                
-                for type_data in sanitized_data['types']:
-                    pokemon.types.append(PokemonType(**type_data))
-                
-                for ability_data in sanitized_data['abilities']:
-                    pokemon.abilities.append(PokemonAbility(**ability_data))
-                
-                for stat_data in sanitized_data['stats']:
-                    pokemon.stats.append(PokemonStat(**stat_data))
-                
-                session.add(pokemon)
+                PokemonRepository.add_pokemon(session, sanitized_data, raw_data)
                 session.commit()
                 
                 print(f"✓ {sanitized_data['name']} - stored successfully")
@@ -345,9 +292,8 @@ class PokemonScoutMenu:
         
         session = Session()
         try:
-            pokemon_with_type = session.query(Pokemon).join(PokemonType).filter(
-                PokemonType.type_name == type_name.capitalize()
-            ).all()
+            query = PokemonQuery(types=[type_name.capitalize()], sort=[('pokedex', False)])
+            pokemon_with_type = query.fetch(session)
             
             if not pokemon_with_type:
                 print(f"\n❌ No {type_name.capitalize()}-type Pokemon found in database.")
@@ -370,9 +316,8 @@ class PokemonScoutMenu:
         
         session = Session()
         try:
-            from sqlalchemy import func
-            
-            total = session.query(Pokemon).count()
+            summary = StatsAggregator.summary(session)
+            total = summary['total']
             
             if total == 0:
                 print("\n❌ No Pokemon found in database.")
@@ -380,24 +325,16 @@ class PokemonScoutMenu:
                 print(f"\nTotal Pokemon: {total}")
                 
                 # Type distribution
-                type_counts = session.query(
-                    PokemonType.type_name, 
-                    func.count(PokemonType.type_name)
-                ).group_by(PokemonType.type_name).all()
-                
                 print(f"\nType Distribution:")
-                for type_name, count in sorted(type_counts, key=lambda x: x[1], reverse=True):
+                for type_name, count in summary['types'].items():
                     print(f"  {type_name:15s}: {count}")
                 
                 # Averages
-                avg_height = session.query(func.avg(Pokemon.height)).scalar()
-                avg_weight = session.query(func.avg(Pokemon.weight)).scalar()
-                avg_exp = session.query(func.avg(Pokemon.base_experience)).scalar()
-                
+                metrics = summary['metrics']
                 print(f"\nAverages:")
-                print(f"  Height: {avg_height / 10:.2f}m")
-                print(f"  Weight: {avg_weight / 10:.2f}kg")
-                print(f"  Base Experience: {avg_exp:.1f}")
+                print(f"  Height: {metrics['height']['mean'] / 10:.2f}m")
+                print(f"  Weight: {metrics['weight']['mean'] / 10:.2f}kg")
+                print(f"  Base Experience: {metrics['base_experience']['mean']:.1f}")
         
         finally:
             session.close()
@@ -405,35 +342,29 @@ class PokemonScoutMenu:
         input("\nPress Enter to continue...")
     
     def export_to_json(self):
-        """Export Pokemon to JSON file."""
+        """Export Pokemon to a JSON, NDJSON or CSV file."""
         print("\n" + "-"*60)
-        print("EXPORT POKEMON TO JSON")
+        print("EXPORT POKEMON")
         print("-"*60)
         
-        filename = input("\nEnter filename (default: pokemon_export.json): ").strip()
+        filename = input("\nEnter filename (default: pokemon_export.json; .ndjson, .csv and .gz also work): ").strip()
         
         if not filename:
             filename = "pokemon_export.json"
         
-        if not filename.endswith('.json'):
-            filename += '.json'
+        base = filename[:-3] if filename.endswith('.gz') else filename
+        if not base.endswith(('.json', '.ndjson', '.csv')):
+            filename = base + '.json' + filename[len(base):]
         
         session = Session()
         try:
-            all_pokemon = session.query(Pokemon).all()
-            
-            if not all_pokemon:
+            if not session.query(Pokemon.id).first():
                 print("\n❌ No Pokemon found in database.")
             else:
-                data = {
-                    'count': len(all_pokemon),
-                    'pokemon': [p.to_dict() for p in all_pokemon]
-                }
-                
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, indent=2, ensure_ascii=False)
+                # streamed, so even a huge database never sits in memory at once
+                result = export_pokemon(session, filename)
                 
-                print(f"\n✓ Exported {len(all_pokemon)} Pokemon to '{filename}'")
+                print(f"\n✓ Exported {result['count']} Pokemon to {', '.join(repr(f) for f in result['files'])}")
         
         finally:
             session.close()
@@ -7,7 +7,8 @@ Project: Challenge Assignment
 import os
 import logging
 
-from app import app, init_db
+from app import app, init_db, Session
+from app.services.read_model import read_model_enabled, read_model_store
 
 
 logger = logging.getLogger(__name__)
@@ -21,6 +22,14 @@ if __name__ == '__main__':
     )
 
     logger.info("Database initialized successfully!")
+
+    if read_model_enabled():
+        # load it now so the first request doesn't pay for it
+        session = Session()
+        try:
+            read_model_store.get(session)
+        finally:
+            session.close()
     logger.info("Starting Pokemon Scout API...")
 
     port = int(os.environ.get('PORT', 5000))
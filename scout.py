@@ -7,13 +7,18 @@ Project: Challenge Assignment
 import sys
 import argparse
 from app import init_db, Session
-from app.services import PokeAPIService, DataProcessor
-from app.models import Pokemon, PokemonType, PokemonAbility, PokemonStat
+from app.services import PokeAPIService, DataProcessor, PokemonRepository, StatsAggregator, TypeChartRepository
+from app.models import Pokemon
+from app.services.archive import PayloadArchive, archive_from_env, reprocess
+from app.services.importer import import_pokemon
+from app.services.name_index import NameListRepository
+from app.services.species import DEFAULT_WORKERS, SpeciesRepository
+from app.services.sprites import download_sprites, local_sprites_enabled, sprite_store_from_env
 
 
 def fetch_and_store_pokemon(pokemon_name):
     """Fetch a Pokemon and save it to the database."""
-    pokeapi = PokeAPIService()
+    pokeapi = PokeAPIService(archive=archive_from_env(Session), moves=True)
     processor = DataProcessor()
     session = Session()
     
@@ -36,25 +41,7 @@ def fetch_and_store_pokemon(pokemon_name):
             print(f"Failed to process {pokemon_name} data")
             return False
         
-        pokemon = Pokemon(
-            name=sanitized_data['name'],
-            pokedex_number=sanitized_data['pokedex_number'],
-            height=sanitized_data['height'],
-            weight=sanitized_data['weight'],
-            base_experience=sanitized_data['base_experience'],
-            sprite_url=sanitized_data['sprite_url']
-        )
-        
-        for type_data in sanitized_data['types']:
-            pokemon.types.append(PokemonType(**type_data))
-        
-        for ability_data in sanitized_data['abilities']:
-            pokemon.abilities.append(PokemonAbility(**ability_data))
-        
-        for stat_data in sanitized_data['stats']:
-            pokemon.stats.append(PokemonStat(**stat_data))
-        
-        session.add(pokemon)
+        PokemonRepository.add_pokemon(session, sanitized_data, raw_data)
         session.commit()
         
         print(f"✓ {sanitized_data['name']} stored successfully!")
@@ -69,6 +56,153 @@ def fetch_and_store_pokemon(pokemon_name):
         session.close()
 
 
+def rebuild_stats():
+    """Recompute the aggregate tables from scratch, e.g. after editing the database by hand."""
+    session = Session()
+    try:
+        StatsAggregator.rebuild(session.connection())
+        session.commit()
+        print(f"✓ Aggregates rebuilt for {StatsAggregator.summary(session)['total']} Pokemon")
+        return True
+    except Exception as e:
+        session.rollback()
+        print(f"Error rebuilding aggregates: {e}")
+        return False
+    finally:
+        session.close()
+
+
+def fetch_types():
+    """Store the damage relations of all 18 types so matchups never need PokeAPI."""
+    init_db()  # databases from before the type chart lack its table
+    session = Session()
+    try:
+        print("Fetching type damage relations...")
+        failed = TypeChartRepository.fetch_all(session, PokeAPIService(archive=archive_from_env(Session)))
+        session.commit()
+        if failed:
+            print(f"Failed to fetch: {', '.join(failed)}")
+        else:
+            print("✓ Type chart stored")
+        return not failed
+    except Exception as e:
+        session.rollback()
+        print(f"Error storing type chart: {e}")
+        return False
+    finally:
+        session.close()
+
+
+def fetch_names():
+    """Store PokeAPI's full /pokemon name list for typo-tolerant lookups and autocomplete."""
+    init_db()  # databases from before the name index lack its table
+    session = Session()
+    try:
+        print("Fetching the PokeAPI name list...")
+        count = NameListRepository.fetch_all(session, PokeAPIService())
+        if count is None:
+            print("Failed to fetch the name list")
+            return False
+        session.commit()
+        print(f"✓ {count} names stored")
+        return True
+    except Exception as e:
+        session.rollback()
+        print(f"Error storing name list: {e}")
+        return False
+    finally:
+        session.close()
+
+
+def fetch_species(workers=None):
+    """Store species details and evolution chains for every stored Pokemon, fetched concurrently."""
+    init_db()  # databases from before species ingestion lack its tables
+    session = Session()
+    try:
+        print("Fetching species and evolution chains...")
+        result = SpeciesRepository.fetch_all(session, PokeAPIService(archive=archive_from_env(Session)),
+                                             workers=workers or DEFAULT_WORKERS)
+        session.commit()
+        print(f"✓ {result['species']} species and {result['chains']} evolution chains stored")
+        if result['failed']:
+            print(f"Failed to fetch: {', '.join(result['failed'])}")
+        return not result['failed']
+    except Exception as e:
+        session.rollback()
+        print(f"Error storing species: {e}")
+        return False
+    finally:
+        session.close()
+
+
+def fetch_sprites(workers=None):
+    """Download the sprite of every stored Pokemon into the local content-addressed cache."""
+    init_db()  # databases from before the sprite cache lack its column
+    store = sprite_store_from_env()
+    if store is None:
+        print("No sprite folder - set SPRITE_DIR (in-memory databases have no default)")
+        return False
+    session = Session()
+    try:
+        print(f"Downloading sprites into {store.root}...")
+        result = download_sprites(session, store, PokeAPIService().get_sprite, workers=workers or DEFAULT_WORKERS)
+        session.commit()
+        print(f"✓ {result['downloaded']} sprites cached for {result['pokemon']} Pokemon")
+        if result['failed']:
+            print(f"Failed to download: {', '.join(result['failed'])}")
+        return not result['failed']
+    except Exception as e:
+        session.rollback()
+        print(f"Error caching sprites: {e}")
+        return False
+    finally:
+        session.close()
+
+
+def reprocess_archive(workers=None):
+    """Re-sanitize every archived /pokemon payload into the database, without touching the network."""
+    init_db()  # databases from before the archive lack its tables
+    session = Session()
+    try:
+        archived = PayloadArchive.summary(session)
+        if not archived['resources']:
+            print("The archive is empty - fetch with ARCHIVE_RAW_PAYLOADS=1 to fill it")
+            return False
+        print(f"Reprocessing {archived['resources']} archived payloads "
+              f"({archived['stored_bytes'] / 1024:.0f} KiB compressed, {archived['raw_bytes'] / 1024:.0f} KiB raw)...")
+        result = reprocess(session, workers=workers)
+        session.commit()
+        print(f"✓ {result['stored']} Pokemon re-sanitized with {result['workers']} workers"
+              + (f" ({result['skipped']} unreadable payloads skipped)" if result['skipped'] else ""))
+        return True
+    except Exception as e:
+        session.rollback()
+        print(f"Error reprocessing archive: {e}")
+        return False
+    finally:
+        session.close()
+
+
+def import_file(path):
+    """Seed the database from a view_db/menu export (json or ndjson, optionally .gz), no network."""
+    init_db()
+    session = Session()
+    try:
+        print(f"Importing {path}...")
+        result = import_pokemon(session, path)
+        session.commit()
+        print(f"✓ {result['imported']} Pokemon imported in {result['seconds']:.1f}s "
+              f"({result['rows_per_second']:.0f} rows/s, indexes rebuilt in {result['index_seconds']:.1f}s)"
+              + (f", {result['skipped']} already stored" if result['skipped'] else ""))
+        return True
+    except Exception as e:
+        session.rollback()
+        print(f"Error importing {path}: {e}")
+        return False
+    finally:
+        session.close()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Pokemon Scout - Fetch Pokemon data from PokeAPI'
@@ -88,14 +222,80 @@ def main():
         action='store_true',
         help='Fetch default Pokemon list'
     )
+    parser.add_argument(
+        '--rebuild-stats',
+        action='store_true',
+        help='Recompute the aggregate statistics tables'
+    )
+    parser.add_argument(
+        '--fetch-types',
+        action='store_true',
+        help='Fetch and store the type effectiveness chart'
+    )
+    parser.add_argument(
+        '--fetch-names',
+        action='store_true',
+        help='Fetch and store the PokeAPI name list used by autocomplete and did-you-mean'
+    )
+    parser.add_argument(
+        '--fetch-species',
+        action='store_true',
+        help='Fetch species details and evolution chains for the stored Pokemon'
+    )
+    parser.add_argument(
+        '--fetch-sprites',
+        action='store_true',
+        help='Download the sprites of the stored Pokemon into the local cache served at /sprites/<hash>'
+    )
+    parser.add_argument(
+        '--reprocess',
+        action='store_true',
+        help='Re-run sanitization over the raw payload archive (no network)'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Processes used by --reprocess (default: one per CPU core), '
+             f'concurrent requests made by --fetch-species and --fetch-sprites (default: {DEFAULT_WORKERS})'
+    )
+    parser.add_argument(
+        '--import',
+        dest='import_file',
+        metavar='FILE',
+        help='Load Pokemon from an export file (.json/.ndjson, optionally .gz) instead of PokeAPI'
+    )
     
     args = parser.parse_args()
     
-    if args.init_db or not args.pokemon and not args.default:
+    maintenance = (args.rebuild_stats or args.fetch_types or args.fetch_names or args.fetch_species
+                   or args.fetch_sprites or args.reprocess or args.import_file)
+    if args.init_db or not args.pokemon and not args.default and not maintenance:
         print("Initializing database...")
         init_db()
         print("Database initialized!")
     
+    if args.rebuild_stats:
+        rebuild_stats()
+    
+    if args.fetch_types:
+        fetch_types()
+    
+    if args.fetch_names:
+        fetch_names()
+    
+    if args.fetch_species:
+        fetch_species(args.workers)
+    
+    if args.fetch_sprites:
+        fetch_sprites(args.workers)
+    
+    if args.reprocess:
+        reprocess_archive(args.workers)
+    
+    if args.import_file:
+        import_file(args.import_file)
+    
     if args.default:
         default_pokemon = ['pikachu', 'dhelmise', 'charizard', 'parasect', 'aerodactyl', 'kingler']
         print(f"Fetching default Pokemon list: {', '.join(default_pokemon)}")
@@ -104,8 +304,12 @@ def main():
     elif args.pokemon:
         for name in args.pokemon:
             fetch_and_store_pokemon(name)
-    elif not args.init_db:
+    elif not args.init_db and not maintenance:
         parser.print_help()
+    
+    # with LOCAL_SPRITES on, the new Pokemon's sprites are downloaded together once they're stored
+    if (args.default or args.pokemon) and local_sprites_enabled() and not args.fetch_sprites:
+        fetch_sprites(args.workers)
 
 
 if __name__ == '__main__':
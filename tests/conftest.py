@@ -0,0 +1,189 @@
+import os
+import threading
+from collections import Counter
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+
+# Set before any test module imports `app`, which creates its engine at import time
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+os.environ['APP_ENV'] = 'testing'
+
+
+def make_session():
+    """A session on a fresh in-memory database of its own."""
+    from app.models.pokemon import Base
+
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+@pytest.fixture()
+def session():
+    session = make_session()
+    yield session
+    session.close()
+
+
+PNG = b'\x89PNG\r\n\x1a\n' + bytes(range(256)) * 4
+
+
+def sample_raw_pokemon():
+    return {
+        'name': 'pikachu',
+        'id': 25,
+        'height': 4,
+        'weight': 60,
+        'base_experience': 112,
+        'sprites': {
+            'other': {
+                'official-artwork': {'front_default': 'https://example.com/pikachu.png'}
+            },
+            'front_default': 'https://example.com/front.png'
+        },
+        'types': [
+            {'slot': 1, 'type': {'name': 'electric'}}
+        ],
+        'abilities': [
+            {'is_hidden': False, 'slot': 1, 'ability': {'name': 'static'}},
+            {'is_hidden': True, 'slot': 3, 'ability': {'name': 'lightning-rod'}}
+        ],
+        'stats': [
+            {'base_stat': 35, 'effort': 0, 'stat': {'name': 'hp'}},
+            {'base_stat': 55, 'effort': 0, 'stat': {'name': 'attack'}}
+        ]
+    }
+
+
+def sample_sanitized_pokemon():
+    return {
+        'name': 'Pikachu',
+        'pokedex_number': 25,
+        'height': 4,
+        'weight': 60,
+        'base_experience': 112,
+        'sprite_url': 'https://example.com/pikachu.png',
+        'types': [{'type_name': 'Electric', 'slot': 1}],
+        'abilities': [{'ability_name': 'Static', 'is_hidden': False, 'slot': 1}],
+        'stats': [
+            {'stat_name': 'HP', 'base_stat': 35, 'effort': 0},
+            {'stat_name': 'ATTACK', 'base_stat': 55, 'effort': 0},
+            {'stat_name': 'SPECIAL ATTACK', 'base_stat': 50, 'effort': 0},
+            {'stat_name': 'SPEED', 'base_stat': 90, 'effort': 2}
+        ]
+    }
+
+
+def raw_pokemon(name, pokedex_number, types, speed, attack, abilities=(('static', False),)):
+    return {
+        'name': name,
+        'id': pokedex_number,
+        'height': 10,
+        'weight': 100,
+        'base_experience': 100,
+        'sprites': {'front_default': f'https://example.com/{name}.png'},
+        'types': [{'slot': i + 1, 'type': {'name': t}} for i, t in enumerate(types)],
+        'abilities': [{'is_hidden': hidden, 'slot': i + 1, 'ability': {'name': a}}
+                      for i, (a, hidden) in enumerate(abilities)],
+        'stats': [
+            {'base_stat': attack, 'effort': 0, 'stat': {'name': 'attack'}},
+            {'base_stat': speed, 'effort': 0, 'stat': {'name': 'speed'}}
+        ]
+    }
+
+
+def sanitized_with_stats(name, pokedex_number, types, stats):
+    return {
+        'name': name,
+        'pokedex_number': pokedex_number,
+        'height': 10,
+        'weight': 100,
+        'base_experience': 50,
+        'sprite_url': '',
+        'types': [{'type_name': t, 'slot': i + 1} for i, t in enumerate(types)],
+        'abilities': [],
+        'stats': [{'stat_name': name, 'base_stat': value, 'effort': 0}
+                  for name, value in zip(['HP', 'ATTACK', 'DEFENSE', 'SPECIAL ATTACK', 'SPECIAL DEFENSE', 'SPEED'],
+                                         stats)]
+    }
+
+
+def move(name, *details):
+    return {'move': {'name': name}, 'version_group_details': [
+        {'level_learned_at': level, 'move_learn_method': {'name': method}, 'version_group': {'name': group}}
+        for method, group, level in details
+    ]}
+
+
+def raw_with_moves(name, pokedex_number, moves):
+    return dict(raw_pokemon(name, pokedex_number, ['electric'], 90, 55), moves=moves)
+
+
+PIKACHU_MOVES = [
+    move('thunder-shock', ('level-up', 'red-blue', 1), ('level-up', 'sword-shield', 1),
+         ('level-up', 'red-blue', 1)),
+    move('thunderbolt', ('machine', 'red-blue', 0), ('level-up', 'sword-shield', 36)),
+    move('quick-attack', ('level-up', 'red-blue', 16)),
+]
+
+
+API = 'https://pokeapi.co/api/v2'
+SPECIES_IDS = {'pichu': 172, 'pikachu': 25, 'raichu': 26, 'eevee': 133, 'vaporeon': 134, 'jolteon': 135,
+               'flareon': 136}
+CHAINS = {10: ('pichu', [('pikachu', [('raichu', [])])]),
+          67: ('eevee', [('vaporeon', []), ('jolteon', []), ('flareon', [])])}
+
+
+def chain_link(name, evolves_to, trigger=None):
+    return {
+        'species': {'name': name, 'url': f'{API}/pokemon-species/{SPECIES_IDS[name]}/'},
+        'evolution_details': [{'trigger': {'name': 'level-up'}, 'min_level': None,
+                               'item': {'name': 'thunder-stone'} if name == 'jolteon' else None}] if trigger else [],
+        'evolves_to': [chain_link(child, grandchildren, True) for child, grandchildren in evolves_to]
+    }
+
+
+def raw_species(name):
+    chain_id = next(chain_id for chain_id, (root, _) in CHAINS.items()
+                    if name == root or name in str(CHAINS[chain_id][1]))
+    return {
+        'id': SPECIES_IDS[name],
+        'name': name,
+        'evolution_chain': {'url': f'{API}/evolution-chain/{chain_id}/'},
+        'evolves_from_species': None,
+        'generation': {'name': 'generation-i', 'url': f'{API}/generation/1/'},
+        'genera': [{'genus': 'Souris', 'language': {'name': 'fr'}},
+                   {'genus': f'{name.capitalize()} Pokémon', 'language': {'name': 'en'}}],
+        'flavor_text_entries': [{'flavor_text': 'Old\ntext.', 'language': {'name': 'en'}},
+                                {'flavor_text': 'Newer\x0ctext.', 'language': {'name': 'en'}}],
+        'habitat': {'name': 'forest'},
+        'growth_rate': {'name': 'medium'},
+        'capture_rate': 190,
+        'base_happiness': 50,
+        'is_baby': name == 'pichu',
+        'varieties': [{'is_default': True, 'pokemon': {'name': name}}]
+                     + ([{'is_default': False, 'pokemon': {'name': 'pikachu-rock-star'}}] if name == 'pikachu' else [])
+    }
+
+
+class FakePokeAPI:
+    def __init__(self):
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _count(self, key):
+        with self._lock:
+            self.calls[key] += 1
+
+    def get_pokemon_species(self, species_id):
+        self._count('species')
+        name = next((name for name, number in SPECIES_IDS.items() if number == species_id), None)
+        return raw_species(name) if name else None
+
+    def get_evolution_chain(self, chain_id):
+        self._count('chain')
+        root, evolves_to = CHAINS[chain_id]
+        return {'id': chain_id, 'chain': chain_link(root, evolves_to)}
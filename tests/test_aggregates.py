@@ -0,0 +1,89 @@
+import pytest
+
+from app.models import Pokemon
+from app.services import DataProcessor, PokemonRepository, StatsAggregator
+
+
+def sanitized(name, pokedex_number, types, height, speed):
+    return {
+        'name': name,
+        'pokedex_number': pokedex_number,
+        'height': height,
+        'weight': 100,
+        'base_experience': 50,
+        'sprite_url': '',
+        'types': [{'type_name': t, 'slot': i + 1} for i, t in enumerate(types)],
+        'abilities': [{'ability_name': 'Blaze', 'is_hidden': False, 'slot': 1}],
+        'stats': [{'stat_name': 'SPEED', 'base_stat': speed, 'effort': 0}]
+    }
+
+
+@pytest.fixture()
+def session(session):
+    session.add(PokemonRepository.build_pokemon(session, sanitized('Charizard', 6, ['Fire', 'Flying'], 17, 100)))
+    session.add(PokemonRepository.build_pokemon(session, sanitized('Ponyta', 77, ['Fire'], 10, 90)))
+    session.commit()
+    return session
+
+
+def test_inserts_update_aggregates(session):
+    summary = StatsAggregator.summary(session)
+
+    assert summary['total'] == 2
+    assert summary['types'] == {'Fire': 2, 'Flying': 1}
+    assert summary['abilities'] == {'Blaze': 2}
+    assert summary['metrics']['height']['mean'] == pytest.approx(13.5)
+    assert summary['metrics']['speed']['stddev'] == pytest.approx(5.0)
+
+
+def test_update_and_delete_adjust_aggregates(session):
+    ponyta = session.query(Pokemon).filter_by(name='Ponyta').one()
+    ponyta.height = 20
+    session.commit()
+    assert StatsAggregator.summary(session)['metrics']['height']['mean'] == pytest.approx(18.5)
+
+    charizard = session.query(Pokemon).filter_by(name='Charizard').one()
+    charizard.types.pop()
+    session.commit()
+    assert StatsAggregator.summary(session)['types'] == {'Fire': 2}
+
+    session.delete(charizard)
+    session.commit()
+    summary = StatsAggregator.summary(session)
+    assert summary['total'] == 1
+    assert summary['types'] == {'Fire': 1}
+    assert summary['metrics']['speed']['mean'] == pytest.approx(90)
+
+
+def test_rebuild_matches_incremental(session):
+    incremental = StatsAggregator.summary(session)
+
+    StatsAggregator.rebuild(session.connection())
+    session.commit()
+
+    assert StatsAggregator.summary(session) == incremental
+
+
+def test_bulk_insert_matches_orm_inserts(session):
+    batch = DataProcessor.sanitize_many([
+        {'name': name, 'id': number, 'height': height, 'weight': 100, 'base_experience': 50,
+         'types': [{'slot': i + 1, 'type': {'name': t}} for i, t in enumerate(types)],
+         'abilities': [{'ability': {'name': 'blaze'}, 'is_hidden': False, 'slot': 1}],
+         'stats': [{'base_stat': speed, 'effort': 0, 'stat': {'name': 'speed'}}]}
+        for name, number, types, height, speed in (
+            ('magmar', 126, ['fire'], 13, 93), ('moltres', 146, ['fire', 'flying'], 20, 90)
+        )
+    ])
+    ids = PokemonRepository.bulk_insert(session, batch)
+    session.commit()
+
+    summary = StatsAggregator.summary(session)
+    assert summary['total'] == 4
+    assert summary['types'] == {'Fire': 4, 'Flying': 2}
+    moltres = session.get(Pokemon, ids[1])
+    assert (moltres.name, moltres.speed, moltres.total, moltres.hp) == ('Moltres', 90, 90, None)
+    assert [t['type'] for t in moltres.to_dict()['types']] == ['Fire', 'Flying']
+
+    StatsAggregator.rebuild(session.connection())
+    session.commit()
+    assert StatsAggregator.summary(session) == summary
@@ -0,0 +1,98 @@
+import json
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.models import Pokemon
+from app.models.pokemon import Base
+from app.services import DataProcessor, PokemonRepository, StatsAggregator
+from app.services.archive import PayloadArchive, reprocess
+from app.services.pokeapi import PokeAPIService
+from tests.conftest import sample_raw_pokemon
+
+
+@pytest.fixture()
+def session_factory():
+    engine = create_engine('sqlite://', connect_args={'check_same_thread': False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def test_store_deduplicates_identical_bodies(session_factory):
+    session = session_factory()
+    body = json.dumps(sample_raw_pokemon()).encode()
+    first = PayloadArchive.store_in(session, 'pokemon', 'pikachu', body)
+    second = PayloadArchive.store_in(session, 'pokemon', '25', body)
+    session.commit()
+
+    summary = PayloadArchive.summary(session)
+    assert first == second
+    assert (summary['resources'], summary['payloads'], summary['raw_bytes']) == (2, 1, len(body))
+    assert summary['stored_bytes'] < len(body)
+    assert PayloadArchive.load(session, 'pokemon', '25') == body
+    assert PayloadArchive.load(session, 'pokemon', 'raichu') is None
+
+
+def test_service_archives_response_bodies(session_factory, monkeypatch):
+    body = json.dumps(dict(sample_raw_pokemon(), moves=[{'move': {'name': 'thunder'}}])).encode()
+
+    class Response:
+        content = body
+
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return json.loads(body)
+
+    service = PokeAPIService(archive=PayloadArchive(session_factory), selective=True)
+    monkeypatch.setattr(service.session, 'get', lambda url, timeout: Response())
+
+    assert 'moves' not in service.get_pokemon('PIKACHU')
+    assert PayloadArchive.load(session_factory(), 'pokemon', 'pikachu') == body
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_reprocess_replaces_rows_in_place(session_factory, workers):
+    session = session_factory()
+    old = DataProcessor.sanitize_pokemon_data(sample_raw_pokemon())
+    old['sprite_url'] = 'https://example.com/old.png'
+    stored = PokemonRepository.build_pokemon(session, old)
+    session.add(stored)
+    raichu = dict(sample_raw_pokemon(), name='raichu', id=26)
+    for raw in (sample_raw_pokemon(), raichu):
+        PayloadArchive.store_in(session, 'pokemon', raw['name'], json.dumps(raw).encode())
+    session.commit()
+    pikachu_id = stored.id
+
+    result = reprocess(session, workers=workers, chunk_size=1)
+    session.commit()
+    session.expire_all()
+
+    assert (result['stored'], result['skipped']) == (2, 0)
+    pikachu = session.get(Pokemon, pikachu_id)
+    assert pikachu.name == 'Pikachu'
+    assert pikachu.sprite_url == 'https://example.com/pikachu.png'
+    assert session.query(Pokemon).count() == 2
+    assert StatsAggregator.summary(session)['types'] == {'Electric': 2}
+
+
+def test_reprocess_keeps_cached_sprites(session_factory):
+    session = session_factory()
+    for raw in (sample_raw_pokemon(), dict(sample_raw_pokemon(), name='raichu', id=26)):
+        sanitized = DataProcessor.sanitize_pokemon_data(raw)
+        if raw['name'] == 'raichu':
+            # the image changed since it was cached: the old hash no longer applies
+            sanitized['sprite_url'] = 'https://example.com/old.png'
+        pokemon = PokemonRepository.build_pokemon(session, sanitized)
+        pokemon.sprite_hash = 'ab' * 32
+        session.add(pokemon)
+        PayloadArchive.store_in(session, 'pokemon', raw['name'], json.dumps(raw).encode())
+    session.commit()
+
+    reprocess(session, workers=1)
+    session.commit()
+
+    assert dict(session.query(Pokemon.name, Pokemon.sprite_hash)) == {'Pikachu': 'ab' * 32, 'Raichu': None}
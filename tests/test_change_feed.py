@@ -0,0 +1,85 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.migrations import run_migrations
+from app.models import Pokemon, PokemonStat
+from app.models.pokemon import Base
+from app.services import DataProcessor, PokemonRepository
+from app.services.change_feed import ChangeFeed
+from tests.conftest import sample_sanitized_pokemon
+
+
+def add_pokemon(session, name, number):
+    session.add(PokemonRepository.build_pokemon(session, dict(sample_sanitized_pokemon(), name=name,
+                                                              pokedex_number=number)))
+
+
+def feed(session, since=0, limit=100):
+    return [(c['name'], c['deleted']) for c in ChangeFeed.page(session, since, limit)['changes']]
+
+
+def test_every_write_gets_a_new_version(session):
+    add_pokemon(session, 'Pikachu', 25)
+    add_pokemon(session, 'Raichu', 26)
+    session.commit()
+    assert feed(session) == [('Pikachu', False), ('Raichu', False)]
+    seen = ChangeFeed.latest_version(session)
+
+    # a child row change versions its parent; a no-op assignment doesn't
+    pikachu = session.query(Pokemon).filter_by(name='Pikachu').one()
+    session.query(PokemonStat).filter_by(pokemon_id=pikachu.id).first().base_stat = 50
+    session.query(Pokemon).filter_by(name='Raichu').one().height = session.query(Pokemon.height).filter_by(
+        name='Raichu').scalar()
+    session.commit()
+    assert feed(session, seen) == [('Pikachu', False)]
+
+    session.delete(session.query(Pokemon).filter_by(name='Raichu').one())
+    session.commit()
+    page = ChangeFeed.page(session, seen)
+    assert [(c['name'], c['deleted'], c['data'] is None) for c in page['changes']] == [
+        ('Pikachu', False, False), ('Raichu', True, True)]
+    assert page['changes'][0]['data']['stats'][0]['base_stat'] == 50
+    # only the latest write per Pokemon is kept
+    assert feed(session) == [('Pikachu', False), ('Raichu', True)]
+
+
+def test_rolled_back_writes_leave_no_version(session):
+    add_pokemon(session, 'Pikachu', 25)
+    session.flush()
+    session.rollback()
+
+    assert ChangeFeed.latest_version(session) == 0
+
+
+def test_bulk_insert_and_paging(session):
+    batch = DataProcessor.sanitize_many([
+        {'name': f'mon{i}', 'id': i, 'types': [], 'abilities': [], 'stats': []} for i in range(1, 8)
+    ])
+    PokemonRepository.bulk_insert(session, batch)
+    session.commit()
+
+    names, since = [], 0
+    while True:
+        page = ChangeFeed.page(session, since, limit=3)
+        names += [c['name'] for c in page['changes']]
+        since = page['next_since']
+        if not page['has_more']:
+            break
+    assert names == [f'Mon{i}' for i in range(1, 8)]
+    assert since == page['latest_version'] == 7
+    assert ChangeFeed.page(session, since)['changes'] == []
+
+
+def test_migration_seeds_existing_pokemon():
+    engine = create_engine('sqlite:///:memory:')
+    Base.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO pokemon (id, name, pokedex_number) VALUES (4, 'Charmander', 4), "
+                          "(9, 'Blastoise', 9)"))
+
+    run_migrations(engine)
+    run_migrations(engine)
+
+    session = sessionmaker(bind=engine)()
+    assert [(c['version'], c['id']) for c in ChangeFeed.page(session)['changes']] == [(1, 4), (2, 9)]
+    session.close()
@@ -0,0 +1,94 @@
+import math
+
+import numpy as np
+import pytest
+
+from app.services.damage import DamageCalculator
+from app.services.stat_matrix import StatMatrix, RECORD_DTYPE
+from app.services.type_chart import TypeChart
+
+
+# types: 1 fire, 2 water, 3 grass, 4 ghost, 5 normal
+CHART = np.array([
+    [0.5, 0.5, 2.0, 1.0, 1.0],
+    [2.0, 0.5, 0.5, 1.0, 1.0],
+    [0.5, 2.0, 0.5, 1.0, 1.0],
+    [1.0, 1.0, 1.0, 2.0, 0.0],
+    [1.0, 1.0, 1.0, 0.0, 1.0],
+])
+
+
+def make_calculator(rows, level=50):
+    records = np.zeros(len(rows), dtype=RECORD_DTYPE)
+    for i, (stats, types) in enumerate(rows):
+        records[i]['id'] = i + 1
+        records[i]['stats'] = stats
+        records[i]['type_ids'][:len(types)] = types
+    chart = TypeChart(range(1, 6), ['Fire', 'Water', 'Grass', 'Ghost', 'Normal'], CHART)
+    return DamageCalculator(StatMatrix(records), chart, level)
+
+
+def reference_damage(level, power, attack, defense, stab, effectiveness, roll):
+    base = math.floor(math.floor(math.floor(2 * level / 5 + 2) * power * attack / defense) / 50) + 2
+    damage = base * roll // 100
+    if stab:
+        damage = math.floor(damage * 1.5)
+    damage = math.floor(damage * effectiveness)
+    return max(damage, 1) if effectiveness else 0
+
+
+def test_known_damage_range():
+    calculator = make_calculator([
+        ([100, 100, 100, 100, 100, 100], [1]),
+        ([100, 100, 100, 100, 100, 100], [3]),
+    ])
+    assert calculator.stats[0].tolist() == [175, 120, 120, 120, 120, 120]
+
+    low, high = calculator.damage(np.array([0]), np.array([1]), np.array(80), np.array(1), np.array(True))
+    assert (low.tolist(), high.tolist()) == ([92], [110])
+
+    low, high = calculator.damage(np.array([0]), np.array([1]), np.array(80), np.array(5), np.array(False))
+    assert (low.tolist(), high.tolist()) == ([31], [37])
+
+
+def test_batch_matches_per_hit_reference():
+    rng = np.random.default_rng(5)
+    rows = [(rng.integers(20, 200, size=6).tolist(), rng.choice(range(1, 6), size=rng.integers(1, 3), replace=False).tolist())
+            for _ in range(30)]
+    calculator = make_calculator(rows, level=72)
+    attackers = rng.integers(0, 30, size=200)
+    defenders = rng.integers(0, 30, size=200)
+    power = rng.integers(20, 150, size=200)
+    move_types = rng.integers(1, 6, size=200)
+    physical = rng.random(200) < 0.5
+
+    low, high = calculator.damage(attackers, defenders, power, move_types, physical)
+
+    for i in range(200):
+        a, d = calculator.stats[attackers[i]], calculator.stats[defenders[i]]
+        attack, defense = (a[1], d[2]) if physical[i] else (a[3], d[4])
+        stab = move_types[i] in rows[attackers[i]][1]
+        effectiveness = np.prod([CHART[move_types[i] - 1, t - 1] for t in rows[defenders[i]][1]])
+        assert low[i] == reference_damage(72, power[i], attack, defense, stab, effectiveness, 85)
+        assert high[i] == reference_damage(72, power[i], attack, defense, stab, effectiveness, 100)
+
+
+def test_pairwise_uses_best_stab_type():
+    calculator = make_calculator([
+        ([80, 100, 80, 60, 80, 90], [1, 4]),   # fire/ghost, physical
+        ([80, 60, 80, 100, 80, 90], [5]),      # normal, special
+        ([80, 80, 80, 80, 80, 80], [3]),       # grass
+    ])
+    blocks = list(calculator.pairwise(power=80, block_size=2))
+    assert [block.tolist() for block, _, _ in blocks] == [[0, 1], [2]]
+    low = np.vstack([block_low for _, block_low, _ in blocks])
+
+    assert low.shape == (3, 3)
+    assert low[1, 0] == 0                     # normal can't touch a ghost
+    fire_only, _ = calculator.damage(np.array([0]), np.array([2]), np.array(80), np.array(1), np.array(True))
+    assert low[0, 2] == fire_only[0]          # fire beats ghost against grass
+    ghost_vs_ghost, _ = calculator.damage(np.array([0]), np.array([0]), np.array(80), np.array(4), np.array(True))
+    assert low[0, 0] == ghost_vs_ghost[0]
+
+    with pytest.raises(ValueError):
+        make_calculator([], level=0)
@@ -1,33 +1,8 @@
 import pytest
 
 from app.services.data_processor import DataProcessor
-
-
-def sample_raw_pokemon():
-    return {
-        'name': 'pikachu',
-        'id': 25,
-        'height': 4,
-        'weight': 60,
-        'base_experience': 112,
-        'sprites': {
-            'other': {
-                'official-artwork': {'front_default': 'https://example.com/pikachu.png'}
-            },
-            'front_default': 'https://example.com/front.png'
-        },
-        'types': [
-            {'slot': 1, 'type': {'name': 'electric'}}
-        ],
-        'abilities': [
-            {'is_hidden': False, 'slot': 1, 'ability': {'name': 'static'}},
-            {'is_hidden': True, 'slot': 3, 'ability': {'name': 'lightning-rod'}}
-        ],
-        'stats': [
-            {'base_stat': 35, 'effort': 0, 'stat': {'name': 'hp'}},
-            {'base_stat': 55, 'effort': 0, 'stat': {'name': 'attack'}}
-        ]
-    }
+from app.services.pokemon_record import PokemonRecord
+from tests.conftest import sample_raw_pokemon
 
 
 def test_sanitize_happy_path():
@@ -46,3 +21,41 @@ def test_sanitize_happy_path():
 
 def test_sanitize_handles_empty():
     assert DataProcessor.sanitize_pokemon_data(None) is None
+
+
+def test_sanitize_record_matches_dict_form():
+    raw = sample_raw_pokemon()
+    record = DataProcessor.sanitize_pokemon_record(raw)
+
+    assert record.as_sanitized() == DataProcessor.sanitize_pokemon_data(raw)
+    assert PokemonRecord.from_sanitized(record.as_sanitized()) == record
+    assert not hasattr(record, '__dict__')
+    assert record.to_dict(pokemon_id=7)['types'] == [{'type': 'Electric', 'slot': 1}]
+    assert DataProcessor.sanitize_pokemon_record(None) is None
+
+
+def test_unknown_stats_are_dropped_with_a_warning(caplog):
+    raw = sample_raw_pokemon()
+    raw['stats'].append({'base_stat': 90, 'effort': 0, 'stat': {'name': 'stamina'}})
+
+    with caplog.at_level('WARNING', logger='app.services.data_processor'):
+        record = DataProcessor.sanitize_pokemon_record(raw)
+        batch = DataProcessor.sanitize_many([raw, raw])
+
+    assert 90 not in record.stats and 90 not in batch.stats
+    # reported once per name, not once per payload
+    assert [r.getMessage() for r in caplog.records if 'stamina' in r.getMessage()] == [
+        "Dropping unknown stat 'stamina'; stat columns are HP, ATTACK, DEFENSE, SPECIAL ATTACK, SPECIAL DEFENSE, SPEED"
+    ]
+
+
+def test_sanitize_many_is_columnar_and_matches_single_payloads():
+    second = dict(sample_raw_pokemon(), name='raichu', id=26)
+    batch = DataProcessor.sanitize_many([sample_raw_pokemon(), None, second])
+
+    assert len(batch) == 2
+    assert batch.skipped == [1]
+    assert batch.names == ['Pikachu', 'Raichu']
+    assert list(batch.type_parent) == [0, 1]
+    assert batch.ability_names.count('Lightning Rod') == 2
+    assert batch.record(1).as_sanitized() == DataProcessor.sanitize_pokemon_data(second)
@@ -0,0 +1,63 @@
+import csv
+import gzip
+import json
+
+import pytest
+
+from app.models import Pokemon, PokemonType
+from app.services import PokemonRepository
+from app.services.export import export_pokemon, iter_pokemon_dicts, split_path
+from tests.conftest import sample_sanitized_pokemon
+
+
+@pytest.fixture()
+def session(session):
+    for name, number in (('Pikachu', 25), ('Raichu', 26), ('Pichu', 172)):
+        session.add(PokemonRepository.build_pokemon(
+            session, dict(sample_sanitized_pokemon(), name=name, pokedex_number=number)
+        ))
+    session.commit()
+    # a Pokemon with no children at all, between two that have them
+    session.query(PokemonType).filter_by(pokemon_id=2).delete()
+    session.commit()
+    return session
+
+
+def test_streamed_dicts_match_to_dict(session):
+    expected = [p.to_dict() for p in session.query(Pokemon).order_by(Pokemon.id)]
+
+    assert list(iter_pokemon_dicts(session, chunk_size=2)) == expected
+
+
+def test_json_and_ndjson_round_trip(session, tmp_path):
+    expected = [p.to_dict() for p in session.query(Pokemon).order_by(Pokemon.id)]
+
+    result = export_pokemon(session, str(tmp_path / 'dex.json'))
+    document = json.loads((tmp_path / 'dex.json').read_text(encoding='utf-8'))
+    assert result['count'] == document['count'] == 3
+    assert document['pokemon'] == expected
+
+    export_pokemon(session, str(tmp_path / 'dex.ndjson.gz'))
+    with gzip.open(tmp_path / 'dex.ndjson.gz', 'rt', encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == expected
+
+
+def test_csv_writes_one_file_per_table(session, tmp_path):
+    result = export_pokemon(session, str(tmp_path / 'dex.csv'))
+
+    assert [path.rsplit('/', 1)[-1] for path in result['files']] == [
+        'dex.pokemon.csv', 'dex.types.csv', 'dex.abilities.csv', 'dex.stats.csv'
+    ]
+    with open(tmp_path / 'dex.types.csv', newline='', encoding='utf-8') as f:
+        rows = list(csv.reader(f))
+    assert rows == [['pokemon_id', 'type', 'slot'], ['1', 'Electric', '1'], ['3', 'Electric', '1']]
+    with open(tmp_path / 'dex.pokemon.csv', newline='', encoding='utf-8') as f:
+        header, first = list(csv.reader(f))[:2]
+    assert dict(zip(header, first))['total'] == '230'
+
+
+def test_split_path():
+    assert split_path('out.ndjson.gz') == ('out.ndjson', 'ndjson', True)
+    assert split_path('out.txt', compress=True) == ('out.txt', 'json', True)
+    with pytest.raises(ValueError):
+        split_path('out', fmt='xml')
@@ -0,0 +1,118 @@
+import json
+
+import pytest
+from sqlalchemy import inspect
+
+from app.models import Pokemon
+from app.services import PokemonRepository, StatsAggregator
+from app.services import importer
+from app.services.export import export_pokemon
+from app.services.importer import import_pokemon, iter_exported
+from tests.conftest import make_session, sample_sanitized_pokemon
+
+
+@pytest.fixture()
+def exported(tmp_path):
+    source = make_session()
+    for name, number in (('Pikachu', 25), ('Raichu', 26), ('Pichu', 172)):
+        source.add(PokemonRepository.build_pokemon(
+            source, dict(sample_sanitized_pokemon(), name=name, pokedex_number=number)
+        ))
+    source.commit()
+    expected = [p.to_dict() for p in source.query(Pokemon).order_by(Pokemon.id)]
+    export_pokemon(source, str(tmp_path / 'dex.json'))
+    export_pokemon(source, str(tmp_path / 'dex.ndjson.gz'))
+    source.close()
+    return tmp_path, expected
+
+
+@pytest.mark.parametrize('name', ['dex.json', 'dex.ndjson.gz'])
+def test_import_round_trips_an_export(exported, name):
+    tmp_path, expected = exported
+    session = make_session()
+
+    result = import_pokemon(session, str(tmp_path / name), batch_size=2)
+    session.commit()
+
+    assert (result['imported'], result['skipped']) == (3, 0)
+    assert [p.to_dict() for p in session.query(Pokemon).order_by(Pokemon.id)] == expected
+    assert StatsAggregator.summary(session)['total'] == 3
+    assert 'ix_pokemon_name' in {index['name'] for index in inspect(session.get_bind()).get_indexes('pokemon')}
+
+
+def test_import_skips_stored_names_and_reassigns_taken_ids(exported):
+    tmp_path, expected = exported
+    session = make_session()
+    session.add(PokemonRepository.build_pokemon(session, dict(sample_sanitized_pokemon(), name='Mew',
+                                                              pokedex_number=151)))
+    session.add(PokemonRepository.build_pokemon(session, dict(sample_sanitized_pokemon(), name='Raichu',
+                                                              pokedex_number=26)))
+    session.commit()
+
+    result = import_pokemon(session, str(tmp_path / 'dex.json'))
+    session.commit()
+
+    assert (result['imported'], result['skipped']) == (2, 1)
+    ids = dict(session.query(Pokemon.name, Pokemon.id))
+    assert ids['Mew'] == 1 and ids['Pichu'] == 3
+    assert ids['Pikachu'] not in (1, 2, 3)
+
+
+def test_displaced_rows_are_spilled_and_inserted_in_batches(exported, monkeypatch):
+    tmp_path, expected = exported
+    session = make_session()
+    for name, number in (('Mew', 151), ('Mewtwo', 150), ('Ditto', 132)):
+        session.add(PokemonRepository.build_pokemon(session, dict(sample_sanitized_pokemon(), name=name,
+                                                                  pokedex_number=number)))
+    session.commit()
+    sizes = []
+    bulk_insert = PokemonRepository.bulk_insert
+    monkeypatch.setattr(PokemonRepository, 'bulk_insert', lambda session, batch, ids=None: (
+        sizes.append(len(batch)), bulk_insert(session, batch, ids=ids))[1])
+
+    result = import_pokemon(session, str(tmp_path / 'dex.ndjson.gz'), batch_size=2)
+    session.commit()
+
+    assert result['imported'] == 3 and sizes == [2, 1]
+    assert [name for name, in session.query(Pokemon.name).order_by(Pokemon.id)] == [
+        'Mew', 'Mewtwo', 'Ditto', 'Pikachu', 'Raichu', 'Pichu'
+    ]
+
+
+def test_failed_import_leaves_database_and_indexes_untouched(exported):
+    tmp_path, expected = exported
+    session = make_session()
+    bad = tmp_path / 'bad.ndjson'
+    bad.write_text(json.dumps(expected[0]) + '\n{not json\n', encoding='utf-8')
+
+    with pytest.raises(ValueError):
+        import_pokemon(session, str(bad), batch_size=1)
+    session.rollback()
+
+    assert session.query(Pokemon).count() == 0
+    assert 'ix_pokemon_name' in {index['name'] for index in inspect(session.get_bind()).get_indexes('pokemon')}
+
+
+def test_json_reader_handles_elements_across_buffer_refills(tmp_path, monkeypatch):
+    monkeypatch.setattr(importer, 'READ_SIZE', 7)
+    records = [{'name': f'P{i}', 'types': [{'type': 'Fire', 'slot': 1}]} for i in range(5)]
+    path = tmp_path / 'legacy.json'
+    path.write_text(json.dumps({'count': 5, 'pokemon': records}, indent=2), encoding='utf-8')
+
+    assert list(iter_exported(str(path))) == records
+    with pytest.raises(ValueError):
+        list(iter_exported(str(tmp_path / 'dex.csv')))
+
+
+def test_import_without_keeping_ids(exported):
+    tmp_path, _ = exported
+    session = make_session()
+    session.add(PokemonRepository.build_pokemon(session, dict(sample_sanitized_pokemon(), name='Mew',
+                                                              pokedex_number=151)))
+    session.commit()
+
+    import_pokemon(session, str(tmp_path / 'dex.ndjson.gz'), batch_size=2, keep_ids=False, defer_indexes=False)
+    session.commit()
+
+    assert [name for name, in session.query(Pokemon.name).order_by(Pokemon.id)] == ['Mew', 'Pikachu', 'Raichu',
+                                                                                    'Pichu']
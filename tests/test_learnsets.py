@@ -0,0 +1,76 @@
+import pytest
+
+from app.models import Pokemon, PokemonMove
+from app.services import DataProcessor, PokemonRepository, QueryError
+from app.services.learnsets import LearnsetQuery
+from tests.conftest import PIKACHU_MOVES, move, raw_pokemon, raw_with_moves
+
+
+RAICHU_MOVES = [
+    move('thunder-shock', ('level-up', 'red-blue', 1)),
+    move('thunderbolt', ('machine', 'sword-shield', 0)),
+]
+
+
+@pytest.fixture()
+def stored(session):
+    batch = DataProcessor.sanitize_many([raw_with_moves('raichu', 26, RAICHU_MOVES),
+                                         raw_with_moves('pikachu', 25, PIKACHU_MOVES)])
+    ids = PokemonRepository.bulk_insert(session, batch)
+    session.commit()
+    return dict(zip(batch.names, ids))
+
+
+def test_sanitize_learnset_drops_duplicates():
+    learnset = DataProcessor.sanitize_learnset(raw_with_moves('pikachu', 25, PIKACHU_MOVES))
+
+    assert len(learnset) == 5
+    assert learnset[0] == ('Thunder Shock', 'level-up', 'red-blue', 1)
+    assert ('Thunderbolt', 'machine', 'red-blue', 0) in learnset
+    assert DataProcessor.sanitize_learnset(raw_pokemon('pikachu', 25, ['electric'], 90, 55)) == []
+
+
+def test_bulk_insert_stores_learnsets(session, stored):
+    assert session.query(PokemonMove).count() == 5 + 2
+    assert session.query(PokemonMove).filter_by(pokemon_id=stored['Raichu']).count() == 2
+
+
+def test_add_pokemon_stores_learnset(session):
+    raw_data = raw_with_moves('pikachu', 25, PIKACHU_MOVES)
+    pokemon = PokemonRepository.add_pokemon(session, DataProcessor.sanitize_pokemon_data(raw_data), raw_data)
+    session.commit()
+
+    assert pokemon.id is not None
+    assert session.query(PokemonMove).filter_by(pokemon_id=pokemon.id).count() == 5
+
+
+def test_moves_of_orders_by_level_and_filters(session, stored):
+    moves = LearnsetQuery.moves_of(session, stored['Pikachu'])
+    assert [m['level'] for m in moves] == [0, 1, 1, 16, 36]
+
+    moves = LearnsetQuery.moves_of(session, stored['Pikachu'], version_group='Red-Blue', method='level-up')
+    assert [(m['move'], m['level']) for m in moves] == [('Thunder Shock', 1), ('Quick Attack', 16)]
+
+    with pytest.raises(QueryError):
+        LearnsetQuery.moves_of(session, stored['Pikachu'], version_group='gold-silver')
+
+
+def test_learners(session, stored):
+    assert [p['name'] for p in LearnsetQuery.learners(session, 'THUNDER-SHOCK')] == ['Pikachu', 'Raichu']
+    assert [p['name'] for p in LearnsetQuery.learners(session, 'thunderbolt', 'sword-shield', 'machine')] == \
+        ['Raichu']
+    assert LearnsetQuery.learners(session, 'quick attack', method='machine') == []
+    assert LearnsetQuery.learners(session, 'surf') is None
+
+
+def test_store_learnset_replaces_and_delete_clears(session, stored):
+    pikachu = session.get(Pokemon, stored['Pikachu'])
+    count = PokemonRepository.store_learnset(session, pikachu.id, [('Surf', 'tutor', 'red-blue', 0)])
+    session.commit()
+    assert count == 1
+    assert [m['move'] for m in LearnsetQuery.moves_of(session, pikachu.id)] == ['Surf']
+
+    session.delete(pikachu)
+    session.commit()
+    assert session.query(PokemonMove).filter_by(pokemon_id=stored['Pikachu']).count() == 0
+    assert session.query(PokemonMove).count() == 2
@@ -0,0 +1,74 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.pokemon import Base
+from app.services.name_index import NameIndex, NameIndexStore, NameListRepository, edit_distance, normalize_name
+
+
+KNOWN = ['bulbasaur', 'pikachu', 'pikachu-rock-star', 'pichu', 'raichu', 'mr-mime', 'mr-mime-galar', 'mime-jr',
+         'flabebe', 'porygon', 'porygon2', 'porygon-z']
+
+
+def test_normalize_name():
+    assert normalize_name('Mr. Mime') == normalize_name('mr-mime') == normalize_name('MR MIME') == 'mrmime'
+    assert normalize_name('Flabébé') == 'flabebe'
+    assert normalize_name('Porygon-Z') == 'porygonz'
+
+
+def test_lookup_prefers_stored_spelling():
+    index = NameIndex(stored=['Pikachu', 'Mr-mime'], known=KNOWN)
+
+    assert index.lookup('MR. MIME') == ('Mr-mime', 'mr-mime', True)
+    assert index.lookup('mr mime galar') == ('Mr-mime-galar', 'mr-mime-galar', False)
+    assert index.lookup('pikachuu') is None
+    assert index.has_known_names
+    assert not NameIndex(stored=['Pikachu']).has_known_names
+
+
+def test_complete_ranks_stored_then_shorter():
+    index = NameIndex(stored=['Pikachu-rock-star'], known=KNOWN)
+
+    assert [e.name for e in index.complete('pi')] == ['Pikachu-rock-star', 'Pichu', 'Pikachu']
+    assert [e.name for e in index.complete('Mr.M', limit=1)] == ['Mr-mime']
+    assert [e.name for e in index.complete('pi', stored_only=True)] == ['Pikachu-rock-star']
+    assert index.complete('zzz') == [] and index.complete('') == []
+
+
+def test_suggest_typos():
+    index = NameIndex(stored=['Pikachu'], known=KNOWN)
+
+    assert [e.name for e in index.suggest('pikachuu')][0] == 'Pikachu'
+    assert [e.name for e in index.suggest('bulbsaur')] == ['Bulbasaur']
+    assert [e.name for e in index.suggest('prygon2')][0] == 'Porygon2'
+    assert index.suggest('charizard') == []
+    assert index.suggest('bulbsaur', stored_only=True) == []
+
+
+def test_edit_distance():
+    assert edit_distance('pikachu', 'pikachu', 2) == 0
+    assert edit_distance('pikachu', 'pikahcu', 2) == 1
+    assert edit_distance('pikachu', 'raichu', 2) == 3
+    assert edit_distance('a', 'abcdef', 2) == 3
+
+
+def test_store_notices_name_lists_from_other_connections(tmp_path):
+    url = f"sqlite:///{tmp_path / 'dex.db'}"
+    ours, theirs = create_engine(url), create_engine(url)
+    Base.metadata.create_all(ours)
+    session = sessionmaker(bind=ours)()
+    NameListRepository.store_names(session, ['pikachu'])
+    session.commit()
+
+    store = NameIndexStore(poll_interval=0)
+    index = store.get(session)
+    assert store.get(session) is index and index.lookup('raichu') is None
+
+    # scout.py --fetch-names writes through its own engine: no commit listener fires in this one
+    other = sessionmaker(bind=theirs)()
+    NameListRepository.store_names(other, KNOWN)
+    other.commit()
+    other.close()
+
+    assert store.get(session).lookup('raichu').api_name == 'raichu'
+    store.close()
+    session.close()
@@ -0,0 +1,119 @@
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+from app.migrations import run_migrations
+from app.models import Pokemon
+from app.models.pokemon import Base
+from app.services.persistence import PokemonRepository, lookup_cache
+from app.services.pokemon_record import PokemonRecord
+from tests.conftest import make_session, sample_sanitized_pokemon
+
+
+def test_build_pokemon_fills_stat_columns(session):
+    pokemon = PokemonRepository.build_pokemon(session, sample_sanitized_pokemon())
+
+    assert pokemon.hp == 35
+    assert pokemon.attack == 55
+    assert pokemon.sp_atk == 50
+    assert pokemon.speed == 90
+    assert pokemon.defense is None
+    assert pokemon.total == 230
+
+
+def test_build_pokemon_shares_lookup_rows(session):
+    first = sample_sanitized_pokemon()
+    second = dict(sample_sanitized_pokemon(), name='Raichu', pokedex_number=26)
+    session.add(PokemonRepository.build_pokemon(session, first))
+    session.add(PokemonRepository.build_pokemon(session, second))
+    session.commit()
+
+    assert session.execute(text('SELECT COUNT(*) FROM type_names')).scalar() == 1
+    assert session.execute(text('SELECT COUNT(*) FROM stat_names')).scalar() == 4
+    raichu = session.query(Pokemon).filter_by(name='Raichu').one().to_dict()
+    assert raichu['types'] == [{'type': 'Electric', 'slot': 1}]
+    assert raichu['abilities'] == [{'ability': 'Static', 'is_hidden': False, 'slot': 1}]
+    assert raichu['stats'][0] == {'stat': 'HP', 'base_stat': 35, 'effort': 0}
+
+
+def test_lookup_ids_are_cached_per_engine():
+    first, second = make_session(), make_session()
+
+    assert [lookup_cache.resolve(first, 'type', name) for name in ('Water', 'Fire')] == [1, 2]
+    first.commit()
+    # same URL, different database: Fire is the second engine's first type
+    assert lookup_cache.resolve(second, 'type', 'Fire') == 1
+    second.commit()
+    assert lookup_cache.resolve(first, 'type', 'Fire') == 2
+    assert lookup_cache.name(second, 'type', 1) == 'Fire' and lookup_cache.name(first, 'type', 1) == 'Water'
+    for session in (first, second):
+        session.close()
+
+
+def test_migration_backfills_stat_columns_on_legacy_db():
+    engine = create_engine('sqlite:///:memory:')
+    with engine.begin() as conn:
+        # schema as it was before the wide stat columns existed
+        conn.execute(text('CREATE TABLE pokemon (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, '
+                          'pokedex_number INTEGER NOT NULL, height INTEGER, weight INTEGER, '
+                          'base_experience INTEGER, sprite_url VARCHAR)'))
+        conn.execute(text('CREATE TABLE pokemon_stats (id INTEGER PRIMARY KEY, pokemon_id INTEGER NOT NULL, '
+                          'stat_name VARCHAR NOT NULL, base_stat INTEGER NOT NULL, effort INTEGER)'))
+        conn.execute(text("INSERT INTO pokemon (id, name, pokedex_number) VALUES (1, 'Pikachu', 25)"))
+        conn.execute(text("INSERT INTO pokemon_stats (pokemon_id, stat_name, base_stat, effort) VALUES "
+                          "(1, 'HP', 35, 0), (1, 'SPEED', 90, 2)"))
+
+    run_migrations(engine)
+    run_migrations(engine)
+
+    with engine.connect() as conn:
+        row = conn.execute(text('SELECT hp, speed, attack, total FROM pokemon WHERE id = 1')).one()
+    assert tuple(row) == (35, 90, None, 125)
+
+
+def test_migration_moves_names_into_lookup_tables():
+    engine = create_engine('sqlite:///:memory:')
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE pokemon (id INTEGER PRIMARY KEY, name VARCHAR NOT NULL, '
+                          'pokedex_number INTEGER NOT NULL, height INTEGER, weight INTEGER, '
+                          'base_experience INTEGER, sprite_url VARCHAR)'))
+        conn.execute(text('CREATE TABLE pokemon_types (id INTEGER PRIMARY KEY, pokemon_id INTEGER NOT NULL, '
+                          'type_name VARCHAR NOT NULL, slot INTEGER)'))
+        conn.execute(text('CREATE TABLE pokemon_abilities (id INTEGER PRIMARY KEY, pokemon_id INTEGER NOT NULL, '
+                          'ability_name VARCHAR NOT NULL, is_hidden INTEGER, slot INTEGER)'))
+        conn.execute(text('CREATE TABLE pokemon_stats (id INTEGER PRIMARY KEY, pokemon_id INTEGER NOT NULL, '
+                          'stat_name VARCHAR NOT NULL, base_stat INTEGER NOT NULL, effort INTEGER)'))
+        conn.execute(text("INSERT INTO pokemon (id, name, pokedex_number) VALUES (1, 'Charizard', 6), (2, 'Ponyta', 77)"))
+        conn.execute(text("INSERT INTO pokemon_types (pokemon_id, type_name, slot) VALUES "
+                          "(1, 'Fire', 1), (1, 'Flying', 2), (2, 'Fire', 1)"))
+        conn.execute(text("INSERT INTO pokemon_abilities (pokemon_id, ability_name, is_hidden, slot) VALUES "
+                          "(1, 'Blaze', 0, 1), (2, 'Flash Fire', 0, 1)"))
+        conn.execute(text("INSERT INTO pokemon_stats (pokemon_id, stat_name, base_stat, effort) VALUES "
+                          "(1, 'SPEED', 100, 0), (2, 'SPEED', 90, 0)"))
+
+    Base.metadata.create_all(engine)
+    run_migrations(engine)
+    run_migrations(engine)
+
+    session = sessionmaker(bind=engine)()
+    charizard = session.get(Pokemon, 1).to_dict()
+    session.close()
+    assert charizard['types'] == [{'type': 'Fire', 'slot': 1}, {'type': 'Flying', 'slot': 2}]
+    assert charizard['abilities'] == [{'ability': 'Blaze', 'is_hidden': False, 'slot': 1}]
+    with engine.connect() as conn:
+        assert conn.execute(text('SELECT COUNT(*) FROM type_names')).scalar() == 2
+        assert conn.execute(text('SELECT speed FROM pokemon WHERE id = 1')).scalar() == 100
+        # aggregate tables are seeded from the existing rows
+        assert conn.execute(text("SELECT count FROM type_counts JOIN type_names ON id = type_id "
+                                 "WHERE name = 'Fire'")).scalar() == 2
+
+
+def test_build_pokemon_accepts_records(session):
+    from_record = PokemonRepository.build_pokemon(session, PokemonRecord.from_sanitized(sample_sanitized_pokemon()))
+    from_dict = PokemonRepository.build_pokemon(session, dict(sample_sanitized_pokemon(), name='Raichu'))
+    session.add_all([from_record, from_dict])
+    session.commit()
+
+    assert (from_record.hp, from_record.defense, from_record.total) == (35, None, 230)
+    record_dict, plain_dict = from_record.to_dict(), from_dict.to_dict()
+    for key in ('types', 'abilities', 'stats'):
+        assert record_dict[key] == plain_dict[key]
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from app.models import EvolutionClosure
+from app.services import PokeAPIService, UpstreamError
+from app.services import pokeapi as pokeapi_module
+from app.services.species import SpeciesRepository
+from benchmarks.pokeapi_standin import FixtureStore, PokeAPIStandIn
+from tests.conftest import CHAINS, FakePokeAPI, SPECIES_IDS, make_session, raw_species, sample_raw_pokemon
+
+
+@pytest.fixture()
+def fixtures(tmp_path):
+    store = FixtureStore(str(tmp_path / 'fixtures'))
+    store.save_json('pokemon/pikachu', sample_raw_pokemon())
+    store.save_json('pokemon', {'count': 1, 'results': [{'name': 'pikachu', 'url': '...'}]})
+    for name, species_id in SPECIES_IDS.items():
+        store.save_json(f'pokemon-species/{species_id}', raw_species(name))
+    for chain_id in CHAINS:
+        store.save_json(f'evolution-chain/{chain_id}', FakePokeAPI().get_evolution_chain(chain_id))
+    return store
+
+
+def test_replays_fixtures_over_http(fixtures, monkeypatch):
+    with PokeAPIStandIn(fixtures.root) as standin:
+        monkeypatch.setenv('POKEAPI_BASE_URL', standin.base_url)
+        pokeapi = PokeAPIService(moves=True)
+
+        assert pokeapi.get_pokemon('Pikachu')['name'] == 'pikachu'
+        assert pokeapi.get_pokemon_names() == ['pikachu']
+        assert pokeapi.get_pokemon('mewthree') is None
+        assert standin.counts['served'] == 2 and standin.counts['not_found'] == 1
+    assert fixtures.path('../../etc/passwd') is None
+
+
+def test_record_then_replay_offline(fixtures, tmp_path):
+    upstream = PokeAPIStandIn(fixtures.root).start()
+    recorder = PokeAPIStandIn(str(tmp_path / 'recorded'), record=True, upstream=upstream.base_url).start()
+    try:
+        assert PokeAPIService(base_url=recorder.base_url).get_pokemon('pikachu')['id'] == 25
+    finally:
+        upstream.stop()
+        recorder.stop()
+    assert recorder.counts['recorded'] == 1
+
+    with PokeAPIStandIn(str(tmp_path / 'recorded')) as replay:
+        assert PokeAPIService(base_url=replay.base_url).get_pokemon('pikachu')['id'] == 25
+
+
+def test_rate_limits_and_errors_are_retried(fixtures):
+    with PokeAPIStandIn(fixtures.root, rate_limit_rate=1.0) as standin:
+        with pytest.raises(UpstreamError) as error:
+            PokeAPIService(base_url=standin.base_url, retries=2).get_pokemon('pikachu')
+        assert error.value.status_code == 429 and standin.counts['rate_limited'] == 3
+
+    with PokeAPIStandIn(fixtures.root, error_rate=0.3, seed=2) as standin:
+        pokeapi = PokeAPIService(base_url=standin.base_url, retries=3)
+        assert all(pokeapi.get_pokemon('pikachu') for _ in range(10))
+        assert standin.counts['errors'] > 0 and standin.counts['served'] == 10
+
+
+def test_long_retry_after_is_capped(fixtures, monkeypatch):
+    monkeypatch.setattr(pokeapi_module, 'MAX_RETRY_AFTER', 0.05)
+    with PokeAPIStandIn(fixtures.root, rate_limit_rate=1.0, retry_after=60) as standin:
+        t0 = time.perf_counter()
+        with pytest.raises(UpstreamError):
+            PokeAPIService(base_url=standin.base_url, retries=2).get_pokemon('pikachu')
+        assert time.perf_counter() - t0 < 5 and standin.counts['rate_limited'] == 3
+
+
+def test_concurrent_species_fetch_end_to_end(fixtures):
+    session = make_session()
+
+    with PokeAPIStandIn(fixtures.root, latency_ms=20, jitter_ms=20) as standin:
+        result = SpeciesRepository.fetch_all(session, PokeAPIService(base_url=standin.base_url),
+                                             list(SPECIES_IDS.values()), workers=8)
+        session.commit()
+
+    assert (result['species'], result['chains'], result['failed']) == (7, 2, [])
+    assert standin.counts['requests'] == 7 + 2
+    assert session.query(EvolutionClosure).count() == 6 + 7
+    session.close()
+
+
+def test_selective_parse_is_opt_in(fixtures):
+    fixtures.save_json('pokemon/pikachu', dict(sample_raw_pokemon(), moves=[]))
+    with PokeAPIStandIn(fixtures.root) as standin:
+        assert 'moves' in PokeAPIService(base_url=standin.base_url).get_pokemon('pikachu')
+
+        selective = PokeAPIService(base_url=standin.base_url, selective=True)
+        assert 'moves' not in selective.get_pokemon('pikachu')
+        assert 'moves' in selective.get_pokemon('pikachu', selective=False)
@@ -0,0 +1,117 @@
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Pokemon
+from app.models.pokemon import Base
+from app.services.persistence import PokemonRepository
+from app.services.prefetch import Prefetcher
+from app.services.species import SpeciesRepository
+from tests.conftest import FakePokeAPI, SPECIES_IDS, raw_pokemon, sample_sanitized_pokemon
+
+
+class FakeDex(FakePokeAPI):
+    def __init__(self):
+        super().__init__()
+        self.times = []
+
+    def _count(self, key):
+        super()._count(key)
+        self.times.append(time.monotonic())
+
+    def get_pokemon(self, name):
+        self._count('pokemon')
+        number = int(name)
+        known = next((known for known, known_id in SPECIES_IDS.items() if known_id == number), None)
+        return raw_pokemon(known or f'mon-{number}', number, ['normal'], 50, 50)
+
+
+@pytest.fixture()
+def session_factory(tmp_path):
+    # the prefetcher works on its own thread, so it needs a database other connections can see
+    engine = create_engine(f"sqlite:///{tmp_path / 'prefetch.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    session = factory()
+    session.add(PokemonRepository.build_pokemon(session, sample_sanitized_pokemon()))
+    session.commit()
+    session.close()
+    yield factory
+    engine.dispose()
+
+
+def test_prefetches_family_then_neighbours_within_budget(session_factory):
+    pokeapi = FakeDex()
+    prefetcher = Prefetcher(session_factory, pokeapi, neighbours=2, budget=3, min_interval=0)
+
+    prefetcher.after_miss('Pikachu', 25)
+    prefetcher.drain()
+
+    session = session_factory()
+    assert sorted(name for name, in session.query(Pokemon.name)) == ['Mon-24', 'Pichu', 'Pikachu', 'Raichu']
+    # the chain was fetched on the way, so the family is known from now on
+    assert SpeciesRepository.species_for(session, 'Raichu').evolution_chain_id == 10
+    raichu_id = session.query(Pokemon.id).filter_by(name='Raichu').scalar()
+    session.close()
+
+    prefetcher.record_hit(raichu_id)
+    prefetcher.record_hit(raichu_id)
+    metrics = prefetcher.metrics()
+    assert (metrics['misses'], metrics['queued'], metrics['prefetched'], metrics['over_budget']) == (1, 3, 3, 2)
+    assert metrics['hits'] == 1 and metrics['hit_rate'] == pytest.approx(1 / 3)
+    assert metrics['saved_ratio'] == pytest.approx(0.5)
+
+    # the family now comes from the closure table and stored relatives are skipped
+    prefetcher.after_miss('Raichu', 26)
+    prefetcher.drain()
+    assert pokeapi.calls['species'] == 1 and pokeapi.calls['chain'] == 1
+    assert prefetcher.metrics()['already_stored'] >= 3
+
+
+def test_waits_for_foreground_requests(session_factory):
+    pokeapi = FakeDex()
+    prefetcher = Prefetcher(session_factory, pokeapi, neighbours=1, budget=2, min_interval=0)
+
+    with prefetcher.foreground():
+        prefetcher.after_miss('Pikachu', 25)
+        time.sleep(0.1)
+        assert sum(pokeapi.calls.values()) == 0
+    prefetcher.drain()
+
+    assert pokeapi.calls['pokemon'] == 2
+
+
+def test_background_requests_are_spaced_out(session_factory):
+    pokeapi = FakeDex()
+    prefetcher = Prefetcher(session_factory, pokeapi, neighbours=2, budget=4, min_interval=0.05)
+
+    prefetcher.after_miss('Pikachu', 25)
+    prefetcher.drain()
+
+    # species, chain and four Pokemon
+    assert len(pokeapi.times) == 6
+    assert min(b - a for a, b in zip(pokeapi.times, pokeapi.times[1:])) >= 0.05
+
+
+def test_prefetched_neighbour_is_served_as_a_hit(session_factory, monkeypatch):
+    from app import app, routes as routes_module
+
+    pokeapi = FakeDex()
+    prefetcher = Prefetcher(session_factory, pokeapi, neighbours=1, budget=2, min_interval=0)
+    monkeypatch.setattr(routes_module, 'Session', session_factory)
+    monkeypatch.setattr(routes_module, 'pokeapi_service', pokeapi)
+    monkeypatch.setattr(routes_module, 'prefetcher', prefetcher)
+    monkeypatch.setenv('PREFETCH', '1')
+    client = app.test_client()
+
+    assert client.get('/api/pokemon/26').status_code == 201
+    prefetcher.drain()
+    assert pokeapi.calls['pokemon'] == 3
+
+    resp = client.get('/api/pokemon/pichu')
+    assert resp.status_code == 200 and resp.get_json()['data']['name'] == 'Pichu'
+    assert pokeapi.calls['pokemon'] == 3
+    metrics = prefetcher.metrics()
+    assert (metrics['misses'], metrics['prefetched'], metrics['hits']) == (1, 2, 1)
@@ -0,0 +1,73 @@
+import random
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.pokemon import Base
+from app.services import PokemonQuery, PokemonRepository
+from app.services.read_model import ReadModel, ReadModelStore
+from tests.conftest import make_session, sample_sanitized_pokemon
+
+
+STATS = ['HP', 'ATTACK', 'DEFENSE', 'SPECIAL ATTACK', 'SPECIAL DEFENSE', 'SPEED']
+
+
+def add_pokemon(session, name, number, **overrides):
+    data = dict(sample_sanitized_pokemon(), name=name, pokedex_number=number, **overrides)
+    session.add(PokemonRepository.build_pokemon(session, data))
+
+
+def random_roster(session, count=60):
+    rng = random.Random(7)
+    for i in range(count):
+        # some stats and metrics left out, so NULL ordering and filtering get exercised
+        stats = [{'stat_name': stat, 'base_stat': rng.randint(1, 9) * 10, 'effort': 0}
+                 for stat in STATS if rng.random() > 0.2]
+        types = [{'type_name': rng.choice(['Fire', 'Water', 'Grass']), 'slot': 1}]
+        abilities = [{'ability_name': rng.choice(['Blaze', 'Torrent']), 'is_hidden': rng.random() > 0.5, 'slot': 1}]
+        add_pokemon(session, f'Mon{rng.randint(0, 10 ** 6)}x{i}', rng.randint(1, 20), stats=stats, types=types,
+                    abilities=abilities, base_experience=None if rng.random() < 0.2 else rng.randint(50, 60))
+    session.commit()
+
+
+def test_queries_match_sql(tmp_path):
+    session = make_session()
+    random_roster(session)
+    model = ReadModel.from_session(session)
+
+    for args in ({}, {'sort': '-hp'}, {'sort': 'speed,-name'}, {'sort': 'base_experience,-total', 'limit': '7'},
+                 {'type': 'fire', 'min_attack': '40', 'sort': '-pokedex'}, {'hidden_ability': 'blaze'},
+                 {'max_total': '300', 'sort': 'weight,name', 'offset': '3'}, {'type': 'fire,water'},
+                 {'ability': 'torrent', 'sort': '-base_experience'}):
+        query = PokemonQuery.from_args(args)
+        page, total = model.page(query)
+        assert page == [p.to_dict() for p in query.fetch(session)], args
+        assert total == query.count(session), args
+
+
+def test_store_notices_commits_from_other_connections(tmp_path):
+    url = f"sqlite:///{tmp_path / 'dex.db'}"
+    ours, theirs = create_engine(url), create_engine(url)
+    Base.metadata.create_all(ours)
+    session = sessionmaker(bind=ours)()
+    add_pokemon(session, 'Pikachu', 25)
+    session.commit()
+
+    store = ReadModelStore(poll_interval=0)
+    model = store.get(session)
+    assert len(model) == 1 and model.version is not None
+    assert store.get(session) is model
+
+    # another worker writes through its own engine: no commit listener fires in this one
+    other = sessionmaker(bind=theirs)()
+    add_pokemon(other, 'Raichu', 26)
+    other.commit()
+    other.close()
+
+    refreshed = store.get(session)
+    assert refreshed is not model
+    assert refreshed.get('Raichu')['pokedex_number'] == 26
+    # the old version is untouched for whoever still holds it
+    assert model.get('Raichu') is None
+    store.close()
+    session.close()
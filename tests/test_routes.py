@@ -2,6 +2,8 @@ import os
 
 import pytest
 
+from tests.conftest import FakePokeAPI, PIKACHU_MOVES, PNG, raw_pokemon, raw_with_moves
+
 
 # Ensure tests use an in-memory database and testing config
 os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
@@ -57,3 +59,432 @@ def test_get_and_store_pokemon_not_found(client, monkeypatch):
     assert resp.status_code == 404
     data = resp.get_json()
     assert 'error' in data
+
+
+def test_get_and_store_pokemon_over_http(client, monkeypatch, tmp_path):
+    from app import routes as routes_module
+    from benchmarks.pokeapi_standin import FixtureStore, PokeAPIStandIn
+
+    FixtureStore(str(tmp_path)).save_json('pokemon/pikachu', sample_raw_pokemon())
+    with PokeAPIStandIn(str(tmp_path), rate_limit_rate=0.5, seed=3) as standin:
+        monkeypatch.setattr(routes_module.pokeapi_service, 'base_url', standin.base_url)
+
+        resp = client.get('/api/pokemon/pikachu')
+        assert resp.status_code == 201 and resp.get_json()['data']['pokedex_number'] == 25
+        assert client.get('/api/pokemon/unknownmon').status_code == 404
+    assert standin.counts['served'] == 1 and standin.counts['not_found'] == 1
+
+
+def test_upstream_outage_is_not_a_404(client, monkeypatch, tmp_path):
+    from app import routes as routes_module
+    from benchmarks.pokeapi_standin import FixtureStore, PokeAPIStandIn
+
+    FixtureStore(str(tmp_path)).save_json('pokemon/pikachu', sample_raw_pokemon())
+    with PokeAPIStandIn(str(tmp_path), rate_limit_rate=1.0) as standin:
+        monkeypatch.setattr(routes_module.pokeapi_service, 'base_url', standin.base_url)
+        assert client.get('/api/pokemon/pikachu').status_code == 503
+    with PokeAPIStandIn(str(tmp_path), error_rate=1.0) as standin:
+        monkeypatch.setattr(routes_module.pokeapi_service, 'base_url', standin.base_url)
+        assert client.get('/api/pokemon/pikachu').status_code == 502
+
+
+@pytest.fixture()
+def stored_roster(client, monkeypatch):
+    from app import routes as routes_module
+
+    roster = {
+        'charizard': raw_pokemon('charizard', 6, ['fire', 'flying'], 100, 84, [('blaze', False), ('solar-power', True)]),
+        'arcanine': raw_pokemon('arcanine', 59, ['fire'], 95, 110, [('intimidate', False), ('justified', True)]),
+        'jolteon': raw_pokemon('jolteon', 135, ['electric'], 130, 65, [('volt-absorb', False)]),
+        'pikachu': raw_pokemon('pikachu', 25, ['electric'], 90, 55, [('static', False), ('lightning-rod', True)]),
+    }
+    monkeypatch.setattr(routes_module.pokeapi_service, 'get_pokemon', lambda name: roster[name])
+    for name in roster:
+        assert client.get(f'/api/pokemon/{name}').status_code == 201
+    return client
+
+
+def test_list_pokemon_filters_and_sorts(stored_roster):
+    resp = stored_roster.get('/api/pokemon?type=fire&min_speed=96&sort=-attack')
+    assert resp.status_code == 200
+    assert [p['name'] for p in resp.get_json()['pokemon']] == ['Charizard']
+
+    resp = stored_roster.get('/api/pokemon?sort=-speed,name')
+    assert [p['name'] for p in resp.get_json()['pokemon']] == ['Jolteon', 'Charizard', 'Arcanine', 'Pikachu']
+
+    resp = stored_roster.get('/api/pokemon?hidden_ability=lightning-rod')
+    assert [p['name'] for p in resp.get_json()['pokemon']] == ['Pikachu']
+
+    resp = stored_roster.get('/api/pokemon?min_pokedex=10&max_pokedex=100&sort=pokedex')
+    assert [p['name'] for p in resp.get_json()['pokemon']] == ['Pikachu', 'Arcanine']
+
+
+def test_list_pokemon_paginates(stored_roster):
+    resp = stored_roster.get('/api/pokemon?sort=pokedex&limit=2&offset=1')
+    data = resp.get_json()
+    assert data['total'] == 4
+    assert data['count'] == 2
+    assert [p['pokedex_number'] for p in data['pokemon']] == [25, 59]
+
+
+def test_list_pokemon_rejects_bad_parameters(stored_roster):
+    assert stored_roster.get('/api/pokemon?sort=-shininess').status_code == 400
+    assert stored_roster.get('/api/pokemon?min_speed=fast').status_code == 400
+
+
+def test_read_model_matches_database_reads(stored_roster, monkeypatch):
+    from app import routes as routes_module
+
+    urls = ['/api/pokemon', '/api/pokemon?type=fire&min_speed=96&sort=-attack',
+            '/api/pokemon?sort=-speed,name', '/api/pokemon?hidden_ability=lightning-rod&ability=static',
+            '/api/pokemon?sort=-hp,pokedex&limit=2&offset=1', '/api/pokemon?min_hp=1',
+            '/api/pokemon/charizard/info', '/api/pokemon/missingno/info']
+    expected = [(stored_roster.get(url).status_code, stored_roster.get(url).get_json()) for url in urls]
+
+    monkeypatch.setenv('READ_MODEL', '1')
+    assert [(stored_roster.get(url).status_code, stored_roster.get(url).get_json()) for url in urls] == expected
+
+    # ingestion swaps in a new version
+    monkeypatch.setattr(routes_module.pokeapi_service, 'get_pokemon',
+                        lambda name: raw_pokemon('raichu', 26, ['electric'], 110, 90))
+    stored_roster.get('/api/pokemon/raichu')
+    assert stored_roster.get('/api/pokemon/raichu/info').get_json()['pokedex_number'] == 26
+    data = stored_roster.get('/api/pokemon?type=electric&sort=-speed').get_json()
+    assert [p['name'] for p in data['pokemon']] == ['Jolteon', 'Raichu', 'Pikachu']
+
+
+def test_typo_tolerant_lookups_and_autocomplete(stored_roster, monkeypatch):
+    from app import Session, routes as routes_module
+    from app.services.name_index import NameListRepository
+
+    data = stored_roster.get('/api/pokemon/autocomplete?q=PI').get_json()
+    assert (data['fuzzy'], [s['name'] for s in data['suggestions']]) == (False, ['Pikachu'])
+    data = stored_roster.get('/api/pokemon/autocomplete?q=jolteom').get_json()
+    assert (data['fuzzy'], data['suggestions']) == (True, [{'name': 'Jolteon', 'stored': True}])
+
+    assert stored_roster.get('/api/pokemon/PIKACHU/info').get_json()['name'] == 'Pikachu'
+    resp = stored_roster.get('/api/pokemon/pikachuu/info')
+    assert resp.status_code == 404 and resp.get_json()['did_you_mean'] == ['Pikachu']
+
+    session = Session()
+    NameListRepository.store_names(session, ['pikachu', 'mr-mime', 'bulbasaur'])
+    session.commit()
+    session.close()
+
+    requested = []
+    monkeypatch.setattr(routes_module.pokeapi_service, 'get_pokemon',
+                        lambda name: requested.append(name) or raw_pokemon(name, 122, ['psychic'], 90, 45))
+    assert stored_roster.get('/api/pokemon/MR. MIME').status_code == 201
+    resp = stored_roster.get('/api/pokemon/bulbsaur')
+    assert resp.status_code == 404 and resp.get_json()['did_you_mean'] == ['Bulbasaur']
+    assert requested == ['mr-mime']
+    assert stored_roster.get('/api/pokemon/mr_mime').get_json()['message'] == 'Mr-mime already in database'
+
+    # the name list has no numbers, so a pokedex id is still asked for upstream
+    monkeypatch.setattr(routes_module.pokeapi_service, 'get_pokemon',
+                        lambda name: requested.append(name) or raw_pokemon('bulbasaur', 1, ['grass'], 45, 45))
+    assert stored_roster.get('/api/pokemon/1').status_code == 201
+    assert requested[-1] == '1'
+
+
+def test_changes_endpoint_syncs_incrementally(stored_roster):
+    from app import Session
+    from app.models import Pokemon
+
+    data = stored_roster.get('/api/pokemon/changes?limit=3').get_json()
+    assert [c['name'] for c in data['changes']] == ['Charizard', 'Arcanine', 'Jolteon']
+    assert data['has_more'] and data['latest_version'] == 4
+    data = stored_roster.get(f"/api/pokemon/changes?since={data['next_since']}").get_json()
+    assert [c['data']['name'] for c in data['changes']] == ['Pikachu'] and not data['has_more']
+    synced = data['next_since']
+
+    session = Session()
+    session.delete(session.query(Pokemon).filter_by(name='Jolteon').one())
+    session.commit()
+    session.close()
+
+    data = stored_roster.get(f'/api/pokemon/changes?since={synced}').get_json()
+    assert [(c['name'], c['deleted'], c['data']) for c in data['changes']] == [('Jolteon', True, None)]
+    assert stored_roster.get('/api/pokemon/changes?since=-1').status_code == 400
+
+
+def test_family_endpoint(stored_roster):
+    from app import Session
+    from app.services.species import SpeciesRepository
+
+    assert stored_roster.get('/api/pokemon/jolteon/family').status_code == 503
+
+    session = Session()
+    SpeciesRepository.fetch_all(session, FakePokeAPI())
+    session.commit()
+    session.close()
+
+    data = stored_roster.get('/api/pokemon/JOLTEON/family').get_json()
+    assert data['pokemon'] == 'Jolteon' and data['species']['id'] == 135
+    assert data['ancestors'] == ['Eevee'] and data['descendants'] == []
+    assert [(m['name'], m['stored']) for m in data['family']] == [
+        ('Eevee', []), ('Vaporeon', []), ('Jolteon', ['Jolteon']), ('Flareon', [])]
+    assert stored_roster.get('/api/pokemon/pikachu/family').get_json()['descendants'] == ['Raichu']
+    assert stored_roster.get('/api/pokemon/charizard/family').status_code == 404
+
+
+def test_learnset_endpoints(client, monkeypatch):
+    from app import routes as routes_module
+
+    monkeypatch.setattr(routes_module.pokeapi_service, 'get_pokemon',
+                        lambda name: raw_with_moves('pikachu', 25, PIKACHU_MOVES))
+    assert client.get('/api/pokemon/pikachu').status_code == 201
+
+    data = client.get('/api/pokemon/PIKACHU/moves?version_group=red-blue').get_json()
+    assert data['pokemon'] == 'Pikachu' and data['count'] == 3
+    assert [m['move'] for m in data['moves']] == ['Thunderbolt', 'Thunder Shock', 'Quick Attack']
+
+    data = client.get('/api/moves/quick-attack/learners').get_json()
+    assert data['move'] == 'Quick Attack' and [p['name'] for p in data['pokemon']] == ['Pikachu']
+
+    assert client.get('/api/pokemon/pikachu/moves?method=egg').status_code == 400
+    assert client.get('/api/pokemon/raichu/moves').status_code == 404
+    assert client.get('/api/moves/surf/learners').status_code == 404
+
+
+def test_sprite_cache_endpoint(client, monkeypatch, tmp_path):
+    from app import routes as routes_module
+    from app.services.sprites import SpriteStore
+
+    monkeypatch.setenv('LOCAL_SPRITES', '1')
+    monkeypatch.setattr(routes_module, 'sprite_store', SpriteStore(str(tmp_path)))
+    monkeypatch.setattr(routes_module.pokeapi_service, 'get_pokemon', lambda name: sample_raw_pokemon())
+    monkeypatch.setattr(routes_module.pokeapi_service, 'get_sprite', lambda url: PNG)
+
+    # the sprite is fetched once the response has gone out, so the first answer still has the remote URL
+    resp = client.get('/api/pokemon/pikachu')
+    assert resp.status_code == 201 and resp.get_json()['data']['sprite_url'] == 'https://example.com/front.png'
+    resp.close()
+    sprite_url = client.get('/api/pokemon/pikachu/info').get_json()['sprite_url']
+    assert sprite_url.startswith('/sprites/')
+
+    resp = client.get(sprite_url)
+    assert resp.status_code == 200 and resp.data == PNG and resp.mimetype == 'image/png'
+    assert resp.headers['ETag'] == f'"{sprite_url[len("/sprites/"):]}"'
+    assert 'immutable' in resp.headers['Cache-Control'] and 'max-age=31536000' in resp.headers['Cache-Control']
+    assert resp.headers['Content-Security-Policy'].startswith("default-src 'none'")
+    assert not resp.headers.get('Content-Disposition', '').startswith('attachment')
+
+    assert client.get(sprite_url, headers={'If-None-Match': resp.headers['ETag']}).status_code == 304
+    resp = client.get(sprite_url, headers={'Range': 'bytes=0-7'})
+    assert resp.status_code == 206 and resp.data == PNG[:8]
+    assert client.get('/sprites/' + '0' * 64).status_code == 404
+    assert client.get('/sprites/not-a-hash').status_code == 404
+
+    monkeypatch.delenv('LOCAL_SPRITES')
+    assert client.get('/api/pokemon/pikachu/info').get_json()['sprite_url'] == 'https://example.com/front.png'
+
+
+def test_sprite_failures_never_fail_the_store(client, monkeypatch, tmp_path):
+    from app import routes as routes_module
+    from app.services.sprites import SpriteStore
+
+    class BrokenStore(SpriteStore):
+        def put(self, data):
+            raise OSError('disk full')
+
+    monkeypatch.setenv('LOCAL_SPRITES', '1')
+    monkeypatch.setattr(routes_module, 'sprite_store', BrokenStore(str(tmp_path)))
+    monkeypatch.setattr(routes_module.pokeapi_service, 'get_pokemon', lambda name: sample_raw_pokemon())
+    monkeypatch.setattr(routes_module.pokeapi_service, 'get_sprite', lambda url: b'<svg onload="alert(1)"/>')
+
+    resp = client.get('/api/pokemon/pikachu')
+    assert resp.status_code == 201
+    resp.close()
+    assert client.get('/api/pokemon/pikachu/info').get_json()['sprite_url'] == 'https://example.com/front.png'
+
+    # an SVG that did make it into the cache is served so that it can't run as a page
+    svg_hash = SpriteStore.put(routes_module.sprite_store, b'<svg onload="alert(1)"/>')
+    resp = client.get(f'/sprites/{svg_hash}')
+    assert resp.mimetype == 'image/svg+xml' and 'sandbox' in resp.headers['Content-Security-Policy']
+    assert resp.headers['Content-Disposition'].startswith('attachment')
+
+
+def test_prefetch_metrics_endpoint(stored_roster):
+    data = stored_roster.get('/api/prefetch/metrics').get_json()
+
+    assert data['enabled'] is False
+    assert (data['misses'], data['prefetched'], data['hits'], data['hit_rate']) == (0, 0, 0, 0.0)
+
+
+def test_stats_endpoint_reads_aggregates(stored_roster):
+    data = stored_roster.get('/api/stats').get_json()
+
+    assert data['total'] == 4
+    assert data['types'] == {'Electric': 2, 'Fire': 2, 'Flying': 1}
+    assert data['metrics']['speed']['mean'] == pytest.approx(103.75)
+
+
+def test_analytics_endpoints(stored_roster):
+    data = stored_roster.get('/api/analytics/top?by=speed&k=2').get_json()
+    assert [r['name'] for r in data['results']] == ['Jolteon', 'Charizard']
+
+    data = stored_roster.get('/api/analytics/top?by=attack:1,speed:1&type=fire').get_json()
+    assert [r['name'] for r in data['results']] == ['Arcanine', 'Charizard']
+
+    data = stored_roster.get('/api/analytics/threshold?min_speed=95&min_attack=80').get_json()
+    assert sorted(p['name'] for p in data['pokemon']) == ['Arcanine', 'Charizard']
+
+    assert stored_roster.get('/api/analytics/top?by=luck').status_code == 400
+    assert stored_roster.get('/api/analytics/zscores/jolteon').status_code == 200
+
+
+def test_analytics_failures_are_json(stored_roster, monkeypatch):
+    from app import routes as routes_module
+
+    def broken(session):
+        raise RuntimeError('stat matrix cache unreadable')
+
+    monkeypatch.setattr(routes_module.stat_matrix_store, 'get', broken)
+    for url in ('/api/analytics/top', '/api/analytics/percentiles', '/api/analytics/threshold?min_speed=1'):
+        resp = stored_roster.get(url)
+        assert resp.status_code == 500 and 'stat matrix cache unreadable' in resp.get_json()['error']
+
+
+def test_similar_pokemon_updates_after_ingest(stored_roster, monkeypatch):
+    from app import routes as routes_module
+
+    data = stored_roster.get('/api/pokemon/pikachu/similar?k=1').get_json()
+    assert [p['name'] for p in data['similar']] == ['Charizard']
+    data = stored_roster.get('/api/pokemon/pikachu/similar?type=electric').get_json()
+    assert [p['name'] for p in data['similar']] == ['Jolteon']
+
+    monkeypatch.setattr(routes_module.pokeapi_service, 'get_pokemon',
+                        lambda name: raw_pokemon('raichu', 26, ['electric'], 91, 56))
+    stored_roster.get('/api/pokemon/raichu')
+
+    data = stored_roster.get('/api/pokemon/pikachu/similar?k=1&type=electric').get_json()
+    assert [p['name'] for p in data['similar']] == ['Raichu']
+    assert stored_roster.get('/api/pokemon/missingno/similar').status_code == 404
+
+
+def test_matchups_endpoint(stored_roster):
+    from app import Session
+    from app.services import DataProcessor, TypeChartRepository
+
+    assert stored_roster.get('/api/matchups?pokemon=pikachu').status_code == 503
+
+    session = Session()
+    for name, double, half, none in (('electric', ['water', 'flying'], ['electric'], ['ground']),
+                                     ('fire', ['grass'], ['fire', 'water'], []),
+                                     ('flying', ['grass'], ['electric'], [])):
+        TypeChartRepository.store_type(session, DataProcessor.sanitize_type_data({
+            'name': name,
+            'damage_relations': {
+                'double_damage_to': [{'name': t} for t in double],
+                'half_damage_to': [{'name': t} for t in half],
+                'no_damage_to': [{'name': t} for t in none],
+            }
+        }))
+    session.commit()
+    session.close()
+
+    data = stored_roster.get('/api/matchups?pokemon=pikachu,charizard&defenders=charizard,jolteon').get_json()
+    assert data['effectiveness'] == [[2.0, 0.5], [1.0, 1.0]]
+    assert data['by_type']['Charizard'] == {'Fire': [0.5, 1.0], 'Flying': [1.0, 0.5]}
+    assert data['defense']['Charizard']['Electric'] == 2.0
+
+    assert stored_roster.get('/api/matchups?pokemon=pikachu,missingno').status_code == 404
+    assert stored_roster.get('/api/matchups').status_code == 400
+
+
+def test_matchup_failures_are_json(stored_roster, monkeypatch):
+    from app import routes as routes_module
+
+    def broken(session):
+        raise RuntimeError('type chart cache unreadable')
+
+    monkeypatch.setattr(routes_module.type_chart_store, 'get', broken)
+    resp = stored_roster.get('/api/matchups?pokemon=pikachu')
+    assert resp.status_code == 500 and 'type chart cache unreadable' in resp.get_json()['error']
+
+
+def test_team_optimize_endpoint(stored_roster):
+    from app import Session
+    from app.services import DataProcessor, TypeChartRepository
+
+    assert stored_roster.get('/api/team/optimize').status_code == 503
+
+    session = Session()
+    for name, double, half in (('electric', ['water', 'flying'], ['electric']),
+                               ('fire', ['grass'], ['fire', 'water']),
+                               ('flying', ['grass'], ['electric'])):
+        TypeChartRepository.store_type(session, DataProcessor.sanitize_type_data({
+            'name': name,
+            'damage_relations': {
+                'double_damage_to': [{'name': t} for t in double],
+                'half_damage_to': [{'name': t} for t in half],
+            }
+        }))
+    session.commit()
+    session.close()
+
+    data = stored_roster.get('/api/team/optimize?size=2&banned_types=flying').get_json()
+    assert data['optimal']
+    assert sorted(p['name'] for p in data['team']) == ['Arcanine', 'Jolteon']
+
+    data = stored_roster.get('/api/team/optimize?size=2&required=pikachu').get_json()
+    assert [p['name'] for p in data['team']] == ['Pikachu', 'Arcanine']
+    data = stored_roster.get('/api/team/optimize?size=2&required=pikachu&min_total=206').get_json()
+    assert [p['name'] for p in data['team']] == ['Pikachu']
+
+    assert stored_roster.get('/api/team/optimize?size=9').status_code == 400
+    assert stored_roster.get('/api/team/optimize?required=missingno').status_code == 404
+
+
+def test_team_optimizer_failures_are_json(stored_roster, monkeypatch):
+    from app import routes as routes_module
+
+    def broken(session):
+        raise RuntimeError('type chart cache unreadable')
+
+    monkeypatch.setattr(routes_module.type_chart_store, 'get', broken)
+    resp = stored_roster.get('/api/team/optimize?size=2')
+    assert resp.status_code == 500 and 'type chart cache unreadable' in resp.get_json()['error']
+
+
+def test_damage_endpoint(stored_roster):
+    from app import Session
+    from app.services import DataProcessor, TypeChartRepository
+
+    session = Session()
+    TypeChartRepository.store_type(session, DataProcessor.sanitize_type_data({
+        'name': 'electric',
+        'damage_relations': {'double_damage_to': [{'name': 'flying'}], 'no_damage_to': [{'name': 'ground'}]}
+    }))
+    session.commit()
+    session.close()
+
+    data = stored_roster.get('/api/damage?attacker=jolteon&defender=charizard,arcanine').get_json()
+    assert data['defenders'] == ['Charizard', 'Arcanine']
+    low, high = data['min'][0], data['max'][0]
+    assert low[0] > low[1] and high[0] > high[1]          # super effective on Charizard
+    assert all(lo <= hi for lo, hi in zip(low, high))
+    assert data['defender_hp'] == [75, 75]                 # no HP stat stored: base 0 at level 50
+
+    data = stored_roster.get('/api/damage?attacker=jolteon&defender=charizard&move_type=ground&power=100').get_json()
+    assert data['max'][0][0] > 0
+
+    assert stored_roster.get('/api/damage?attacker=jolteon&power=0').status_code == 400
+    assert stored_roster.get('/api/damage?attacker=missingno').status_code == 404
+    assert stored_roster.get('/api/damage?attacker=jolteon&move_type=shadow').status_code == 400
+
+
+def test_damage_refreshes_a_stale_stat_matrix(stored_roster, monkeypatch):
+    import numpy as np
+    from app import routes as routes_module
+    from app.services import StatMatrix, TypeChart
+    from app.services.stat_matrix import RECORD_DTYPE
+
+    # a matrix built before any of the roster was stored
+    monkeypatch.setattr(routes_module.stat_matrix_store, '_matrix', StatMatrix(np.zeros(0, dtype=RECORD_DTYPE)))
+    monkeypatch.setattr(routes_module.type_chart_store, 'get',
+                        lambda session: TypeChart([1], ['Normal'], [[1.0]]))
+
+    resp = stored_roster.get('/api/damage?attacker=jolteon&defender=charizard')
+    assert resp.status_code == 200 and resp.get_json()['max'][0][0] > 0
@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from app.services.data_processor import DataProcessor
+from app.services.selective_json import JsonIndex, extract, parse_pokemon
+from tests.conftest import sample_raw_pokemon
+
+
+def test_parse_pokemon_matches_full_parse():
+    raw = sample_raw_pokemon()
+    raw['moves'] = [{'move': {'name': 'thunder-shock', 'url': '"}{,:'}}] * 50
+    raw['sprites']['versions'] = {'generation-i': {'red-blue': {'front_default': 'ignored'}}}
+
+    for text in (json.dumps(raw), json.dumps(raw, indent=2), json.dumps(raw, ensure_ascii=False)):
+        parsed = parse_pokemon(text.encode('utf-8'))
+        assert 'moves' not in parsed
+        assert 'versions' not in parsed['sprites']
+        assert DataProcessor.sanitize_pokemon_data(parsed) == DataProcessor.sanitize_pokemon_data(raw)
+
+
+def test_extract_handles_escapes_nesting_and_missing_keys():
+    document = {
+        'name': 'say \\"hi\\" \\\\',
+        'decoy': {'name': 'nested', 'id': 2},
+        'a\\"b': [1, {'x': '}'}],
+        'id': 1,
+        'sprites': None,
+        'é': 'ünïcode',
+    }
+    data = json.dumps(document, ensure_ascii=False).encode('utf-8')
+
+    result = extract(data, {'name': None, 'id': None, 'a\\"b': None, 'é': None, 'sprites': {'front_default': None},
+                            'missing': None})
+
+    assert result == {'name': document['name'], 'id': 1, 'a\\"b': [1, {'x': '}'}], 'é': 'ünïcode', 'sprites': None}
+    assert extract(data, {'decoy': {'id': None}}) == {'decoy': {'id': 2}}
+
+
+def test_malformed_documents_raise_value_error():
+    for data in (b'{"name": "open', b'{"name": 1', b'[1, 2]', b'   '):
+        with pytest.raises(ValueError):
+            extract(data, {'name': None})
+    assert JsonIndex(b'{}').members() == {}
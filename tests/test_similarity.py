@@ -0,0 +1,107 @@
+import threading
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models.pokemon import Base
+from app.services import PokemonRepository
+from app.services.similarity import SimilarityIndexStore, StatVectorIndex
+from tests.conftest import sanitized_with_stats
+
+
+@pytest.fixture()
+def index():
+    rng = np.random.default_rng(7)
+    stats = rng.integers(20, 180, size=(200, 6))
+    type_ids = rng.integers(1, 5, size=(200, 2))
+    return StatVectorIndex(np.arange(1, 201), stats, type_ids), stats, type_ids
+
+
+def test_nearest_matches_brute_force(index):
+    index, stats, _ = index
+    scale = stats.std(axis=0)
+    expected = np.sqrt((((stats - stats[0]) / scale) ** 2).sum(axis=1))
+    expected[0] = np.inf
+
+    neighbours = index.similar_to(1, k=5)
+
+    assert [pokemon_id for pokemon_id, _ in neighbours] == list(np.argsort(expected)[:5] + 1)
+    assert neighbours[0][1] == pytest.approx(expected.min())
+
+
+def test_type_filter_and_cosine(index):
+    index, _, type_ids = index
+    neighbours = index.similar_to(1, k=10, metric='cosine', type_id=3)
+
+    assert neighbours
+    assert all(3 in type_ids[pokemon_id - 1] for pokemon_id, _ in neighbours)
+    assert all(0 <= distance <= 1 for _, distance in neighbours)
+    with pytest.raises(ValueError):
+        index.similar_to(1, metric='manhattan')
+
+
+def test_incremental_upsert_and_remove(index):
+    index, stats, _ = index
+    index.upsert(999, stats[0] + 1, [1])
+    assert index.similar_to(1, k=1)[0][0] == 999
+
+    index.remove(999)
+    index.remove(2)
+    assert 999 not in index and 2 not in index
+    assert len(index) == 199
+    assert all(pokemon_id not in (2, 999) for pokemon_id, _ in index.similar_to(1, k=198))
+
+
+def test_readers_wait_for_a_write_in_progress(index, monkeypatch):
+    index, stats, _ = index
+    inside, release = threading.Event(), threading.Event()
+    derive = index._derive
+
+    def paused_derive(rows):
+        # the arrays have just been reallocated and the new row is only half written
+        inside.set()
+        release.wait(5)
+        derive(rows)
+
+    monkeypatch.setattr(index, '_derive', paused_derive)
+    writer = threading.Thread(target=index.upsert, args=(999, stats[0], [1]))
+    writer.start()
+    assert inside.wait(5)
+
+    results = []
+    reader = threading.Thread(target=lambda: results.append(index.similar_to(1, k=1)))
+    reader.start()
+    reader.join(0.2)
+    assert results == []
+
+    release.set()
+    writer.join()
+    reader.join()
+    assert results[0][0][0] == 999
+
+
+def test_store_notices_commits_from_other_connections(tmp_path):
+    url = f"sqlite:///{tmp_path / 'dex.db'}"
+    ours, theirs = create_engine(url), create_engine(url)
+    Base.metadata.create_all(ours)
+    session = sessionmaker(bind=ours)()
+    for name, number in (('Pichu', 172), ('Pikachu', 25)):
+        session.add(PokemonRepository.build_pokemon(session, sanitized_with_stats(name, number, ['Electric'],
+                                                                          [40] * 6)))
+    session.commit()
+
+    store = SimilarityIndexStore(poll_interval=0)
+    assert len(store.get(session)) == 2
+
+    other = sessionmaker(bind=theirs)()
+    raichu = PokemonRepository.build_pokemon(other, sanitized_with_stats('Raichu', 26, ['Electric'], [60] * 6))
+    other.add(raichu)
+    other.commit()
+    raichu_id = raichu.id
+    other.close()
+
+    assert raichu_id in store.get(session)
+    store.close()
+    session.close()
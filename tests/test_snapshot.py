@@ -0,0 +1,74 @@
+import struct
+
+import pytest
+
+from app.models import Pokemon
+from app.services import PokemonRepository
+from app.services.snapshot import HEADER, DexSnapshot, write_snapshot
+from tests.conftest import make_session, sample_sanitized_pokemon
+
+
+@pytest.fixture()
+def session(session):
+    for name, number in (('Raichu', 26), ('Pikachu', 25), ('Pichu', 172), ('Pikachu-Gmax', 25)):
+        session.add(PokemonRepository.build_pokemon(
+            session, dict(sample_sanitized_pokemon(), name=name, pokedex_number=number)
+        ))
+    mew = PokemonRepository.build_pokemon(session, dict(sample_sanitized_pokemon(), name='Mew', pokedex_number=151,
+                                                        base_experience=None, sprite_url=None, types=[]))
+    session.add(mew)
+    session.commit()
+    return session
+
+
+def test_snapshot_round_trips_to_dict(session, tmp_path):
+    path = str(tmp_path / 'dex.snap')
+    assert write_snapshot(session, path)['count'] == 5
+
+    with DexSnapshot(path) as snapshot:
+        assert len(snapshot) == 5
+        for pokemon in session.query(Pokemon):
+            assert snapshot.get(pokemon.name.upper()) == pokemon.to_dict()
+        assert snapshot.get('Missingno') is None
+
+
+def test_number_index_and_listing(session, tmp_path):
+    path = str(tmp_path / 'dex.snap')
+    write_snapshot(session, path)
+
+    with DexSnapshot(path) as snapshot:
+        assert [p['name'] for p in snapshot.by_number(25)] == ['Pikachu', 'Pikachu-Gmax']
+        assert snapshot.by_number(1) == []
+        assert [row[:2] for row in snapshot.listing()] == [
+            (25, 'Pikachu'), (25, 'Pikachu-Gmax'), (26, 'Raichu'), (151, 'Mew'), (172, 'Pichu')
+        ]
+        assert [row[2] for row in snapshot.listing()][3] == []
+
+
+def test_empty_dex(tmp_path):
+    path = str(tmp_path / 'empty.snap')
+    write_snapshot(make_session(), path)
+
+    with DexSnapshot(path) as snapshot:
+        assert len(snapshot) == 0
+        assert snapshot.get('Pikachu') is None
+        assert list(snapshot.listing()) == []
+
+
+def test_rejects_other_files_and_versions(session, tmp_path):
+    path = tmp_path / 'dex.snap'
+    write_snapshot(session, str(path))
+    data = bytearray(path.read_bytes())
+
+    struct.pack_into('<H', data, 8, 99)
+    (tmp_path / 'future.snap').write_bytes(bytes(data))
+    with pytest.raises(ValueError, match='version 99'):
+        DexSnapshot(str(tmp_path / 'future.snap'))
+
+    (tmp_path / 'short.snap').write_bytes(path.read_bytes()[:HEADER.size + 16])
+    with pytest.raises(ValueError, match='truncated'):
+        DexSnapshot(str(tmp_path / 'short.snap'))
+
+    (tmp_path / 'other.snap').write_bytes(b'{"count": 0}' * 20)
+    with pytest.raises(ValueError, match='not a dex snapshot'):
+        DexSnapshot(str(tmp_path / 'other.snap'))
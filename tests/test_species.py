@@ -0,0 +1,87 @@
+from app.models import EvolutionClosure
+from app.services import DataProcessor, PokemonRepository
+from app.services.species import SpeciesRepository, closure_rows
+from tests.conftest import API, FakePokeAPI, raw_species, sample_sanitized_pokemon
+
+
+def test_sanitize_species_and_chain():
+    species = DataProcessor.sanitize_species_data(raw_species('pikachu'))
+    assert (species['id'], species['name'], species['evolution_chain_id'], species['generation']) == \
+        (25, 'Pikachu', 10, 1)
+    assert species['genus'] == 'Pikachu Pokémon' and species['flavor_text'] == 'Newer text.'
+    assert [v['pokemon_name'] for v in species['varieties']] == ['Pikachu', 'Pikachu-rock-star']
+
+    chain = DataProcessor.sanitize_evolution_chain(FakePokeAPI().get_evolution_chain(67))
+    assert [s['name'] for s in chain['species']] == ['Eevee', 'Vaporeon', 'Jolteon', 'Flareon']
+    assert {(e['from_species_id'], e['to_species_id'], e['item']) for e in chain['edges']} == {
+        (133, 134, None), (133, 135, 'thunder-stone'), (133, 136, None)}
+
+    pairs = {(row['ancestor_id'], row['descendant_id'], row['depth'])
+             for row in closure_rows(DataProcessor.sanitize_evolution_chain(FakePokeAPI().get_evolution_chain(10)))}
+    assert pairs == {(172, 172, 0), (25, 25, 0), (26, 26, 0), (172, 25, 1), (25, 26, 1), (172, 26, 2)}
+
+
+def test_fetch_all_requests_each_chain_once(session):
+    pokeapi = FakePokeAPI()
+    result = SpeciesRepository.fetch_all(session, pokeapi, [25, 26, 133, 135, 999], workers=4)
+    session.commit()
+
+    assert (result['species'], result['chains'], result['failed']) == (4, 2, ['species 999'])
+    assert pokeapi.calls == {'species': 5, 'chain': 2}
+    assert session.query(EvolutionClosure).count() == 6 + 7
+
+    # already stored: nothing to fetch again
+    again = SpeciesRepository.fetch_all(session, pokeapi, [25, 26, 133], workers=4)
+    assert (again['species'], again['chains']) == (0, 0) and pokeapi.calls['species'] == 5
+
+
+def test_fetch_all_reaches_forms_and_survives_bad_payloads(session):
+    for name, number in (('Eevee', 133), ('Pikachu-rock-star', 10080), ('Eevee-starter', 10159)):
+        session.add(PokemonRepository.build_pokemon(session, dict(sample_sanitized_pokemon(), name=name,
+                                                                  pokedex_number=number)))
+    session.commit()
+
+    class FormsAndBadChain(FakePokeAPI):
+        def get_pokemon(self, name, selective=None):
+            self._count('pokemon')
+            species_id = {10080: 25, 10159: 133}[int(name)]
+            return {'id': int(name), 'species': {'url': f'{API}/pokemon-species/{species_id}/'}}
+
+        def get_evolution_chain(self, chain_id):
+            # a payload sanitize_evolution_chain can't read
+            return {'id': chain_id} if chain_id == 67 else super().get_evolution_chain(chain_id)
+
+    pokeapi = FormsAndBadChain()
+    assert SpeciesRepository.unresolved_form_ids(session) == [10080, 10159]
+    result = SpeciesRepository.fetch_all(session, pokeapi, workers=4)
+    session.commit()
+
+    assert (result['species'], result['chains'], result['failed']) == (2, 1, ['chain 67'])
+    assert pokeapi.calls == {'species': 2, 'pokemon': 2, 'chain': 1}
+    assert SpeciesRepository.species_for(session, 'Pikachu-rock-star').id == 25
+    assert SpeciesRepository.unresolved_form_ids(session) == [10159]
+
+
+def test_family_from_closure(session):
+    for name, number in (('Pikachu', 25), ('Pikachu-rock-star', 10080), ('Eevee', 133)):
+        session.add(PokemonRepository.build_pokemon(session, dict(sample_sanitized_pokemon(), name=name,
+                                                                  pokedex_number=number)))
+    session.commit()
+    pokeapi = FakePokeAPI()
+    assert SpeciesRepository.stored_species_ids(session) == [25, 133]
+    # the form is a variety of Pikachu, so it needs no request of its own
+    assert SpeciesRepository.fetch_all(session, pokeapi)['failed'] == []
+    session.commit()
+
+    family = SpeciesRepository.family(session, SpeciesRepository.species_for(session, 'Pikachu-rock-star'))
+    assert family['species']['name'] == 'Pikachu'
+    assert (family['ancestors'], family['descendants']) == (['Pichu'], ['Raichu'])
+    assert [(m['name'], m['stage'], m['evolves_from']) for m in family['family']] == [
+        ('Pichu', 0, None), ('Pikachu', 1, 'Pichu'), ('Raichu', 2, 'Pikachu')]
+    assert family['family'][1]['stored'] == ['Pikachu', 'Pikachu-rock-star']
+    # Pichu was only seen as a chain member
+    assert family['family'][0]['stored'] == [] and SpeciesRepository.species_for(session, 'Pichu').genus is None
+
+    eevee = SpeciesRepository.family(session, SpeciesRepository.species_for(session, 'Eevee'))
+    assert eevee['ancestors'] == [] and eevee['descendants'] == ['Vaporeon', 'Jolteon', 'Flareon']
+    assert eevee['family'][2]['item'] == 'thunder-stone'
@@ -0,0 +1,55 @@
+import os
+
+from app.models import Pokemon
+from app.services.persistence import PokemonRepository
+from app.services.sprites import SpriteStore, download_sprites
+from tests.conftest import PNG, sample_sanitized_pokemon
+
+
+SVG = b'<svg xmlns="http://www.w3.org/2000/svg"></svg>'
+
+
+class FakeImages:
+    def __init__(self, images):
+        self.images = images
+        self.calls = []
+
+    def __call__(self, url):
+        self.calls.append(url)
+        return self.images.get(url)
+
+
+def test_store_deduplicates_by_content(tmp_path):
+    store = SpriteStore(str(tmp_path))
+    first = store.put(PNG)
+
+    assert store.put(PNG) == first and len(first) == 64
+    assert os.listdir(tmp_path / first[:2]) == [first]
+    assert store.content_type(first) == 'image/png'
+    assert store.content_type(store.put(SVG)) == 'image/svg+xml'
+    assert store.path('../../etc/passwd') is None and not store.has('0' * 64)
+
+
+def test_download_sprites_fetches_each_url_once(session, tmp_path):
+    for name, url in (('Pikachu', 'https://x/25.png'), ('Pikachu-rock-star', 'https://x/25.png'),
+                      ('Raichu', 'https://x/26.png'), ('Missingno', 'https://x/0.png'), ('Ditto', '')):
+        session.add(PokemonRepository.build_pokemon(session, dict(sample_sanitized_pokemon(), name=name,
+                                                                  sprite_url=url)))
+    session.commit()
+    store = SpriteStore(str(tmp_path))
+    fetch = FakeImages({'https://x/25.png': PNG, 'https://x/26.png': SVG})
+
+    result = download_sprites(session, store, fetch, workers=4)
+    session.commit()
+
+    assert result == {'downloaded': 2, 'pokemon': 3, 'failed': ['https://x/0.png']}
+    assert sorted(fetch.calls) == ['https://x/0.png', 'https://x/25.png', 'https://x/26.png']
+    pikachu = session.query(Pokemon).filter_by(name='Pikachu').one()
+    assert pikachu.to_dict()['sprite_url'] == 'https://x/25.png'
+    assert pikachu.to_dict(local_sprites=True)['sprite_url'] == '/sprites/' + store.put(PNG)
+    assert session.query(Pokemon).filter_by(name='Missingno').one().to_dict(local_sprites=True)['sprite_url'] == \
+        'https://x/0.png'
+
+    # cached files aren't fetched again; only the one that failed is retried
+    again = download_sprites(session, store, fetch)
+    assert (again['downloaded'], fetch.calls[3:]) == (0, ['https://x/0.png'])
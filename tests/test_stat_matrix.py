@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.models import Pokemon
+from app.models.pokemon import Base
+from app.services import PokemonRepository
+from app.services.stat_matrix import StatMatrix, StatMatrixStore, STAT_ORDER, data_fingerprint, parse_score
+from tests.conftest import sanitized_with_stats
+
+
+@pytest.fixture()
+def session(session):
+    for data in [
+        sanitized_with_stats('Charizard', 6, ['Fire', 'Flying'], [78, 84, 78, 109, 85, 100]),
+        sanitized_with_stats('Blastoise', 9, ['Water'], [79, 83, 100, 85, 105, 78]),
+        sanitized_with_stats('Jolteon', 135, ['Electric'], [65, 65, 60, 110, 95, 130]),
+        sanitized_with_stats('Snorlax', 143, ['Normal'], [160, 110, 65, 65, 110, 30]),
+    ]:
+        session.add(PokemonRepository.build_pokemon(session, data))
+    session.commit()
+    return session
+
+
+def test_matrix_is_aligned_with_database(session):
+    matrix = StatMatrix.from_session(session)
+
+    assert matrix.stats.shape == (4, len(STAT_ORDER))
+    assert matrix.stats[0].tolist() == [78, 84, 78, 109, 85, 100]
+    assert (matrix.type_ids[0] > 0).all()
+    assert matrix.type_ids[1, 1] == 0
+
+
+def test_vectorized_queries(session):
+    matrix = StatMatrix.from_session(session)
+    ids = {name: pokemon_id for pokemon_id, name in session.query(Pokemon.id, Pokemon.name)}
+
+    assert [r['id'] for r in matrix.top_k('speed', 2)] == [ids['Jolteon'], ids['Charizard']]
+    assert matrix.top_k(parse_score('hp:1,defense:1'), 1)[0]['id'] == ids['Snorlax']
+    assert matrix.percentiles([50])['hp'] == [78.5]
+    mask = matrix.threshold_mask({'speed': 80, 'sp_atk': 100})
+    assert sorted(matrix.ids[mask].tolist()) == sorted([ids['Charizard'], ids['Jolteon']])
+    hp = [78, 79, 65, 160]
+    mean = sum(hp) / 4
+    std = (sum((value - mean) ** 2 for value in hp) / 4) ** 0.5
+    assert matrix.zscores(ids['Snorlax'])[0] == pytest.approx((160 - mean) / std)
+
+
+def test_store_memory_maps_cache_file(session, tmp_path):
+    path = str(tmp_path / 'stats.npy')
+    built = StatMatrixStore(path).get(session)
+
+    loaded = StatMatrix.load(path, data_fingerprint(session))
+    assert isinstance(loaded.records, np.memmap)
+    assert loaded.stats.tolist() == built.stats.tolist()
+    assert StatMatrix.load(path, 'stale') is None
+
+
+def test_store_notices_commits_from_other_connections(tmp_path):
+    url = f"sqlite:///{tmp_path / 'dex.db'}"
+    ours, theirs = create_engine(url), create_engine(url)
+    Base.metadata.create_all(ours)
+    session = sessionmaker(bind=ours)()
+    session.add(PokemonRepository.build_pokemon(session, sanitized_with_stats('Pikachu', 25, ['Electric'], [35] * 6)))
+    session.commit()
+
+    store = StatMatrixStore(poll_interval=0)
+    matrix = store.get(session)
+    assert len(matrix) == 1 and store.get(session) is matrix
+
+    # scout.py or another worker writes through its own engine: no commit listener fires in this one
+    other = sessionmaker(bind=theirs)()
+    other.add(PokemonRepository.build_pokemon(other, sanitized_with_stats('Raichu', 26, ['Electric'], [60] * 6)))
+    other.commit()
+    other.close()
+
+    assert len(store.get(session)) == 2
+    store.close()
+    session.close()
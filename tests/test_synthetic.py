@@ -0,0 +1,47 @@
+import numpy as np
+
+from app.models import Pokemon, PokemonAbility
+from benchmarks.synthetic import MIN_SAMPLE, Distribution, load, sanitized_pokemon
+
+
+def test_batch_columns_line_up():
+    batch = Distribution.default().batch(10, 200, np.random.default_rng(0))
+
+    assert len(batch) == 200 and batch.names[0] == 'Synthmon10' and batch.pokedex_numbers[-1] == 209
+    assert len(batch.stats) == len(batch.efforts) == 200 * 6
+    assert set(batch.type_parent) == set(batch.ability_parent) == set(range(200))
+    assert all(5 <= stat <= 255 for stat in batch.stats)
+
+
+def test_loaded_rows_round_trip_through_to_dict(session):
+    load(session, 300)
+    session.commit()
+
+    stored = [p.to_dict() for p in session.query(Pokemon).order_by(Pokemon.id)]
+    assert len(stored) == 300
+    for row, expected in zip(stored, sanitized_pokemon(300)):
+        assert (row['name'], row['pokedex_number'], row['height']) == \
+            (expected['name'], expected['pokedex_number'], expected['height'])
+        assert [t['type'] for t in row['types']] == [t['type_name'] for t in expected['types']]
+        assert [a['ability'] for a in row['abilities']] == [a['ability_name'] for a in expected['abilities']]
+        assert [s['base_stat'] for s in row['stats']] == [s['base_stat'] for s in expected['stats']]
+
+
+def test_fit_falls_back_to_the_defaults(session):
+    load(session, MIN_SAMPLE - 1)
+    session.commit()
+    assert not Distribution.from_session(session).fitted
+
+    load(session, 300, start=MIN_SAMPLE)
+    session.commit()
+    fitted = Distribution.from_session(session)
+    assert fitted.fitted and fitted.stat_cov.shape == (6, 6)
+    assert np.allclose(fitted.stat_mean, Distribution.default().stat_mean, atol=10)
+
+    # no ability rows at all: the default abilities, not NaN weights
+    session.query(PokemonAbility).delete()
+    session.commit()
+    fitted = Distribution.from_session(session)
+    assert fitted.abilities == Distribution.default().abilities
+    assert np.isfinite(fitted.ability_weights).all() and np.isfinite(fitted.ability_counts).all()
+    assert len(fitted.batch(1, 50, np.random.default_rng(1)).ability_names) > 0
@@ -0,0 +1,62 @@
+from itertools import combinations
+
+import numpy as np
+import pytest
+
+from app.services.stat_matrix import StatMatrix, RECORD_DTYPE
+from app.services.team_optimizer import TeamOptimizer, popcount
+from app.services.type_chart import TypeChart
+
+
+def make_optimizer(count=16, seed=3):
+    rng = np.random.default_rng(seed)
+    chart = TypeChart(range(1, 9), [f'T{i}' for i in range(1, 9)], rng.choice([0.0, 0.5, 1.0, 2.0], size=(8, 8)))
+    records = np.zeros(count, dtype=RECORD_DTYPE)
+    records['id'] = np.arange(1, count + 1)
+    records['stats'] = rng.integers(20, 150, size=(count, 6))
+    records['type_ids'][:, 0] = rng.integers(1, 9, size=count)
+    records['type_ids'][:, 1] = np.where(rng.random(count) < 0.5, rng.integers(1, 9, size=count), 0)
+    return TeamOptimizer(StatMatrix(records), chart)
+
+
+def brute_force(optimizer, size, rows, required=()):
+    best = None
+    for picked in combinations(rows, size - len(required)):
+        team = [*required, *picked]
+        offense = defense = 0
+        for row in team:
+            offense |= optimizer.offense[row]
+            defense |= optimizer.defense[row]
+        key = (popcount(offense) + popcount(defense), int(optimizer.totals[team].sum()))
+        best = key if best is None or key > best else best
+    return best
+
+
+@pytest.mark.parametrize('seed', [1, 2, 3])
+def test_matches_brute_force(seed):
+    optimizer = make_optimizer(seed=seed)
+    result = optimizer.optimize(size=4)
+
+    assert result['optimal']
+    assert len(set(result['ids'])) == 4
+    assert (result['coverage'], result['stat_total']) == brute_force(optimizer, 4, range(16))
+
+
+def test_constraints():
+    optimizer = make_optimizer()
+    banned = int(optimizer.matrix.type_ids[0, 0])
+    min_total = int(np.median(optimizer.totals))
+
+    result = optimizer.optimize(size=3, required_ids=[1], banned_type_ids=[banned], min_total=min_total)
+
+    assert result['optimal']
+    assert result['ids'][0] == 1
+    allowed = [row for row in range(1, 16)
+               if banned not in optimizer.matrix.type_ids[row] and optimizer.totals[row] >= min_total]
+    assert all(optimizer.matrix.row(pokemon_id) in allowed for pokemon_id in result['ids'][1:])
+    assert (result['coverage'], result['stat_total']) == brute_force(optimizer, 3, allowed, required=[0])
+
+    with pytest.raises(ValueError):
+        optimizer.optimize(size=7)
+    with pytest.raises(ValueError):
+        optimizer.optimize(required_ids=[999])
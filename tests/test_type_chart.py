@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+
+from app.services import DataProcessor, TypeChartRepository
+from app.services.type_chart import TypeChart
+
+
+def raw_type(name, double=(), half=(), none=()):
+    return {
+        'name': name,
+        'damage_relations': {
+            'double_damage_to': [{'name': t} for t in double],
+            'half_damage_to': [{'name': t} for t in half],
+            'no_damage_to': [{'name': t} for t in none],
+        }
+    }
+
+
+# a slice of the real chart, enough for fire/flying/electric/ground/rock/water
+RAW_TYPES = [
+    raw_type('fire', double=['grass'], half=['fire', 'water', 'rock']),
+    raw_type('water', double=['fire', 'ground', 'rock'], half=['water', 'grass']),
+    raw_type('electric', double=['water', 'flying'], half=['electric', 'grass'], none=['ground']),
+    raw_type('ground', double=['fire', 'electric', 'rock'], half=['grass'], none=['flying']),
+    raw_type('rock', double=['fire', 'flying'], half=['ground']),
+    raw_type('flying', double=['grass'], half=['electric', 'rock']),
+    raw_type('grass', double=['water', 'ground', 'rock'], half=['fire', 'grass', 'flying']),
+]
+
+
+def test_sanitize_type_data():
+    data = DataProcessor.sanitize_type_data(RAW_TYPES[2])
+    assert data['type_name'] == 'Electric'
+    assert data['damage_to'] == {'Water': 2.0, 'Flying': 2.0, 'Electric': 0.5, 'Grass': 0.5, 'Ground': 0.0}
+    assert DataProcessor.sanitize_type_data(None) is None
+
+
+@pytest.fixture()
+def chart_session(session):
+    for raw in RAW_TYPES:
+        TypeChartRepository.store_type(session, DataProcessor.sanitize_type_data(raw))
+    session.commit()
+    return session, TypeChart.from_session(session)
+
+
+def test_dual_type_defensive_profile(chart_session):
+    session, chart = chart_session
+    from app.services.persistence import lookup_cache
+
+    fire, flying, rock = (lookup_cache.resolve(session, 'type', t) for t in ('Fire', 'Flying', 'Rock'))
+    profile = chart.profile_dict(chart.defensive_profiles(np.array([[fire, flying]]))[0])
+
+    assert profile['Rock'] == 4.0
+    assert profile['Ground'] == 0.0
+    assert profile['Water'] == 2.0
+    assert profile['Grass'] == 0.25
+    assert chart.names[:3] == ['Flying', 'Ground', 'Rock']
+    # unknown ids and empty second slots are neutral
+    assert chart.defensive_profiles(np.array([[rock, 999]]))[0].tolist() == \
+        chart.defensive_profiles(np.array([[rock, 0]]))[0].tolist()
+
+
+def test_matchups_take_best_stab_type(chart_session):
+    session, chart = chart_session
+    from app.services.persistence import lookup_cache
+
+    ids = {t: lookup_cache.resolve(session, 'type', t) for t in ('Fire', 'Flying', 'Electric', 'Ground', 'Water')}
+    attackers = np.array([[ids['Electric'], 0], [ids['Ground'], ids['Flying']]])
+    defenders = np.array([[ids['Fire'], ids['Flying']], [ids['Water'], 0], [ids['Ground'], 0]])
+
+    by_type, best = chart.matchups(attackers, defenders)
+
+    assert best.tolist() == [[2.0, 2.0, 0.0], [1.0, 1.0, 1.0]]
+    assert np.isnan(by_type[0, 1]).all()
+    assert by_type[1, 0].tolist() == [0.0, 1.0, 1.0]
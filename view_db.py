@@ -5,13 +5,100 @@ Project: Challenge Assignment
 """
 
 import argparse
-import json
 from app import Session
 from app.models import Pokemon
+from app.services import StatsAggregator, stat_matrix_store
+from app.services.export import FORMATS, export_pokemon
+from app.services.snapshot import DexSnapshot, write_snapshot
+from app.services.stat_matrix import STAT_ORDER, parse_score
 
 
-def list_all_pokemon():
-    """Show all Pokemon in the database."""
+def print_listing(entries):
+    """Print the dex listing from (pokedex_number, name, type names) rows."""
+    print(f"\n{'='*60}")
+    print(f"POKEMON IN DATABASE ({len(entries)} total)")
+    print(f"{'='*60}\n")
+    
+    for pokedex_number, name, types in entries:
+        print(f"#{pokedex_number:03d} - {name:15s} | Types: {', '.join(types)}")
+    
+    print(f"\n{'='*60}\n")
+
+
+def print_details(pokemon):
+    """Print one Pokemon in Pokemon.to_dict form."""
+    print(f"\n{'='*60}")
+    print(f"POKEMON DETAILS: {pokemon['name'].upper()}")
+    print(f"{'='*60}\n")
+    
+    print(f"Pokedex Number: #{pokemon['pokedex_number']}")
+    print(f"Height: {pokemon['height'] / 10:.1f}m")
+    print(f"Weight: {pokemon['weight'] / 10:.1f}kg")
+    print(f"Base Experience: {pokemon['base_experience']}")
+    
+    print(f"\nTypes:")
+    for ptype in pokemon['types']:
+        print(f"  - {ptype['type']}")
+    
+    print(f"\nAbilities:")
+    for ability in pokemon['abilities']:
+        hidden = " (Hidden)" if ability['is_hidden'] else ""
+        print(f"  - {ability['ability']}{hidden}")
+    
+    print(f"\nBase Stats:")
+    for stat in pokemon['stats']:
+        bar = '█' * (stat['base_stat'] // 5)
+        print(f"  {stat['stat']:20s}: {stat['base_stat']:3d} {bar}")
+    
+    if pokemon['sprite_url']:
+        print(f"\nSprite URL: {pokemon['sprite_url']}")
+    
+    print(f"\n{'='*60}\n")
+
+
+def print_summary(pokemon):
+    """Print one Pokemon, in Pokemon.to_dict form, as a --all entry."""
+    print(f"\n{'='*60}")
+    print(f"#{pokemon['pokedex_number']:03d} - {pokemon['name'].upper()}")
+    print(f"{'='*60}")
+    
+    types = ', '.join([t['type'] for t in pokemon['types']])
+    abilities = ', '.join([a['ability'] for a in pokemon['abilities']])
+    
+    print(f"Types: {types}")
+    print(f"Abilities: {abilities}")
+    print(f"Height: {pokemon['height'] / 10:.1f}m | Weight: {pokemon['weight'] / 10:.1f}kg")
+    print(f"Base Experience: {pokemon['base_experience']}")
+    
+    print("\nStats:")
+    for stat in pokemon['stats']:
+        print(f"  {stat['stat']:20s}: {stat['base_stat']:3d}")
+
+
+def open_snapshot(path):
+    """The DexSnapshot at path, or None (with a message) if it can't be read."""
+    try:
+        return DexSnapshot(path)
+    except (OSError, ValueError) as e:
+        print(f"Cannot read snapshot: {e}")
+        print("Write one with 'python view_db.py --write-snapshot FILE'.")
+        return None
+
+
+def list_all_pokemon(snapshot_path=None):
+    """Show all Pokemon in the database (or in a snapshot file)."""
+    if snapshot_path:
+        snapshot = open_snapshot(snapshot_path)
+        if snapshot is None:
+            return
+        with snapshot:
+            entries = list(snapshot.listing())
+        if not entries:
+            print("No Pokemon found in snapshot.")
+            return
+        print_listing(entries)
+        return
+    
     session = Session()
     try:
         all_pokemon = session.query(Pokemon).order_by(Pokemon.pokedex_number).all()
@@ -21,22 +108,26 @@ def list_all_pokemon():
             print("Run 'python scout.py --default' to add some.")
             return
         
-        print(f"\n{'='*60}")
-        print(f"POKEMON IN DATABASE ({len(all_pokemon)} total)")
-        print(f"{'='*60}\n")
-        
-        for p in all_pokemon:
-            types = ', '.join([t.type_name for t in p.types])
-            print(f"#{p.pokedex_number:03d} - {p.name:15s} | Types: {types}")
-        
-        print(f"\n{'='*60}\n")
+        print_listing([(p.pokedex_number, p.name, [t.type_name for t in p.types]) for p in all_pokemon])
         
     finally:
         session.close()
 
 
-def view_pokemon(pokemon_name):
+def view_pokemon(pokemon_name, snapshot_path=None):
     """Show detailed info about a Pokemon."""
+    if snapshot_path:
+        snapshot = open_snapshot(snapshot_path)
+        if snapshot is None:
+            return
+        with snapshot:
+            pokemon = snapshot.get(pokemon_name)
+        if not pokemon:
+            print(f"\nPokemon '{pokemon_name}' not in snapshot.")
+            return
+        print_details(pokemon)
+        return
+    
     session = Session()
     try:
         pokemon = session.query(Pokemon).filter_by(name=pokemon_name.capitalize()).first()
@@ -46,40 +137,29 @@ def view_pokemon(pokemon_name):
             print("Use --list to see what's available.")
             return
         
-        print(f"\n{'='*60}")
-        print(f"POKEMON DETAILS: {pokemon.name.upper()}")
-        print(f"{'='*60}\n")
-        
-        print(f"Pokedex Number: #{pokemon.pokedex_number}")
-        print(f"Height: {pokemon.height / 10:.1f}m")
-        print(f"Weight: {pokemon.weight / 10:.1f}kg")
-        print(f"Base Experience: {pokemon.base_experience}")
-        
-        print(f"\nTypes:")
-        for ptype in pokemon.types:
-            print(f"  - {ptype.type_name}")
-        
-        print(f"\nAbilities:")
-        for ability in pokemon.abilities:
-            hidden = " (Hidden)" if ability.is_hidden else ""
-            print(f"  - {ability.ability_name}{hidden}")
-        
-        print(f"\nBase Stats:")
-        for stat in pokemon.stats:
-            bar = '█' * (stat.base_stat // 5)
-            print(f"  {stat.stat_name:20s}: {stat.base_stat:3d} {bar}")
-        
-        if pokemon.sprite_url:
-            print(f"\nSprite URL: {pokemon.sprite_url}")
-        
-        print(f"\n{'='*60}\n")
+        print_details(pokemon.to_dict())
         
     finally:
         session.close()
 
 
-def view_all_detailed():
+def view_all_detailed(snapshot_path=None):
     """View all Pokemon with full details."""
+    if snapshot_path:
+        snapshot = open_snapshot(snapshot_path)
+        if snapshot is None:
+            return
+        with snapshot:
+            if not len(snapshot):
+                print("No Pokemon found in snapshot.")
+                return
+            for pokemon in snapshot.iter_by_number():
+                print_summary(pokemon)
+            total = len(snapshot)
+        print(f"\n{'='*60}\n")
+        print(f"Total Pokemon: {total}")
+        return
+    
     session = Session()
     try:
         all_pokemon = session.query(Pokemon).order_by(Pokemon.pokedex_number).all()
@@ -89,21 +169,7 @@ def view_all_detailed():
             return
         
         for pokemon in all_pokemon:
-            print(f"\n{'='*60}")
-            print(f"#{pokemon.pokedex_number:03d} - {pokemon.name.upper()}")
-            print(f"{'='*60}")
-            
-            types = ', '.join([t.type_name for t in pokemon.types])
-            abilities = ', '.join([a.ability_name for a in pokemon.abilities])
-            
-            print(f"Types: {types}")
-            print(f"Abilities: {abilities}")
-            print(f"Height: {pokemon.height / 10:.1f}m | Weight: {pokemon.weight / 10:.1f}kg")
-            print(f"Base Experience: {pokemon.base_experience}")
-            
-            print("\nStats:")
-            for stat in pokemon.stats:
-                print(f"  {stat.stat_name:20s}: {stat.base_stat:3d}")
+            print_summary(pokemon.to_dict())
         
         print(f"\n{'='*60}\n")
         print(f"Total Pokemon: {len(all_pokemon)}")
@@ -112,25 +178,28 @@ def view_all_detailed():
         session.close()
 
 
-def export_to_json(filename):
-    """Export all Pokemon data to a JSON file."""
+def write_dex_snapshot(filename):
+    """Write the stored dex to a memory-mappable snapshot file for --snapshot."""
     session = Session()
     try:
-        all_pokemon = session.query(Pokemon).all()
+        result = write_snapshot(session, filename)
+        print(f"\n✓ Wrote {result['count']} Pokemon to snapshot '{filename}' ({result['bytes'] / 1024:.0f} KiB)")
         
-        if not all_pokemon:
+    finally:
+        session.close()
+
+
+def export_to_json(filename, fmt=None, compress=None):
+    """Export all Pokemon data, streamed row by row (json, ndjson or per-table csv; .gz to compress)."""
+    session = Session()
+    try:
+        if not session.query(Pokemon.id).first():
             print("No Pokemon found in database.")
             return
         
-        data = {
-            'count': len(all_pokemon),
-            'pokemon': [p.to_dict() for p in all_pokemon]
-        }
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        result = export_pokemon(session, filename, fmt, compress)
         
-        print(f"\n✓ Exported {len(all_pokemon)} Pokemon to '{filename}'")
+        print(f"\n✓ Exported {result['count']} Pokemon to {', '.join(repr(f) for f in result['files'])}")
         
     finally:
         session.close()
@@ -140,7 +209,9 @@ def stats_summary():
     """Show database statistics."""
     session = Session()
     try:
-        total = session.query(Pokemon).count()
+        # read from the aggregate tables rather than scanning the Pokemon tables
+        summary = StatsAggregator.summary(session)
+        total = summary['total']
         
         if total == 0:
             print("No Pokemon found in database.")
@@ -152,28 +223,15 @@ def stats_summary():
         
         print(f"Total Pokemon: {total}")
         
-        # Get all Pokemon with types
-        from sqlalchemy import func
-        from app.models import PokemonType
-        
-        type_counts = session.query(
-            PokemonType.type_name, 
-            func.count(PokemonType.type_name)
-        ).group_by(PokemonType.type_name).all()
-        
         print(f"\nType Distribution:")
-        for type_name, count in sorted(type_counts, key=lambda x: x[1], reverse=True):
+        for type_name, count in summary['types'].items():
             print(f"  {type_name:15s}: {count}")
         
-        # Average stats
-        avg_height = session.query(func.avg(Pokemon.height)).scalar()
-        avg_weight = session.query(func.avg(Pokemon.weight)).scalar()
-        avg_exp = session.query(func.avg(Pokemon.base_experience)).scalar()
-        
+        metrics = summary['metrics']
         print(f"\nAverages:")
-        print(f"  Height: {avg_height / 10:.2f}m")
-        print(f"  Weight: {avg_weight / 10:.2f}kg")
-        print(f"  Base Experience: {avg_exp:.1f}")
+        print(f"  Height: {metrics['height']['mean'] / 10:.2f}m")
+        print(f"  Weight: {metrics['weight']['mean'] / 10:.2f}kg")
+        print(f"  Base Experience: {metrics['base_experience']['mean']:.1f}")
         
         print(f"\n{'='*60}\n")
         
@@ -181,6 +239,74 @@ def stats_summary():
         session.close()
 
 
+def top_pokemon(by, k):
+    """Show the top k Pokemon by a stat, 'total' or a weighted formula like 'attack:1.5,speed:1'."""
+    session = Session()
+    try:
+        matrix = stat_matrix_store.get(session)
+        if not len(matrix):
+            print("No Pokemon found in database.")
+            return
+        
+        results = matrix.top_k(parse_score(by), k)
+        names = dict(session.query(Pokemon.id, Pokemon.name).filter(
+            Pokemon.id.in_([r['id'] for r in results])
+        ).all())
+        
+        print(f"\n{'='*60}")
+        print(f"TOP {len(results)} BY {by.upper()}")
+        print(f"{'='*60}\n")
+        for rank, result in enumerate(results, 1):
+            print(f"  {rank:3d}. {names.get(result['id'], '?'):15s} {result['score']:8.1f}")
+        print(f"\n{'='*60}\n")
+        
+    finally:
+        session.close()
+
+
+def stat_percentiles():
+    """Show the 10th/25th/50th/75th/90th percentile of each base stat."""
+    session = Session()
+    try:
+        matrix = stat_matrix_store.get(session)
+        if not len(matrix):
+            print("No Pokemon found in database.")
+            return
+        
+        q = [10, 25, 50, 75, 90]
+        percentiles = matrix.percentiles(q)
+        
+        print(f"\n{'='*60}")
+        print(f"STAT PERCENTILES ({len(matrix)} Pokemon)")
+        print(f"{'='*60}\n")
+        print(f"  {'stat':10s}" + ''.join(f"{f'p{value}':>8s}" for value in q))
+        for stat in STAT_ORDER:
+            print(f"  {stat:10s}" + ''.join(f"{value:8.1f}" for value in percentiles[stat]))
+        print(f"\n{'='*60}\n")
+        
+    finally:
+        session.close()
+
+
+def stat_zscores(pokemon_name):
+    """Show how a Pokemon's base stats compare to the rest of the database."""
+    session = Session()
+    try:
+        pokemon_id = session.query(Pokemon.id).filter_by(name=pokemon_name.capitalize()).scalar()
+        if pokemon_id is None:
+            print(f"\nPokemon '{pokemon_name}' not in database.")
+            return
+        
+        zscores = stat_matrix_store.get(session).zscores(pokemon_id)
+        print(f"\nStat z-scores for {pokemon_name.capitalize()}:")
+        for stat, value in zip(STAT_ORDER, zscores.tolist()):
+            print(f"  {stat:10s}: {value:+.2f}")
+        print()
+        
+    finally:
+        session.close()
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='View Pokemon data stored in the database'
@@ -207,29 +333,83 @@ def main():
         '--export',
         type=str,
         metavar='FILENAME',
-        help='Export all Pokemon to JSON file'
+        help='Export all Pokemon (format from the extension: .json, .ndjson, .csv; add .gz to compress)'
     )
     group.add_argument(
         '--stats',
         action='store_true',
         help='Show database statistics'
     )
+    group.add_argument(
+        '--top',
+        type=str,
+        metavar='STAT',
+        help="Top Pokemon by a stat, 'total' or weights like 'attack:1.5,speed:1'"
+    )
+    group.add_argument(
+        '--percentiles',
+        action='store_true',
+        help='Show base stat percentiles'
+    )
+    group.add_argument(
+        '--zscores',
+        type=str,
+        metavar='NAME',
+        help='Show stat z-scores of a Pokemon against the database'
+    )
+    group.add_argument(
+        '--write-snapshot',
+        type=str,
+        metavar='FILENAME',
+        help='Write the dex to a binary snapshot file for --snapshot'
+    )
+    parser.add_argument(
+        '--snapshot',
+        type=str,
+        metavar='FILENAME',
+        help='Read --list, --pokemon and --all from a snapshot file instead of the database'
+    )
+    parser.add_argument(
+        '--format',
+        choices=FORMATS,
+        help='Export format, overriding the file extension'
+    )
+    parser.add_argument(
+        '--gzip',
+        action='store_true',
+        default=None,
+        help='Gzip the export even without a .gz extension'
+    )
+    parser.add_argument(
+        '-k',
+        type=int,
+        default=10,
+        help='How many Pokemon --top shows (default: 10)'
+    )
     
     args = parser.parse_args()
     
     if args.list:
-        list_all_pokemon()
+        list_all_pokemon(args.snapshot)
     elif args.pokemon:
-        view_pokemon(args.pokemon)
+        view_pokemon(args.pokemon, args.snapshot)
     elif args.all:
-        view_all_detailed()
+        view_all_detailed(args.snapshot)
+    elif args.write_snapshot:
+        write_dex_snapshot(args.write_snapshot)
     elif args.export:
-        export_to_json(args.export)
+        export_to_json(args.export, args.format, args.gzip)
     elif args.stats:
         stats_summary()
+    elif args.top:
+        top_pokemon(args.top, args.k)
+    elif args.percentiles:
+        stat_percentiles()
+    elif args.zscores:
+        stat_zscores(args.zscores)
     else:
         # Default: list all Pokemon
-        list_all_pokemon()
+        list_all_pokemon(args.snapshot)
 
 
 if __name__ == '__main__':